@@ -20,6 +20,10 @@ def create_app(config_name='default'):
     # Configure the app
     configure_app(app, config_name)
     
+    # Pick the PostgreSQL driver and pool options before the engine is created
+    from app.utils.postgres_engine import configure_postgres, init_postgres_session
+    configure_postgres(app)
+    
     # Initialize extensions with app
     db.init_app(app)
     migrate.init_app(app, db)
@@ -37,6 +41,54 @@ def create_app(config_name='default'):
     from app.utils.cache_utils import cache_static_files
     cache_static_files(app, max_age=app.config.get('STATIC_CACHE_TIMEOUT', 86400))
     
+    # Set PostgreSQL session timeouts on every connection
+    init_postgres_session(app)
+    
+    # Create the coming months' partitions of a partitioned tasks table
+    from app.utils.task_partitions import init_task_partitions
+    init_task_partitions(app)
+    
+    # Tune SQLite connections for concurrent workers when enabled
+    from app.utils.sqlite_profile import init_sqlite_profile
+    init_sqlite_profile(app)
+    
+    # Profile the SQL run by each request
+    from app.utils.query_instrumentation import instrument_queries
+    instrument_queries(app)
+    
+    # Log slow statements with their call sites when enabled
+    from app.utils.slow_query_log import init_slow_query_log
+    init_slow_query_log(app)
+    
+    # Sample request stacks when profiling is enabled
+    from app.utils.request_profiler import init_request_profiler
+    init_request_profiler(app)
+    
+    # Record request, database and cache metrics
+    from app.utils.metrics import init_metrics
+    init_metrics(app)
+    
+    # Trace the stages of sampled requests
+    from app.utils.tracing import init_tracing
+    init_tracing(app)
+    
+    # Capture request patterns for local replay when enabled
+    from app.utils.traffic_capture import init_traffic_capture
+    init_traffic_capture(app)
+    
+    # Serve @read_only views from the read replica when one is configured; registered
+    # before the unit of work so it sees the writes flushed by the request's commit
+    from app.utils.read_replica import init_read_replica
+    init_read_replica(app)
+    
+    # Commit each request's changes once, before the request metrics are recorded
+    from app.utils.unit_of_work import init_unit_of_work
+    init_unit_of_work(app)
+    
+    # Coalesce each request's confidence updates into one write before it commits
+    from app.utils.confidence_buffer import confidence_buffer
+    confidence_buffer.init_app(app)
+    
     # Register CLI commands
     from app.cli import register_commands
     register_commands(app)
@@ -63,3 +63,429 @@ def register_commands(app):
                     click.echo(click.style(message, fg='green'))
                 else:
                     click.echo(click.style(f"Error: {message}", fg='red'))
+    
+    @app.cli.command('slow-queries')
+    @click.option('--file', 'log_file', default=None, help='Slow query log to read (defaults to the configured file).')
+    @click.option('--limit', default=20, help='Number of fingerprints to show.')
+    @click.option('--plans', is_flag=True, help='Show the captured query plans.')
+    def slow_queries(log_file, limit, plans):
+        """Summarise the slow query log by statement fingerprint."""
+        from app.utils.slow_query_log import slow_query_log_path, summarize_slow_queries
+        
+        log_file = log_file or slow_query_log_path(app)
+        if not os.path.exists(log_file):
+            click.echo(click.style(f"No slow query log at {log_file}", fg='yellow'))
+            return
+        
+        summary = summarize_slow_queries(log_file)
+        click.echo(f"{len(summary)} slow statement fingerprints in {log_file}")
+        for group in summary[:limit]:
+            click.echo('')
+            click.echo(click.style(
+                f"{group['count']} x  total {group['total_ms']:.1f} ms  "
+                f"mean {group['mean_ms']:.1f} ms  max {group['max_ms']:.1f} ms",
+                fg='cyan'
+            ))
+            click.echo(f"  {group['fingerprint']}")
+            for caller in group['callers']:
+                click.echo(f"  from {caller}")
+            if plans and group['plan']:
+                for line in group['plan']:
+                    click.echo(f"    {line}")
+    
+    @app.cli.group('profiler')
+    def profiler():
+        """Control the request profiler and read its results."""
+    
+    @profiler.command('rate')
+    @click.argument('sample_rate', type=click.FloatRange(0.0, 1.0))
+    def profiler_rate(sample_rate):
+        """Profile this fraction of requests in every worker (0 turns sampling off)."""
+        from app.utils.request_profiler import profiler_directory, set_sample_rate
+        
+        set_sample_rate(profiler_directory(app), sample_rate)
+        click.echo(click.style(f"Profiling {sample_rate:.1%} of requests.", fg='green'))
+        if not app.config.get('PROFILER_ENABLED'):
+            click.echo(click.style('PROFILER_ENABLED is not set, so the workers are not profiling.', fg='yellow'))
+    
+    @profiler.command('report')
+    @click.option('--endpoint', default=None, help='Only report this endpoint.')
+    @click.option('--top', default=10, help='Functions to show per endpoint.')
+    def profiler_report(endpoint, top):
+        """Show the hottest functions per endpoint."""
+        from app.utils.request_profiler import load_profiles, profiler_directory, summarize_profile
+        
+        directory = profiler_directory(app)
+        profiles = load_profiles(directory)
+        if endpoint:
+            profiles = {name: stacks for name, stacks in profiles.items() if name == endpoint}
+        if not profiles:
+            click.echo(click.style(f"No profiles in {directory}", fg='yellow'))
+            return
+        
+        for name, stacks in sorted(profiles.items()):
+            summary = summarize_profile(stacks, top)
+            click.echo(click.style(f"{name}: {summary['samples']} samples", fg='cyan'))
+            for title, ranking in (('self', summary['self']), ('inclusive', summary['inclusive'])):
+                click.echo(f"  {title}:")
+                for label, count in ranking:
+                    click.echo(f"    {count / summary['samples']:6.1%}  {label}")
+        click.echo(f"Collapsed stacks for flamegraph tools are in {directory}")
+    
+    @profiler.command('clear')
+    def profiler_clear():
+        """Delete the collected profiles."""
+        from app.utils.request_profiler import PROFILE_SUFFIX, profiler_directory
+        
+        directory = profiler_directory(app)
+        removed = 0
+        if os.path.isdir(directory):
+            for filename in os.listdir(directory):
+                if filename.endswith(PROFILE_SUFFIX):
+                    os.remove(os.path.join(directory, filename))
+                    removed += 1
+        click.echo(click.style(f"Removed {removed} profile files.", fg='green'))
+    
+    @app.cli.command('traces')
+    @click.option('--file', 'trace_file', default=None, help='Trace file to read (defaults to the configured file).')
+    @click.option('--endpoint', default=None, help='Only summarise this endpoint.')
+    @click.option('--top', default=10, help='Spans to show per endpoint.')
+    def traces(trace_file, endpoint, top):
+        """Print critical-path breakdowns of the sampled traces per endpoint."""
+        from app.utils.tracing import summarize_traces, trace_file_path
+        
+        trace_file = trace_file or trace_file_path(app)
+        summaries = summarize_traces(trace_file, endpoint)
+        if not summaries:
+            click.echo(click.style(f"No traces in {trace_file}", fg='yellow'))
+            return
+        
+        for name, summary in sorted(summaries.items(), key=lambda item: -item[1]['mean_ms'] * item[1]['traces']):
+            click.echo(click.style(f"{name}: {summary['traces']} traces, mean {summary['mean_ms']:.1f} ms", fg='cyan'))
+            click.echo('  critical path:')
+            for depth, (span_name, mean_ms) in enumerate(summary['critical_path']):
+                click.echo(f"    {'  ' * depth}{span_name}  {mean_ms:.1f} ms")
+            
+            click.echo('  spans by self time (mean per trace):')
+            spans = sorted(summary['spans'].items(), key=lambda item: -item[1]['mean_self_ms'])
+            for span_name, span_summary in spans[:top]:
+                share = span_summary['mean_ms'] / summary['mean_ms'] if summary['mean_ms'] else 0
+                click.echo(
+                    f"    {span_summary['mean_self_ms']:8.2f} ms self  {span_summary['mean_ms']:8.2f} ms total "
+                    f"({share:5.1%})  x{span_summary['count']}  {span_name}"
+                )
+    
+    @app.cli.command('replay-traffic')
+    @click.argument('capture_file', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--users', default=None, type=int, help='Concurrent virtual users (defaults to one per captured session).')
+    @click.option('--speedup', default=1.0, help='Replay this many times faster than captured (0 = no waiting).')
+    @click.option('--output', default=None, help='Write the JSON report to this file.')
+    def replay_traffic(capture_file, users, speedup, output):
+        """Re-run captured traffic against the local database and report latencies."""
+        import json
+        from app.utils.traffic_capture import load_capture
+        from app.utils.traffic_replay import replay
+        
+        if app.config.get('ENVIRONMENT') == 'production' or os.environ.get('RAILWAY_ENVIRONMENT'):
+            click.echo(click.style('Refusing to replay traffic against a production database.', fg='red'))
+            return
+        
+        report = replay(app, load_capture(capture_file), users=users, speedup=speedup)
+        click.echo(
+            f"{report['requests']} requests from {report['virtual_users']} virtual users in "
+            f"{report['duration_s']:.1f}s on {report['database']} (revision {report['revision']})"
+        )
+        click.echo(f"{'endpoint':<55} {'n':>5} {'p50':>8} {'p95':>8} {'p99':>8} {'queries':>8}  statuses")
+        for endpoint, stats in report['endpoints'].items():
+            click.echo(
+                f"{endpoint:<55} {stats['count']:>5} {stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} "
+                f"{stats['p99_ms']:>8.1f} {stats['mean_queries']:>8.1f}  {stats['statuses']}"
+            )
+        
+        if output:
+            with open(output, 'w', encoding='utf-8') as report_file:
+                json.dump(report, report_file, indent=2)
+            click.echo(click.style(f"Report written to {output}", fg='green'))
+    
+    @app.cli.command('replay-diff')
+    @click.argument('base_report', type=click.File('r'))
+    @click.argument('head_report', type=click.File('r'))
+    @click.option('--threshold', default=0.2, help='Flag endpoints whose p95 grew by more than this fraction.')
+    def replay_diff(base_report, head_report, threshold):
+        """Compare two replay reports, e.g. from two git revisions."""
+        import json
+        from app.utils.traffic_replay import diff_reports
+        
+        base, head = json.load(base_report), json.load(head_report)
+        click.echo(f"base {base.get('revision')}  ->  head {head.get('revision')}")
+        
+        def fmt(value):
+            return f"{value:8.1f}" if value is not None else f"{'-':>8}"
+        
+        regressions = 0
+        for row in diff_reports(base, head):
+            change = row['p95_change']
+            flagged = change is not None and change > threshold
+            regressions += flagged
+            line = (
+                f"{row['endpoint']:<55} p95 {fmt(row['base_p95_ms'])} -> {fmt(row['head_p95_ms'])}  "
+                f"queries {fmt(row['base_queries'])} -> {fmt(row['head_queries'])}"
+                + (f"  {change:+.0%}" if change is not None else '')
+            )
+            click.echo(click.style(line, fg='red') if flagged else line)
+        
+        if regressions:
+            click.echo(click.style(f"{regressions} endpoints regressed by more than {threshold:.0%}", fg='red'))
+    
+    @app.cli.command('synth-data')
+    @click.option('--scale', default='small', type=click.Choice(['small', 'medium', 'large']), help='Preset dataset size.')
+    @click.option('--seed', default=42, help='Random seed; the same seed always produces the same data.')
+    @click.option('--subjects', default=None, type=int, help='Override the number of subjects.')
+    @click.option('--topics', default=None, type=int, help='Override the number of topics.')
+    @click.option('--subtopics', default=None, type=int, help='Override the number of subtopics.')
+    @click.option('--users', default=None, type=int, help='Override the number of users.')
+    @click.option('--tasks', default=None, type=int, help='Override the number of tasks.')
+    @click.option('--batch-size', default=50000, help='Rows per table written in each bulk insert.')
+    def synth_data(scale, seed, subjects, topics, subtopics, users, tasks, batch_size):
+        """Bulk-load a deterministic synthetic dataset for benchmarking."""
+        from app.utils.synthetic_data import generate_synthetic_data
+        
+        if app.config.get('ENVIRONMENT') == 'production' or os.environ.get('RAILWAY_ENVIRONMENT'):
+            click.echo(click.style('Refusing to load synthetic data into a production database.', fg='red'))
+            return
+        
+        def progress(counts):
+            click.echo(f"  tasks {counts['tasks']:,}  task_subtopics {counts['task_subtopics']:,}  "
+                       f"confidences {counts['subtopic_confidences']:,}")
+        
+        counts = generate_synthetic_data(
+            seed=seed, scale=scale, batch_size=batch_size, progress=progress,
+            subjects=subjects, topics=topics, subtopics=subtopics, users=users, tasks=tasks
+        )
+        for table, count in counts.items():
+            click.echo(f"{table:<22} {count:>12,}")
+        click.echo(click.style('Synthetic data loaded.', fg='green'))
+    
+    @app.cli.command('load-test')
+    @click.option('--users', default=10, help='Concurrent virtual students.')
+    @click.option('--days', default=1, help='Study days each student works through.')
+    @click.option('--think-time', default=1.0, help='Mean pause between steps in seconds (0 = none).')
+    @click.option('--ramp-up', default=0.0, help='Seconds over which the students start.')
+    @click.option('--url', default=None, help='Send requests to this server (e.g. http://127.0.0.1:8000) instead of in-process.')
+    @click.option('--seed', default=0, help='Seed for think times and confidence ratings.')
+    @click.option('--output', default=None, help='Write the JSON report to this file.')
+    def load_test(users, days, think_time, ramp_up, url, seed, output):
+        """Simulate concurrent students working through a study day."""
+        import json
+        from app.utils.load_test import run_load_test
+        
+        if app.config.get('ENVIRONMENT') == 'production' or os.environ.get('RAILWAY_ENVIRONMENT'):
+            click.echo(click.style('Refusing to load test against a production database.', fg='red'))
+            return
+        
+        report = run_load_test(app, users=users, days=days, think_time=think_time, ramp_up=ramp_up,
+                               base_url=url, seed=seed)
+        click.echo(
+            f"{report['requests']} requests from {report['virtual_users']} students in {report['duration_s']:.1f}s "
+            f"against {report['target']}: {report['throughput_rps']:.1f} req/s, {report['error_rate']:.1%} errors"
+        )
+        click.echo(f"{'step':<20} {'n':>6} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'errors':>7}  statuses")
+        for step, stats in report['steps'].items():
+            line = (
+                f"{step:<20} {stats['count']:>6} {stats['throughput_rps']:>8.2f} {stats['p50_ms']:>8.1f} "
+                f"{stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} {stats['error_rate']:>7.1%}  {stats['statuses']}"
+            )
+            click.echo(click.style(line, fg='red') if stats['errors'] else line)
+        
+        if output:
+            with open(output, 'w', encoding='utf-8') as report_file:
+                json.dump(report, report_file, indent=2)
+            click.echo(click.style(f"Report written to {output}", fg='green'))
+    
+    @app.cli.command('index-advisor')
+    @click.option('--capture', default=None, type=click.Path(exists=True, dir_okay=False),
+                  help='Replay this traffic capture as the workload instead of a load test.')
+    @click.option('--users', default=3, help='Virtual students in the load test workload.')
+    @click.option('--min-calls', default=1, help='Ignore query shapes seen fewer times.')
+    def index_advisor(capture, users, min_calls):
+        """Run a workload, check its query plans and propose missing indexes."""
+        from app import db
+        from app.utils.index_advisor import QueryRecorder, advise
+        
+        if app.config.get('ENVIRONMENT') == 'production' or os.environ.get('RAILWAY_ENVIRONMENT'):
+            click.echo(click.style('Refusing to run the advisor workload against a production database.', fg='red'))
+            return
+        
+        recorder = QueryRecorder()
+        recorder.attach(db.engine)
+        try:
+            if capture:
+                from app.utils.traffic_capture import load_capture
+                from app.utils.traffic_replay import replay
+                replay(app, load_capture(capture), speedup=0)
+            else:
+                from app.utils.load_test import run_load_test
+                run_load_test(app, users=users, think_time=0)
+        finally:
+            recorder.detach(db.engine)
+        
+        proposals = advise(db.engine, recorder.queries, min_calls=min_calls)
+        click.echo(f"{len(recorder.queries)} query shapes recorded, {len(proposals)} indexes proposed")
+        for proposal in proposals:
+            click.echo('')
+            click.echo(click.style(proposal['ddl'] + ';', fg='green'))
+            click.echo(f"  serves {len(proposal['fingerprints'])} query shapes, "
+                       f"{proposal['calls']} calls, {proposal['total_ms']:.1f}ms")
+            for line in sorted(set(proposal['scans'])):
+                click.echo(f"  plan: {line}")
+            for key in proposal['fingerprints'][:3]:
+                click.echo(f"  {key[:160]}")
+    
+    @app.cli.command('sweep-stale-tasks')
+    @click.option('--grace-days', default=0, help='Only retire tasks overdue by more than this many days.')
+    @click.option('--batch-size', default=500, help='Stale tasks per transaction.')
+    @click.option('--limit', default=None, type=int, help='Retire at most this many tasks.')
+    @click.option('--no-replace', is_flag=True, help='Retire stale tasks without generating replacements.')
+    @click.option('--output', default=None, help='Append the JSON report to this file.')
+    def sweep_stale_tasks_command(grace_days, batch_size, limit, no_replace, output):
+        """Retire overdue open tasks for every user and generate replacements (run daily from a scheduler)."""
+        import json
+        from app.utils.task_sweeper import sweep_stale_tasks
+        
+        report = sweep_stale_tasks(grace_days=grace_days, batch_size=batch_size, limit=limit, replace=not no_replace)
+        click.echo(
+            f"Swept {report['date']}: {report['tasks_retired']} tasks retired and {report['tasks_generated']} "
+            f"generated for {report['users']} users in {report['chunks']} chunks, "
+            f"{report['duration_s']:.1f}s ({report['tasks_per_second']:.1f} tasks/s)"
+        )
+        
+        if output:
+            with open(output, 'a', encoding='utf-8') as report_file:
+                report_file.write(json.dumps(report) + '\n')
+    
+    @app.cli.command('compact-tasks')
+    @click.option('--retention-days', default=90, help='Keep skipped tasks created this many days back.')
+    @click.option('--history-days', default=365, help='Keep completed tasks created this many days back.')
+    @click.option('--archive-completed', is_flag=True, help='Archive completed tasks past the retention window.')
+    @click.option('--batch-size', default=1000, help='Tasks per transaction.')
+    @click.option('--limit', default=None, type=int, help='Compact at most this many tasks.')
+    @click.option('--no-vacuum', is_flag=True, help='Only analyze the tables afterwards.')
+    @click.option('--output', default=None, help='Append the JSON report to this file.')
+    def compact_tasks_command(retention_days, history_days, archive_completed, batch_size, limit, no_vacuum, output):
+        """Fold old skipped and completed tasks into daily rollups and delete them (run weekly from a scheduler)."""
+        import json
+        from app.utils.task_compaction import compact_tasks
+        
+        try:
+            report = compact_tasks(retention_days=retention_days, history_days=history_days,
+                                   archive_completed=archive_completed, batch_size=batch_size,
+                                   limit=limit, vacuum=not no_vacuum)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint='--retention-days')
+        
+        click.echo(
+            f"Compacted {report['date']}: {report['tasks_deleted']} tasks and {report['task_subtopics_deleted']} "
+            f"task subtopics deleted ({report['rows_reclaimed']} rows reclaimed), {report['rollups_written']} "
+            f"rollups written, {report['tasks_archived']} tasks archived in {report['chunks']} chunks, "
+            f"{report['duration_s']:.1f}s"
+        )
+        maintenance = report['maintenance']
+        if 'size_before' in maintenance:
+            click.echo(f"Database size {maintenance['size_before'] / 1e6:.1f} MB -> {maintenance['size_after'] / 1e6:.1f} MB")
+        
+        if output:
+            with open(output, 'a', encoding='utf-8') as report_file:
+                report_file.write(json.dumps(report) + '\n')
+    
+    @app.cli.command('delete-user')
+    @click.argument('usernames', nargs=-1, required=True)
+    @click.option('--batch-size', default=1000, help='Rows per transaction.')
+    @click.option('--yes', is_flag=True, help='Do not ask for confirmation.')
+    def delete_user_command(usernames, batch_size, yes):
+        """Delete users and everything they own, in short batched transactions."""
+        from app.models.user import User
+        from app.utils.account_deletion import delete_user
+        
+        users = User.query.filter(User.username.in_(usernames)).all()
+        missing = set(usernames) - {user.username for user in users}
+        if missing:
+            raise click.BadParameter(f"No such users: {', '.join(sorted(missing))}", param_hint='USERNAMES')
+        if not yes:
+            click.confirm(f"Delete {len(users)} users and all of their data?", abort=True)
+        
+        for username, user_id in [(user.username, user.id) for user in users]:
+            report = delete_user(user_id, batch_size=batch_size)
+            rows = ', '.join(f"{count} {table}" for table, count in sorted(report['deleted'].items()) if table != 'users')
+            click.echo(f"Deleted {username}: {rows or 'no data'} in {report['batches']} batches, {report['duration_s']:.1f}s")
+    
+    @app.cli.command('task-partitions')
+    @click.option('--months-ahead', default=None, type=int, help='Months of partitions to create ahead (TASK_PARTITIONS_MONTHS_AHEAD).')
+    @click.option('--detach-before-months', default=None, type=int,
+                  help='Roll up and detach the months that ended more than this many months ago.')
+    @click.option('--drop', is_flag=True, help='Drop detached partitions instead of moving them to the archive schema.')
+    def task_partitions(months_ahead, detach_before_months, drop):
+        """Create the coming months' task partitions and detach old ones (run daily from a scheduler)."""
+        from datetime import datetime
+        from app import db
+        from app.utils.task_partitions import detach_partitions, ensure_partitions, is_partitioned, months_after
+        
+        if db.engine.dialect.name != 'postgresql':
+            click.echo('The database is not PostgreSQL; tasks are not partitioned.')
+            return
+        
+        months_ahead = app.config['TASK_PARTITIONS_MONTHS_AHEAD'] if months_ahead is None else months_ahead
+        with db.engine.begin() as conn:
+            if not is_partitioned(conn):
+                click.echo('The tasks table is not partitioned; run migrations/partition_tasks.py first.')
+                return
+            created = ensure_partitions(conn, months_ahead=months_ahead)
+        click.echo(f"Created {len(created)} partitions" + (f": {', '.join(created)}" if created else ''))
+        
+        if detach_before_months is None:
+            return
+        try:
+            with db.engine.begin() as conn:
+                months = detach_partitions(conn, months_after(datetime.utcnow().date(), -detach_before_months),
+                                           archive_schema=None if drop else 'archive')
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint='--detach-before-months')
+        action = 'dropped' if drop else 'moved to the archive schema'
+        click.echo(f"Rolled up and detached {len(months)} months, {action}" +
+                   (f": {', '.join(month.strftime('%Y-%m') for month in months)}" if months else ''))
+    
+    @app.cli.command('sqlite-maintenance')
+    @click.option('--checkpoint', default='TRUNCATE', type=click.Choice(['PASSIVE', 'FULL', 'RESTART', 'TRUNCATE']),
+                  help='WAL checkpoint mode; TRUNCATE also empties the WAL file.')
+    def sqlite_maintenance(checkpoint):
+        """Checkpoint the SQLite WAL and run PRAGMA optimize (for a scheduler in quiet hours)."""
+        from app import db
+        from app.utils.sqlite_profile import run_maintenance
+        
+        if db.engine.dialect.name != 'sqlite':
+            click.echo('The database is not SQLite; nothing to do.')
+            return
+        
+        result = run_maintenance(db.engine, checkpoint=checkpoint)
+        status = 'incomplete, the database was busy' if result['busy'] else 'complete'
+        click.echo(f"Checkpoint {checkpoint} {status}: {result['checkpointed_pages']} of {result['wal_pages']} WAL pages "
+                   f"written back; statistics optimized")
+    
+    @app.cli.command('sync-replica')
+    def sync_replica():
+        """Copy the primary SQLite database into the replica file, to try read/write splitting locally."""
+        from app import db
+        from app.utils.read_replica import replica_engine
+        
+        replica = replica_engine()
+        if replica is None or replica.dialect.name != 'sqlite' or db.engine.dialect.name != 'sqlite':
+            click.echo('Set REPLICA_DATABASE_URI to a second SQLite file; other replicas are kept in sync by the server.')
+            return
+        
+        source = db.engine.raw_connection()
+        target = replica.raw_connection()
+        try:
+            source.driver_connection.backup(target.driver_connection)
+        finally:
+            target.close()
+            source.close()
+        click.echo(f"Copied {db.engine.url.database} to {replica.url.database}")
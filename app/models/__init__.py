@@ -1,3 +1,4 @@
 from app.models.user import User
 from app.models.curriculum import Subject, Topic, Subtopic
 from app.models.task import Task, TaskType, TaskTypePreference, TaskSubtopic
+from app.models.task_history import TaskDailyRollup, ArchivedTask
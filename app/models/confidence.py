@@ -6,11 +6,12 @@ class SubtopicConfidence(db.Model):
     __tablename__ = 'subtopic_confidences'
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     subtopic_id = db.Column(db.Integer, db.ForeignKey('subtopics.id'), nullable=False)
     confidence_level = db.Column(db.Integer, default=3)  # Default to 3 out of 5
-    last_updated = db.Column(db.DateTime, default=datetime.utcnow)
+    last_updated = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     priority = db.Column(db.Boolean, default=False)  # Whether this subtopic is marked as priority
+    version = db.Column(db.Integer, nullable=False, default=1)  # Optimistic concurrency counter
     
     # Using back_populates instead of backref per best practices
     user = db.relationship('User', back_populates='subtopic_confidences', lazy=True)
@@ -18,14 +19,21 @@ class SubtopicConfidence(db.Model):
     
     __table_args__ = (
         db.UniqueConstraint('user_id', 'subtopic_id', name='unique_user_subtopic_confidence'),
+        # Supports delta sync: "rows for this user changed since <cursor>"
+        db.Index('ix_subtopic_confidences_user_last_updated', 'user_id', 'last_updated'),
     )
     
+    # UPDATEs are issued as "... WHERE id = :id AND version = :v" and raise
+    # StaleDataError when another transaction changed the row first
+    __mapper_args__ = {'version_id_col': version}
+    
     def __repr__(self):
         return f"<SubtopicConfidence user_id={self.user_id} subtopic_id={self.subtopic_id} level={self.confidence_level}>"
     
     @staticmethod
     def get_or_create(user_id, subtopic_id, default_level=3):
         """Get existing confidence or create new one with default level."""
+        from app.utils.unit_of_work import commit
         confidence = SubtopicConfidence.query.filter_by(
             user_id=user_id, 
             subtopic_id=subtopic_id
@@ -38,7 +46,7 @@ class SubtopicConfidence(db.Model):
                 confidence_level=default_level
             )
             db.session.add(confidence)
-            db.session.commit()
+            commit()
             
         return confidence
     
@@ -56,10 +64,11 @@ class TopicConfidence(db.Model):
     __tablename__ = 'topic_confidences'
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     topic_id = db.Column(db.Integer, db.ForeignKey('topics.id'), nullable=False)
     confidence_percent = db.Column(db.Float, default=50.0)  # Default to 50%
-    last_updated = db.Column(db.DateTime, default=datetime.utcnow)
+    last_updated = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    version = db.Column(db.Integer, nullable=False, default=1)  # Optimistic concurrency counter
     
     # Using back_populates instead of backref per best practices
     user = db.relationship('User', back_populates='topic_confidences', lazy=True)
@@ -67,14 +76,18 @@ class TopicConfidence(db.Model):
     
     __table_args__ = (
         db.UniqueConstraint('user_id', 'topic_id', name='unique_user_topic_confidence'),
+        db.Index('ix_topic_confidences_user_last_updated', 'user_id', 'last_updated'),
     )
     
+    __mapper_args__ = {'version_id_col': version}
+    
     def __repr__(self):
         return f"<TopicConfidence user_id={self.user_id} topic_id={self.topic_id} percent={self.confidence_percent}>"
     
     @staticmethod
     def get_or_create(user_id, topic_id, default_percent=50.0):
         """Get existing confidence or create new one with default level."""
+        from app.utils.unit_of_work import commit
         confidence = TopicConfidence.query.filter_by(
             user_id=user_id, 
             topic_id=topic_id
@@ -87,7 +100,7 @@ class TopicConfidence(db.Model):
                 confidence_percent=default_percent
             )
             db.session.add(confidence)
-            db.session.commit()
+            commit()
             
         return confidence
     
@@ -140,17 +153,95 @@ class TopicConfidence(db.Model):
     
     @staticmethod
     def update_for_topic(topic_id, user_id):
-        """Update confidence percentage for a topic."""
-        # Calculate new confidence percentage
-        confidence_percent = TopicConfidence.calculate_for_topic(topic_id, user_id)
+        """Update confidence percentage for a topic, retrying if a concurrent update wins."""
+        from app.utils.retry_utils import retry_on_conflict
+        from app.utils.unit_of_work import commit
+        
+        def recalculate():
+            topic_confidence = TopicConfidence.update_for_topics([topic_id], user_id)[0]
+            commit()
+            return topic_confidence
+        
+        return retry_on_conflict(recalculate)
+    
+    @staticmethod
+    def update_for_topics(topic_ids, user_id):
+        """
+        Recalculate confidence percentages for several topics at once.
+        
+        Subtopics with no confidence row count at the default level of 3. Uses
+        a fixed number of queries. Changes are added to the session; the caller
+        commits and retries on StaleDataError.
+        """
+        from app.models.curriculum import Subtopic
+        
+        topic_ids = list(topic_ids)
+        if not topic_ids:
+            return []
         
-        # Get or create topic confidence record
-        topic_confidence = TopicConfidence.get_or_create(user_id, topic_id)
+        # Read the topic rows first: if a concurrent writer commits newer
+        # subtopic levels after this point, it also bumps the topic version
+        # and our stale percentage is rejected instead of overwriting theirs
+        existing = {
+            tc.topic_id: tc
+            for tc in TopicConfidence.query.filter(
+                TopicConfidence.user_id == user_id,
+                TopicConfidence.topic_id.in_(topic_ids)
+            ).all()
+        }
         
-        # Update the percentage
-        topic_confidence.confidence_percent = confidence_percent
-        topic_confidence.last_updated = datetime.utcnow()
+        # Number of subtopics under each topic
+        subtopic_counts = dict(
+            db.session.query(Subtopic.topic_id, db.func.count(Subtopic.id))
+            .filter(Subtopic.topic_id.in_(topic_ids))
+            .group_by(Subtopic.topic_id)
+            .all()
+        )
         
-        db.session.commit()
+        # Sum and count of the user's recorded confidence levels per topic
+        recorded = {
+            topic_id: (level_sum or 0, level_count)
+            for topic_id, level_sum, level_count in db.session.query(
+                Subtopic.topic_id,
+                db.func.sum(SubtopicConfidence.confidence_level),
+                db.func.count(SubtopicConfidence.id)
+            )
+            .join(SubtopicConfidence, SubtopicConfidence.subtopic_id == Subtopic.id)
+            .filter(
+                SubtopicConfidence.user_id == user_id,
+                Subtopic.topic_id.in_(topic_ids)
+            )
+            .group_by(Subtopic.topic_id)
+            .all()
+        }
         
-        return topic_confidence
+        now = datetime.utcnow()
+        updated = []
+        
+        for topic_id in topic_ids:
+            total = subtopic_counts.get(topic_id, 0)
+            
+            if total == 0:
+                confidence_percent = 0.0
+            else:
+                level_sum, level_count = recorded.get(topic_id, (0, 0))
+                avg_confidence = (level_sum + 3 * (total - level_count)) / total
+                # Same scale as calculate_for_topic: 1/5 = 0%, 3/5 = 50%, 5/5 = 100%
+                confidence_percent = ((avg_confidence - 1) / 4.0) * 100.0
+            
+            topic_confidence = existing.get(topic_id)
+            if not topic_confidence:
+                topic_confidence = TopicConfidence(
+                    user_id=user_id,
+                    topic_id=topic_id,
+                    confidence_percent=confidence_percent
+                )
+                db.session.add(topic_confidence)
+            else:
+                topic_confidence.confidence_percent = confidence_percent
+            
+            topic_confidence.last_updated = now
+            updated.append(topic_confidence)
+        
+        return updated
+
@@ -11,7 +11,7 @@ class Subject(db.Model):
     description = db.Column(db.Text, nullable=True)
     value = db.Column(db.Integer, default=1)  # Used in the curriculum hierarchy
     is_user_created = db.Column(db.Boolean, default=False)
-    created_by_user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    created_by_user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'), nullable=True)
     
     # Use back_populates instead of backref per SQLAlchemy best practices
     topics = db.relationship('Topic', back_populates='subject', lazy=True, cascade='all, delete-orphan')
@@ -32,7 +32,7 @@ class Topic(db.Model):
     description = db.Column(db.Text, nullable=True)
     value = db.Column(db.Integer, default=3)  # Used in the curriculum hierarchy
     is_user_created = db.Column(db.Boolean, default=False)
-    created_by_user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    created_by_user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'), nullable=True)
     
     # Relationships - using back_populates for clarity
     subject = db.relationship('Subject', back_populates='topics', lazy=True)
@@ -41,6 +41,12 @@ class Topic(db.Model):
     # Confidence relationship
     topic_confidences = db.relationship('TopicConfidence', back_populates='topic', lazy=True, cascade='all, delete-orphan')
     
+    __table_args__ = (
+        # Topic listing for a subject, and child topics of Psychology papers
+        db.Index('ix_topics_subject_id', 'subject_id'),
+        db.Index('ix_topics_parent_topic_id', 'parent_topic_id'),
+    )
+    
     def generate_topic_key(self):
         """Generate a unique key for this topic."""
         return f"{self.subject.title}:{self.title}"
@@ -59,7 +65,7 @@ class Subtopic(db.Model):
     value = db.Column(db.Integer, default=4)  # Used in the curriculum hierarchy
     estimated_duration = db.Column(db.Integer, default=15)  # Duration in minutes
     is_user_created = db.Column(db.Boolean, default=False)
-    created_by_user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    created_by_user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'), nullable=True)
     
     # Relationships
     topic = db.relationship('Topic', back_populates='subtopics', lazy=True)
@@ -67,10 +73,19 @@ class Subtopic(db.Model):
     # Confidence relationship
     subtopic_confidences = db.relationship('SubtopicConfidence', back_populates='subtopic', lazy=True, cascade='all, delete-orphan')
     
+    __table_args__ = (
+        # Subtopic packing and topic confidence recalculation load a topic's subtopics
+        db.Index('ix_subtopics_topic_id', 'topic_id'),
+    )
+    
     def generate_subtopic_key(self):
         """Generate a unique key for this subtopic."""
         return f"{self.topic.generate_topic_key()}:{self.title}"
     
+    def get_subject(self):
+        """Get the subject this subtopic belongs to."""
+        return self.topic.subject
+    
     def __repr__(self):
         return f"<Subtopic {self.title}>"
 
@@ -1,4 +1,6 @@
 from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.orm import Session
 from app import db
 
 class TaskType(db.Model):
@@ -40,7 +42,8 @@ class TaskType(db.Model):
                 task_type = cls(name=name, description=description)
                 db.session.add(task_type)
         
-        db.session.commit()
+        from app.utils.unit_of_work import commit
+        commit()
     
     def __repr__(self):
         return f"<TaskType {self.name}>"
@@ -51,11 +54,16 @@ class TaskTypePreference(db.Model):
     __tablename__ = 'task_type_preferences'
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     task_type_id = db.Column(db.Integer, db.ForeignKey('task_types.id'), nullable=False)
     subject_id = db.Column(db.Integer, db.ForeignKey('subjects.id'), nullable=True)  # Null for global preference
     is_enabled = db.Column(db.Boolean, default=True)
     
+    __table_args__ = (
+        # Task type selection: "this user's preference for a type in a subject"
+        db.Index('ix_task_type_preferences_user_type_subject', 'user_id', 'task_type_id', 'subject_id'),
+    )
+    
     def __init__(self, user_id, task_type_id, subject_id=None, is_enabled=True):
         self.user_id = user_id
         self.task_type_id = task_type_id
@@ -71,7 +79,7 @@ class Task(db.Model):
     __tablename__ = 'tasks'
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     subject_id = db.Column(db.Integer, db.ForeignKey('subjects.id'), nullable=False)
     topic_id = db.Column(db.Integer, db.ForeignKey('topics.id'), nullable=True)
     task_type_id = db.Column(db.Integer, db.ForeignKey('task_types.id'), nullable=False)
@@ -80,17 +88,39 @@ class Task(db.Model):
     description = db.Column(db.Text, nullable=True)
     total_duration = db.Column(db.Integer, default=30)  # Duration in minutes
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    due_date = db.Column(db.Date, nullable=True)
+    # Part of the primary key on partitioned PostgreSQL (see app/utils/task_partitions.py)
+    due_date = db.Column(db.Date, nullable=False)
     completed_at = db.Column(db.DateTime, nullable=True)
     skipped_at = db.Column(db.DateTime, nullable=True)
+    # Raised as the due date nears, see app/utils/task_priority.py
+    priority = db.Column(db.Integer, nullable=False, default=50, server_default='50')
+    # Precomputed card read model, see app/utils/task_card_utils.py
+    card_data = db.Column(db.JSON, nullable=True)
     
     # Relationships
     subject = db.relationship('Subject', back_populates='tasks')
     topic = db.relationship('Topic', backref=db.backref('tasks', lazy=True))
-    subtopics = db.relationship('TaskSubtopic', backref='task', lazy=True, cascade='all, delete-orphan')
+    subtopics = db.relationship('TaskSubtopic', backref='task', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
     # Explicitly define the relationship to User
     assigned_user = db.relationship('User', back_populates='tasks')
     
+    __table_args__ = (
+        # Dashboard and calendar reads: "this user's tasks due on/between dates"
+        db.Index('ix_tasks_user_due_date', 'user_id', 'due_date'),
+        # The same for tasks still to do, much smaller once history builds up
+        db.Index(
+            'ix_tasks_user_due_date_active', 'user_id', 'due_date',
+            postgresql_where=db.and_(completed_at.is_(None), skipped_at.is_(None)),
+            sqlite_where=db.and_(completed_at.is_(None), skipped_at.is_(None))
+        ),
+        # Recent tasks for analytics and stale-task checks
+        db.Index('ix_tasks_user_created_at', 'user_id', 'created_at'),
+        # Recently studied topics, to vary topic selection
+        db.Index('ix_tasks_user_topic_created_at', 'user_id', 'topic_id', 'created_at'),
+        # Per-subject completion counts for subject distribution
+        db.Index('ix_tasks_user_subject_completed_at', 'user_id', 'subject_id', 'completed_at'),
+    )
+    
     def __init__(self, user_id, subject_id, task_type_id, title, description=None, topic_id=None, due_date=None, total_duration=30):
         self.user_id = user_id
         self.subject_id = subject_id
@@ -98,11 +128,13 @@ class Task(db.Model):
         self.title = title
         self.description = description
         self.topic_id = topic_id
-        self.due_date = due_date
+        # Tasks without a due date are due the day they are created
+        self.due_date = due_date or datetime.utcnow().date()
         self.total_duration = total_duration
     
     def mark_completed(self):
         """Mark the task as completed and load relationships."""
+        from app.utils.unit_of_work import commit
         self.completed_at = datetime.utcnow()
         
         # Ensure subtopics relationship is loaded
@@ -110,43 +142,44 @@ class Task(db.Model):
             _ = self.subtopics  # Access relationship to load it
             self._subtopics_loaded = True
         
-        db.session.commit()
+        commit()
     
     def mark_skipped(self):
         """Mark the task as skipped."""
+        from app.utils.unit_of_work import commit
         self.skipped_at = datetime.utcnow()
-        db.session.commit()
+        commit()
     
     def add_subtopic(self, subtopic_id, duration=15):
         """Add a subtopic to this task."""
-        task_subtopic = TaskSubtopic(
-            task_id=self.id,
-            subtopic_id=subtopic_id,
-            duration=duration
-        )
-        db.session.add(task_subtopic)
-        db.session.commit()
+        self.add_subtopics([subtopic_id], duration)
+    
+    def add_subtopics(self, subtopic_ids, duration=15):
+        """Add several subtopics to this task, rebuilding its card once."""
+        from app.utils.unit_of_work import commit
+        db.session.add_all([
+            TaskSubtopic(task_id=self.id, subtopic_id=subtopic_id, duration=duration)
+            for subtopic_id in subtopic_ids
+        ])
+        commit()
         
         # Update the total task duration
         self.update_total_duration()
+        
+        from app.utils.task_card_utils import refresh_task_cards
+        refresh_task_cards([self.id])
     
     def update_total_duration(self):
         """Update the total duration based on subtopic durations."""
+        from app.utils.unit_of_work import commit
         total = sum(ts.duration for ts in self.subtopics)
         self.total_duration = total if total > 0 else 30
-        db.session.commit()
+        commit()
     
     def get_subtopics(self):
         """Get all subtopics in this task."""
-        result = []
-        
-        for task_subtopic in self.subtopics:
-            from app.models.curriculum import Subtopic
-            subtopic = Subtopic.query.get(task_subtopic.subtopic_id)
-            if subtopic:
-                result.append(subtopic)
-        
-        return result
+        # Uses the relationship, so tasks loaded through TaskRepository need no extra queries
+        return [task_subtopic.subtopic for task_subtopic in self.subtopics if task_subtopic.subtopic]
     
     def is_active(self):
         """Check if this task is still active (not completed or skipped)."""
@@ -166,13 +199,21 @@ class TaskSubtopic(db.Model):
     __tablename__ = 'task_subtopics'
     
     id = db.Column(db.Integer, primary_key=True)
-    task_id = db.Column(db.Integer, db.ForeignKey('tasks.id'), nullable=False)
+    task_id = db.Column(db.Integer, db.ForeignKey('tasks.id', ondelete='CASCADE'), nullable=False)
     subtopic_id = db.Column(db.Integer, db.ForeignKey('subtopics.id'), nullable=False)
     duration = db.Column(db.Integer, default=15)  # Duration in minutes
+    # Copy of the task's due date: the partition key on partitioned PostgreSQL (see app/utils/task_partitions.py)
+    task_due_date = db.Column(db.Date, nullable=True)
     
     # Relationships
     subtopic = db.relationship('Subtopic', back_populates='task_subtopics', lazy=True)
     
+    __table_args__ = (
+        # Loading a task's subtopics, and the tasks that covered a subtopic
+        db.Index('ix_task_subtopics_task_id', 'task_id'),
+        db.Index('ix_task_subtopics_subtopic_id', 'subtopic_id'),
+    )
+    
     def __init__(self, task_id, subtopic_id, duration=15):
         self.task_id = task_id
         self.subtopic_id = subtopic_id
@@ -180,3 +221,13 @@ class TaskSubtopic(db.Model):
     
     def __repr__(self):
         return f"<TaskSubtopic task={self.task_id} subtopic={self.subtopic_id}>"
+
+
+@event.listens_for(Session, 'before_flush')
+def copy_task_due_dates(session, flush_context, instances):
+    """Give new task subtopics their task's due date; the task is usually already in the session."""
+    for obj in session.new:
+        if isinstance(obj, TaskSubtopic) and obj.task_due_date is None:
+            task = obj.task or session.get(Task, obj.task_id)
+            if task is not None:
+                obj.task_due_date = task.due_date
@@ -0,0 +1,47 @@
+from app import db
+
+class TaskDailyRollup(db.Model):
+    """Model holding per-day task counts of a user and subject for tasks compacted away."""
+    __tablename__ = 'task_daily_rollups'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subjects.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)  # The tasks' due date, or creation date without one
+    tasks = db.Column(db.Integer, nullable=False, default=0)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+    skipped = db.Column(db.Integer, nullable=False, default=0)
+    completed_minutes = db.Column(db.Integer, nullable=False, default=0)  # Sum of completed tasks' durations
+
+    __table_args__ = (
+        # One row per user, subject and day; also serves "this user's rollups"
+        db.UniqueConstraint('user_id', 'subject_id', 'day', name='unique_user_subject_day_rollup'),
+    )
+
+    def __repr__(self):
+        return f"<TaskDailyRollup user={self.user_id} subject={self.subject_id} day={self.day}: {self.completed}/{self.tasks}>"
+
+
+class ArchivedTask(db.Model):
+    """Model keeping a compact copy of a completed task after compaction."""
+    __tablename__ = 'archived_tasks'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # The task's original id
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subjects.id'), nullable=False)
+    topic_id = db.Column(db.Integer, db.ForeignKey('topics.id'), nullable=True)
+    task_type_id = db.Column(db.Integer, db.ForeignKey('task_types.id'), nullable=False)
+    title = db.Column(db.String(255), nullable=False)
+    total_duration = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=True)
+    due_date = db.Column(db.Date, nullable=True)
+    completed_at = db.Column(db.DateTime, nullable=False)
+    subtopic_ids = db.Column(db.JSON, nullable=False, default=list)  # The subtopics the task covered
+
+    __table_args__ = (
+        # A user's study history, newest first
+        db.Index('ix_archived_tasks_user_completed_at', 'user_id', 'completed_at'),
+    )
+
+    def __repr__(self):
+        return f"<ArchivedTask {self.id}: {self.title}>"
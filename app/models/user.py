@@ -26,13 +26,16 @@ class User(db.Model, UserMixin):
     # UI preferences
     dark_mode = db.Column(db.Boolean, default=False)
     
-    # Relationships
-    task_type_preferences = db.relationship('TaskTypePreference', backref='user', lazy=True, cascade='all, delete-orphan')
+    # Relationships; the database deletes the rows not loaded (ON DELETE CASCADE)
+    task_type_preferences = db.relationship('TaskTypePreference', backref='user', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
     # Using explicit back_populates to avoid backref conflicts
-    tasks = db.relationship('Task', back_populates='assigned_user', lazy=True, cascade='all, delete-orphan')
+    tasks = db.relationship('Task', back_populates='assigned_user', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    # Compacted task history, see app/utils/task_compaction.py
+    task_rollups = db.relationship('TaskDailyRollup', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    archived_tasks = db.relationship('ArchivedTask', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
     # Confidence relationships
-    subtopic_confidences = db.relationship('SubtopicConfidence', back_populates='user', lazy=True, cascade='all, delete-orphan')
-    topic_confidences = db.relationship('TopicConfidence', back_populates='user', lazy=True, cascade='all, delete-orphan')
+    subtopic_confidences = db.relationship('SubtopicConfidence', back_populates='user', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    topic_confidences = db.relationship('TopicConfidence', back_populates='user', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
     
     def __init__(self, username, password, email=None):
         self.username = username
@@ -49,8 +52,9 @@ class User(db.Model, UserMixin):
     
     def update_last_login(self):
         """Update the last login time."""
+        from app.utils.unit_of_work import commit
         self.last_login = datetime.utcnow()
-        db.session.commit()
+        commit()
     
     def get_enabled_task_types(self):
         """Get a list of task types enabled for this user."""
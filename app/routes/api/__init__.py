@@ -6,10 +6,15 @@ from app import db
 from app.models.task import Task, TaskSubtopic, TaskType
 from app.models.curriculum import Subtopic, Topic
 from app.utils.task_generator import generate_replacement_task
+from app.utils.task_repository import TaskRepository
+from app.utils.task_card_utils import serialize_task_card, refresh_task_cards
+from app.utils.unit_of_work import commit
 from app.routes.api.curriculum import curriculum_bp
 from app.routes.api.confidence import confidence_bp
-from app.models.confidence import SubtopicConfidence
-from app.utils.confidence_utils import update_subtopics_confidence_from_dict
+from app.utils.confidence_utils import (
+    update_subtopics_confidence_from_dict,
+    get_subtopic_confidence_state
+)
 
 # Create blueprint
 api_bp = Blueprint('api', __name__)
@@ -18,40 +23,45 @@ api_bp = Blueprint('api', __name__)
 # api_bp.register_blueprint(curriculum_bp)  # Comment this out to avoid double registration
 api_bp.register_blueprint(confidence_bp)
 
+def get_task_subtopic_confidences(task, user_id):
+    """
+    Get a task's subtopics with the user's current confidence, including unflushed changes.
+    
+    Expects the task to be loaded with the detail profile, so the only query
+    is the confidence lookup.
+    """
+    subtopics = [task_subtopic.subtopic for task_subtopic in task.subtopics if task_subtopic.subtopic]
+    if not subtopics:
+        return []
+    
+    state = get_subtopic_confidence_state(user_id, [subtopic.id for subtopic in subtopics])
+    
+    return [
+        {
+            'id': subtopic.id,
+            'title': subtopic.title,
+            'confidence': state[subtopic.id]['confidence_level'],
+            'priority': state[subtopic.id]['priority']
+        }
+        for subtopic in subtopics
+    ]
+
 @api_bp.route('/tasks/complete/<int:task_id>', methods=['POST'])
 @login_required
 def complete_task(task_id):
     """Mark a task as completed."""
-    task = Task.query.get_or_404(task_id)
+    task = TaskRepository(current_user.id).get_or_404(task_id)
     
     # Ensure the task belongs to the current user
     if task.user_id != current_user.id:
         return jsonify({'success': False, 'message': 'Unauthorized'}), 403
     
+    # Get subtopics in this task for confidence prompt while they are still
+    # loaded; committing the completion expires them
+    subtopics = get_task_subtopic_confidences(task, current_user.id)
+    
     # Mark task as completed
     task.mark_completed()
-    db.session.commit()
-    
-    # Get subtopics in this task for confidence prompt
-    subtopics = []
-    for task_subtopic in task.subtopics:
-        subtopic = Subtopic.query.get(task_subtopic.subtopic_id)
-        if subtopic:
-            # Get current confidence
-            confidence = SubtopicConfidence.query.filter_by(
-                user_id=current_user.id,
-                subtopic_id=subtopic.id
-            ).first()
-            
-            confidence_level = confidence.confidence_level if confidence else 3
-            priority = confidence.priority if confidence else False
-            
-            subtopics.append({
-                'id': subtopic.id,
-                'title': subtopic.title,
-                'confidence': confidence_level,
-                'priority': priority
-            })
     
     return jsonify({
         'success': True,
@@ -63,32 +73,15 @@ def complete_task(task_id):
 @login_required
 def skip_task(task_id):
     """Skip a task and generate a replacement task."""
-    task = Task.query.get_or_404(task_id)
+    tasks = TaskRepository(current_user.id)
+    task = tasks.get_or_404(task_id)
     
     # Ensure the task belongs to the current user
     if task.user_id != current_user.id:
         return jsonify({'success': False, 'message': 'Unauthorized'}), 403
     
     # Get subtopics in this task for confidence prompt before skipping
-    subtopics = []
-    for task_subtopic in task.subtopics:
-        subtopic = Subtopic.query.get(task_subtopic.subtopic_id)
-        if subtopic:
-            # Get current confidence
-            confidence = SubtopicConfidence.query.filter_by(
-                user_id=current_user.id,
-                subtopic_id=subtopic.id
-            ).first()
-            
-            confidence_level = confidence.confidence_level if confidence else 3
-            priority = confidence.priority if confidence else False
-            
-            subtopics.append({
-                'id': subtopic.id,
-                'title': subtopic.title,
-                'confidence': confidence_level,
-                'priority': priority
-            })
+    subtopics = get_task_subtopic_confidences(task, current_user.id)
     
     # Get subject ID for generating replacement
     subject_id = task.subject_id
@@ -106,20 +99,7 @@ def skip_task(task_id):
         }), 500
     
     # Format task data for response
-    task_data = {
-        'id': new_task.id,
-        'title': new_task.title,
-        'description': new_task.description,
-        'duration': new_task.total_duration,
-        'subject': {
-            'id': new_task.subject_id,
-            'title': new_task.subject.title
-        },
-        'task_type': {
-            'id': new_task.task_type_id,
-            'name': new_task.task_type.name
-        }
-    }
+    task_data = serialize_task_card(tasks.reload([new_task], profile='summary')[0])
     
     return jsonify({
         'success': True,
@@ -133,21 +113,15 @@ def skip_task(task_id):
 def refresh_tasks():
     """Regenerate all tasks for today."""
     today = datetime.utcnow().date()
+    repository = TaskRepository(current_user.id)
     
     # Get all active tasks for today
-    active_tasks = Task.query.filter(
-        Task.user_id == current_user.id,
-        Task.due_date == today,
-        Task.completed_at.is_(None),
-        Task.skipped_at.is_(None)
-    ).all()
+    active_tasks = repository.active_for_day(today, profile='summary')
     
     # Mark all as skipped
     for task in active_tasks:
         task.mark_skipped()
     
-    db.session.commit()
-    
     try:
         # Always generate exactly 3 tasks - one for each main subject category
         # This ensures balanced coverage across Biology, Chemistry, and Psychology
@@ -174,22 +148,7 @@ def refresh_tasks():
                     tasks.append(task)
         
         # Format tasks for the API response
-        new_tasks = []
-        for task in tasks:
-            new_tasks.append({
-                'id': task.id,
-                'title': task.title,
-                'description': task.description,
-                'duration': task.total_duration,
-                'subject': {
-                    'id': task.subject_id,
-                    'title': task.subject.title
-                },
-                'task_type': {
-                    'id': task.task_type_id,
-                    'name': task.task_type.name
-                }
-            })
+        new_tasks = [serialize_task_card(task) for task in repository.reload(tasks, profile='summary')]
         
         return jsonify({
             'success': True,
@@ -221,20 +180,7 @@ def add_bonus_task():
         }), 500
     
     # Format task data for response
-    task_data = {
-        'id': task.id,
-        'title': task.title,
-        'description': task.description,
-        'duration': task.total_duration,
-        'subject': {
-            'id': task.subject_id,
-            'title': task.subject.title
-        },
-        'task_type': {
-            'id': task.task_type_id,
-            'name': task.task_type.name
-        }
-    }
+    task_data = serialize_task_card(TaskRepository(current_user.id).reload([task], profile='summary')[0])
     
     return jsonify({
         'success': True,
@@ -283,6 +229,8 @@ def add_task_for_subtopic():
     )
     
     db.session.add(task)
+    # Assign the task ID before linking the subtopic
+    db.session.flush()
     
     # Link the task to the subtopic
     task_subtopic = TaskSubtopic(
@@ -291,7 +239,9 @@ def add_task_for_subtopic():
     )
     db.session.add(task_subtopic)
     
-    db.session.commit()
+    commit()
+    
+    refresh_task_cards([task.id])
     
     return jsonify({
         'success': True,
@@ -355,7 +305,7 @@ def practice_subtopic():
     )
     db.session.add(task_subtopic)
     
-    db.session.commit()
+    commit()
     
     return jsonify({
         'success': True,
@@ -368,7 +318,7 @@ def practice_subtopic():
 @login_required
 def start_task(task_id):
     """Mark a task as in progress (for Pomodoro timer)."""
-    task = Task.query.get_or_404(task_id)
+    task = TaskRepository(current_user.id).get_or_404(task_id, profile='summary')
     
     # Ensure the task belongs to the current user
     if task.user_id != current_user.id:
@@ -391,18 +341,10 @@ def get_pomodoro_stats():
     today = datetime.utcnow().date()
     seven_days_ago = today - timedelta(days=7)
     
-    total_tasks = Task.query.filter(
-        Task.user_id == current_user.id,
-        Task.due_date >= seven_days_ago,
-        Task.due_date <= today
-    ).count()
-    
-    completed_tasks = Task.query.filter(
-        Task.user_id == current_user.id,
-        Task.due_date >= seven_days_ago,
-        Task.due_date <= today,
-        Task.completed_at.isnot(None)
-    ).count()
+    total_tasks, completed_tasks = TaskRepository(current_user.id).completion_counts(
+        start_date=seven_days_ago,
+        end_date=today
+    )
     
     completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
     
@@ -426,7 +368,7 @@ def update_dark_mode():
     
     # Update user preference
     current_user.dark_mode = dark_mode
-    db.session.commit()
+    commit()
     
     return jsonify({
         'success': True,
@@ -3,6 +3,14 @@ from flask_login import login_required, current_user
 from app import db
 from app.models.confidence import SubtopicConfidence, TopicConfidence
 from app.models.curriculum import Subtopic, Topic
+from app.utils.confidence_buffer import confidence_buffer
+from app.utils.confidence_utils import (
+    decode_sync_cursor,
+    get_confidence_changes,
+    format_confidence_changes,
+    get_subtopic_confidence_state,
+    estimate_topic_confidence
+)
 from datetime import datetime
 
 # Create blueprint for confidence API
@@ -11,31 +19,41 @@ confidence_bp = Blueprint('confidence_api', __name__, url_prefix='/confidence')
 @confidence_bp.route('/user/data', methods=['GET'])
 @login_required
 def get_all_confidence_data():
-    """Get all confidence data for the current user."""
-    # Get all subtopic confidence data
-    subtopic_confidences = SubtopicConfidence.query.filter_by(user_id=current_user.id).all()
+    """
+    Get confidence data for the current user.
     
-    # Get all topic confidence data
-    topic_confidences = TopicConfidence.query.filter_by(user_id=current_user.id).all()
+    Without parameters this returns every row as a list of objects. Passing
+    ?since=<cursor> returns only rows changed since that cursor, in a
+    columnar layout unless ?format=legacy is given. Every response carries
+    the cursor to send on the next poll.
+    """
+    since_param = request.args.get('since')
+    response_format = request.args.get('format')
     
-    return jsonify({
-        'subtopic_confidences': [
-            {
-                'subtopic_id': sc.subtopic_id,
-                'confidence_level': sc.confidence_level,
-                'last_updated': sc.last_updated.isoformat() if sc.last_updated else None
-            }
-            for sc in subtopic_confidences
-        ],
-        'topic_confidences': [
-            {
-                'topic_id': tc.topic_id,
-                'confidence_percent': tc.confidence_percent,
-                'last_updated': tc.last_updated.isoformat() if tc.last_updated else None
-            }
-            for tc in topic_confidences
-        ]
-    })
+    if response_format not in (None, 'legacy', 'columnar'):
+        return jsonify({'error': 'Format must be legacy or columnar'}), 400
+    
+    since = None
+    if since_param:
+        try:
+            since = decode_sync_cursor(since_param)
+        except (ValueError, OverflowError):
+            return jsonify({'error': 'Invalid sync cursor'}), 400
+    
+    # Delta requests default to the compact layout, full requests to the legacy one
+    if response_format is None:
+        response_format = 'columnar' if since is not None else 'legacy'
+    
+    # Sync reads stored rows, so write out this request's pending changes first
+    confidence_buffer.flush_user(current_user.id)
+    changes = get_confidence_changes(current_user.id, since)
+    
+    payload = format_confidence_changes(changes, columnar=response_format == 'columnar')
+    payload['cursor'] = changes['cursor']
+    payload['full'] = since is None
+    payload['format'] = response_format
+    
+    return jsonify(payload)
 
 @confidence_bp.route('/user/subtopic/<int:subtopic_id>', methods=['GET', 'PUT'])
 @login_required
@@ -45,12 +63,9 @@ def subtopic_confidence(subtopic_id):
     user_id = current_user.id
     
     if request.method == 'GET':
-        confidence = SubtopicConfidence.query.filter_by(
-            user_id=user_id, 
-            subtopic_id=subtopic_id
-        ).first()
+        state = get_subtopic_confidence_state(user_id, [subtopic_id])[subtopic_id]
         
-        if not confidence:
+        if state['last_updated'] is None:
             # Return default if not found
             return jsonify({
                 'confidence_level': 3,
@@ -59,10 +74,10 @@ def subtopic_confidence(subtopic_id):
             })
             
         return jsonify({
-            'confidence_level': confidence.confidence_level,
+            'confidence_level': state['confidence_level'],
             'subtopic_id': subtopic_id,
             'user_id': user_id,
-            'last_updated': confidence.last_updated.isoformat() if confidence.last_updated else None
+            'last_updated': state['last_updated'].isoformat()
         })
     
     elif request.method == 'PUT':
@@ -76,38 +91,19 @@ def subtopic_confidence(subtopic_id):
         # Validate confidence level (1-5)
         if confidence_level < 1 or confidence_level > 5:
             return jsonify({'error': 'Confidence level must be between 1 and 5'}), 400
-            
-        # Get or create confidence record
-        confidence = SubtopicConfidence.query.filter_by(
-            user_id=user_id, 
-            subtopic_id=subtopic_id
-        ).first()
         
-        if not confidence:
-            confidence = SubtopicConfidence(
-                user_id=user_id,
-                subtopic_id=subtopic_id,
-                confidence_level=confidence_level
-            )
-            db.session.add(confidence)
-        else:
-            confidence.confidence_level = confidence_level
-            confidence.last_updated = datetime.utcnow()
-        
-        # Update topic confidence
-        topic_confidence = TopicConfidence.update_for_topic(subtopic.topic_id, user_id)
-        
-        db.session.commit()
+        # Coalesced with the request's other changes and written, with the topic recompute, before the response is sent
+        pending = confidence_buffer.record(user_id, subtopic_id, confidence_level=confidence_level)
         
         return jsonify({
-            'confidence_level': confidence.confidence_level,
+            'confidence_level': confidence_level,
             'subtopic_id': subtopic_id,
             'user_id': user_id,
-            'last_updated': confidence.last_updated.isoformat(),
+            'last_updated': pending['updated_at'].isoformat(),
             'topic_id': subtopic.topic_id,
             'topic_confidence': {
-                'confidence_percent': topic_confidence.confidence_percent,
-                'last_updated': topic_confidence.last_updated.isoformat()
+                'confidence_percent': estimate_topic_confidence(user_id, subtopic.topic_id),
+                'last_updated': pending['updated_at'].isoformat()
             }
         })
 
@@ -118,6 +114,9 @@ def topic_confidence(topic_id):
     topic = Topic.query.get_or_404(topic_id)
     user_id = current_user.id
     
+    # The stored percentage is only exact once pending changes are written
+    confidence_buffer.flush_user(user_id)
+    
     confidence = TopicConfidence.query.filter_by(
         user_id=user_id, 
         topic_id=topic_id
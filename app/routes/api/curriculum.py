@@ -2,12 +2,14 @@ from flask import Blueprint, jsonify, request
 from flask_login import login_required, current_user
 from app import db
 from app.models.curriculum import Subject, Topic, Subtopic
+from app.utils.read_replica import read_only
 
 # Create API blueprint for curriculum
 curriculum_bp = Blueprint('curriculum_api', __name__, url_prefix='/api/curriculum')
 
 @curriculum_bp.route('/subjects')
 @login_required
+@read_only
 def get_subjects():
     """API endpoint to get all subjects."""
     subjects = Subject.query.all()
@@ -79,6 +81,7 @@ def get_subjects():
 
 @curriculum_bp.route('/subject/<int:subject_id>/topics')
 @login_required
+@read_only
 def get_topics(subject_id):
     """API endpoint to get topics for a subject."""
     topics = Topic.query.filter_by(subject_id=subject_id).all()
@@ -111,6 +114,7 @@ def get_topics(subject_id):
 
 @curriculum_bp.route('/topic/<int:topic_id>/subtopics')
 @login_required
+@read_only
 def get_subtopics(topic_id):
     """API endpoint to get subtopics for a topic."""
     subtopics = Subtopic.query.filter_by(topic_id=topic_id).all()
@@ -131,6 +135,7 @@ def get_subtopics(topic_id):
 
 @curriculum_bp.route('/search')
 @login_required
+@read_only
 def search_curriculum():
     """API endpoint for curriculum search."""
     query = request.args.get('q', '').lower()
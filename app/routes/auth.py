@@ -3,6 +3,7 @@ from flask_login import login_user, logout_user, current_user, login_required
 from app import db, bcrypt
 from app.models.user import User
 from app.models.task import TaskType, TaskTypePreference
+from app.utils.unit_of_work import commit
 
 # Create blueprint
 auth_bp = Blueprint('auth', __name__)
@@ -83,7 +84,7 @@ def register():
         # Create new user
         user = User(username=username, password=password, email=email)
         db.session.add(user)
-        db.session.commit()
+        commit()
         
         # Initialize task type preferences
         task_types = TaskType.query.all()
@@ -96,7 +97,7 @@ def register():
             )
             db.session.add(preference)
         
-        db.session.commit()
+        commit()
         
         flash('Account created successfully! Please log in.', 'success')
         return redirect(url_for('auth.login'))
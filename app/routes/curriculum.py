@@ -2,12 +2,14 @@ from flask import Blueprint, render_template, request, jsonify, current_app
 from flask_login import login_required, current_user
 from app import db
 from app.models.curriculum import Subject, Topic, Subtopic
+from app.utils.read_replica import read_only
 
 # Create a blueprint for curriculum routes
 curriculum = Blueprint('curriculum', __name__)
 
 @curriculum.route('/')
 @login_required
+@read_only
 def view_curriculum():
     """Curriculum browser view."""
     # Get all subjects
@@ -16,6 +18,7 @@ def view_curriculum():
 
 @curriculum.route('/api/subjects')
 @login_required
+@read_only
 def get_subjects():
     """API endpoint to get all subjects."""
     subjects = Subject.query.all()
@@ -33,6 +36,7 @@ def get_subjects():
 
 @curriculum.route('/api/subject/<int:subject_id>/topics')
 @login_required
+@read_only
 def get_topics(subject_id):
     """API endpoint to get topics for a subject."""
     topics = Topic.query.filter_by(subject_id=subject_id).all()
@@ -55,6 +59,7 @@ def get_topics(subject_id):
 
 @curriculum.route('/api/topic/<int:topic_id>/subtopics')
 @login_required
+@read_only
 def get_subtopics(topic_id):
     """API endpoint to get subtopics for a topic."""
     subtopics = Subtopic.query.filter_by(topic_id=topic_id).all()
@@ -75,6 +80,7 @@ def get_subtopics(topic_id):
 
 @curriculum.route('/api/curriculum/search')
 @login_required
+@read_only
 def search_curriculum():
     """API endpoint for curriculum search."""
     query = request.args.get('q', '').lower()
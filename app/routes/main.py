@@ -9,6 +9,10 @@ from app.utils.analytics_utils import prepare_analytics_data, get_chart_data_for
 from app.utils.optimization_utils import get_optimized_subject_distribution, generate_tasks_in_batch
 from app.utils.optimization_tasks import generate_balanced_task_batch
 from app.utils.cache_utils import cache_response, add_cache_headers
+from app.utils.task_repository import TaskRepository
+from app.utils.task_card_utils import get_task_cards
+from app.utils.unit_of_work import commit
+from app.utils.read_replica import read_only
 import os
 import random
 import stripe
@@ -27,24 +31,24 @@ def index():
     response = _get_index_data()
     return add_cache_headers(response, max_age=60)  # Short cache for dynamic dashboard
 
+def _get_day_task_cards(day):
+    """Get a user's active and three most recently completed task cards for a day."""
+    cards = get_task_cards(current_user.id, day)
+    
+    active_tasks = [card for card in cards if not card['completed_at'] and not card['skipped_at']]
+    completed_tasks = sorted(
+        (card for card in cards if card['completed_at']),
+        key=lambda card: card['completed_at'],
+        reverse=True
+    )[:3]
+    
+    return active_tasks, completed_tasks
+
 def _get_index_data():
     """Get data for the index page - separate function to support caching."""
-    # Get today's active tasks
+    # Get today's active and completed tasks from their precomputed cards
     today = datetime.utcnow().date()
-    
-    active_tasks = Task.query.filter(
-        Task.user_id == current_user.id,
-        Task.due_date == today,
-        Task.completed_at.is_(None),
-        Task.skipped_at.is_(None)
-    ).all()
-    
-    # Get completed tasks for today
-    completed_tasks = Task.query.filter(
-        Task.user_id == current_user.id,
-        Task.due_date == today,
-        Task.completed_at.isnot(None)
-    ).order_by(Task.completed_at.desc()).limit(3).all()
+    active_tasks, completed_tasks = _get_day_task_cards(today)
     
     # Generate tasks if none exist
     if not active_tasks and not completed_tasks:
@@ -101,6 +105,9 @@ def _get_index_data():
             # Handle any exceptions
             print(f"Exception while generating tasks: {str(e)}")
             active_tasks = []
+        
+        # Read the generated tasks back as cards
+        active_tasks, completed_tasks = _get_day_task_cards(today)
     
     return render_template('main/index.html', active_tasks=active_tasks, completed_tasks=completed_tasks, current_date=today)
 
@@ -108,6 +115,7 @@ def _get_index_data():
 @login_required
 def calendar():
     """Calendar view with exam dates."""
+    # Not @read_only: reading the cards can backfill and store missing card data
     # Get month/year from query parameters for navigation, default to current
     month = request.args.get('month', type=int)
     year = request.args.get('year', type=int)
@@ -128,10 +136,7 @@ def calendar():
         end_date = datetime(year, month + 1, 1).date() - timedelta(days=1)
     
     # Get tasks within the date range
-    tasks = Task.query.filter(
-        Task.user_id == current_user.id,
-        Task.due_date.between(start_date, end_date)
-    ).all()
+    tasks = get_task_cards(current_user.id, start_date, end_date)
     
     # Get exams that fall within this month
     exams = Exam.query.join(Exam.subject).filter(
@@ -150,7 +155,7 @@ def calendar():
     
     # Add tasks to calendar data
     for task in tasks:
-        date_str = task.due_date.strftime('%Y-%m-%d')
+        date_str = task['due_date'].strftime('%Y-%m-%d')
         if date_str not in calendar_data:
             calendar_data[date_str] = {'tasks': [], 'exams': []}
         
@@ -186,33 +191,23 @@ def curriculum():
 
 @main_bp.route('/progress')
 @login_required
+@read_only
 def progress():
     """View progress and statistics with advanced analytics."""
     # Get basic task stats
-    total_tasks = Task.query.filter_by(user_id=current_user.id).count()
-    completed_tasks = Task.query.filter(
-        Task.user_id == current_user.id,
-        Task.completed_at.isnot(None)
-    ).count()
+    tasks = TaskRepository(current_user.id)
+    total_tasks, completed_tasks = tasks.completion_counts()
     
     # Calculate completion percentage
     completion_percentage = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
     
     # Get subject breakdown
     subjects = Subject.query.all()
+    subject_counts = tasks.completion_counts(by_subject=True)
     subject_stats = {}
     
     for subject in subjects:
-        subject_total = Task.query.filter_by(
-            user_id=current_user.id,
-            subject_id=subject.id
-        ).count()
-        
-        subject_completed = Task.query.filter(
-            Task.user_id == current_user.id,
-            Task.subject_id == subject.id,
-            Task.completed_at.isnot(None)
-        ).count()
+        subject_total, subject_completed = subject_counts.get(subject.id, (0, 0))
         
         subject_percentage = (subject_completed / subject_total * 100) if subject_total > 0 else 0
         
@@ -224,9 +219,7 @@ def progress():
         }
     
     # Get recent tasks (last 10)
-    recent_tasks = Task.query.filter_by(
-        user_id=current_user.id
-    ).order_by(Task.created_at.desc()).limit(10).all()
+    recent_tasks = tasks.recent(limit=10)
     
     # Get advanced analytics data
     analytics_data = prepare_analytics_data(current_user.id)
@@ -320,7 +313,7 @@ def settings():
         dark_mode = request.form.get('dark_mode') == 'on'
         current_user.dark_mode = dark_mode
         
-        db.session.commit()
+        commit()
         flash('Settings updated successfully', 'success')
         return redirect(url_for('main.settings'))
     
@@ -424,12 +417,7 @@ def pomodoro():
     # Get today's active tasks
     today = datetime.utcnow().date()
     
-    active_tasks = Task.query.filter(
-        Task.user_id == current_user.id,
-        Task.due_date == today,
-        Task.completed_at.is_(None),
-        Task.skipped_at.is_(None)
-    ).all()
+    active_tasks, _ = _get_day_task_cards(today)
     
     # Add cache version to prevent browser caching of static files
     cache_version = int(datetime.utcnow().timestamp())
@@ -487,7 +475,7 @@ def first_login_setup():
         # Process blank subject setup (if applicable)
         # We would handle this in a more advanced implementation
         
-        db.session.commit()
+        commit()
         
         # Mark setup as complete
         session['setup_complete'] = True
@@ -0,0 +1,89 @@
+"""
+Account deletion utilities.
+Provides the deletion of a user and everything they own in primary key
+batches, one short transaction each, for the `flask delete-user` command.
+"""
+
+import time
+from collections import Counter
+from app import db
+from app.models.confidence import SubtopicConfidence, TopicConfidence
+from app.models.curriculum import Subject, Subtopic, Topic
+from app.models.task import Task, TaskSubtopic, TaskTypePreference
+from app.models.task_history import ArchivedTask, TaskDailyRollup
+from app.models.user import User
+from app.utils.optimization_batch import db_batch_process
+from app.utils.unit_of_work import commit
+
+# Rows owned by a user besides tasks, deleted before the user
+OWNED_MODELS = (SubtopicConfidence, TopicConfidence, TaskTypePreference, TaskDailyRollup, ArchivedTask)
+
+# Curriculum a user added, kept for everyone else without its author
+AUTHORED_MODELS = (Subject, Topic, Subtopic)
+
+def _delete_ids(model, ids):
+    """Delete rows of a model by id, without committing."""
+    return db.session.execute(
+        db.delete(model).where(model.id.in_(ids)).execution_options(synchronize_session=False)
+    ).rowcount
+
+def _delete_task_batch(rows):
+    """Delete a batch of tasks and their subtopics, without committing."""
+    task_ids = [row.id for row in rows]
+    subtopics = db.session.execute(
+        db.delete(TaskSubtopic).where(TaskSubtopic.task_id.in_(task_ids))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    return {'task_subtopics': subtopics, 'tasks': _delete_ids(Task, task_ids)}
+
+def delete_user(user_id, batch_size=1000, max_retries=3):
+    """
+    Delete a user and everything they own in batches.
+
+    The foreign keys cascade, so deleting the users row alone would remove
+    the rest too, but as one transaction holding locks on every row of the
+    account. Instead the user's tasks (with their subtopics), confidences,
+    preferences and task history are deleted in primary key ranges of
+    `batch_size`, each committed separately and retried when it fails (see
+    db_batch_process); the user row goes last. Inside a request the batches
+    only flush, and the whole deletion commits with the request.
+
+    Args:
+        user_id (int): User to delete
+        batch_size (int): Rows per transaction
+        max_retries (int): Retries of a failed batch
+
+    Returns:
+        dict: Rows deleted per table, batches and duration
+    """
+    started = time.perf_counter()
+    deleted = Counter()
+
+    batches = db_batch_process(
+        db.session.query(Task.id).filter(Task.user_id == user_id),
+        batch_size=batch_size, max_retries=max_retries, process_func=_delete_task_batch
+    )
+    for model in OWNED_MODELS:
+        batches += db_batch_process(
+            db.session.query(model.id).filter(model.user_id == user_id),
+            batch_size=batch_size, max_retries=max_retries,
+            process_func=lambda rows, model=model: {model.__tablename__: _delete_ids(model, [row.id for row in rows])}
+        )
+    for batch in batches:
+        deleted.update(batch)
+
+    for model in AUTHORED_MODELS:
+        db.session.execute(
+            db.update(model).where(model.created_by_user_id == user_id)
+            .values(created_by_user_id=None).execution_options(synchronize_session=False)
+        )
+    deleted['users'] = _delete_ids(User, [user_id])
+    commit()
+    db.session.expire_all()
+
+    return {
+        'user_id': user_id,
+        'deleted': dict(deleted),
+        'batches': len(batches) + 1,
+        'duration_s': round(time.perf_counter() - started, 3)
+    }
@@ -4,11 +4,24 @@ Provides basic analytics features without confidence tracking.
 """
 
 from datetime import datetime, timedelta
-from sqlalchemy import text, func, desc
+from sqlalchemy import text, func, desc, or_
 from app import db
 from app.models.curriculum import Subject, Topic, Subtopic
 from app.models.task import Task, TaskSubtopic
+from app.utils.task_repository import TaskRepository
+from app.utils.tracing import Stopwatch, current_span, traced
 
+def due_since(day):
+    """
+    Filter for tasks due on or after a day, or without a due date.
+
+    Tasks are due the day they are created, so adding it to a created_at
+    range keeps the result and lets a partitioned tasks table skip older
+    months (see app/utils/task_partitions.py).
+    """
+    return or_(Task.due_date >= day, Task.due_date.is_(None))
+
+@traced('analytics.prepare')
 def prepare_analytics_data(user_id):
     """
     Prepare basic analytics data for dashboard.
@@ -19,32 +32,25 @@ def prepare_analytics_data(user_id):
     Returns:
         Dictionary with analytics data
     """
-    # Get task completion stats
-    total_tasks = Task.query.filter_by(user_id=user_id).count()
-    completed_tasks = Task.query.filter(
-        Task.user_id == user_id,
-        Task.completed_at.isnot(None)
-    ).count()
+    current_span().set(user_id=user_id)
+    stages = Stopwatch('analytics')
+    
+    # Get task completion stats, including compacted tasks
+    tasks = TaskRepository(user_id)
+    total_tasks, completed_tasks = tasks.completion_counts()
     
     # Calculate completion rate
     completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
+    stages.lap('completion_counts', tasks=total_tasks)
     
     # Get subject breakdown
     subjects = Subject.query.all()
+    subject_counts = tasks.completion_counts(by_subject=True)
     subject_stats = []
     subject_analytics = []
     
     for subject in subjects:
-        subject_total = Task.query.filter_by(
-            user_id=user_id,
-            subject_id=subject.id
-        ).count()
-        
-        subject_completed = Task.query.filter(
-            Task.user_id == user_id,
-            Task.subject_id == subject.id,
-            Task.completed_at.isnot(None)
-        ).count()
+        subject_total, subject_completed = subject_counts.get(subject.id, (0, 0))
         
         subject_percentage = (subject_completed / subject_total * 100) if subject_total > 0 else 0
         
@@ -75,14 +81,18 @@ def prepare_analytics_data(user_id):
             'coverage_percentage': round(subject_percentage)
         })
     
+    stages.lap('subject_breakdown', subjects=len(subjects))
+    
     # Calculate tasks per week
     thirty_days_ago = datetime.utcnow() - timedelta(days=30)
     recent_tasks = Task.query.filter(
         Task.user_id == user_id,
-        Task.created_at >= thirty_days_ago
+        Task.created_at >= thirty_days_ago,
+        due_since(thirty_days_ago.date())
     ).count()
     
     tasks_per_week = (recent_tasks / 30) * 7
+    stages.lap('recent_tasks')
     
     # Generate mock recommendations
     recommendations = []
@@ -106,6 +116,7 @@ def prepare_analytics_data(user_id):
                 'recommended_review': confidence_level < 3 or (days_since and days_since > 14),
                 'priority': i < 2
             })
+    stages.lap('recommendations', recommendations=len(recommendations))
     
     return {
         'overview': {
@@ -142,6 +153,7 @@ def prepare_analytics_data(user_id):
         'recommendations': recommendations
     }
 
+@traced('analytics.charts')
 def get_chart_data_for_dashboard(user_id):
     """
     Generate chart-ready data for the dashboard.
@@ -152,22 +164,16 @@ def get_chart_data_for_dashboard(user_id):
     Returns:
         Dictionary with chart data
     """
+    stages = Stopwatch('analytics')
+    
     # Get subject data for chart
     subjects = Subject.query.all()
+    subject_counts = TaskRepository(user_id).completion_counts(by_subject=True)
     subject_labels = []
     subject_data = []
     
     for subject in subjects:
-        subject_total = Task.query.filter_by(
-            user_id=user_id,
-            subject_id=subject.id
-        ).count()
-        
-        subject_completed = Task.query.filter(
-            Task.user_id == user_id,
-            Task.subject_id == subject.id,
-            Task.completed_at.isnot(None)
-        ).count()
+        subject_total, subject_completed = subject_counts.get(subject.id, (0, 0))
         
         if subject_total > 0:
             subject_labels.append(subject.title)
@@ -183,6 +189,8 @@ def get_chart_data_for_dashboard(user_id):
         }]
     }
     
+    stages.lap('subject_chart', subjects=len(subjects))
+    
     # Create weekly task completion chart
     now = datetime.utcnow()
     labels = []
@@ -201,17 +209,20 @@ def get_chart_data_for_dashboard(user_id):
         # Count tasks for this day
         day_total = Task.query.filter(
             Task.user_id == user_id,
-            Task.created_at.between(day_start, day_end)
+            Task.created_at.between(day_start, day_end),
+            due_since(day_start.date())
         ).count()
         
         day_completed = Task.query.filter(
             Task.user_id == user_id,
             Task.created_at.between(day_start, day_end),
+            due_since(day_start.date()),
             Task.completed_at.isnot(None)
         ).count()
         
         total_data.append(day_total)
         completed_data.append(day_completed)
+    stages.lap('weekly_chart')
     
     # Create weekly task completion chart
     weekly_chart = {
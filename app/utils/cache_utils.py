@@ -1,6 +1,7 @@
 from functools import wraps
 from flask import make_response, request, current_app
 from app import cache
+from app.utils import metrics
 import hashlib
 import re
 
@@ -33,9 +34,12 @@ def cache_response(timeout=None, key_prefix='view'):
             
             # If not in cache, call the original function and cache the response
             if response is None:
+                metrics.inc('cache_requests_total', cache='flask', result='miss')
                 response = f(*args, **kwargs)
                 timeout_value = timeout or current_app.config.get('CACHE_DEFAULT_TIMEOUT', 300)
                 cache.set(cache_key, response, timeout=timeout_value)
+            else:
+                metrics.inc('cache_requests_total', cache='flask', result='hit')
             
             return response
         return decorated_function
@@ -0,0 +1,112 @@
+"""
+Per-request coalescing of confidence updates.
+Folds the subtopic confidence changes a request makes into one entry per
+subtopic and writes them as one bulk update plus one topic recompute, just
+before the request's unit of work commits. The response is only sent once
+they are durable, so every worker reads them.
+
+Changes are not carried across requests: each request's changes are
+written in its own transaction. Outside a request (CLI commands, scripts)
+every change is written immediately.
+"""
+
+from datetime import datetime
+from flask import g
+from app.utils.unit_of_work import in_unit_of_work, savepoint
+
+class ConfidenceWriteBuffer:
+    """Per-request, per-subtopic coalescing of confidence writes."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Register the hook writing each request's changes before it commits."""
+
+        # Registered after the unit of work, so it runs before the request commits
+        @app.after_request
+        def write_request_confidences(response):
+            if response.status_code < 400:
+                for user_id in list(g.get('_confidence_pending', {})):
+                    self.flush_user(user_id)
+            return response
+
+    def record(self, user_id, subtopic_id, confidence_level=None, priority=None):
+        """
+        Record a confidence change for a subtopic.
+
+        Only the fields that are passed are changed, so a priority toggle and
+        a level change for the same subtopic coalesce without clobbering
+        each other.
+
+        Args:
+            user_id (int): User ID
+            subtopic_id (int): Subtopic ID
+            confidence_level (int): New confidence level (1-5), or None to keep
+            priority (bool): New priority flag, or None to keep
+
+        Returns:
+            dict: The pending state for the subtopic after merging
+        """
+        if not in_unit_of_work():
+            from app.utils.confidence_utils import apply_confidence_updates
+
+            entry = self._merge({}, subtopic_id, confidence_level, priority)
+            apply_confidence_updates(user_id, {subtopic_id: entry})
+            return entry
+
+        # Only this request reads these, and it writes them before responding
+        user_pending = g.setdefault('_confidence_pending', {}).setdefault(user_id, {})
+        return dict(self._merge(user_pending, subtopic_id, confidence_level, priority))
+
+    @staticmethod
+    def _merge(user_pending, subtopic_id, confidence_level, priority):
+        """Fold a change into a user's pending entries and return the subtopic's entry."""
+        entry = user_pending.setdefault(subtopic_id, {
+            'confidence_level': None,
+            'priority': None
+        })
+
+        if confidence_level is not None:
+            entry['confidence_level'] = confidence_level
+        if priority is not None:
+            entry['priority'] = bool(priority)
+        entry['updated_at'] = datetime.utcnow()
+        return entry
+
+    def pending_for_user(self, user_id):
+        """Get a copy of the current request's unwritten changes for a user, keyed by subtopic ID."""
+        if not in_unit_of_work():
+            return {}
+        pending = g.get('_confidence_pending', {}).get(user_id, {})
+        return {subtopic_id: dict(entry) for subtopic_id, entry in pending.items()}
+
+    def flush_user(self, user_id):
+        """
+        Write the changes the current request made for a user in its unit of work.
+
+        Called before reads that need the stored rows or exact topic
+        aggregates. The changes are written in a savepoint, so a failure
+        leaves the rest of the request usable; the entries then stay with the
+        request and fail it when it tries to commit them.
+
+        Returns:
+            int: Number of subtopics written
+        """
+        from app.utils.confidence_utils import apply_confidence_updates
+
+        if not in_unit_of_work():
+            return 0
+        request_pending = g.get('_confidence_pending', {})
+        entries = request_pending.get(user_id)
+        if not entries:
+            return 0
+
+        with savepoint():
+            apply_confidence_updates(user_id, entries)
+        del request_pending[user_id]
+        return len(entries)
+
+# Shared buffer, initialised in create_app
+confidence_buffer = ConfidenceWriteBuffer()
@@ -1,10 +1,23 @@
+from datetime import datetime, timedelta
+from flask import current_app
 from app import db
 from app.models.confidence import SubtopicConfidence, TopicConfidence
+from app.utils.confidence_buffer import confidence_buffer
+from app.utils.retry_utils import retry_on_conflict
+from app.utils.tracing import Stopwatch, current_span, traced
+from app.utils.unit_of_work import commit, rollback
+
+# Epoch used to turn naive UTC timestamps into integer sync cursors
+SYNC_EPOCH = datetime(1970, 1, 1)
 
 def update_subtopic_confidence(user_id, subtopic_id, confidence_level, priority=False):
     """
     Update a user's confidence level for a specific subtopic.
     
+    The change goes through the confidence buffer, so repeated updates to
+    the same subtopic within a request are coalesced into a single write,
+    made before the response is sent.
+    
     Args:
         user_id (int): User ID
         subtopic_id (int): Subtopic ID
@@ -15,31 +28,10 @@ def update_subtopic_confidence(user_id, subtopic_id, confidence_level, priority=
         bool: Success status
     """
     try:
-        # Get or create confidence entry
-        confidence = SubtopicConfidence.query.filter_by(
-            user_id=user_id,
-            subtopic_id=subtopic_id
-        ).first()
-        
-        if not confidence:
-            # Create new entry if it doesn't exist
-            confidence = SubtopicConfidence(
-                user_id=user_id,
-                subtopic_id=subtopic_id,
-                confidence_level=confidence_level,
-                priority=priority
-            )
-            db.session.add(confidence)
-        else:
-            # Update existing entry
-            confidence.confidence_level = confidence_level
-            confidence.priority = priority
-        
-        db.session.commit()
+        confidence_buffer.record(user_id, subtopic_id, confidence_level, priority)
         return True
     except Exception as e:
         print(f"Error updating subtopic confidence: {e}")
-        db.session.rollback()
         return False
 
 def update_subtopics_confidence_from_dict(user_id, confidence_dict):
@@ -54,48 +46,173 @@ def update_subtopics_confidence_from_dict(user_id, confidence_dict):
         bool: Success status
     """
     try:
-        # Update each subtopic confidence
         for subtopic_id, (confidence_level, priority) in confidence_dict.items():
-            # Get or create confidence entry
-            confidence = SubtopicConfidence.query.filter_by(
-                user_id=user_id,
-                subtopic_id=subtopic_id
-            ).first()
+            confidence_buffer.record(user_id, subtopic_id, confidence_level, priority)
+        return True
+    except Exception as e:
+        print(f"Error updating multiple subtopic confidences: {e}")
+        return False
+
+@traced('confidence.apply')
+def apply_confidence_updates(user_id, entries):
+    """
+    Write a batch of coalesced subtopic confidence changes in one transaction.
+    
+    Existing rows are loaded with a single IN query, missing rows are created
+    at the default level, and every affected topic is recalculated once.
+    Subtopic IDs that no longer exist are dropped so they cannot block the
+    rest of the batch. Only the fields set in each entry are written, and the
+    whole batch is re-read and re-applied if a concurrent writer changed one
+    of the rows first.
+    
+    Args:
+        user_id (int): User ID
+        entries (dict): {subtopic_id: {'confidence_level': int or None, 'priority': bool or None}}
+        
+    Returns:
+        int: Number of subtopics written
+    """
+    from app.models.curriculum import Subtopic
+    from app.utils.task_card_utils import update_card_confidences
+    
+    current_span().set(user_id=user_id, subtopics=len(entries))
+    
+    def write():
+        stages = Stopwatch('confidence')
+        topic_by_subtopic = dict(
+            db.session.query(Subtopic.id, Subtopic.topic_id)
+            .filter(Subtopic.id.in_(list(entries.keys())))
+            .all()
+        )
+        
+        existing = {
+            confidence.subtopic_id: confidence
+            for confidence in SubtopicConfidence.query.filter(
+                SubtopicConfidence.user_id == user_id,
+                SubtopicConfidence.subtopic_id.in_(list(topic_by_subtopic.keys()))
+            ).all()
+        }
+        stages.lap('load_rows', rows=len(existing))
+        
+        for subtopic_id in topic_by_subtopic:
+            entry = entries[subtopic_id]
+            confidence = existing.get(subtopic_id)
             
             if not confidence:
-                # Create new entry if it doesn't exist
                 confidence = SubtopicConfidence(
                     user_id=user_id,
                     subtopic_id=subtopic_id,
-                    confidence_level=confidence_level,
-                    priority=priority
+                    confidence_level=3,
+                    priority=False
                 )
                 db.session.add(confidence)
-            else:
-                # Update existing entry
-                confidence.confidence_level = confidence_level
-                confidence.priority = priority
+            
+            if entry.get('confidence_level') is not None:
+                confidence.confidence_level = entry['confidence_level']
+            if entry.get('priority') is not None:
+                confidence.priority = entry['priority']
+            confidence.last_updated = datetime.utcnow()
         
-        # Commit all changes
-        db.session.commit()
+        # Make the new levels visible to the aggregate queries
+        db.session.flush()
+        stages.lap('write_subtopics')
+        topic_ids = set(topic_by_subtopic.values())
+        TopicConfidence.update_for_topics(topic_ids, user_id)
+        stages.lap('topic_recalculation', topics=len(topic_ids))
         
-        # Update topic confidences for affected topics
-        from app.models.curriculum import Subtopic
-        affected_topics = set()
+        # Keep the confidences shown on current task cards in step
+        cards = update_card_confidences(user_id, {
+            subtopic_id: entries[subtopic_id] for subtopic_id in topic_by_subtopic
+        })
+        stages.lap('card_patch', cards=cards)
         
-        for subtopic_id in confidence_dict.keys():
-            subtopic = Subtopic.query.get(subtopic_id)
-            if subtopic:
-                affected_topics.add(subtopic.topic_id)
+        commit()
+        stages.lap('commit')
+        return len(topic_by_subtopic)
+    
+    try:
+        return retry_on_conflict(write)
+    except Exception:
+        rollback()
+        raise
+
+@traced('confidence.state')
+def get_subtopic_confidence_state(user_id, subtopic_ids):
+    """
+    Get current confidence levels and priorities including unflushed changes.
+    
+    Args:
+        user_id (int): User ID
+        subtopic_ids (iterable): Subtopic IDs to look up
         
-        for topic_id in affected_topics:
-            TopicConfidence.update_for_topic(topic_id, user_id)
+    Returns:
+        dict: {subtopic_id: {'confidence_level', 'priority', 'last_updated'}},
+            with subtopics that have no row reported at the default level
+    """
+    subtopic_ids = list(subtopic_ids)
+    state = {
+        subtopic_id: {'confidence_level': 3, 'priority': False, 'last_updated': None}
+        for subtopic_id in subtopic_ids
+    }
+    
+    if subtopic_ids:
+        rows = db.session.query(
+            SubtopicConfidence.subtopic_id,
+            SubtopicConfidence.confidence_level,
+            SubtopicConfidence.priority,
+            SubtopicConfidence.last_updated
+        ).filter(
+            SubtopicConfidence.user_id == user_id,
+            SubtopicConfidence.subtopic_id.in_(subtopic_ids)
+        ).all()
         
-        return True
-    except Exception as e:
-        print(f"Error updating multiple subtopic confidences: {e}")
-        db.session.rollback()
-        return False
+        for row in rows:
+            state[row.subtopic_id] = {
+                'confidence_level': row.confidence_level,
+                'priority': bool(row.priority),
+                'last_updated': row.last_updated
+            }
+    
+    pending = confidence_buffer.pending_for_user(user_id)
+    for subtopic_id in subtopic_ids:
+        entry = pending.get(subtopic_id)
+        if not entry:
+            continue
+        if entry['confidence_level'] is not None:
+            state[subtopic_id]['confidence_level'] = entry['confidence_level']
+        if entry['priority'] is not None:
+            state[subtopic_id]['priority'] = entry['priority']
+        state[subtopic_id]['last_updated'] = entry['updated_at']
+    
+    return state
+
+def estimate_topic_confidence(user_id, topic_id):
+    """
+    Calculate a topic's confidence percentage including unflushed changes.
+    
+    Uses the same scale as TopicConfidence.calculate_for_topic but does not
+    write anything, so it is safe to call while changes are still pending.
+    
+    Args:
+        user_id (int): User ID
+        topic_id (int): Topic ID
+        
+    Returns:
+        float: Confidence percentage (0-100)
+    """
+    from app.models.curriculum import Subtopic
+    
+    subtopic_ids = [
+        row.id for row in db.session.query(Subtopic.id).filter(Subtopic.topic_id == topic_id).all()
+    ]
+    if not subtopic_ids:
+        return 0.0
+    
+    state = get_subtopic_confidence_state(user_id, subtopic_ids)
+    avg_confidence = sum(s['confidence_level'] for s in state.values()) / len(state)
+    
+    # 1/5 = 0%, 3/5 = 50%, 5/5 = 100%
+    return ((avg_confidence - 1) / 4.0) * 100.0
 
 def update_topic_confidence(user_id, topic_id):
     """
@@ -114,4 +231,155 @@ def update_topic_confidence(user_id, topic_id):
         return topic_confidence.confidence_percent
     except Exception as e:
         print(f"Error updating topic confidence: {e}")
-        return 50.0  # Default to 50% on error 
\ No newline at end of file
+        return 50.0  # Default to 50% on error
+
+def encode_sync_cursor(timestamp):
+    """
+    Encode a naive UTC timestamp as an opaque, monotonic sync cursor.
+    
+    Args:
+        timestamp (datetime): Timestamp to encode (None encodes as the epoch)
+        
+    Returns:
+        str: Microseconds since the epoch as a decimal string
+    """
+    if timestamp is None:
+        return '0'
+    delta = timestamp - SYNC_EPOCH
+    return str((delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds)
+
+def decode_sync_cursor(cursor):
+    """
+    Decode a sync cursor produced by encode_sync_cursor.
+    
+    Args:
+        cursor (str): Cursor string from a previous sync response
+        
+    Returns:
+        datetime: The naive UTC timestamp the cursor points at
+        
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    micros = int(cursor)
+    if micros < 0:
+        raise ValueError(f"Invalid sync cursor: {cursor}")
+    return SYNC_EPOCH + timedelta(microseconds=micros)
+
+def _epoch_millis(timestamp):
+    """Convert a naive UTC timestamp to integer epoch milliseconds."""
+    if timestamp is None:
+        return None
+    delta = timestamp - SYNC_EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1000 + delta.microseconds // 1000
+
+def get_confidence_changes(user_id, since=None):
+    """
+    Get the confidence rows a user has changed since a sync cursor.
+    
+    Only plain columns are selected, so no ORM objects are hydrated. Both
+    queries are served by the (user_id, last_updated) indexes.
+    
+    Rows are stamped when flushed but only visible once their request
+    commits, so they do not become visible in last_updated order: a row
+    stamped t1 can commit after a row stamped t2 > t1 has been synced. The
+    next cursor is therefore held back CONFIDENCE_SYNC_LAG_SECONDS below the
+    newest last_updated returned, never earlier than the client's cursor,
+    and the rows in that window are sent again on later polls; clients apply
+    rows as upserts. A row is only missed if its transaction commits more
+    than the lag after it was flushed, or its host's clock is off by more;
+    the default lag covers a request running until the worker timeout.
+    
+    Args:
+        user_id (int): User ID
+        since (datetime): Timestamp decoded from the client's cursor, or None
+            for a full sync
+        
+    Returns:
+        dict: 'subtopics' and 'topics' row tuples plus the next 'cursor'
+    """
+    subtopic_query = db.session.query(
+        SubtopicConfidence.subtopic_id,
+        SubtopicConfidence.confidence_level,
+        SubtopicConfidence.priority,
+        SubtopicConfidence.last_updated
+    ).filter(SubtopicConfidence.user_id == user_id)
+    
+    topic_query = db.session.query(
+        TopicConfidence.topic_id,
+        TopicConfidence.confidence_percent,
+        TopicConfidence.last_updated
+    ).filter(TopicConfidence.user_id == user_id)
+    
+    if since is not None:
+        # Inclusive, so rows sharing the newest timestamp are never skipped
+        subtopic_query = subtopic_query.filter(SubtopicConfidence.last_updated >= since)
+        topic_query = topic_query.filter(TopicConfidence.last_updated >= since)
+    
+    subtopic_rows = subtopic_query.all()
+    topic_rows = topic_query.all()
+    
+    stamps = [row.last_updated for row in (*subtopic_rows, *topic_rows) if row.last_updated is not None]
+    next_cursor = None
+    if stamps:
+        next_cursor = max(stamps) - timedelta(seconds=current_app.config.get('CONFIDENCE_SYNC_LAG_SECONDS', 60))
+    # Never move a client's cursor backwards
+    if since is not None:
+        next_cursor = max(next_cursor or since, since)
+    
+    return {
+        'subtopics': subtopic_rows,
+        'topics': topic_rows,
+        'cursor': encode_sync_cursor(next_cursor)
+    }
+
+def format_confidence_changes(changes, columnar=True):
+    """
+    Shape confidence changes for the sync API.
+    
+    The columnar layout sends parallel arrays of ids, levels and epoch
+    millisecond timestamps instead of one object per row.
+    
+    Args:
+        changes (dict): Result of get_confidence_changes
+        columnar (bool): Whether to use the compact columnar layout
+        
+    Returns:
+        dict: 'subtopic_confidences' and 'topic_confidences' payloads
+    """
+    subtopics = changes['subtopics']
+    topics = changes['topics']
+    
+    if not columnar:
+        return {
+            'subtopic_confidences': [
+                {
+                    'subtopic_id': row.subtopic_id,
+                    'confidence_level': row.confidence_level,
+                    'last_updated': row.last_updated.isoformat() if row.last_updated else None
+                }
+                for row in subtopics
+            ],
+            'topic_confidences': [
+                {
+                    'topic_id': row.topic_id,
+                    'confidence_percent': row.confidence_percent,
+                    'last_updated': row.last_updated.isoformat() if row.last_updated else None
+                }
+                for row in topics
+            ]
+        }
+    
+    return {
+        'subtopic_confidences': {
+            'subtopic_id': [row.subtopic_id for row in subtopics],
+            'confidence_level': [row.confidence_level for row in subtopics],
+            'priority': [bool(row.priority) for row in subtopics],
+            'last_updated': [_epoch_millis(row.last_updated) for row in subtopics]
+        },
+        'topic_confidences': {
+            'topic_id': [row.topic_id for row in topics],
+            'confidence_percent': [row.confidence_percent for row in topics],
+            'last_updated': [_epoch_millis(row.last_updated) for row in topics]
+        }
+    }
@@ -0,0 +1,223 @@
+"""
+Index advisor utilities for the hot query shapes.
+Provides a recorder of the statement fingerprints an engine runs, and an
+advisor that reads each fingerprint's filters and query plan and proposes
+the composite or partial indexes that would serve it.
+"""
+
+import re
+import threading
+import time
+from sqlalchemy import event, inspect, text
+from app.utils.query_instrumentation import fingerprint
+from app.utils.slow_query_log import explain_statement
+
+_ALIAS = re.compile(r'\b(\w+) AS (\w+)\b')
+_EQUALITY = re.compile(r'\b(\w+)\.(\w+) (?:= \?|IN \(\?)')
+_RANGE = re.compile(r'\b(\w+)\.(\w+) (?:(?:>=|<=|>|<|BETWEEN) \?|IS NOT NULL)')
+_JOINED_TABLE = re.compile(r'\bJOIN (\w+)(?: AS (\w+))?')
+_COLUMN_EQUALITY = re.compile(r'\b(\w+)\.(\w+) = (\w+)\.(\w+)\b')
+_IS_NULL = re.compile(r'\b(?:(\w+)\.)?(\w+) IS NULL\b')
+_ORDER_BY = re.compile(r'\bORDER BY (\w+)\.(\w+)')
+
+# Tasks that are neither completed nor skipped
+ACTIVE_TASK = frozenset({'completed_at', 'skipped_at'})
+
+# A partial index beside a full one is only worth it when it is much smaller
+PARTIAL_INDEX_MAX_SHARE = 0.5
+
+# Plan lines that read a whole table
+_SQLITE_SCAN = re.compile(r'\bSCAN (\w+)\b(?! USING)')
+_POSTGRES_SCAN = re.compile(r'\bSeq Scan on (\w+)')
+
+class QueryRecorder:
+    """Counts and times every statement fingerprint run on an engine, keeping one sample each."""
+
+    def __init__(self):
+        self.queries = {}
+        self._lock = threading.Lock()
+
+    def attach(self, engine):
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def detach(self, engine):
+        event.remove(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.remove(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('index_advisor_start_time', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('index_advisor_start_time')
+        duration = time.perf_counter() - started.pop() if started else 0.0
+        if executemany or not statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+            return
+
+        key = fingerprint(statement)
+        with self._lock:
+            entry = self.queries.setdefault(key, {
+                'statement': statement, 'parameters': parameters, 'count': 0, 'total_ms': 0.0
+            })
+            entry['count'] += 1
+            entry['total_ms'] += duration * 1000.0
+
+def predicates(key):
+    """
+    Find the columns a fingerprinted statement filters and sorts on, per table.
+
+    Returns:
+        dict: {table: {'equality': [...], 'range': [...], 'null': [...]}}
+    """
+    aliases = {alias: table for table, alias in _ALIAS.findall(key)}
+    # Skip the select list, where IS NULL tests are values rather than filters
+    clauses = key[key.find(' FROM '):] if key.startswith('SELECT') else key
+    found = {}
+
+    def add(kind, table, column):
+        columns = found.setdefault(aliases.get(table, table), {'equality': [], 'range': [], 'null': []})[kind]
+        if column not in columns:
+            columns.append(column)
+
+    for table, column in _EQUALITY.findall(clauses):
+        add('equality', table, column)
+    # A joined table is looked up by its side of the join condition
+    joined = {alias or table for table, alias in _JOINED_TABLE.findall(clauses)}
+    for left_table, left, right_table, right in _COLUMN_EQUALITY.findall(clauses):
+        for table, column in ((left_table, left), (right_table, right)):
+            if table in joined:
+                add('equality', table, column)
+    for table, column in _RANGE.findall(clauses) + _ORDER_BY.findall(clauses):
+        if column != 'id':
+            add('range', table, column)
+    for table, column in _IS_NULL.findall(clauses):
+        if table:
+            add('null', table, column)
+    return found
+
+def existing_indexes(engine):
+    """
+    Indexed column lists per table, including primary keys and unique constraints.
+
+    Returns:
+        dict: {table: [(columns tuple, frozenset of IS NULL columns of a partial index)]}
+    """
+    inspector = inspect(engine)
+    indexes = {}
+    for table in inspector.get_table_names():
+        entries = [(tuple(inspector.get_pk_constraint(table)['constrained_columns']), frozenset())]
+        for constraint in inspector.get_unique_constraints(table):
+            entries.append((tuple(constraint['column_names']), frozenset()))
+        for index in inspector.get_indexes(table):
+            where = next((value for key, value in index.get('dialect_options', {}).items() if key.endswith('_where')), '')
+            null_columns = frozenset(column for _, column in _IS_NULL.findall(str(where)))
+            entries.append((tuple(column for column in index['column_names'] if column), null_columns))
+        indexes[table] = entries
+    return indexes
+
+def proposal_for(table, columns, existing):
+    """
+    Build the index serving a table's predicates.
+
+    Returns:
+        dict: The proposal, flagged 'partial_only' when a full index on the
+            same columns exists and only a smaller partial one is new, or
+            None when an existing index already serves the predicates
+    """
+    equality = sorted(columns['equality'], key=lambda column: column != 'user_id')
+    if 'id' in equality:
+        # Primary key lookups need nothing else
+        return None
+    key_columns = tuple(equality + [column for column in columns['range'] if column not in equality][:1])
+    if not key_columns:
+        return None
+
+    # Equality columns can lead an index in any order
+    null_columns = frozenset(columns['null'])
+    partial_only = False
+    for indexed, where in existing.get(table, []):
+        if set(indexed[:len(equality)]) == set(equality) and indexed[len(equality):len(key_columns)] == key_columns[len(equality):]:
+            if where == null_columns:
+                return None
+            partial_only = partial_only or not where
+
+    suffix = '_active' if null_columns == ACTIVE_TASK else ''.join(f"_no_{column}" for column in sorted(null_columns))
+    name = f"ix_{table}_{'_'.join(key_columns)}{suffix}"
+    where = ' AND '.join(f"{column} IS NULL" for column in sorted(null_columns))
+    return {
+        'name': name,
+        'table': table,
+        'columns': list(key_columns),
+        'where': where or None,
+        'partial_only': partial_only,
+        'ddl': f"CREATE INDEX {name} ON {table} ({', '.join(key_columns)})" + (f" WHERE {where}" if where else '')
+    }
+
+def _matching_share(connection, table, where):
+    """Fraction of a table's rows that a partial index condition keeps."""
+    total, matching = connection.execute(text(
+        f"SELECT COUNT(*), SUM(CASE WHEN {where} THEN 1 ELSE 0 END) FROM {table}"
+    )).one()
+    return (matching or 0) / total if total else 1.0
+
+def advise(engine, queries, min_calls=1):
+    """
+    Propose indexes for recorded queries.
+
+    Every fingerprint seen at least `min_calls` times is explained with its
+    sample parameters; those whose filters no existing index leads with get
+    a proposal, partial when the statement also filters on IS NULL. Where
+    a full index on the same columns exists, the partial one is only
+    proposed if it keeps at most PARTIAL_INDEX_MAX_SHARE of the rows. A
+    proposal whose columns lead a longer one on the same table is merged
+    into it.
+
+    Args:
+        engine: SQLAlchemy engine the queries ran on
+        queries (dict): QueryRecorder.queries
+        min_calls (int): Ignore fingerprints seen fewer times
+
+    Returns:
+        list: Proposals with the fingerprints they serve, their calls, time
+            and plan lines showing full table scans, most time first
+    """
+    existing = existing_indexes(engine)
+    scan = _SQLITE_SCAN if engine.dialect.name == 'sqlite' else _POSTGRES_SCAN
+    proposals = {}
+
+    with engine.connect() as connection:
+        for key, entry in queries.items():
+            if entry['count'] < min_calls:
+                continue
+            plan = None
+            for table, columns in predicates(key).items():
+                proposal = proposal_for(table, columns, existing)
+                if not proposal:
+                    continue
+                if proposal['partial_only']:
+                    share = _matching_share(connection, table, proposal['where'])
+                    if share > PARTIAL_INDEX_MAX_SHARE:
+                        continue
+                    proposal['matching_share'] = round(share, 3)
+                if plan is None:
+                    plan = explain_statement(connection, entry['statement'], entry['parameters']) or []
+                merged = proposals.setdefault(proposal['name'], {**proposal, 'fingerprints': [], 'calls': 0,
+                                                                 'total_ms': 0.0, 'scans': []})
+                merged['fingerprints'].append(key)
+                merged['calls'] += entry['count']
+                merged['total_ms'] += entry['total_ms']
+                merged['scans'].extend(line for line in plan if table in scan.findall(line))
+
+    for name, proposal in list(proposals.items()):
+        for other in proposals.values():
+            if (other is not proposal and other['table'] == proposal['table'] and other['where'] == proposal['where']
+                    and len(other['columns']) > len(proposal['columns'])
+                    and other['columns'][:len(proposal['columns'])] == proposal['columns']):
+                other['fingerprints'].extend(proposal['fingerprints'])
+                other['calls'] += proposal['calls']
+                other['total_ms'] += proposal['total_ms']
+                other['scans'].extend(proposal['scans'])
+                del proposals[name]
+                break
+
+    return sorted(proposals.values(), key=lambda proposal: proposal['total_ms'], reverse=True)
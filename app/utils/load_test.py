@@ -0,0 +1,240 @@
+"""
+Load testing utilities for closed-loop capacity runs.
+Provides virtual students that each follow a scripted study day (login,
+dashboard, pomodoro, completing and skipping tasks, progress, calendar and
+curriculum search) with think times and ramp-up, either in-process through
+the Flask test client or over HTTP against a running server.
+"""
+
+import http.cookiejar
+import json
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter
+from datetime import datetime
+from app import db
+from app.utils.traffic_replay import ensure_accounts, git_revision, percentile
+
+LOAD_TEST_PASSWORD = 'load-test-password'
+
+# The order a student works through their day
+STUDENT_DAY = ('login', 'index', 'pomodoro', 'complete', 'confidence', 'skip',
+               'refresh', 'progress', 'calendar', 'curriculum_search')
+
+TASK_ID_PATTERN = re.compile(r'id="task-(\d+)"')
+
+class InProcessSession:
+    """One virtual student's cookies, sending requests to the app in-process."""
+
+    def __init__(self, app):
+        self._client = app.test_client()
+
+    def request(self, method, path, form=None, payload=None):
+        response = self._client.open(path, method=method, data=form, json=payload)
+        return response.status_code, response.get_data(as_text=True)
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+class HttpSession:
+    """One virtual student's cookies, sending requests to a server over HTTP."""
+
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self._opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect()
+        )
+
+    def request(self, method, path, form=None, payload=None):
+        headers = {}
+        body = None
+        if form is not None:
+            body = urllib.parse.urlencode(form).encode('utf-8')
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        elif payload is not None:
+            body = json.dumps(payload).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+
+        request = urllib.request.Request(self.base_url + path, data=body, headers=headers, method=method)
+        try:
+            with self._opener.open(request, timeout=self.timeout) as response:
+                return response.status, response.read().decode('utf-8', 'replace')
+        except urllib.error.HTTPError as e:
+            # Redirects and error statuses both arrive here
+            return e.code, e.read().decode('utf-8', 'replace')
+
+class VirtualStudent:
+    """Works through STUDENT_DAY, recording (step, seconds, status) for every request."""
+
+    def __init__(self, session, username, rng, search_terms, record):
+        self.session = session
+        self.username = username
+        self.rng = rng
+        self.search_terms = search_terms
+        self.record = record
+        self.task_ids = []
+        self.completed_subtopics = []
+
+    def call(self, step, method, path, form=None, payload=None):
+        started = time.perf_counter()
+        try:
+            status, body = self.session.request(method, path, form=form, payload=payload)
+        except Exception:
+            status, body = 'exception', ''
+        self.record(step, time.perf_counter() - started, status)
+        return status, body
+
+    def login(self):
+        self.call('login', 'POST', '/login', form={'username': self.username, 'password': LOAD_TEST_PASSWORD})
+
+    def index(self):
+        status, body = self.call('index', 'GET', '/')
+        self.task_ids = [int(task_id) for task_id in TASK_ID_PATTERN.findall(body)] if status == 200 else []
+
+    def pomodoro(self):
+        self.call('pomodoro', 'GET', '/pomodoro')
+        self.call('pomodoro', 'GET', '/api/pomodoro/stats')
+
+    def complete(self):
+        self.completed_subtopics = []
+        if self.task_ids:
+            status, body = self.call('complete', 'POST', f'/api/tasks/complete/{self.task_ids.pop(0)}')
+            if status == 200:
+                self.completed_subtopics = [subtopic['id'] for subtopic in json.loads(body).get('subtopics', [])]
+
+    def confidence(self):
+        # Answer the prompt shown after completing a task
+        if self.completed_subtopics:
+            ratings = {str(subtopic_id): {'confidence': self.rng.randint(1, 5)} for subtopic_id in self.completed_subtopics}
+            self.call('confidence', 'POST', '/api/subtopics/update_confidence', payload={'subtopics': ratings})
+
+    def skip(self):
+        if self.task_ids:
+            self.call('skip', 'POST', f'/api/tasks/skip/{self.task_ids.pop(0)}')
+
+    def refresh(self):
+        self.call('refresh', 'POST', '/api/tasks/refresh', payload={})
+
+    def progress(self):
+        self.call('progress', 'GET', '/progress')
+
+    def calendar(self):
+        self.call('calendar', 'GET', '/calendar')
+
+    def curriculum_search(self):
+        query = urllib.parse.quote(self.rng.choice(self.search_terms))
+        self.call('curriculum_search', 'GET', f'/api/curriculum/search?q={query}')
+
+def run_load_test(app, users=10, days=1, think_time=1.0, ramp_up=0.0, base_url=None, seed=0):
+    """
+    Run virtual students through STUDENT_DAY concurrently.
+
+    The test is closed-loop: each student waits for a response and then
+    thinks (an exponential pause averaging `think_time` seconds) before the
+    next step, so throughput reflects how fast the app answers. Students
+    start evenly spread over `ramp_up` seconds.
+
+    Args:
+        app: Flask app instance, used for the accounts and in-process requests
+        users (int): Concurrent virtual students
+        days (int): Study days each student works through
+        think_time (float): Mean pause between steps in seconds (0 for none)
+        ramp_up (float): Seconds over which the students start
+        base_url (str): Send requests over HTTP to this server instead
+        seed (int): Seed for think times and confidence ratings
+
+    Returns:
+        dict: Report with throughput and per-step latency percentiles and error rates
+    """
+    from app.models.curriculum import Subject
+
+    with app.app_context():
+        usernames = ensure_accounts('load_user', users, LOAD_TEST_PASSWORD)
+        search_terms = [subject.title[:4] for subject in Subject.query.limit(20).all() if len(subject.title) >= 2]
+        database = db.engine.dialect.name
+
+    results = []
+    results_lock = threading.Lock()
+
+    def record(step, seconds, status):
+        with results_lock:
+            results.append((step, seconds, status))
+
+    def virtual_student(index):
+        rng = random.Random(seed * 100003 + index)
+        time.sleep(ramp_up * index / users)
+        session = HttpSession(base_url) if base_url else InProcessSession(app)
+        student = VirtualStudent(session, usernames[index], rng, search_terms or ['topic'], record)
+
+        for _ in range(days):
+            for step in STUDENT_DAY:
+                getattr(student, step)()
+                if think_time > 0:
+                    time.sleep(rng.expovariate(1.0 / think_time))
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=virtual_student, args=(index,)) for index in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return build_load_report(results, elapsed, {
+        'revision': git_revision(),
+        'created_at': datetime.utcnow().isoformat(),
+        'target': base_url or f"in-process ({database})",
+        'virtual_users': users,
+        'days': days,
+        'think_time_s': think_time,
+        'ramp_up_s': ramp_up
+    })
+
+def build_load_report(results, elapsed, meta):
+    """
+    Aggregate recorded requests by step.
+
+    A request is an error when it raised or answered with a 4xx or 5xx.
+
+    Returns:
+        dict: meta plus duration, totals, throughput and 'steps' in STUDENT_DAY order
+    """
+    grouped = {}
+    for step, seconds, status in results:
+        group = grouped.setdefault(step, {'latencies': [], 'statuses': Counter()})
+        group['latencies'].append(seconds * 1000.0)
+        group['statuses'][str(status)] += 1
+
+    steps = {}
+    for step in sorted(grouped, key=STUDENT_DAY.index):
+        latencies = grouped[step]['latencies']
+        statuses = grouped[step]['statuses']
+        errors = sum(count for status, count in statuses.items() if not status.isdigit() or int(status) >= 400)
+        steps[step] = {
+            'count': len(latencies),
+            'errors': errors,
+            'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+            'error_rate': round(errors / len(latencies), 4),
+            'statuses': dict(statuses),
+            'p50_ms': round(percentile(latencies, 0.50), 2),
+            'p95_ms': round(percentile(latencies, 0.95), 2),
+            'p99_ms': round(percentile(latencies, 0.99), 2),
+            'max_ms': round(max(latencies), 2)
+        }
+
+    total_errors = sum(stats['errors'] for stats in steps.values())
+    return {
+        **meta,
+        'duration_s': round(elapsed, 3),
+        'requests': len(results),
+        'throughput_rps': round(len(results) / elapsed, 2) if elapsed else 0.0,
+        'error_rate': round(total_errors / len(results), 4) if results else 0.0,
+        'steps': steps
+    }
@@ -0,0 +1,254 @@
+"""
+Metrics utilities for Prometheus-format monitoring.
+Provides counters and histograms recorded into per-thread stores without
+locking, merged on scrape and shared between gunicorn workers through
+snapshot files in a common directory, plus the request hooks and the
+protected /metrics endpoint that expose them.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from flask import Response, abort, g, request
+from app.utils.tracing import Stopwatch
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# name: (type, help, label names)
+METRICS = {
+    'http_requests_total': ('counter', 'Requests handled', ('endpoint', 'method', 'status')),
+    'http_request_duration_seconds': ('histogram', 'Request latency', ('endpoint',)),
+    'db_queries_total': ('counter', 'SQL statements executed by requests', ('endpoint',)),
+    'db_query_duration_seconds_total': ('counter', 'Time requests spent in SQL statements', ('endpoint',)),
+    'db_commits_total': ('counter', 'Transactions committed by requests', ('endpoint',)),
+    'task_generation_stage_duration_seconds': ('histogram', 'Time spent in each task generation stage', ('stage',)),
+    'cache_requests_total': ('counter', 'Cache lookups by result', ('cache', 'result')),
+    'cache_evictions_total': ('counter', 'Cache entries expired or cleared', ('cache',)),
+}
+
+SNAPSHOT_PREFIX = 'metrics_'
+
+_local = threading.local()
+_stores = []
+_stores_lock = threading.Lock()
+
+def _store():
+    """Get the calling thread's store, registering it on first use."""
+    store = getattr(_local, 'store', None)
+    if store is None:
+        store = {}
+        _local.store = store
+        with _stores_lock:
+            _stores.append(store)
+    return store
+
+def _key(name, labels):
+    label_names = METRICS[name][2]
+    return name, tuple(str(labels.get(label, '')) for label in label_names)
+
+def inc(name, amount=1, **labels):
+    """
+    Increment a counter.
+
+    Args:
+        name (str): Counter name from METRICS
+        amount (float): Amount to add
+        **labels: Label values
+    """
+    store = _store()
+    key = _key(name, labels)
+    store[key] = store.get(key, 0) + amount
+
+def observe(name, value, **labels):
+    """
+    Record a value in a histogram.
+
+    Args:
+        name (str): Histogram name from METRICS
+        value (float): Observed value, in seconds for latencies
+        **labels: Label values
+    """
+    store = _store()
+    key = _key(name, labels)
+    buckets = store.get(key)
+    if buckets is None:
+        # One slot per bucket plus +Inf, then the sum
+        buckets = store[key] = [0] * (len(LATENCY_BUCKETS) + 2)
+    buckets[bisect_left(LATENCY_BUCKETS, value)] += 1
+    buckets[-1] += value
+
+class StageTimer(Stopwatch):
+    """Times consecutive stages of a pipeline into a histogram, and into spans when tracing."""
+
+    def __init__(self, name='task_generation_stage_duration_seconds', prefix='task_generation'):
+        super().__init__(prefix)
+        self.name = name
+
+    def lap(self, stage, **attributes):
+        """Record the time since the previous lap (or creation) as `stage`."""
+        duration = super().lap(stage, **attributes)
+        observe(self.name, duration, stage=stage)
+        return duration
+
+def collect():
+    """
+    Merge every thread's store in this process.
+
+    Returns:
+        dict: {(name, label values): counter value or histogram slots}
+    """
+    with _stores_lock:
+        stores = list(_stores)
+
+    merged = {}
+    for store in stores:
+        # dict() copies in one step, so a writing thread cannot break the iteration
+        for key, value in dict(store).items():
+            _merge(merged, key, value)
+    return merged
+
+def _merge(merged, key, value):
+    if isinstance(value, list):
+        existing = merged.get(key)
+        merged[key] = [a + b for a, b in zip(existing, value)] if existing else list(value)
+    else:
+        merged[key] = merged.get(key, 0) + value
+
+def write_snapshot(directory):
+    """Write this process's metrics to its snapshot file in a shared directory."""
+    path = os.path.join(directory, f"{SNAPSHOT_PREFIX}{os.getpid()}.json")
+    entries = [[name, list(labels), value] for (name, labels), value in collect().items()]
+    with open(f"{path}.tmp", 'w', encoding='utf-8') as snapshot_file:
+        json.dump(entries, snapshot_file)
+    os.replace(f"{path}.tmp", path)
+
+def read_snapshots(directory):
+    """
+    Merge the snapshot files of every worker, including ones that have exited.
+
+    Returns:
+        dict: Same shape as collect()
+    """
+    merged = {}
+    for filename in os.listdir(directory):
+        if not (filename.startswith(SNAPSHOT_PREFIX) and filename.endswith('.json')):
+            continue
+        try:
+            with open(os.path.join(directory, filename), encoding='utf-8') as snapshot_file:
+                entries = json.load(snapshot_file)
+        except (OSError, ValueError):
+            continue
+        for name, labels, value in entries:
+            if name in METRICS:
+                _merge(merged, (name, tuple(labels)), value)
+    return merged
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(label_names, label_values, extra=()):
+    pairs = list(zip(label_names, label_values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+def render(values):
+    """
+    Format merged metrics in the Prometheus text exposition format.
+
+    Args:
+        values (dict): Result of collect() or read_snapshots()
+
+    Returns:
+        str: Exposition text
+    """
+    lines = []
+    for name, (metric_type, help_text, label_names) in METRICS.items():
+        series = sorted((labels, value) for (metric, labels), value in values.items() if metric == name)
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+
+        for labels, value in series:
+            if metric_type == 'counter':
+                lines.append(f"{name}{_format_labels(label_names, labels)} {value}")
+                continue
+
+            cumulative = 0
+            bounds = [str(bound) for bound in LATENCY_BUCKETS] + ['+Inf']
+            for bound, count in zip(bounds, value[:-1]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(label_names, labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(label_names, labels)} {value[-1]}")
+            lines.append(f"{name}_count{_format_labels(label_names, labels)} {cumulative}")
+
+    return '\n'.join(lines) + '\n'
+
+def init_metrics(app):
+    """
+    Record request metrics and serve them at /metrics when METRICS_ENABLED is set.
+
+    With METRICS_DIR set, each worker writes a snapshot there every
+    METRICS_SNAPSHOT_INTERVAL seconds and /metrics merges all of them.
+    With METRICS_TOKEN set, scrapes must send it as a bearer token.
+
+    Args:
+        app: Flask app instance
+    """
+    if not app.config.get('METRICS_ENABLED'):
+        return app
+
+    directory = app.config.get('METRICS_DIR')
+    interval = app.config.get('METRICS_SNAPSHOT_INTERVAL', 5.0)
+    token = app.config.get('METRICS_TOKEN')
+    state = {'next_snapshot': 0.0}
+
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        atexit.register(write_snapshot, directory)
+
+    @app.before_request
+    def start_request_metrics():
+        g._metrics_started = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.get('_metrics_started')
+        if started is None:
+            return response
+
+        endpoint = request.endpoint or 'unmatched'
+        inc('http_requests_total', endpoint=endpoint, method=request.method, status=response.status_code)
+        observe('http_request_duration_seconds', time.perf_counter() - started, endpoint=endpoint)
+
+        stats = g.get('query_stats')
+        if stats is not None:
+            inc('db_queries_total', stats.count, endpoint=endpoint)
+            inc('db_query_duration_seconds_total', stats.total_time, endpoint=endpoint)
+            inc('db_commits_total', stats.commits, endpoint=endpoint)
+
+        now = time.monotonic()
+        if directory and now >= state['next_snapshot']:
+            state['next_snapshot'] = now + interval
+            try:
+                write_snapshot(directory)
+            except OSError as e:
+                app.logger.error(f"Error writing metrics snapshot: {str(e)}")
+
+        return response
+
+    def metrics_view():
+        if token and request.headers.get('Authorization') != f"Bearer {token}":
+            abort(401)
+        if directory:
+            write_snapshot(directory)
+            values = read_snapshots(directory)
+        else:
+            values = collect()
+        return Response(render(values), mimetype='text/plain; version=0.0.4')
+
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+    return app
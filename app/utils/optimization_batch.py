@@ -2,9 +2,14 @@
 Batch processing utilities for handling large datasets efficiently.
 Provides functions for processing items in batches to avoid memory issues.
 """
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from types import SimpleNamespace
 from flask import current_app
+from sqlalchemy import and_, func, inspect, or_, select, update
 from sqlalchemy.exc import SQLAlchemyError
 from app import db
+from app.utils.unit_of_work import commit, rollback, savepoint
 import time
 
 def batch_process(items, batch_size=100, process_func=None):
@@ -35,87 +40,262 @@ def batch_process(items, batch_size=100, process_func=None):
         
     return results
 
-def db_batch_process(query, batch_size=100, process_func=None, commit_per_batch=True, max_retries=3):
+class KeysetIterator:
+    """
+    Iterates a query in batches ordered by a key, seeking past the last row seen.
+
+    Each batch is found with "WHERE key > last key ORDER BY key LIMIT n"
+    instead of OFFSET. Every batch costs the same however deep the scan is,
+    and rows deleted or changed by processing cannot shift later batches.
+    A key that is not the primary key is made unique by adding the primary
+    key to it. In stream mode one query is read through a server-side cursor
+    (yield_per), so callers must not commit between batches.
+    """
+
+    def __init__(self, query, batch_size=100, key=None, after=None, upper=None, limit=None, stream=False):
+        entity = query.column_descriptions[0]['entity']
+        mapper = inspect(entity)
+        self.primary_key = getattr(entity, mapper.get_property_by_column(mapper.primary_key[0]).key)
+        self.key = key if key is not None else self.primary_key
+
+        ordering = [self.key] if self.key is self.primary_key else [self.key, self.primary_key]
+        self.query = query.order_by(None).order_by(*ordering)
+        if after is not None:
+            self.query = self.query.filter(self.key > after)
+        if upper is not None:
+            self.query = self.query.filter(self.key <= upper)
+
+        self.batch_size = batch_size
+        self.limit = limit
+        self.stream = stream
+        self.position = None
+        self.batch_start = None
+        self.rows_seen = 0
+        self._last_batch_size = 0
+        self._rows = None
+
+    def _seek(self):
+        if self.position is None:
+            return self.query
+        key_value, primary_key_value = self.position
+        if self.key is self.primary_key:
+            return self.query.filter(self.primary_key > primary_key_value)
+        return self.query.filter(or_(
+            self.key > key_value,
+            and_(self.key == key_value, self.primary_key > primary_key_value)
+        ))
+
+    def rewind(self):
+        """Fetch the last batch again on the next iteration, e.g. after a rollback."""
+        self.position = self.batch_start
+        self.rows_seen -= self._last_batch_size
+        self._rows = None
+
+    def __iter__(self):
+        while self.limit is None or self.rows_seen < self.limit:
+            size = self.batch_size if self.limit is None else min(self.batch_size, self.limit - self.rows_seen)
+            if self.stream:
+                if self._rows is None:
+                    self._rows = iter(self._seek().yield_per(self.batch_size))
+                batch = list(islice(self._rows, size))
+            else:
+                batch = self._seek().limit(size).all()
+            if not batch:
+                return
+
+            # Read the position before yielding: processing may delete or expire the row
+            self.batch_start = self.position
+            self.position = (getattr(batch[-1], self.key.key), getattr(batch[-1], self.primary_key.key))
+            self.rows_seen += len(batch)
+            self._last_batch_size = len(batch)
+            yield batch
+
+def key_ranges(query, key, parts):
+    """
+    Split the values of an integer key into disjoint (after, upper) ranges.
+
+    Returns:
+        list: Up to `parts` ranges of key > after AND key <= upper covering every row
+    """
+    low, high = query.order_by(None).with_entities(func.min(key), func.max(key)).one()
+    if low is None:
+        return []
+    if not isinstance(low, int):
+        raise ValueError('Parallel batch processing needs an integer key')
+
+    span = -(-(high - low + 1) // parts)
+    return [
+        (low - 1 + index * span, min(high, low - 1 + (index + 1) * span))
+        for index in range(parts) if low - 1 + index * span < high
+    ]
+
+def db_batch_process(query, batch_size=100, process_func=None, commit_per_batch=True, max_retries=3,
+                     key=None, limit=None, workers=1, after=None, upper=None):
     """
     Process database query results in batches with proper transaction handling.
     
+    Batches are read with a KeysetIterator, so processing may delete or
+    modify the rows it is given. A batch that fails is rolled back and read
+    again from the key it started at. Inside a request each batch only
+    flushes, in a savepoint, and the request commits them together.
+    
     Args:
-        query: SQLAlchemy query object to iterate over
+        query: SQLAlchemy query object to iterate over (without ORDER BY/LIMIT)
         batch_size: Number of items to process in each batch
         process_func: Function to apply to each batch of items
-        commit_per_batch: Whether to commit after each batch
+        commit_per_batch: Whether to commit after each batch; without it the
+            rows are streamed from a single server-side cursor
         max_retries: Maximum number of retry attempts for failed batches
+        key: Indexed column to page by, defaults to the primary key
+        limit: Maximum number of rows to process
+        workers: Threads processing disjoint key ranges, each with its own
+            session (for databases that allow concurrent writers)
+        after, upper: Only process rows with after < key <= upper
         
     Returns:
         List of processed results or None if process_func is None
+        
+    Raises:
+        ValueError: If limit is combined with workers, as the first `limit`
+            rows cannot be split between threads
     """
+    if workers > 1:
+        if limit is not None:
+            raise ValueError('limit cannot be combined with workers')
+        return _parallel_batch_process(query, batch_size, process_func, commit_per_batch, max_retries, key, workers,
+                                       after, upper)
+    
     results = []
-    offset = 0
     retry_count = 0
+    pages = KeysetIterator(query, batch_size, key=key, after=after, upper=upper, limit=limit,
+                           stream=not commit_per_batch)
     
-    while True:
-        # Get a batch of records
-        batch = query.limit(batch_size).offset(offset).all()
-        
-        # Break if no more records
-        if not batch:
-            break
-            
+    for batch in pages:
         try:
-            # Process the batch
-            if process_func:
-                batch_results = process_func(batch)
-                if batch_results:
-                    if isinstance(batch_results, list):
-                        results.extend(batch_results)
-                    else:
-                        results.append(batch_results)
+            with savepoint():
+                # Process the batch
+                batch_results = process_func(batch) if process_func else None
+                
+                # Commit if requested
+                if commit_per_batch:
+                    commit()
             
-            # Commit if requested
-            if commit_per_batch:
-                db.session.commit()
+            if batch_results:
+                if isinstance(batch_results, list):
+                    results.extend(batch_results)
+                else:
+                    results.append(batch_results)
                 
-            # Reset retry counter and advance to next batch
+            # Reset retry counter
             retry_count = 0
-            offset += len(batch)
             
         except SQLAlchemyError as e:
             # Rollback on error
-            db.session.rollback()
+            rollback()
             
             # Log the error
             current_app.logger.error(f"Batch processing error: {str(e)}")
             
-            # Retry logic
+            # Retry logic: read the batch again from its first key
             if retry_count < max_retries:
                 retry_count += 1
                 current_app.logger.info(f"Retrying batch (attempt {retry_count}/{max_retries})...")
                 time.sleep(1)  # Wait before retry
+                pages.rewind()
             else:
-                current_app.logger.error(f"Max retries reached for batch at offset {offset}")
-                offset += len(batch)  # Skip problematic batch
-                retry_count = 0
+                current_app.logger.error(f"Max retries reached for batch ending at key {pages.position}")
+                retry_count = 0  # Skip problematic batch
     
     return results
 
+def _parallel_batch_process(query, batch_size, process_func, commit_per_batch, max_retries, key, workers,
+                            after=None, upper=None):
+    """Run db_batch_process over disjoint key ranges in worker threads, keeping results in key order."""
+    app = current_app._get_current_object()
+    pages = KeysetIterator(query, key=key)
+    bounded = query
+    if after is not None:
+        bounded = bounded.filter(pages.key > after)
+    if upper is not None:
+        bounded = bounded.filter(pages.key <= upper)
+    
+    def process_range(after, upper):
+        with app.app_context():
+            try:
+                return db_batch_process(
+                    query.with_session(db.session()), batch_size, process_func, commit_per_batch,
+                    max_retries, key=pages.key, after=after, upper=upper
+                )
+            finally:
+                db.session.remove()
+    
+    ranges = key_ranges(bounded, pages.key, workers)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(process_range, after, upper) for after, upper in ranges]
+        return [result for future in futures for result in future.result()]
+
+def bulk_update(model, values, *criteria, max_retries=3):
+    """
+    Update every row matching the criteria with a single UPDATE statement.
+    
+    Inside a request the update is only flushed and commits with the request.
+    
+    Args:
+        model: SQLAlchemy model class
+        values: Dict of column to new value or SQL expression (e.g. a CASE
+            over the row's own columns)
+        criteria: WHERE clauses selecting the rows
+        max_retries: Maximum number of retry attempts
+        
+    Returns:
+        Number of rows updated
+    """
+    statement = update(model).where(*criteria).values(values).execution_options(synchronize_session=False)
+    
+    for retry_count in range(max_retries + 1):
+        try:
+            with savepoint():
+                updated_count = db.session.execute(statement).rowcount
+                commit()
+            return updated_count
+            
+        except SQLAlchemyError as e:
+            rollback()
+            current_app.logger.error(f"Bulk update error: {str(e)}")
+            
+            if retry_count < max_retries:
+                current_app.logger.info(f"Retrying bulk update (attempt {retry_count + 1}/{max_retries})...")
+                time.sleep(1)  # Wait before retry
+    
+    current_app.logger.error("Max retries reached for bulk update")
+    return 0
+
 def db_batch_update(model, ids, update_func, batch_size=100, max_retries=3):
     """
     Update database records in batches.
     
+    Each batch is read as plain column values rather than ORM objects, and
+    the rows the callback changed are written back with one executemany
+    UPDATE per batch (bulk_update_mappings). Use bulk_update instead when
+    the change can be written as a SQL expression. Inside a request each
+    batch is only flushed and commits with the request.
+    
     Args:
         model: SQLAlchemy model class
         ids: List of record IDs to update
-        update_func: Function that takes a record and updates it
+        update_func: Function that takes a record and sets its column
+            attributes (relationships are not loaded)
         batch_size: Number of records to update in each batch
         max_retries: Maximum number of retry attempts for failed batches
         
     Returns:
-        Number of records successfully updated
+        Number of records changed
     """
     if not ids:
         return 0
         
     updated_count = 0
+    columns = [getattr(model, attribute.key) for attribute in inspect(model).column_attrs]
     
     # Process in batches
     for i in range(0, len(ids), batch_size):
@@ -124,21 +304,29 @@ def db_batch_update(model, ids, update_func, batch_size=100, max_retries=3):
         
         while retry_count <= max_retries:
             try:
-                # Get records for this batch
-                records = model.query.filter(model.id.in_(batch_ids)).all()
-                
-                # Apply update function to each record
-                for record in records:
-                    update_func(record)
-                
-                # Commit changes
-                db.session.commit()
-                updated_count += len(records)
+                with savepoint():
+                    # Get the column values of this batch
+                    rows = db.session.execute(select(*columns).where(model.id.in_(batch_ids))).mappings().all()
+                    
+                    # Apply update function to each record, keeping only the changed columns
+                    mappings = []
+                    for row in rows:
+                        record = SimpleNamespace(**row)
+                        update_func(record)
+                        changes = {key: value for key, value in vars(record).items() if key in row and value != row[key]}
+                        if changes:
+                            mappings.append({'id': row['id'], **changes})
+                    
+                    # Write the changes and commit
+                    if mappings:
+                        db.session.bulk_update_mappings(model, mappings)
+                    commit()
+                updated_count += len(mappings)
                 break  # Break retry loop on success
                 
             except SQLAlchemyError as e:
                 # Rollback on error
-                db.session.rollback()
+                rollback()
                 
                 # Log the error
                 current_app.logger.error(f"Batch update error: {str(e)}")
@@ -5,6 +5,7 @@ Provides caching mechanisms to improve performance for the Timetable app.
 
 import time
 import functools
+from app.utils import metrics
 
 # Cache storage
 _cache = {}
@@ -29,8 +30,14 @@ def cached(timeout_seconds=300):
             # Check if result is in cache and not expired
             current_time = time.time()
             if key in _cache and _cache_timeout.get(key, 0) > current_time:
+                metrics.inc('cache_requests_total', cache='optimization', result='hit')
                 return _cache[key]
             
+            metrics.inc('cache_requests_total', cache='optimization', result='miss')
+            if key in _cache:
+                # The expired entry is about to be replaced
+                metrics.inc('cache_evictions_total', cache='optimization')
+            
             # Execute function and cache result
             result = func(*args, **kwargs)
             _cache[key] = result
@@ -43,6 +50,7 @@ def cached(timeout_seconds=300):
 def clear_cache():
     """Clear all cached data."""
     global _cache, _cache_timeout
+    metrics.inc('cache_evictions_total', len(_cache), cache='optimization')
     _cache = {}
     _cache_timeout = {}
 
@@ -57,3 +65,4 @@ def clear_cache_for_function(func_name):
     for key in keys_to_remove:
         _cache.pop(key, None)
         _cache_timeout.pop(key, None)
+    metrics.inc('cache_evictions_total', len(keys_to_remove), cache='optimization')
@@ -5,15 +5,16 @@ Provides functions for generating tasks in batches with proper transaction handl
 
 from flask import current_app
 from sqlalchemy.exc import SQLAlchemyError
-from app import db
 from app.utils.optimization_queries import get_optimized_subject_distribution
-from app.utils.optimization_batch import db_batch_process, db_batch_update
+from app.utils.optimization_batch import bulk_update
+from app.utils.unit_of_work import commit, rollback, savepoint
 from datetime import datetime, timedelta
 
 def generate_tasks_in_batch(user_id, count=5, max_retries=3):
     """
     Generate multiple tasks at once for a user with transaction safety.
-    More efficient than generating tasks one by one.
+    More efficient than generating tasks one by one. Inside a request the
+    tasks are only flushed and commit with the request.
     
     Args:
         user_id: User ID to generate tasks for
@@ -52,32 +53,35 @@ def generate_tasks_in_batch(user_id, count=5, max_retries=3):
     
     while successful_tasks < count and retry_count <= max_retries:
         try:
-            # Start a new transaction for each attempt
-            db.session.begin_nested()
-            
-            # Calculate how many more tasks we need
-            remaining = count - successful_tasks
-            
-            # Generate the remaining tasks
-            for _ in range(remaining):
-                task = generate_replacement_task(user)
-                if task:
-                    result['tasks'].append(task)
-                    successful_tasks += 1
+            # Each attempt in its own savepoint, so a failed one loses only its own tasks
+            generated = []
+            with savepoint():
+                # Calculate how many more tasks we need
+                remaining = count - successful_tasks
+                
+                # Generate the remaining tasks
+                for _ in range(remaining):
+                    task = generate_replacement_task(user)
+                    if task:
+                        generated.append(task)
+                
+                # Commit the transaction if we generated at least one task
+                if generated:
+                    commit()
             
-            # Commit the transaction if we generated at least one task
-            if successful_tasks > 0:
-                db.session.commit()
+            if generated:
+                result['tasks'].extend(generated)
+                successful_tasks += len(generated)
                 retry_count = 0  # Reset retry counter after success
             else:
                 # No tasks generated, so rollback and try again
-                db.session.rollback()
+                rollback()
                 retry_count += 1
                 current_app.logger.warning(f"No tasks generated, retrying (attempt {retry_count}/{max_retries})...")
         
         except Exception as e:
             # Rollback on error
-            db.session.rollback()
+            rollback()
             current_app.logger.error(f"Error generating tasks: {str(e)}")
             
             # Retry logic
@@ -164,156 +168,26 @@ def generate_balanced_task_batch(user_id, count=5, max_per_subject=2):
     
     return tasks
 
-def regenerate_stale_tasks(user_id, days_threshold=7, limit=10, batch_size=5):
+def update_task_priorities(user_id):
     """
-    Find and regenerate tasks that haven't been updated in a while.
-    Uses batch processing for better performance and transaction safety.
-    
-    Args:
-        user_id: User ID to regenerate tasks for
-        days_threshold: Number of days after which a task is considered stale
-        limit: Maximum number of tasks to regenerate
-        batch_size: Size of batches for processing
-        
-    Returns:
-        Dict with status and regenerated tasks
-    """
-    from app.models.task import Task
-    from app.utils.task_generator import generate_replacement_task
-    from app.models.user import User
-    
-    result = {
-        'success': True,
-        'tasks_regenerated': 0,
-        'new_tasks': [],
-        'error': None
-    }
-    
-    # Get the user object
-    user = User.query.get(user_id)
-    if not user:
-        result['success'] = False
-        result['error'] = f"User with ID {user_id} not found"
-        return result
-    
-    try:
-        # Calculate threshold date
-        threshold_date = datetime.utcnow() - timedelta(days=days_threshold)
-        
-        # Create query for stale tasks
-        stale_tasks_query = Task.query.filter(
-            Task.user_id == user_id,
-            Task.last_updated <= threshold_date,
-            Task.completed == False
-        ).limit(limit)
-        
-        # Use our batch processing utility for database operations
-        def process_batch(batch):
-            batch_new_tasks = []
-            stale_ids = []
-            
-            # First collect all the subject IDs and task IDs
-            for stale_task in batch:
-                stale_ids.append(stale_task.id)
-            
-            # Delete the stale tasks in a single operation
-            if stale_ids:
-                db.session.query(Task).filter(Task.id.in_(stale_ids)).delete(synchronize_session=False)
-            
-            # Now generate replacement tasks
-            for stale_task in batch:
-                subject_id = stale_task.subject_id
-                new_task = generate_replacement_task(user, subject_id)
-                if new_task:
-                    batch_new_tasks.append(new_task)
-            
-            return batch_new_tasks
-        
-        # Process in batches
-        new_tasks = db_batch_process(
-            stale_tasks_query, 
-            batch_size=batch_size,
-            process_func=process_batch
-        )
-        
-        result['tasks_regenerated'] = len(new_tasks)
-        result['new_tasks'] = new_tasks
-        
-    except Exception as e:
-        db.session.rollback()
-        result['success'] = False
-        result['error'] = str(e)
-        current_app.logger.error(f"Error regenerating stale tasks: {str(e)}")
-    
-    return result
-
-def update_task_priorities(user_id, batch_size=50):
-    """
-    Update task priorities based on due dates and importance.
-    Uses batch processing for efficiency.
+    Update task priorities based on due dates.
+    Runs the rules in app/utils/task_priority.py as a single UPDATE.
     
     Args:
         user_id: User ID to update task priorities for
-        batch_size: Size of batches for processing
         
     Returns:
         Number of tasks updated
     """
     from app.models.task import Task
-    from datetime import datetime, timedelta
-    
-    now = datetime.utcnow()
-    tomorrow = now + timedelta(days=1)
-    next_week = now + timedelta(days=7)
+    from app.utils.task_priority import priority_expression
     
-    # Get all incomplete tasks for the user
-    tasks_query = Task.query.filter(
+    # Every open task with a due date, re-prioritised in the database
+    return bulk_update(
+        Task,
+        {Task.priority: priority_expression(datetime.utcnow().date())},
         Task.user_id == user_id,
-        Task.completed == False
+        Task.completed_at.is_(None),
+        Task.skipped_at.is_(None),
+        Task.due_date.isnot(None)
     )
-    
-    # Update function to apply to each task
-    def update_priority(task):
-        # Calculate base priority based on due date
-        if task.due_date:
-            if task.due_date <= tomorrow:
-                # Due today or tomorrow
-                task.priority = min(100, task.priority + 30)
-            elif task.due_date <= next_week:
-                # Due within a week
-                task.priority = min(90, task.priority + 20)
-            else:
-                # Due later
-                task.priority = max(50, task.priority)
-        
-        # Factor in importance
-        if task.importance >= 4:  # High importance
-            task.priority = min(100, task.priority + 15)
-        elif task.importance <= 2:  # Low importance
-            task.priority = max(10, task.priority - 10)
-        
-        # Update last_updated timestamp
-        task.last_updated = datetime.utcnow()
-    
-    # Process in batches
-    updated_count = 0
-    try:
-        # Use our batch processing utility
-        def process_priority_batch(batch):
-            for task in batch:
-                update_priority(task)
-            return len(batch)
-        
-        batch_results = db_batch_process(
-            tasks_query,
-            batch_size=batch_size,
-            process_func=process_priority_batch
-        )
-        
-        updated_count = sum(batch_results)
-        
-    except Exception as e:
-        db.session.rollback()
-        current_app.logger.error(f"Error updating task priorities: {str(e)}")
-    
-    return updated_count
@@ -0,0 +1,151 @@
+"""
+PostgreSQL engine utilities for production deployments.
+Provides driver selection (a C-accelerated psycopg when installed, falling
+back to the pure-Python pg8000), SQLALCHEMY_ENGINE_OPTIONS for the
+connection pool built from config, and session timeouts set on every new
+connection.
+"""
+
+import importlib.util
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# Preferred first: psycopg 3 and psycopg2 parse results in C, pg8000 in Python
+DRIVERS = ('psycopg', 'psycopg2', 'pg8000')
+
+def installed_drivers():
+    """Get the PostgreSQL drivers that can be imported, most preferred first."""
+    return [driver for driver in DRIVERS if importlib.util.find_spec(driver) is not None]
+
+def select_driver(preference='auto'):
+    """
+    Pick the driver to connect with.
+
+    Args:
+        preference (str): 'auto' for the best installed driver, or a driver name
+
+    Returns:
+        str: Driver name
+
+    Raises:
+        ValueError: If the preferred driver, or for 'auto' every driver, is missing
+    """
+    installed = installed_drivers()
+    if preference == 'auto':
+        if not installed:
+            raise ValueError(f"No PostgreSQL driver installed; install one of {', '.join(DRIVERS)}")
+        return installed[0]
+    if preference not in installed:
+        raise ValueError(f"PostgreSQL driver {preference} is not installed")
+    return preference
+
+def database_uri(uri, preference='auto'):
+    """
+    Point a PostgreSQL URI at the selected driver.
+
+    Hosting providers hand out postgres:// or postgresql:// URLs; a URI that
+    already names a driver (postgresql+pg8000://) is left alone.
+
+    Returns:
+        str: The URI with its driver, unchanged for other databases
+    """
+    if uri.startswith('postgres://'):
+        uri = 'postgresql://' + uri[len('postgres://'):]
+    url = make_url(uri)
+    if url.drivername != 'postgresql':
+        return uri
+    return url.set(drivername=f"postgresql+{select_driver(preference)}").render_as_string(hide_password=False)
+
+def engine_options(config, driver):
+    """
+    Build SQLALCHEMY_ENGINE_OPTIONS for the connection pool.
+
+    pool_pre_ping replaces connections the server or a proxy closed while
+    idle, and pool_recycle retires them before such timeouts. With psycopg 3,
+    statements run prepare_threshold times on a connection are prepared
+    server-side; pg8000 keeps its own per-connection statement cache.
+
+    Args:
+        config: Flask app config
+        driver (str): Driver name
+
+    Returns:
+        dict: Engine options
+    """
+    options = {
+        'pool_size': config.get('DB_POOL_SIZE', 10),
+        'max_overflow': config.get('DB_MAX_OVERFLOW', 20),
+        'pool_timeout': config.get('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': config.get('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': config.get('DB_POOL_PRE_PING', True),
+        'query_cache_size': config.get('DB_QUERY_CACHE_SIZE', 500)
+    }
+    if driver == 'psycopg':
+        options['connect_args'] = {'prepare_threshold': config.get('DB_PREPARE_THRESHOLD', 5)}
+    return options
+
+def session_settings(config):
+    """Get the session settings applied to every new connection, in milliseconds."""
+    return {
+        'statement_timeout': config.get('DB_STATEMENT_TIMEOUT_MS', 30000),
+        'idle_in_transaction_session_timeout': config.get('DB_IDLE_IN_TRANSACTION_TIMEOUT_MS', 60000)
+    }
+
+def apply_session_settings(dbapi_connection, settings):
+    """
+    SET session settings on a raw DBAPI connection and commit them.
+
+    Committing keeps a later rollback of the connection's first transaction
+    from undoing them.
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in settings.items():
+            cursor.execute(f"SET {name} = {int(value)}")
+    finally:
+        cursor.close()
+    dbapi_connection.commit()
+
+def configure_postgres(app):
+    """
+    Select the driver and pool options for a PostgreSQL app, before db.init_app.
+
+    Options already present in SQLALCHEMY_ENGINE_OPTIONS take precedence.
+
+    Args:
+        app: Flask app instance
+    """
+    uri = app.config.get('SQLALCHEMY_DATABASE_URI')
+    if not uri or not uri.startswith(('postgres://', 'postgresql')):
+        return app
+
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri(uri, app.config.get('POSTGRES_DRIVER', 'auto'))
+    driver = make_url(app.config['SQLALCHEMY_DATABASE_URI']).get_driver_name()
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        **engine_options(app.config, driver),
+        **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+    }
+    return app
+
+def add_session_settings(engine, config):
+    """Apply the configured session settings to every new connection of an engine."""
+    settings = session_settings(config)
+
+    @event.listens_for(engine, 'connect')
+    def set_session_timeouts(dbapi_connection, connection_record):
+        apply_session_settings(dbapi_connection, settings)
+
+def init_postgres_session(app):
+    """
+    Set the statement and idle-in-transaction timeouts on every new connection.
+
+    Args:
+        app: Flask app instance, after db.init_app
+    """
+    from app import db
+
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name == 'postgresql':
+        add_session_settings(engine, app.config)
+    return app
@@ -0,0 +1,239 @@
+"""
+Query instrumentation utilities for per-request SQL profiling.
+Provides SQLAlchemy cursor hooks that count queries, time them and group
+them by normalized fingerprint, flagging repeated fingerprints as likely
+N+1 patterns. Results are reported as Server-Timing headers and a
+structured log line per request (unless QUERY_PROFILE_REPORT is off, as in
+production), and can be collected directly in tests.
+"""
+
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Active collectors for the current thread/context, innermost last
+_collectors = ContextVar('query_collectors', default=())
+
+_APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_THIS_FILE = os.path.abspath(__file__)
+# Flushes staged through unit_of_work.commit() are attributed to its caller
+_UNIT_OF_WORK_FILE = os.path.join(_APP_ROOT, 'utils', 'unit_of_work.py')
+
+_listeners_installed = False
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|\$\d+|(?<!:):\w+|\?")
+_IN_LIST = re.compile(r"\bIN \((?:\?, )*\?\)", re.IGNORECASE)
+_VALUES_LIST = re.compile(r"\bVALUES (\([?, ]+\))(?:, \([?, ]+\))+", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+def fingerprint(statement):
+    """
+    Normalize a SQL statement so that queries differing only in values match.
+
+    Literals and bind placeholders become ?, IN lists and multi-row VALUES
+    collapse to one entry, and whitespace is squeezed.
+
+    Args:
+        statement (str): SQL text as sent to the driver
+
+    Returns:
+        str: Normalized statement
+    """
+    text = _WHITESPACE.sub(' ', statement).strip()
+    text = _STRING_LITERAL.sub('?', text)
+    text = _PLACEHOLDER.sub('?', text)
+    text = _NUMBER_LITERAL.sub('?', text)
+    text = _IN_LIST.sub('IN (?...)', text)
+    text = _VALUES_LIST.sub(r'VALUES \1...', text)
+    return text
+
+def find_app_frame(exclude=()):
+    """
+    Find the innermost stack frame inside the application package.
+
+    Args:
+        exclude (iterable): Further absolute file paths to skip, e.g. other
+            instrumentation modules whose own frames are not of interest
+
+    Returns:
+        str: "path/to/file.py:line in function", relative to the project, or None
+    """
+    skipped = {_THIS_FILE, _UNIT_OF_WORK_FILE, *exclude}
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename.startswith(_APP_ROOT) and filename not in skipped:
+            relative = os.path.relpath(filename, os.path.dirname(_APP_ROOT))
+            return f"{relative}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+class QueryStats:
+    """Queries recorded while a collector was active."""
+
+    def __init__(self, n_plus_one_threshold=5):
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.count = 0
+        self.commits = 0
+        self.total_time = 0.0
+        self.statements = []
+        self.fingerprints = Counter()
+        self.origins = {}
+
+    def record(self, statement, duration):
+        """Add one executed statement."""
+        key = fingerprint(statement)
+        self.count += 1
+        self.total_time += duration
+        self.statements.append(statement)
+        self.fingerprints[key] += 1
+
+        # Walking the stack is only worth it once a fingerprint looks repeated
+        if self.fingerprints[key] == self.n_plus_one_threshold:
+            self.origins[key] = find_app_frame()
+
+    @property
+    def total_ms(self):
+        """Total time spent in the database, in milliseconds."""
+        return self.total_time * 1000.0
+
+    def suspected_n_plus_one(self):
+        """
+        Get fingerprints repeated often enough to suggest an N+1 pattern.
+
+        Returns:
+            list: Dicts with 'fingerprint', 'count' and originating 'origin' frame
+        """
+        return [
+            {'fingerprint': key, 'count': count, 'origin': self.origins.get(key)}
+            for key, count in self.fingerprints.most_common()
+            if count >= self.n_plus_one_threshold
+        ]
+
+    def summary(self):
+        """Readable list of fingerprints with their counts, most frequent first."""
+        return '\n'.join(f"{count:>4} x {key}" for key, count in self.fingerprints.most_common())
+
+@contextmanager
+def track_queries(n_plus_one_threshold=5):
+    """
+    Collect the queries executed in the current context.
+
+    Collectors nest: queries run inside a request that is itself inside a
+    track_queries block are recorded by both.
+
+    Yields:
+        QueryStats: Statistics, complete once the block exits
+    """
+    install_listeners()
+    stats = QueryStats(n_plus_one_threshold)
+    token = _collectors.set(_collectors.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _collectors.reset(token)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _collectors.get():
+        conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    collectors = _collectors.get()
+    if not collectors:
+        return
+    started = conn.info.get('query_start_time')
+    duration = time.perf_counter() - started.pop() if started else 0.0
+    for stats in collectors:
+        stats.record(statement, duration)
+
+def _commit(conn):
+    for stats in _collectors.get():
+        stats.commits += 1
+
+def install_listeners():
+    """Attach the cursor and commit hooks to every engine, once per process."""
+    global _listeners_installed
+    if _listeners_installed:
+        return
+    event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(Engine, 'commit', _commit)
+    _listeners_installed = True
+
+def instrument_queries(app):
+    """
+    Profile the SQL run by each request of a Flask app.
+
+    Adds a Server-Timing header (db time, query and commit counts and total
+    request time) and logs one JSON line per request, when QUERY_PROFILE_REPORT
+    is on. Requests with suspected N+1 patterns are always logged as warnings
+    with the originating app frame.
+
+    Args:
+        app: Flask app instance
+    """
+    if not app.config.get('QUERY_INSTRUMENTATION', True):
+        return app
+
+    install_listeners()
+    threshold = app.config.get('N_PLUS_ONE_THRESHOLD', 5)
+
+    @app.before_request
+    def start_query_tracking():
+        g._query_tracking = track_queries(threshold)
+        g.query_stats = g._query_tracking.__enter__()
+        g._request_started = time.perf_counter()
+
+    @app.after_request
+    def report_query_stats(response):
+        stats = g.get('query_stats')
+        if stats is None:
+            return response
+
+        elapsed_ms = (time.perf_counter() - g._request_started) * 1000.0
+        report = app.config.get('QUERY_PROFILE_REPORT', True)
+        if report:
+            response.headers.add(
+                'Server-Timing',
+                f'db;dur={stats.total_ms:.1f};desc="{stats.count} queries, {stats.commits} commits", app;dur={elapsed_ms:.1f}'
+            )
+
+        suspects = stats.suspected_n_plus_one()
+        if not suspects and not report:
+            return response
+        payload = {
+            'event': 'sql_profile',
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'queries': stats.count,
+            'commits': stats.commits,
+            'db_ms': round(stats.total_ms, 2),
+            'request_ms': round(elapsed_ms, 2),
+            'n_plus_one': suspects
+        }
+        if suspects:
+            app.logger.warning(f"sql_profile {json.dumps(payload)}")
+        else:
+            app.logger.info(f"sql_profile {json.dumps(payload)}")
+
+        return response
+
+    @app.teardown_request
+    def stop_query_tracking(exception=None):
+        tracking = g.pop('_query_tracking', None)
+        if tracking is not None:
+            tracking.__exit__(None, None, None)
+
+    return app
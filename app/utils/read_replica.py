@@ -0,0 +1,146 @@
+"""
+Read replica utilities for read/write splitting.
+Provides an engine for REPLICA_DATABASE_URI, a session that sends the
+reads of views marked @read_only to it, and the guards around that: writes
+always go to the primary, a user whose own writes may not have reached the
+replica yet reads from the primary, and a replica that fails is skipped
+for a while with the view re-run on the primary.
+"""
+
+import threading
+import time
+from functools import wraps
+from flask import current_app, g, has_request_context, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.sql.dml import UpdateBase
+
+# app.extensions key of the replica engine
+REPLICA_EXTENSION = 'read_replica'
+
+# Flask session key: until when (epoch seconds) the user reads from the primary
+PRIMARY_UNTIL_KEY = '_read_primary_until'
+
+_replica_state = {'down_until': 0.0}
+_state_lock = threading.Lock()
+_listeners_installed = False
+
+class ReplicaRoutingSession(Session):
+    """Session that reads from the replica inside @read_only views."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and not isinstance(clause, UpdateBase) and self._reads_from_replica():
+            return replica_engine()
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _reads_from_replica(self):
+        return has_request_context() and g.get('_read_replica', False) and not g.get('_wrote_primary', False)
+
+def replica_engine():
+    """Get the current app's replica engine, or None without a replica."""
+    return current_app.extensions.get(REPLICA_EXTENSION)
+
+def replica_available():
+    """Whether the replica is configured and not in its back-off after a failure."""
+    return replica_engine() is not None and time.time() >= _replica_state['down_until']
+
+def mark_replica_down(interval):
+    """Route reads to the primary for `interval` seconds."""
+    with _state_lock:
+        _replica_state['down_until'] = time.time() + interval
+
+def read_only(view):
+    """
+    Serve a view's reads from the replica when one is configured.
+
+    Only mark views that do not write. If the replica raises a connection
+    or database error, the replica is skipped for REPLICA_RETRY_INTERVAL
+    seconds and the view is re-run on the primary. A view that has already
+    written to the primary cannot be re-run without repeating the write, so
+    then the error is raised instead.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not replica_available() or session.get(PRIMARY_UNTIL_KEY, 0) > time.time():
+            return view(*args, **kwargs)
+
+        from app import db
+
+        g._read_replica = True
+        try:
+            return view(*args, **kwargs)
+        except (OperationalError, InterfaceError) as e:
+            if g.get('_wrote_primary'):
+                raise
+            current_app.logger.warning(f"Read replica failed, reading from the primary: {str(e)}")
+            mark_replica_down(current_app.config.get('REPLICA_RETRY_INTERVAL', 30))
+            db.session.rollback()
+            g._read_replica = False
+            return view(*args, **kwargs)
+        finally:
+            g.pop('_read_replica', None)
+
+    return wrapper
+
+def _mark_primary_write(session_, *args):
+    if has_request_context():
+        g._wrote_primary = True
+
+def _mark_primary_bulk_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _mark_primary_write(orm_execute_state.session)
+
+def _install_listeners():
+    """Notice writes made during a request, once per process."""
+    global _listeners_installed
+    if _listeners_installed:
+        return
+    event.listen(Session, 'after_flush', _mark_primary_write)
+    event.listen(Session, 'do_orm_execute', _mark_primary_bulk_write)
+    _listeners_installed = True
+
+def create_replica_engine(app, uri):
+    """Create the replica engine, with the same driver and pool settings as a PostgreSQL primary."""
+    from app.utils.postgres_engine import add_session_settings, database_uri, engine_options
+
+    uri = database_uri(uri, app.config.get('POSTGRES_DRIVER', 'auto'))
+    url = make_url(uri)
+    if url.get_backend_name() != 'postgresql':
+        return create_engine(uri)
+    engine = create_engine(uri, **engine_options(app.config, url.get_driver_name()))
+    add_session_settings(engine, app.config)
+    return engine
+
+def init_read_replica(app):
+    """
+    Route @read_only views to the replica and keep users on the primary after their writes.
+
+    A request that wrote anything stores, in the user's signed session,
+    when the replica can be expected to have caught up; until then the
+    user's @read_only views read from the primary, whichever worker
+    serves them.
+
+    Args:
+        app: Flask app instance, after db.init_app
+    """
+    uri = app.config.get('REPLICA_DATABASE_URI')
+    if not uri:
+        return app
+
+    from app import db
+
+    app.extensions[REPLICA_EXTENSION] = create_replica_engine(app, uri)
+    db.session.session_factory.class_ = ReplicaRoutingSession
+    _install_listeners()
+    lag_window = app.config.get('REPLICA_READ_YOUR_WRITES_SECONDS', 5)
+
+    # after_request hooks run in reverse, so this runs after the unit of work's commit
+    @app.after_request
+    def remember_primary_write(response):
+        if g.pop('_wrote_primary', False):
+            session[PRIMARY_UNTIL_KEY] = time.time() + lag_window
+        return response
+
+    return app
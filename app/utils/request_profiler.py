@@ -0,0 +1,265 @@
+"""
+Request profiler utilities for finding where request time goes.
+Provides an opt-in WSGI middleware that samples the stack of a fraction of
+requests (or of requests carrying the admin profiling header) and writes
+per-endpoint collapsed-stack files that flamegraph tools can read, plus a
+summary of the hottest functions per endpoint. The sample rate is read from
+a control file so it can be changed without restarting the workers.
+"""
+
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+CONTROL_FILE = 'control.json'
+PROFILE_SUFFIX = '.collapsed'
+
+_UNSAFE_FILENAME = re.compile(r'[^\w.-]')
+
+def frame_label(frame):
+    """Label a frame as "function (package/module.py)" for flamegraphs."""
+    path = frame.f_code.co_filename.replace('\\', '/').split('/')
+    return f"{frame.f_code.co_name} ({'/'.join(path[-2:])})"
+
+def collapse_stack(frame):
+    """Turn a frame and its callers into a root-first "a;b;c" stack string."""
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+class StackSampler:
+    """Background thread that samples the stacks of registered threads."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self._samples = {}
+        self._lock = threading.Lock()
+        self._active = threading.Event()
+        self._thread = None
+
+    def start(self, thread_id):
+        """Start collecting samples for a thread."""
+        with self._lock:
+            self._samples[thread_id] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+                self._thread.start()
+            self._active.set()
+
+    def stop(self, thread_id):
+        """
+        Stop collecting samples for a thread.
+
+        Returns:
+            Counter: {collapsed stack: sample count}
+        """
+        with self._lock:
+            samples = self._samples.pop(thread_id, Counter())
+            if not self._samples:
+                self._active.clear()
+        return samples
+
+    def _run(self):
+        while True:
+            # Sleeps without waking while no request is being profiled
+            self._active.wait()
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, samples in self._samples.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[collapse_stack(frame)] += 1
+
+class RequestProfiler:
+    """WSGI middleware profiling sampled requests by endpoint."""
+
+    def __init__(self, wsgi_app, flask_app, directory, sample_rate=0.0, token=None,
+                 interval=0.005, control_check_interval=1.0):
+        self.wsgi_app = wsgi_app
+        self.flask_app = flask_app
+        self.directory = directory
+        self.token = token
+        self.sampler = StackSampler(interval)
+        self.control_check_interval = control_check_interval
+
+        self._sample_rate = sample_rate
+        self._control_mtime = None
+        self._next_control_check = 0.0
+        self._profiles = {}
+        self._write_lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+
+    def __call__(self, environ, start_response):
+        if not self._should_profile(environ):
+            return self.wsgi_app(environ, start_response)
+
+        thread_id = threading.get_ident()
+        self.sampler.start(thread_id)
+        try:
+            return self.wsgi_app(environ, start_response)
+        finally:
+            self._record(self._endpoint(environ), self.sampler.stop(thread_id))
+
+    @property
+    def sample_rate(self):
+        """Fraction of requests profiled, refreshed from the control file at most once a second."""
+        now = time.monotonic()
+        if now >= self._next_control_check:
+            self._next_control_check = now + self.control_check_interval
+            self._reload_control()
+        return self._sample_rate
+
+    def _should_profile(self, environ):
+        if self.token and environ.get('HTTP_X_PROFILE_REQUEST') == self.token:
+            return True
+        rate = self.sample_rate
+        return rate > 0 and random.random() < rate
+
+    def _reload_control(self):
+        path = os.path.join(self.directory, CONTROL_FILE)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        # The file is replaced on every change, so a new inode also means new contents
+        mtime = (stat.st_mtime_ns, stat.st_ino)
+        if mtime == self._control_mtime:
+            return
+
+        try:
+            with open(path, encoding='utf-8') as control_file:
+                self._sample_rate = float(json.load(control_file).get('sample_rate', 0.0))
+            self._control_mtime = mtime
+        except (OSError, ValueError) as e:
+            self.flask_app.logger.error(f"Error reading profiler control file: {str(e)}")
+
+    def _endpoint(self, environ):
+        try:
+            rule, _ = self.flask_app.url_map.bind_to_environ(environ).match(return_rule=True)
+            return rule.endpoint
+        except Exception:
+            return 'unmatched'
+
+    def _record(self, endpoint, samples):
+        """Add a request's samples to the endpoint's profile and rewrite this worker's file."""
+        if not samples:
+            return
+
+        # One file per endpoint and worker process, so workers never share a file
+        filename = f"{_UNSAFE_FILENAME.sub('_', endpoint)}.{os.getpid()}{PROFILE_SUFFIX}"
+        path = os.path.join(self.directory, filename)
+
+        with self._write_lock:
+            # A file deleted by `flask profiler clear` starts the endpoint afresh
+            if endpoint in self._profiles and not os.path.exists(path):
+                del self._profiles[endpoint]
+            profile = self._profiles.setdefault(endpoint, Counter())
+            profile.update(samples)
+
+            try:
+                with open(f"{path}.tmp", 'w', encoding='utf-8') as profile_file:
+                    for stack, count in profile.items():
+                        profile_file.write(f"{stack} {count}\n")
+                os.replace(f"{path}.tmp", path)
+            except OSError as e:
+                self.flask_app.logger.error(f"Error writing profile for {endpoint}: {str(e)}")
+
+def profiler_directory(app):
+    """Get the configured profile output directory."""
+    return app.config.get('PROFILER_DIR') or os.path.join(app.instance_path, 'profiles')
+
+def init_request_profiler(app):
+    """
+    Wrap the app in the request profiler when PROFILER_ENABLED is set.
+
+    When disabled nothing is installed; when enabled but idle each request
+    costs one random number (and a stat of the control file once a second).
+
+    Args:
+        app: Flask app instance
+
+    Returns:
+        RequestProfiler: The installed middleware, or None when disabled
+    """
+    if not app.config.get('PROFILER_ENABLED'):
+        return None
+
+    profiler = RequestProfiler(
+        app.wsgi_app,
+        app,
+        profiler_directory(app),
+        sample_rate=app.config.get('PROFILER_SAMPLE_RATE', 0.0),
+        token=app.config.get('PROFILER_TOKEN'),
+        interval=app.config.get('PROFILER_INTERVAL_MS', 5) / 1000.0
+    )
+    app.wsgi_app = profiler
+    app.extensions['request_profiler'] = profiler
+    return profiler
+
+def set_sample_rate(directory, sample_rate):
+    """Set the sample rate used by every worker writing to a profile directory."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, CONTROL_FILE)
+    with open(f"{path}.tmp", 'w', encoding='utf-8') as control_file:
+        json.dump({'sample_rate': sample_rate}, control_file)
+    os.replace(f"{path}.tmp", path)
+
+def load_profiles(directory):
+    """
+    Merge every worker's collapsed stacks by endpoint.
+
+    Returns:
+        dict: {endpoint: Counter of collapsed stack -> samples}
+    """
+    profiles = {}
+    if not os.path.isdir(directory):
+        return profiles
+
+    for filename in os.listdir(directory):
+        if not filename.endswith(PROFILE_SUFFIX):
+            continue
+        # <endpoint>.<pid>.collapsed
+        endpoint = filename[:-len(PROFILE_SUFFIX)].rsplit('.', 1)[0]
+        profile = profiles.setdefault(endpoint, Counter())
+        with open(os.path.join(directory, filename), encoding='utf-8') as profile_file:
+            for line in profile_file:
+                stack, _, count = line.rstrip('\n').rpartition(' ')
+                if stack and count.isdigit():
+                    profile[stack] += int(count)
+    return profiles
+
+def summarize_profile(profile, top=10):
+    """
+    Find the hottest functions in an endpoint's profile.
+
+    Args:
+        profile (Counter): Collapsed stack -> samples
+        top (int): Number of functions to return per ranking
+
+    Returns:
+        dict: 'samples', 'self' (time in the function itself) and 'inclusive'
+            (time with the function anywhere on the stack), each a list of
+            (function, samples) pairs
+    """
+    self_time = Counter()
+    inclusive = Counter()
+    for stack, count in profile.items():
+        frames = stack.split(';')
+        self_time[frames[-1]] += count
+        for label in set(frames):
+            inclusive[label] += count
+
+    return {
+        'samples': sum(profile.values()),
+        'self': self_time.most_common(top),
+        'inclusive': inclusive.most_common(top)
+    }
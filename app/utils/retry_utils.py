@@ -0,0 +1,85 @@
+"""
+Retry utilities for optimistic concurrency.
+Provides a helper that re-runs a unit of work when a versioned row was
+changed by another transaction.
+"""
+
+import random
+import time
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+from app import db
+from app.utils.unit_of_work import in_unit_of_work, savepoint
+
+# Raised when a versioned UPDATE matched no rows, or when two transactions
+# inserted the same unique row; both mean "re-read and try again"
+CONFLICT_ERRORS = (StaleDataError, IntegrityError)
+
+# SQLSTATE of a unique violation, and SQLite's names for the same error
+UNIQUE_VIOLATION = '23505'
+SQLITE_UNIQUE_ERRORS = ('SQLITE_CONSTRAINT_UNIQUE', 'SQLITE_CONSTRAINT_PRIMARYKEY')
+
+def is_write_conflict(error):
+    """
+    Whether an error means another transaction won a write race.
+
+    Only stale versions and unique violations qualify; other integrity
+    errors (foreign key, NOT NULL, CHECK) fail the same way on every retry.
+    """
+    if isinstance(error, StaleDataError):
+        return True
+    if not isinstance(error, IntegrityError):
+        return False
+    orig = error.orig
+    # psycopg exposes sqlstate, psycopg2 pgcode and pg8000 the server's error fields
+    fields = orig.args[0] if orig.args and isinstance(orig.args[0], dict) else {}
+    sqlstate = getattr(orig, 'sqlstate', None) or getattr(orig, 'pgcode', None) or fields.get('C')
+    if sqlstate:
+        return sqlstate == UNIQUE_VIOLATION
+    return (getattr(orig, 'sqlite_errorname', None) in SQLITE_UNIQUE_ERRORS
+            or str(orig).startswith('UNIQUE constraint failed'))
+
+def retry_on_conflict(operation, max_attempts=None):
+    """
+    Run a unit of work, retrying it when it loses a write race.
+
+    The operation must read everything it needs and commit itself, so that a
+    retry starts from fresh rows. The session is rolled back between attempts,
+    with a short jittered backoff so competing writers do not collide again.
+    Inside a request's unit of work each attempt runs in a savepoint instead,
+    and only the attempt is rolled back.
+
+    Args:
+        operation (callable): Function performing the reads, writes and commit
+        max_attempts (int): Maximum attempts, defaults to the
+            OPTIMISTIC_LOCK_MAX_ATTEMPTS config value
+
+    Returns:
+        The operation's return value
+
+    Raises:
+        StaleDataError, IntegrityError: If every attempt conflicted, or at
+            once for an integrity error other than a unique violation
+    """
+    if max_attempts is None:
+        max_attempts = current_app.config.get('OPTIMISTIC_LOCK_MAX_ATTEMPTS', 8)
+
+    for attempt in range(1, max_attempts + 1):
+        try:
+            if in_unit_of_work():
+                with savepoint():
+                    return operation()
+            return operation()
+        except CONFLICT_ERRORS as e:
+            if not in_unit_of_work():
+                db.session.rollback()
+
+            if not is_write_conflict(e):
+                raise
+            if attempt == max_attempts:
+                current_app.logger.error(f"Giving up after {attempt} conflicting attempts: {str(e)}")
+                raise
+
+            current_app.logger.info(f"Write conflict on attempt {attempt}, retrying")
+            time.sleep(random.uniform(0, min(0.5, 0.01 * (2 ** attempt))))
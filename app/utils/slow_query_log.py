@@ -0,0 +1,226 @@
+"""
+Slow query log utilities for finding expensive ORM calls in production.
+Provides opt-in SQLAlchemy cursor hooks that write statements slower than a
+threshold to a rotating JSON-lines file, attributed to the calling function
+in app/, optionally with the database's query plan, plus a summary of that
+file grouped by statement fingerprint.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from sqlalchemy import event
+from app import db
+from app.utils.query_instrumentation import fingerprint, find_app_frame
+
+_THIS_FILE = os.path.abspath(__file__)
+
+# Only statements that EXPLAIN can describe without side effects
+_EXPLAINABLE = ('SELECT', 'WITH', 'UPDATE', 'DELETE')
+
+def parameter_shape(parameters):
+    """
+    Describe bound parameters by type only, so no student data is logged.
+
+    Args:
+        parameters: DBAPI parameters (dict, sequence, or a list of either for executemany)
+
+    Returns:
+        Same structure with each value replaced by its type name
+    """
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            # executemany: the first row's shape stands for all of them
+            return {'rows': len(parameters), 'shape': parameter_shape(parameters[0])}
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+def explain_statement(conn, statement, parameters):
+    """
+    Get the query plan for a statement.
+
+    Uses a separate DBAPI cursor on the connection, so the plan sees the
+    same transaction and the results of a statement that has just run are
+    untouched. On PostgreSQL, where any error aborts the transaction, the
+    EXPLAIN runs in a savepoint so a failure leaves the caller's transaction
+    usable.
+
+    Args:
+        conn: SQLAlchemy connection
+        statement (str): SQL text as sent to the driver
+        parameters: The DBAPI parameters it ran with
+
+    Returns:
+        list: Plan lines, or None for statements that cannot be explained
+    """
+    if not statement.lstrip().upper().startswith(_EXPLAINABLE):
+        return None
+
+    prefix = 'EXPLAIN QUERY PLAN ' if conn.dialect.name == 'sqlite' else 'EXPLAIN '
+    guarded = conn.dialect.name == 'postgresql' and not getattr(conn.connection.dbapi_connection, 'autocommit', False)
+    cursor = conn.connection.cursor()
+    try:
+        if guarded:
+            cursor.execute('SAVEPOINT slow_query_explain')
+        try:
+            cursor.execute(prefix + statement, parameters)
+            plan = [' '.join(str(column) for column in row) for row in cursor.fetchall()]
+        except Exception as e:
+            if guarded:
+                cursor.execute('ROLLBACK TO SAVEPOINT slow_query_explain')
+            plan = [f"EXPLAIN failed: {str(e)}"]
+        if guarded:
+            cursor.execute('RELEASE SAVEPOINT slow_query_explain')
+        return plan
+    except Exception as e:
+        return [f"EXPLAIN failed: {str(e)}"]
+    finally:
+        cursor.close()
+
+class SlowQueryLog:
+    """Writes statements slower than a threshold to a rotating file."""
+
+    def __init__(self, path, threshold_ms=200.0, explain=False, max_bytes=5 * 1024 * 1024, backup_count=3):
+        self.path = path
+        self.threshold = threshold_ms / 1000.0
+        self.explain = explain
+        self._explained = set()
+        self._lock = threading.Lock()
+
+        self.logger = logging.getLogger(f"app.slow_queries.{id(self)}")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        self.logger.addHandler(handler)
+
+    def attach(self, engine):
+        """Listen for statements executed on an engine."""
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def close(self):
+        """Close the log file."""
+        for handler in list(self.logger.handlers):
+            handler.close()
+            self.logger.removeHandler(handler)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('slow_query_start_time', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('slow_query_start_time')
+        if not started:
+            return
+        duration = time.perf_counter() - started.pop()
+        if duration < self.threshold:
+            return
+
+        key = fingerprint(statement)
+        entry = {
+            'timestamp': datetime.utcnow().isoformat(),
+            'duration_ms': round(duration * 1000.0, 2),
+            'fingerprint': key,
+            'statement': statement,
+            'parameters': parameter_shape(parameters),
+            'caller': find_app_frame(exclude=(_THIS_FILE,))
+        }
+
+        if self.explain and not executemany and self._first_sighting(key):
+            entry['plan'] = explain_statement(conn, statement, parameters)
+
+        self.logger.info(json.dumps(entry, default=str))
+
+    def _first_sighting(self, key):
+        """Check whether a fingerprint has not been explained yet, claiming it if so."""
+        with self._lock:
+            if key in self._explained:
+                return False
+            self._explained.add(key)
+            return True
+
+def init_slow_query_log(app):
+    """
+    Attach a slow query log to the app's database engine when enabled.
+
+    Controlled by SLOW_QUERY_LOG, SLOW_QUERY_THRESHOLD_MS, SLOW_QUERY_EXPLAIN
+    and SLOW_QUERY_LOG_FILE (defaults to slow_queries.log in the instance folder).
+
+    Args:
+        app: Flask app instance
+
+    Returns:
+        SlowQueryLog: The attached log, or None when disabled
+    """
+    if not app.config.get('SLOW_QUERY_LOG'):
+        return None
+
+    slow_log = SlowQueryLog(
+        slow_query_log_path(app),
+        threshold_ms=app.config.get('SLOW_QUERY_THRESHOLD_MS', 200.0),
+        explain=app.config.get('SLOW_QUERY_EXPLAIN', False),
+        max_bytes=app.config.get('SLOW_QUERY_LOG_MAX_BYTES', 5 * 1024 * 1024),
+        backup_count=app.config.get('SLOW_QUERY_LOG_BACKUPS', 3)
+    )
+    with app.app_context():
+        slow_log.attach(db.engine)
+
+    app.extensions['slow_query_log'] = slow_log
+    return slow_log
+
+def slow_query_log_path(app):
+    """Get the configured slow query log file path."""
+    return app.config.get('SLOW_QUERY_LOG_FILE') or os.path.join(app.instance_path, 'slow_queries.log')
+
+def summarize_slow_queries(path):
+    """
+    Group the entries of a slow query log and its rotated backups by fingerprint.
+
+    Args:
+        path (str): Path of the current log file
+
+    Returns:
+        list: Dicts with fingerprint, count, total_ms, mean_ms, max_ms, callers
+            and the first recorded plan, slowest total first
+    """
+    # RotatingFileHandler keeps backups as path.1, path.2, ...
+    paths = [path] + [f"{path}.{n}" for n in range(1, 100) if os.path.exists(f"{path}.{n}")]
+
+    groups = {}
+    for log_path in paths:
+        if not os.path.exists(log_path):
+            continue
+        with open(log_path, encoding='utf-8') as log_file:
+            for line in log_file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+
+                group = groups.setdefault(entry['fingerprint'], {
+                    'fingerprint': entry['fingerprint'],
+                    'count': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'callers': set(),
+                    'plan': None
+                })
+                group['count'] += 1
+                group['total_ms'] += entry['duration_ms']
+                group['max_ms'] = max(group['max_ms'], entry['duration_ms'])
+                if entry.get('caller'):
+                    group['callers'].add(entry['caller'])
+                if group['plan'] is None and entry.get('plan'):
+                    group['plan'] = entry['plan']
+
+    summary = sorted(groups.values(), key=lambda group: group['total_ms'], reverse=True)
+    for group in summary:
+        group['mean_ms'] = group['total_ms'] / group['count']
+        group['callers'] = sorted(group['callers'])
+    return summary
@@ -0,0 +1,180 @@
+"""
+SQLite profile utilities for running the app on SQLite under several workers.
+Provides opt-in connect-time pragmas (WAL journal, synchronous=NORMAL,
+memory mapping, page cache and busy timeout), foreign key enforcement as a
+separate opt-in, periodic WAL checkpoints with PRAGMA optimize from a
+background thread per worker or the `flask sqlite-maintenance` command, and
+an opt-in per-worker lock that lets one write transaction at a time reach
+SQLite.
+"""
+
+import threading
+import time
+import weakref
+from sqlalchemy import event
+from app import db
+
+# Statements that take SQLite's write lock; pysqlite begins the transaction just before them
+_WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'CREATE', 'DROP', 'ALTER')
+
+_serialized_engines = weakref.WeakSet()
+
+def sqlite_pragmas(config):
+    """
+    Get the pragmas applied to every new SQLite connection.
+
+    The profile's pragmas come with SQLITE_PROFILE, foreign key enforcement
+    with SQLITE_FOREIGN_KEYS; both are off by default.
+
+    Args:
+        config: Flask app config
+
+    Returns:
+        dict: Pragma name to value, in the order they are applied
+    """
+    pragmas = {}
+    if config.get('SQLITE_PROFILE', False):
+        pragmas.update({
+            # Readers no longer block the writer, and the writer no longer blocks readers
+            'journal_mode': 'WAL',
+            # Durable at checkpoints rather than at every commit, which WAL keeps consistent
+            'synchronous': 'NORMAL',
+            'busy_timeout': config.get('SQLITE_BUSY_TIMEOUT_MS', 5000),
+            'cache_size': -config.get('SQLITE_CACHE_SIZE_KB', 65536),
+            'mmap_size': config.get('SQLITE_MMAP_SIZE', 268435456),
+            'temp_store': 'MEMORY'
+        })
+    if config.get('SQLITE_FOREIGN_KEYS', False):
+        pragmas['foreign_keys'] = 'ON'
+    return pragmas
+
+def apply_pragmas(dbapi_connection, pragmas):
+    """Set pragmas on a raw DBAPI connection."""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+def serialize_writes(engine, timeout):
+    """
+    Queue write transactions on an engine behind one in-process lock.
+
+    A connection takes the lock before its first write and releases it when
+    it goes back to the pool, after its transaction has committed or rolled
+    back; the engine's commit and rollback events fire before SQLite has
+    released its own lock. Engines already serialized are left as they are.
+    A writer that waits longer than `timeout` seconds goes ahead and is left
+    to SQLite's busy timeout.
+
+    Args:
+        engine: SQLAlchemy engine of a SQLite database
+        timeout (float): Longest wait for the lock, in seconds
+    """
+    if engine in _serialized_engines:
+        return
+    _serialized_engines.add(engine)
+    write_lock = threading.Lock()
+
+    def release(info):
+        if info.pop('holds_write_lock', False):
+            write_lock.release()
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def acquire_write_lock(conn, cursor, statement, parameters, context, executemany):
+        if conn.info.get('holds_write_lock') or not statement.lstrip()[:7].upper().startswith(_WRITE_STATEMENTS):
+            return
+        if write_lock.acquire(timeout=timeout):
+            conn.info['holds_write_lock'] = True
+
+    @event.listens_for(engine.pool, 'checkin')
+    def release_on_checkin(dbapi_connection, connection_record):
+        if connection_record is not None:
+            release(connection_record.info)
+
+def run_maintenance(engine, checkpoint='PASSIVE'):
+    """
+    Checkpoint the WAL into the database file and refresh planner statistics.
+
+    PASSIVE checkpoints never wait for readers or writers; TRUNCATE waits
+    for them and also empties the WAL file, for quiet periods.
+
+    Args:
+        engine: SQLAlchemy engine of a SQLite database
+        checkpoint (str): PASSIVE, FULL, RESTART or TRUNCATE
+
+    Returns:
+        dict: 'busy' (1 if the checkpoint could not finish), 'wal_pages'
+            and 'checkpointed_pages'
+    """
+    with engine.connect() as conn:
+        busy, wal_pages, checkpointed = conn.exec_driver_sql(f"PRAGMA wal_checkpoint({checkpoint})").one()
+        conn.exec_driver_sql("PRAGMA optimize")
+    return {'busy': busy, 'wal_pages': wal_pages, 'checkpointed_pages': checkpointed}
+
+def _run_maintainer(app, engine, interval):
+    """Run maintenance every interval until the worker exits."""
+    while True:
+        time.sleep(interval)
+        try:
+            run_maintenance(engine)
+        except Exception as e:
+            app.logger.error(f"Error running SQLite maintenance: {str(e)}")
+
+def init_sqlite_profile(app):
+    """
+    Apply the SQLite settings to the app's engine, if it is SQLite.
+
+    The pragmas are set on every new pooled connection. With
+    SQLITE_SERIALIZE_WRITES the worker's write transactions take turns
+    behind one lock. The maintenance thread, part of the profile, starts
+    with the worker's first request, so gunicorn starts one per worker
+    after forking.
+
+    Args:
+        app: Flask app instance
+    """
+    pragmas = sqlite_pragmas(app.config)
+    serialize = app.config.get('SQLITE_SERIALIZE_WRITES', False)
+    if not pragmas and not serialize:
+        return app
+
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        return app
+
+    if pragmas:
+        @event.listens_for(engine, 'connect')
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            apply_pragmas(dbapi_connection, pragmas)
+
+    if serialize:
+        serialize_writes(engine, app.config.get('SQLITE_BUSY_TIMEOUT_MS', 5000) / 1000.0)
+
+    if not app.config.get('SQLITE_PROFILE', False):
+        return app
+
+    interval = app.config.get('SQLITE_MAINTENANCE_INTERVAL', 300)
+    if not interval:
+        return app
+
+    state = {'thread': None}
+    lock = threading.Lock()
+
+    @app.before_request
+    def start_sqlite_maintainer():
+        if state['thread'] is not None:
+            return
+        with lock:
+            if state['thread'] is None:
+                state['thread'] = threading.Thread(
+                    target=_run_maintainer,
+                    args=(app, engine, interval),
+                    name='sqlite-maintenance',
+                    daemon=True
+                )
+                state['thread'].start()
+
+    return app
@@ -0,0 +1,293 @@
+"""
+Synthetic data utilities for benchmarking at production scale.
+Provides a deterministic generator for curriculum, users, tasks, task
+subtopics and confidence rows with realistic skew, written with bulk loads:
+COPY on PostgreSQL and executemany batches elsewhere.
+"""
+
+import csv
+import io
+import random
+from datetime import date, datetime, time, timedelta
+from app import db
+from app.models.task import TaskType
+
+# Preset sizes; any value can be overridden individually
+SCALES = {
+    'small': {'subjects': 5, 'topics': 50, 'subtopics': 500, 'users': 50,
+              'tasks': 5_000, 'confidences_per_user': 40},
+    'medium': {'subjects': 20, 'topics': 500, 'subtopics': 10_000, 'users': 2_000,
+               'tasks': 500_000, 'confidences_per_user': 150},
+    'large': {'subjects': 50, 'topics': 5_000, 'subtopics': 100_000, 'users': 100_000,
+              'tasks': 50_000_000, 'confidences_per_user': 300},
+}
+
+# Parents before children, so every batch only references rows already written
+TABLES = {
+    'subjects': ('id', 'title', 'description', 'value', 'is_user_created'),
+    'topics': ('id', 'subject_id', 'name', 'title', 'description', 'value', 'is_user_created'),
+    'subtopics': ('id', 'topic_id', 'title', 'description', 'value', 'estimated_duration', 'is_user_created'),
+    'users': ('id', 'username', 'password_hash', 'email', 'created_at', 'study_hours_per_day',
+              'weekend_study_hours', 'dark_mode'),
+    'subtopic_confidences': ('id', 'user_id', 'subtopic_id', 'confidence_level', 'last_updated', 'priority', 'version'),
+    'topic_confidences': ('id', 'user_id', 'topic_id', 'confidence_percent', 'last_updated', 'version'),
+    'tasks': ('id', 'user_id', 'subject_id', 'topic_id', 'task_type_id', 'title', 'description',
+              'total_duration', 'created_at', 'due_date', 'completed_at', 'skipped_at'),
+    'task_subtopics': ('id', 'task_id', 'subtopic_id', 'duration', 'task_due_date'),
+}
+
+# Students mostly rate themselves in the middle, rarely at the extremes
+CONFIDENCE_WEIGHTS = (5, 15, 35, 30, 15)
+
+HISTORY_DAYS = 180
+
+class BulkWriter:
+    """Buffers rows per table and writes them in batches on one raw connection."""
+
+    def __init__(self, engine, batch_size=50_000, progress=None):
+        self.dialect = engine.dialect.name
+        self.paramstyle = engine.dialect.paramstyle
+        self.batch_size = batch_size
+        self.progress = progress
+        self.counts = {table: 0 for table in TABLES}
+        self._buffers = {table: [] for table in TABLES}
+        self._connection = engine.raw_connection()
+
+        if self.dialect == 'sqlite':
+            # Losing a half-loaded synthetic dataset to a crash is acceptable
+            cursor = self._connection.cursor()
+            cursor.execute('PRAGMA synchronous = OFF')
+            cursor.close()
+
+    def add(self, table, row):
+        buffer = self._buffers[table]
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write every buffered row, parents first, and commit."""
+        cursor = self._connection.cursor()
+        try:
+            for table, rows in self._buffers.items():
+                if not rows:
+                    continue
+                if self.dialect == 'postgresql':
+                    self._copy(cursor, table, rows)
+                else:
+                    self._executemany(cursor, table, rows)
+                self.counts[table] += len(rows)
+                rows.clear()
+            self._connection.commit()
+        finally:
+            cursor.close()
+
+        if self.progress:
+            self.progress(dict(self.counts))
+
+    def close(self):
+        self.flush()
+        if self.dialect == 'postgresql':
+            # Rows were written with explicit IDs, so move the sequences past them
+            cursor = self._connection.cursor()
+            for table in TABLES:
+                cursor.execute(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                    f"COALESCE((SELECT MAX(id) FROM {table}), 1))"
+                )
+            self._connection.commit()
+            cursor.close()
+        self._connection.close()
+
+    def _copy(self, cursor, table, rows):
+        data = io.StringIO()
+        csv.writer(data).writerows(rows)
+        data.seek(0)
+        sql = f"COPY {table} ({', '.join(TABLES[table])}) FROM STDIN WITH (FORMAT csv)"
+
+        if hasattr(cursor, 'copy_expert'):
+            cursor.copy_expert(sql, data)
+        elif hasattr(cursor, 'copy'):
+            with cursor.copy(sql) as copy:
+                copy.write(data.getvalue())
+        else:
+            # pg8000 streams COPY data from a file-like object
+            cursor.execute(sql, stream=data)
+
+    def _executemany(self, cursor, table, rows):
+        placeholder = '?' if self.paramstyle == 'qmark' else '%s'
+        columns = TABLES[table]
+        if self.dialect == 'sqlite':
+            # Store dates as the same text SQLAlchemy writes, without sqlite3's deprecated adapters
+            rows = [tuple(str(value) if isinstance(value, date) else value for value in row) for row in rows]
+        cursor.executemany(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join([placeholder] * len(columns))})",
+            rows
+        )
+
+def _split(total, parts, rng):
+    """Split `total` into `parts` positive, uneven counts that add up exactly."""
+    weights = [rng.uniform(0.5, 1.5) for _ in range(parts)]
+    scale = total / sum(weights)
+    counts = [max(1, int(weight * scale)) for weight in weights]
+    counts[-1] += total - sum(counts)
+    while counts[-1] < 1:
+        index = counts.index(max(counts))
+        counts[index] -= 1
+        counts[-1] += 1
+    return counts
+
+def _next_id(table):
+    return (db.session.execute(db.text(f"SELECT MAX(id) FROM {table}")).scalar() or 0) + 1
+
+def generate_synthetic_data(seed=42, scale='small', batch_size=50_000, anchor_date=None, progress=None, **sizes):
+    """
+    Generate a deterministic dataset and bulk-load it into the current database.
+
+    The same seed and sizes always produce the same rows (on an empty
+    database the same IDs too). Subject popularity and per-user activity
+    follow a power law, so a few subjects and users dominate, as in
+    production. All users share the password 'password'.
+
+    Args:
+        seed (int): Random seed
+        scale (str): Preset from SCALES
+        batch_size (int): Rows per table buffered before each bulk write
+        anchor_date (date): "Today" for due dates, defaults to the current date
+        progress (callable): Called with row counts per table after each batch
+        **sizes: Overrides for subjects, topics, subtopics, users, tasks and
+            confidences_per_user
+
+    Returns:
+        dict: Rows written per table
+    """
+    from app import bcrypt
+
+    config = {**SCALES[scale], **{key: value for key, value in sizes.items() if value is not None}}
+    rng = random.Random(seed)
+    anchor_date = anchor_date or datetime.utcnow().date()
+    anchor = datetime.combine(anchor_date, time(18, 0))
+
+    TaskType.create_default_types()
+    task_types = [(task_type.id, task_type.name) for task_type in TaskType.query.order_by(TaskType.id).all()]
+    password_hash = bcrypt.generate_password_hash('password').decode('utf-8')
+    ids = {table: _next_id(table) for table in TABLES}
+
+    writer = BulkWriter(db.engine, batch_size, progress)
+    try:
+        # Curriculum: contiguous ID ranges per subject and per topic
+        subjects = []
+        topic_counts = _split(config['topics'], config['subjects'], rng)
+        subtopic_counts = iter(_split(config['subtopics'], config['topics'], rng))
+        topic_id = ids['topics']
+        subtopic_id = ids['subtopics']
+        topics = {}
+
+        for index, topic_count in enumerate(topic_counts):
+            subject_id = ids['subjects'] + index
+            writer.add('subjects', (subject_id, f"Subject {index + 1}", f"Synthetic subject {index + 1}", 1, False))
+            subject_topics = []
+
+            for topic_index in range(topic_count):
+                title = f"Topic {index + 1}.{topic_index + 1}"
+                writer.add('topics', (topic_id, subject_id, title, title, f"Synthetic topic {title}", 3, False))
+                count = next(subtopic_counts)
+                for subtopic_index in range(count):
+                    writer.add('subtopics', (
+                        subtopic_id + subtopic_index, topic_id, f"{title} subtopic {subtopic_index + 1}",
+                        f"Synthetic subtopic {subtopic_index + 1} of {title}", rng.randint(1, 8),
+                        rng.choice((15, 15, 15, 20, 30)), False
+                    ))
+                topics[topic_id] = (title, subtopic_id, count)
+                subject_topics.append(topic_id)
+                subtopic_id += count
+                topic_id += 1
+            subjects.append((subject_id, subject_topics))
+
+        # Users: power-law activity decides how many tasks and ratings each has
+        activity = [rng.paretovariate(1.5) for _ in range(config['users'])]
+        task_counts = [int(weight * config['tasks'] / sum(activity)) for weight in activity]
+        task_counts[-1] += config['tasks'] - sum(task_counts)
+        subject_popularity = [1.0 / (rank + 1) ** 1.1 for rank in range(len(subjects))]
+
+        task_id = ids['tasks']
+        task_subtopic_id = ids['task_subtopics']
+        confidence_id = ids['subtopic_confidences']
+        topic_confidence_id = ids['topic_confidences']
+
+        for index in range(config['users']):
+            user_id = ids['users'] + index
+            created_at = anchor - timedelta(days=HISTORY_DAYS + rng.randint(0, 60))
+            writer.add('users', (
+                user_id, f"synth_user_{user_id}", password_hash, f"synth_user_{user_id}@example.com",
+                created_at, rng.choice((1.5, 2.0, 2.0, 3.0)), rng.choice((2.0, 3.0, 4.0)), rng.random() < 0.3
+            ))
+
+            # A-level students take three or four subjects
+            chosen = []
+            while len(chosen) < min(rng.choice((3, 3, 4)), len(subjects)):
+                subject = rng.choices(subjects, weights=subject_popularity)[0]
+                if subject not in chosen:
+                    chosen.append(subject)
+            user_topics = [topic for _, subject_topics in chosen for topic in subject_topics]
+
+            # Confidence ratings, skewed towards the middle and per-student ability
+            ability = rng.gauss(0, 0.6)
+            ratings = int(config['confidences_per_user'] * min(activity[index], 5.0) / 2.0)
+            rated = {}
+            for _ in range(ratings):
+                rated_topic = rng.choice(user_topics)
+                _, first_subtopic, count = topics[rated_topic]
+                subtopic = first_subtopic + rng.randrange(count)
+                if subtopic in rated:
+                    continue
+                base = rng.choices(range(1, 6), weights=CONFIDENCE_WEIGHTS)[0]
+                level = min(5, max(1, round(base + ability)))
+                rated[subtopic] = (rated_topic, level)
+                writer.add('subtopic_confidences', (
+                    confidence_id, user_id, subtopic, level,
+                    anchor - timedelta(minutes=rng.randint(0, HISTORY_DAYS * 1440)), rng.random() < 0.05, 1
+                ))
+                confidence_id += 1
+
+            levels_by_topic = {}
+            for rated_topic, level in rated.values():
+                levels_by_topic.setdefault(rated_topic, []).append(level)
+            for rated_topic, levels in levels_by_topic.items():
+                count = topics[rated_topic][2]
+                average = (sum(levels) + 3 * (count - len(levels))) / count
+                writer.add('topic_confidences', (
+                    topic_confidence_id, user_id, rated_topic, (average - 1) / 4.0 * 100.0, anchor, 1
+                ))
+                topic_confidence_id += 1
+
+            # Tasks spread over the history, mostly completed in the past
+            for _ in range(task_counts[index]):
+                subject_id, subject_topics = rng.choice(chosen)
+                task_topic = rng.choice(subject_topics)
+                title, first_subtopic, count = topics[task_topic]
+                type_id, type_name = rng.choice(task_types)
+                days_ago = min(int(rng.expovariate(1 / 30.0)), HISTORY_DAYS)
+                due_date = anchor_date - timedelta(days=days_ago)
+                created = datetime.combine(due_date, time(7, 0)) + timedelta(minutes=rng.randint(0, 120))
+
+                outcome = rng.random()
+                completed_at = skipped_at = None
+                if days_ago > 0 and outcome < 0.7:
+                    completed_at = created + timedelta(minutes=rng.randint(20, 600))
+                elif days_ago > 0 and outcome < 0.8:
+                    skipped_at = created + timedelta(minutes=rng.randint(1, 300))
+
+                packed = rng.sample(range(first_subtopic, first_subtopic + count), min(count, rng.randint(1, 4)))
+                writer.add('tasks', (
+                    task_id, user_id, subject_id, task_topic, type_id, f"{type_name.capitalize()}: {title}",
+                    f"Synthetic {type_name} task", 15 * len(packed), created, due_date, completed_at, skipped_at
+                ))
+                for subtopic in packed:
+                    writer.add('task_subtopics', (task_subtopic_id, task_id, subtopic, 15, due_date))
+                    task_subtopic_id += 1
+                task_id += 1
+    finally:
+        writer.close()
+
+    return writer.counts
@@ -0,0 +1,220 @@
+"""
+Task card utilities for the denormalized task read model.
+Provides helpers that precompute everything a task card displays into
+Task.card_data when a task is generated or modified, and assemble dashboard
+and API views from it without joins.
+"""
+
+from datetime import datetime
+from flask import current_app
+from app import db
+from app.models.task import Task, TaskSubtopic
+from app.utils.unit_of_work import commit, in_unit_of_work
+
+# Task columns copied into every card view next to the precomputed card data
+CARD_COLUMNS = (
+    'id', 'user_id', 'subject_id', 'topic_id', 'task_type_id', 'title', 'description',
+    'total_duration', 'created_at', 'due_date', 'completed_at', 'skipped_at'
+)
+
+def build_task_card(task, confidence_state):
+    """
+    Build the card data for a task.
+
+    The card mirrors the shape of the ORM relationships (task.subject.title,
+    task.subtopics[i].subtopic.topic.title, ...) so templates render a card
+    view exactly as they render a Task.
+
+    Args:
+        task (Task): Task loaded with the detail profile
+        confidence_state (dict): Result of get_subtopic_confidence_state for
+            the task's subtopics
+
+    Returns:
+        dict: JSON-serializable card data
+    """
+    subtopics = []
+    for task_subtopic in task.subtopics:
+        subtopic = task_subtopic.subtopic
+        if not subtopic:
+            continue
+
+        state = confidence_state.get(subtopic.id, {})
+        subtopics.append({
+            'duration': task_subtopic.duration,
+            'confidence': state.get('confidence_level', 3),
+            'priority': state.get('priority', False),
+            'subtopic': {
+                'id': subtopic.id,
+                'title': subtopic.title,
+                'description': subtopic.description,
+                'topic': {
+                    'id': subtopic.topic_id,
+                    'title': subtopic.topic.title if subtopic.topic else None
+                }
+            }
+        })
+
+    return {
+        'subject': {'id': task.subject_id, 'title': task.subject.title},
+        'task_type': {'id': task.task_type_id, 'name': task.task_type.name},
+        'topic': {'id': task.topic_id, 'title': task.topic.title} if task.topic else None,
+        'subtopics': subtopics
+    }
+
+def refresh_task_cards(task_ids):
+    """
+    Recompute and store the card data for tasks.
+
+    Loads the tasks with the detail profile and the owners' confidences with
+    one query per user, then commits.
+
+    Args:
+        task_ids (iterable): IDs of tasks to refresh
+
+    Returns:
+        list: The refreshed Task objects
+    """
+    from app.utils.task_repository import TaskRepository
+    from app.utils.confidence_utils import get_subtopic_confidence_state
+
+    task_ids = list(task_ids)
+    if not task_ids:
+        return []
+
+    tasks = TaskRepository.query('detail').filter(Task.id.in_(task_ids)).all()
+
+    subtopic_ids_by_user = {}
+    for task in tasks:
+        subtopic_ids_by_user.setdefault(task.user_id, set()).update(
+            task_subtopic.subtopic_id for task_subtopic in task.subtopics
+        )
+
+    states = {
+        user_id: get_subtopic_confidence_state(user_id, subtopic_ids)
+        for user_id, subtopic_ids in subtopic_ids_by_user.items()
+    }
+
+    for task in tasks:
+        task.card_data = build_task_card(task, states[task.user_id])
+
+    commit()
+    return tasks
+
+def update_card_confidences(user_id, entries):
+    """
+    Patch new confidence values into the cards of the user's current tasks.
+
+    Only tasks due today or later are touched; past cards keep the
+    confidence the student had at the time. Runs in the caller's
+    transaction; the caller commits.
+
+    Args:
+        user_id (int): User ID
+        entries (dict): {subtopic_id: {'confidence_level': int or None, 'priority': bool or None}}
+
+    Returns:
+        int: Number of cards updated
+    """
+    tasks = Task.query.filter(
+        Task.user_id == user_id,
+        Task.due_date >= datetime.utcnow().date(),
+        Task.card_data.isnot(None),
+        Task.id.in_(
+            db.session.query(TaskSubtopic.task_id).filter(
+                TaskSubtopic.subtopic_id.in_(list(entries.keys()))
+            )
+        )
+    ).all()
+
+    for task in tasks:
+        card = dict(task.card_data)
+        subtopics = []
+        for item in card.get('subtopics', []):
+            entry = entries.get(item['subtopic']['id'])
+            if entry:
+                item = dict(item)
+                if entry.get('confidence_level') is not None:
+                    item['confidence'] = entry['confidence_level']
+                if entry.get('priority') is not None:
+                    item['priority'] = entry['priority']
+            subtopics.append(item)
+        card['subtopics'] = subtopics
+
+        # Reassign so the JSON column is marked as changed
+        task.card_data = card
+
+    return len(tasks)
+
+def task_card_view(task):
+    """
+    Combine a task's columns with its card data for rendering or serializing.
+
+    Args:
+        task (Task): Task with card_data set
+
+    Returns:
+        dict: Task columns plus subject, task_type, topic and subtopics
+    """
+    view = dict(task.card_data)
+    for column in CARD_COLUMNS:
+        view[column] = getattr(task, column)
+    return view
+
+def get_task_cards(user_id, start_date, end_date=None):
+    """
+    Get card views for a user's tasks due on a day or within a date range.
+
+    Uses one query on the (user_id, due_date) index. Tasks created before
+    cards existed are backfilled on first read.
+
+    Args:
+        user_id (int): User ID
+        start_date (date): First due date to include
+        end_date (date): Last due date to include, defaults to start_date
+
+    Returns:
+        list: Card views ordered by task ID
+    """
+    query = Task.query.filter(Task.user_id == user_id)
+    if end_date is None or end_date == start_date:
+        query = query.filter(Task.due_date == start_date)
+    else:
+        query = query.filter(Task.due_date.between(start_date, end_date))
+
+    tasks = query.order_by(Task.id).all()
+
+    missing = [task.id for task in tasks if task.card_data is None]
+    if missing:
+        current_app.logger.info(f"Backfilling {len(missing)} task cards for user {user_id}")
+        refresh_task_cards(missing)
+        # Inside a request the refresh only flushed and the loaded rows hold the new cards;
+        # outside one its commit expired them, so reload them in one query, not one per row
+        if not in_unit_of_work():
+            tasks = query.order_by(Task.id).all()
+
+    return [task_card_view(task) for task in tasks]
+
+def serialize_task_card(task):
+    """
+    Format a task for API responses.
+
+    Args:
+        task (Task): Task with card_data set, or loaded with the card profile
+
+    Returns:
+        dict: Task id, title, description, duration, subject and task type
+    """
+    card = task.card_data or {
+        'subject': {'id': task.subject_id, 'title': task.subject.title},
+        'task_type': {'id': task.task_type_id, 'name': task.task_type.name}
+    }
+
+    return {
+        'id': task.id,
+        'title': task.title,
+        'description': task.description,
+        'duration': task.total_duration,
+        'subject': card['subject'],
+        'task_type': card['task_type']
+    }
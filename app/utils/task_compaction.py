@@ -0,0 +1,205 @@
+"""
+Task compaction utilities for keeping the tasks tables small.
+Provides a job that folds skipped tasks past a retention window, and all
+finished tasks past a history window, into per-day rollup rows, optionally
+archives completed ones in a compact table, deletes their detail rows in
+key-range batches and then vacuums and analyzes the tables, for the
+`flask compact-tasks` command or a scheduler running it.
+"""
+
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_
+from app import db
+from app.models.task import Task, TaskSubtopic
+from app.models.task_history import ArchivedTask, TaskDailyRollup
+from app.utils.optimization_batch import db_batch_process
+
+# Analytics reads the last 30 days of task detail (recent tasks, weekly chart)
+MIN_RETENTION_DAYS = 31
+
+COMPACTED_TABLES = ('tasks', 'task_subtopics', 'task_daily_rollups', 'archived_tasks')
+
+def compactable_task_criteria(today, retention_days, history_days, archive_completed=False):
+    """
+    Filter selecting the finished tasks to compact.
+
+    Skipped tasks are compacted after `retention_days`, completed ones too
+    when they are archived, and every finished task after `history_days`.
+    Open tasks are left to the stale task sweeper. Rollups are by due date,
+    the day completion counts file live tasks under, so tasks left without
+    one from before due dates were required stay until
+    migrations/require_task_due_dates.py gives them one.
+    """
+    retention_cutoff = datetime.combine(today - timedelta(days=retention_days), datetime.min.time())
+    history_cutoff = datetime.combine(today - timedelta(days=history_days), datetime.min.time())
+    finished = or_(Task.completed_at.isnot(None), Task.skipped_at.isnot(None))
+    expired = [
+        and_(Task.created_at < retention_cutoff, Task.skipped_at.isnot(None)),
+        and_(Task.created_at < history_cutoff, finished)
+    ]
+    if archive_completed:
+        expired.append(and_(Task.created_at < retention_cutoff, Task.completed_at.isnot(None)))
+    return and_(Task.due_date.isnot(None), or_(*expired))
+
+def _add_to_rollups(rows):
+    """Add a chunk's tasks to the per-day rollups, without committing."""
+    counts = defaultdict(lambda: {'tasks': 0, 'completed': 0, 'skipped': 0, 'completed_minutes': 0})
+    for row in rows:
+        day_counts = counts[(row.user_id, row.subject_id, row.due_date)]
+        day_counts['tasks'] += 1
+        if row.completed_at is not None:
+            day_counts['completed'] += 1
+            day_counts['completed_minutes'] += row.total_duration or 0
+        elif row.skipped_at is not None:
+            day_counts['skipped'] += 1
+
+    existing = {
+        (rollup.user_id, rollup.subject_id, rollup.day): rollup
+        for rollup in TaskDailyRollup.query.filter(
+            TaskDailyRollup.user_id.in_({key[0] for key in counts}),
+            TaskDailyRollup.day.in_({key[2] for key in counts})
+        )
+    }
+    for (user_id, subject_id, day), day_counts in counts.items():
+        rollup = existing.get((user_id, subject_id, day))
+        if rollup is None:
+            db.session.add(TaskDailyRollup(user_id=user_id, subject_id=subject_id, day=day, **day_counts))
+            continue
+        for name, value in day_counts.items():
+            setattr(rollup, name, getattr(rollup, name) + value)
+    return len(counts)
+
+def _archive_completed(rows):
+    """Copy a chunk's completed tasks, with their subtopic ids, to archived_tasks."""
+    completed = [row for row in rows if row.completed_at is not None]
+    if not completed:
+        return 0
+
+    subtopic_ids = defaultdict(list)
+    for task_id, subtopic_id in db.session.execute(
+        db.select(TaskSubtopic.task_id, TaskSubtopic.subtopic_id)
+        .where(TaskSubtopic.task_id.in_([row.id for row in completed]))
+    ):
+        subtopic_ids[task_id].append(subtopic_id)
+
+    db.session.execute(db.insert(ArchivedTask), [
+        {'id': row.id, 'user_id': row.user_id, 'subject_id': row.subject_id, 'topic_id': row.topic_id,
+         'task_type_id': row.task_type_id, 'title': row.title, 'total_duration': row.total_duration,
+         'created_at': row.created_at, 'due_date': row.due_date, 'completed_at': row.completed_at,
+         'subtopic_ids': subtopic_ids[row.id]}
+        for row in completed
+    ])
+    return len(completed)
+
+def _compact_chunk(rows, archive_completed):
+    """
+    Fold one key range of tasks into rollups and delete them, without committing.
+
+    Returns:
+        dict: Counts for the chunk
+    """
+    task_ids = [row.id for row in rows]
+    rollups = _add_to_rollups(rows)
+    archived = _archive_completed(rows) if archive_completed else 0
+
+    subtopics_deleted = db.session.execute(
+        db.delete(TaskSubtopic).where(TaskSubtopic.task_id.in_(task_ids))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    tasks_deleted = db.session.execute(
+        db.delete(Task).where(Task.id.in_(task_ids)).execution_options(synchronize_session=False)
+    ).rowcount
+
+    return {'tasks_deleted': tasks_deleted, 'task_subtopics_deleted': subtopics_deleted,
+            'rollups_written': rollups, 'tasks_archived': archived}
+
+def vacuum_tables(engine, vacuum=True):
+    """
+    Refresh planner statistics after compaction and, with `vacuum`, reclaim the space.
+
+    PostgreSQL vacuums the compacted tables, which does not block reads or
+    writes. SQLite can only VACUUM the whole database, rewriting the file
+    while holding its write lock, so it is best run in quiet hours.
+
+    Returns:
+        dict: 'vacuumed', and for SQLite the database size in bytes
+            before and after
+    """
+    result = {'vacuumed': vacuum}
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        if engine.dialect.name == 'postgresql':
+            command = 'VACUUM (ANALYZE)' if vacuum else 'ANALYZE'
+            for table in COMPACTED_TABLES:
+                conn.exec_driver_sql(f"{command} {table}")
+            return result
+
+        def database_size():
+            page_size = conn.exec_driver_sql("PRAGMA page_size").scalar()
+            return page_size * conn.exec_driver_sql("PRAGMA page_count").scalar()
+
+        result['size_before'] = database_size()
+        if vacuum:
+            conn.exec_driver_sql("VACUUM")
+        for table in COMPACTED_TABLES:
+            conn.exec_driver_sql(f"ANALYZE {table}")
+        result['size_after'] = database_size()
+    return result
+
+def compact_tasks(today=None, retention_days=90, history_days=365, archive_completed=False,
+                  batch_size=1000, limit=None, vacuum=True, max_retries=3):
+    """
+    Fold old finished tasks into per-day rollups and delete their detail rows.
+
+    Rollups count tasks, completed and skipped tasks and completed minutes
+    per user, subject and day (the due date), so completion counts stay the
+    same once added to those of the remaining tasks (see
+    TaskRepository.completion_counts). Tasks are read in primary key ranges
+    of `batch_size`; each range is rolled up, archived and deleted in one
+    transaction and retried from its first key when it fails.
+
+    Args:
+        today (date): Day to compact for, defaults to today (UTC)
+        retention_days (int): Keep skipped tasks created this many days back
+        history_days (int): Keep completed tasks created this many days back
+        archive_completed (bool): Archive completed tasks after retention_days instead
+        batch_size (int): Tasks per transaction
+        limit (int): Maximum number of tasks to compact
+        vacuum (bool): VACUUM the tables afterwards; they are analyzed either way
+        max_retries (int): Retries of a failed range
+
+    Returns:
+        dict: Report with the rows deleted and reclaimed, rollups written,
+            tasks archived, chunks, duration and the vacuum result
+
+    Raises:
+        ValueError: If retention_days is below MIN_RETENTION_DAYS
+    """
+    if retention_days < MIN_RETENTION_DAYS:
+        raise ValueError(f"retention_days must be at least {MIN_RETENTION_DAYS}, analytics reads recent task detail")
+
+    today = today or datetime.utcnow().date()
+    query = db.session.query(
+        Task.id, Task.user_id, Task.subject_id, Task.topic_id, Task.task_type_id, Task.title,
+        Task.total_duration, Task.created_at, Task.due_date, Task.completed_at, Task.skipped_at
+    ).filter(compactable_task_criteria(today, retention_days, history_days, archive_completed))
+
+    started = time.perf_counter()
+    chunks = db_batch_process(
+        query, batch_size=batch_size, limit=limit, max_retries=max_retries,
+        process_func=lambda rows: _compact_chunk(rows, archive_completed)
+    )
+    maintenance = vacuum_tables(db.engine, vacuum=vacuum)
+    duration = time.perf_counter() - started
+
+    totals = {name: sum(chunk[name] for chunk in chunks)
+              for name in ('tasks_deleted', 'task_subtopics_deleted', 'rollups_written', 'tasks_archived')}
+    return {
+        'date': today.isoformat(),
+        'chunks': len(chunks),
+        **totals,
+        'rows_reclaimed': totals['tasks_deleted'] + totals['task_subtopics_deleted'],
+        'duration_s': round(duration, 3),
+        'maintenance': maintenance
+    }
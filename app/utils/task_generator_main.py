@@ -5,6 +5,7 @@ Integrates subject, topic, and subtopic functionality to create tasks.
 
 import random
 from datetime import datetime
+from flask import current_app
 from app import db
 from app.models.curriculum import Subject
 from app.models.task import Task, TaskType
@@ -19,8 +20,13 @@ from app.utils.task_topic_utils import (
     get_subtopic_categories
 )
 from app.utils.task_subtopic_utils import add_subtopics_to_task
+from app.utils.task_card_utils import refresh_task_cards
+from app.utils.metrics import StageTimer
+from app.utils.tracing import current_span, traced
+from app.utils.unit_of_work import commit as commit_changes
 
-def generate_task_for_subject(user, subject_id):
+@traced('task_generation')
+def generate_task_for_subject(user, subject_id, commit=True, due_date=None):
     """
     Generate a study task for a subject.
     
@@ -34,14 +40,30 @@ def generate_task_for_subject(user, subject_id):
     Args:
         user: User object to generate task for
         subject_id: Subject ID to generate task for
+        commit: Commit the task and refresh its card; otherwise only flush,
+                leaving both to a caller generating many tasks in one transaction
+        due_date: Day the task is due, defaults to today (UTC)
         
     Returns:
         The created task object.
     """
+    current_span().set(user_id=user.id, subject_id=subject_id)
+    stages = StageTimer()
+    
+    # Topic selection is weighted by confidence, so write out pending changes first
+    from app.utils.confidence_buffer import confidence_buffer
+    try:
+        confidence_buffer.flush_user(user.id)
+    except Exception as e:
+        # Generate from the stored confidences rather than fail the request
+        current_app.logger.error(f"Error flushing confidence updates for user {user.id}: {str(e)}")
+    stages.lap('confidence_flush')
+    
     # Get the subject
     subject = Subject.query.get(subject_id)
     if not subject:
         return None
+    stages.lap('subject_lookup', subject=subject.title)
     
     # Check if Uplearn is enabled for this subject
     uplearn_only = user.is_uplearn_enabled_for_subject(subject_id)
@@ -68,10 +90,9 @@ def generate_task_for_subject(user, subject_id):
     
     # Select random task type from available options
     task_type = random.choice(task_types)
+    stages.lap('task_type_selection', task_types=len(task_types), task_type=task_type.name)
     
     # Get all topics for this subject
-    from flask import current_app
-    
     if "Psychology" in subject.title:
         # Special handling for Psychology's nested structure
         try:
@@ -81,6 +102,7 @@ def generate_task_for_subject(user, subject_id):
             if not paper_topics:
                 current_app.logger.error(f"No paper topics found for Psychology subject ID {subject_id}")
                 return None
+            stages.lap('topic_listing', topics=len(paper_topics))
             
             # Select a paper topic randomly
             selected_paper = select_weighted_topic(paper_topics, user, subject.title)
@@ -110,12 +132,14 @@ def generate_task_for_subject(user, subject_id):
     else:
         # Normal subject structure
         topics = get_topics_for_subject(subject_id)
+        stages.lap('topic_listing', topics=len(topics))
         
         # Select a topic randomly
         selected_topic = select_weighted_topic(topics, user, subject.title)
     
     if not selected_topic:
         return None
+    stages.lap('weighted_topic_selection', topic_id=selected_topic.id)
     
     # Create the task
     task = Task(
@@ -125,15 +149,25 @@ def generate_task_for_subject(user, subject_id):
         title=f"{task_type.name.capitalize()}: {selected_topic.title}",
         description=selected_topic.description,
         topic_id=selected_topic.id,
-        due_date=datetime.utcnow().date()
+        due_date=due_date or datetime.utcnow().date()
     )
     
     # Save task to get an ID
     db.session.add(task)
-    db.session.commit()
+    if commit:
+        commit_changes()
+    else:
+        db.session.flush()
+    stages.lap('task_insert')
     
     # Add subtopics to the task
-    add_subtopics_to_task(task, selected_topic, user)
+    add_subtopics_to_task(task, selected_topic, user, commit=commit)
+    stages.lap('subtopic_packing')
+    
+    # Precompute the card shown on the dashboard and in API responses
+    if commit:
+        refresh_task_cards([task.id])
+        stages.lap('card_refresh')
     
     return task
 
@@ -0,0 +1,268 @@
+"""
+Task partitioning utilities for PostgreSQL deployments.
+Provides the conversion of tasks and task_subtopics into tables partitioned
+by month of the task's due date, creation of the coming months' partitions
+at startup and from `flask task-partitions`, and detaching old months into
+an archive schema once their counts are folded into the daily rollups.
+"""
+
+import re
+from datetime import date, datetime, timedelta
+from sqlalchemy import text
+from app import db
+from app.models.task import Task, TaskSubtopic
+from app.utils.task_compaction import MIN_RETENTION_DAYS
+
+# Partitioned tables, parents before children, with their partition key
+PARTITION_KEYS = {'tasks': 'due_date', 'task_subtopics': 'task_due_date'}
+
+# pg_advisory_xact_lock key serializing partition maintenance between workers
+ADVISORY_LOCK_KEY = 4_900_049
+
+def month_start(day):
+    """Get the first day of a date's month."""
+    return day.replace(day=1)
+
+def next_month(month):
+    """Get the first day of the month after `month`."""
+    return months_after(month, 1)
+
+def months_after(day, count):
+    """Get the first day of the month `count` months after a date's month (before, when negative)."""
+    index = day.year * 12 + day.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(table, month):
+    """Name of a table's partition for a month, e.g. tasks_2026_10."""
+    return f"{table}_{month:%Y_%m}"
+
+def is_partitioned(conn, table='tasks'):
+    """Whether a table is a partitioned table."""
+    return conn.execute(
+        text("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table))"),
+        {'table': table}
+    ).scalar()
+
+def monthly_partitions(conn, table='tasks'):
+    """
+    Get a table's monthly partitions.
+
+    Returns:
+        dict: {first day of month: partition name}, without the default partition
+    """
+    names = conn.execute(
+        text("SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+             "WHERE i.inhparent = to_regclass(:table)"),
+        {'table': table}
+    ).scalars()
+    partitions = {}
+    for name in names:
+        match = re.fullmatch(rf"{table}_(\d{{4}})_(\d{{2}})", name)
+        if match:
+            partitions[date(int(match.group(1)), int(match.group(2)), 1)] = name
+    return partitions
+
+def create_partitions(conn, first, last):
+    """
+    Create the partitions of both tables for the months from `first` to `last`.
+
+    Months that already have them are left alone.
+
+    Returns:
+        list: Names of the partitions created
+    """
+    existing = {table: monthly_partitions(conn, table) for table in PARTITION_KEYS}
+    created = []
+    month = month_start(first)
+    while month <= last:
+        for table in PARTITION_KEYS:
+            if month in existing[table]:
+                continue
+            name = partition_name(table, month)
+            conn.execute(text(
+                f"CREATE TABLE {name} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month(month).isoformat()}')"
+            ))
+            created.append(name)
+        month = next_month(month)
+    return created
+
+def ensure_partitions(conn, today=None, months_ahead=3):
+    """
+    Create the partitions for this month and the next `months_ahead` months.
+
+    Rows outside every monthly partition go to the default partition, so
+    a missed run is not an error, but the default partition is not pruned.
+    Workers starting together take turns through an advisory lock.
+
+    Returns:
+        list: Names of the partitions created
+    """
+    today = today or datetime.utcnow().date()
+    conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {'key': ADVISORY_LOCK_KEY})
+    return create_partitions(conn, today, months_after(today, months_ahead))
+
+def partition_task_tables(conn, today=None, months_ahead=3):
+    """
+    Convert tasks and task_subtopics into partitioned tables, in the caller's transaction.
+
+    Tasks without a due date get their creation date, and task subtopics
+    their task's due date, so every row has a partition key; task subtopics
+    whose task no longer exists have none and must be deleted first. The tables are
+    recreated as partitioned tables with the same columns, id sequences,
+    foreign keys and model indexes; their primary keys become (id, key). A
+    partition is created for every month from the oldest due date to
+    `months_ahead` months ahead, plus a default partition, and the rows are
+    copied over. The copy holds locks on both tables until it commits, so
+    run it in a maintenance window.
+
+    Returns:
+        dict: Rows copied per table and the number of partitions created
+
+    Raises:
+        ValueError: If the tables are already partitioned, or task subtopics
+            have no task
+    """
+    if is_partitioned(conn):
+        raise ValueError("The tasks table is already partitioned")
+
+    today = today or datetime.utcnow().date()
+    conn.execute(text("ALTER TABLE task_subtopics ADD COLUMN IF NOT EXISTS task_due_date DATE"))
+    conn.execute(text("UPDATE tasks SET due_date = COALESCE(created_at::date, CURRENT_DATE) WHERE due_date IS NULL"))
+    conn.execute(text(
+        "UPDATE task_subtopics ts SET task_due_date = t.due_date FROM tasks t "
+        "WHERE t.id = ts.task_id AND ts.task_due_date IS DISTINCT FROM t.due_date"
+    ))
+    # The partition key becomes NOT NULL, so rows without one would fail the copy after the tables are swapped
+    orphans = conn.execute(text("SELECT COUNT(*) FROM task_subtopics WHERE task_due_date IS NULL")).scalar()
+    if orphans:
+        raise ValueError(f"{orphans} task subtopics belong to no task, so have no due date to partition by; "
+                         "delete them with DELETE FROM task_subtopics WHERE task_id NOT IN (SELECT id FROM tasks)")
+    oldest = conn.execute(text("SELECT MIN(due_date) FROM tasks")).scalar() or today
+
+    foreign_keys = {}
+    for table, key in PARTITION_KEYS.items():
+        old = f"{table}_unpartitioned"
+        sequence = conn.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"), {'table': table}).scalar()
+        primary_key = conn.execute(
+            text("SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(:table) AND contype = 'p'"),
+            {'table': table}
+        ).scalar()
+        foreign_keys[table] = conn.execute(
+            text("SELECT conname, pg_get_constraintdef(oid), confrelid::regclass::text FROM pg_constraint "
+                 "WHERE conrelid = to_regclass(:table) AND contype = 'f'"),
+            {'table': table}
+        ).all()
+
+        # Free the names the new table and its indexes take over
+        conn.execute(text(f"ALTER TABLE {table} RENAME TO {old}"))
+        conn.execute(text(f'ALTER TABLE {old} RENAME CONSTRAINT "{primary_key}" TO "{old}_pkey"'))
+        for index in (Task if table == 'tasks' else TaskSubtopic).__table__.indexes:
+            conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+        # Keep the id sequence when the old table is dropped
+        conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY NONE"))
+
+        conn.execute(text(f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS) PARTITION BY RANGE ({key})"))
+        conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {key} SET NOT NULL, "
+                          f"ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, {key})"))
+        conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id"))
+        conn.execute(text(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT"))
+
+    created = create_partitions(conn, oldest, months_after(today, months_ahead))
+
+    copied = {}
+    for table in PARTITION_KEYS:
+        copied[table] = conn.execute(text(f"INSERT INTO {table} SELECT * FROM {table}_unpartitioned")).rowcount
+
+    # Foreign keys are added after the copy, which checks them once in bulk
+    for table, constraints in foreign_keys.items():
+        for name, definition, referenced in constraints:
+            if referenced == 'tasks_unpartitioned':
+                # Only (id, due_date) is unique on the partitioned tasks table
+                definition = ("FOREIGN KEY (task_id, task_due_date) REFERENCES tasks (id, due_date) "
+                              "ON UPDATE CASCADE ON DELETE CASCADE")
+            conn.execute(text(f'ALTER TABLE {table} ADD CONSTRAINT "{name}" {definition}'))
+
+    for model in (Task, TaskSubtopic):
+        for index in model.__table__.indexes:
+            index.create(conn)
+
+    conn.execute(text("DROP TABLE task_subtopics_unpartitioned, tasks_unpartitioned"))
+    return {'rows': copied, 'partitions_created': len(created) + len(PARTITION_KEYS)}
+
+def detach_partitions(conn, before, archive_schema='archive', today=None):
+    """
+    Fold the months before `before` into the daily rollups and detach their partitions.
+
+    The rollups keep completion counts and analytics the same (see
+    app/utils/task_compaction.py). The detached partitions are moved to
+    `archive_schema`, or dropped when it is None.
+
+    Returns:
+        list: First days of the months detached
+
+    Raises:
+        ValueError: If `before` is within the task detail analytics reads
+    """
+    today = today or datetime.utcnow().date()
+    if before > today - timedelta(days=MIN_RETENTION_DAYS):
+        raise ValueError(f"Only months older than {MIN_RETENTION_DAYS} days can be detached, analytics reads recent task detail")
+
+    conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {'key': ADVISORY_LOCK_KEY})
+    months = sorted(month for month in monthly_partitions(conn) if month < month_start(before))
+    if months and archive_schema:
+        conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {archive_schema}"))
+
+    for month in months:
+        tasks, subtopics = partition_name('tasks', month), partition_name('task_subtopics', month)
+        conn.execute(text(
+            "INSERT INTO task_daily_rollups (user_id, subject_id, day, tasks, completed, skipped, completed_minutes) "
+            "SELECT user_id, subject_id, due_date, COUNT(*), COUNT(completed_at), "
+            "COUNT(*) FILTER (WHERE completed_at IS NULL AND skipped_at IS NOT NULL), "
+            "COALESCE(SUM(total_duration) FILTER (WHERE completed_at IS NOT NULL), 0) "
+            f"FROM {tasks} GROUP BY user_id, subject_id, due_date "
+            "ON CONFLICT ON CONSTRAINT unique_user_subject_day_rollup DO UPDATE SET "
+            "tasks = task_daily_rollups.tasks + EXCLUDED.tasks, "
+            "completed = task_daily_rollups.completed + EXCLUDED.completed, "
+            "skipped = task_daily_rollups.skipped + EXCLUDED.skipped, "
+            "completed_minutes = task_daily_rollups.completed_minutes + EXCLUDED.completed_minutes"
+        ))
+
+        conn.execute(text(f"ALTER TABLE task_subtopics DETACH PARTITION {subtopics}"))
+        # The detached subtopics keep their foreign key, which would stop their tasks being detached
+        for name in conn.execute(
+            text("SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(:table) AND contype = 'f' "
+                 "AND confrelid = 'tasks'::regclass"),
+            {'table': subtopics}
+        ).scalars().all():
+            conn.execute(text(f'ALTER TABLE {subtopics} DROP CONSTRAINT "{name}"'))
+        conn.execute(text(f"ALTER TABLE tasks DETACH PARTITION {tasks}"))
+
+        for name in (subtopics, tasks):
+            if archive_schema:
+                conn.execute(text(f"ALTER TABLE {name} SET SCHEMA {archive_schema}"))
+            else:
+                conn.execute(text(f"DROP TABLE {name}"))
+    return months
+
+def init_task_partitions(app):
+    """
+    Create the coming months' partitions when the tasks table is partitioned.
+
+    Args:
+        app: Flask app instance, after db.init_app
+    """
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name != 'postgresql':
+        return app
+
+    try:
+        with engine.begin() as conn:
+            if is_partitioned(conn):
+                created = ensure_partitions(conn, months_ahead=app.config.get('TASK_PARTITIONS_MONTHS_AHEAD', 3))
+                if created:
+                    app.logger.info(f"Created task partitions {', '.join(created)}")
+    except Exception as e:
+        app.logger.error(f"Error creating task partitions: {str(e)}")
+    return app
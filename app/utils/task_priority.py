@@ -0,0 +1,47 @@
+"""
+Task priority utilities.
+Provides the priority rules once, with a Python reading for a single task
+and a SQL reading that re-prioritises many tasks in one UPDATE.
+"""
+
+from datetime import timedelta
+from sqlalchemy import case
+from app.models.task import Task
+
+# (due within days, increase, cap): the first rule a task's due date matches applies
+PRIORITY_RULES = (
+    (1, 30, 100),  # Due today or tomorrow
+    (7, 20, 90),   # Due within a week
+)
+
+# Priority of tasks due later is raised to at least this
+PRIORITY_FLOOR = 50
+
+def task_priority(priority, due_date, today):
+    """
+    New priority of a task with the given priority and due date.
+
+    Tasks without a due date keep their priority.
+    """
+    if due_date is None:
+        return priority
+    for days, increase, cap in PRIORITY_RULES:
+        if due_date <= today + timedelta(days=days):
+            return min(cap, priority + increase)
+    return max(PRIORITY_FLOOR, priority)
+
+def priority_expression(today):
+    """
+    SQL expression computing task_priority from the tasks row it updates.
+
+    Returns:
+        A CASE expression over Task.priority and Task.due_date
+    """
+    whens = [
+        (Task.due_date <= today + timedelta(days=days),
+         case((Task.priority + increase > cap, cap), else_=Task.priority + increase))
+        for days, increase, cap in PRIORITY_RULES
+    ]
+    whens.append((Task.due_date.isnot(None),
+                  case((Task.priority < PRIORITY_FLOOR, PRIORITY_FLOOR), else_=Task.priority)))
+    return case(*whens, else_=Task.priority)
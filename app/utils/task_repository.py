@@ -0,0 +1,160 @@
+"""
+Task repository utilities for loading tasks with their relationships.
+Provides named loading profiles so that a list of tasks is loaded in a
+constant number of queries instead of one lazy load per task.
+"""
+
+from flask import abort
+from sqlalchemy import case, func
+from sqlalchemy.orm import joinedload, selectinload
+from app import db
+from app.models.task import Task, TaskSubtopic
+from app.models.task_history import TaskDailyRollup
+from app.models.curriculum import Subtopic
+
+# Eager-loading options for each way tasks are displayed:
+# - summary: plain task columns (pomodoro task picker)
+# - card: subject, task type and subtopic titles (dashboard cards, API responses)
+# - detail: card plus the task's and subtopics' topics (confidence prompts, task cards)
+# - calendar: subject plus each subtopic's topic, for grouping by topic
+LOADING_PROFILES = {
+    'summary': (),
+    'card': (
+        joinedload(Task.subject),
+        joinedload(Task.task_type),
+        selectinload(Task.subtopics).joinedload(TaskSubtopic.subtopic),
+    ),
+    'detail': (
+        joinedload(Task.subject),
+        joinedload(Task.task_type),
+        joinedload(Task.topic),
+        selectinload(Task.subtopics).joinedload(TaskSubtopic.subtopic).joinedload(Subtopic.topic),
+    ),
+    'calendar': (
+        joinedload(Task.subject),
+        selectinload(Task.subtopics).joinedload(TaskSubtopic.subtopic).joinedload(Subtopic.topic),
+    ),
+}
+
+class TaskRepository:
+    """Loads a user's tasks using a named loading profile."""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+
+    @staticmethod
+    def query(profile='card'):
+        """
+        Get a task query with the eager-loading options for a profile.
+
+        Args:
+            profile (str): Name of a profile in LOADING_PROFILES
+
+        Returns:
+            Query: Task query with loader options applied
+        """
+        if profile not in LOADING_PROFILES:
+            raise ValueError(f"Unknown task loading profile: {profile}")
+        return Task.query.options(*LOADING_PROFILES[profile])
+
+    def get_or_404(self, task_id, profile='detail'):
+        """
+        Get a task by ID with its relationships loaded, or abort with 404.
+
+        Ownership is left to the caller so it can answer 403 rather than 404.
+        """
+        task = self.query(profile).filter(Task.id == task_id).first()
+        if task is None:
+            abort(404)
+        return task
+
+    def active_for_day(self, day, profile='card'):
+        """Get the user's tasks due on a day that are neither completed nor skipped."""
+        return self.query(profile).filter(
+            Task.user_id == self.user_id,
+            Task.due_date == day,
+            Task.completed_at.is_(None),
+            Task.skipped_at.is_(None)
+        ).all()
+
+    def completed_for_day(self, day, limit=3, profile='card'):
+        """Get the user's most recently completed tasks due on a day."""
+        return self.query(profile).filter(
+            Task.user_id == self.user_id,
+            Task.due_date == day,
+            Task.completed_at.isnot(None)
+        ).order_by(Task.completed_at.desc()).limit(limit).all()
+
+    def due_between(self, start_date, end_date, profile='calendar'):
+        """Get the user's tasks due within a date range (inclusive)."""
+        return self.query(profile).filter(
+            Task.user_id == self.user_id,
+            Task.due_date.between(start_date, end_date)
+        ).all()
+
+    def recent(self, limit=10, profile='card'):
+        """Get the user's most recently created tasks."""
+        return self.query(profile).filter(
+            Task.user_id == self.user_id
+        ).order_by(Task.created_at.desc()).limit(limit).all()
+
+    def completion_counts(self, start_date=None, end_date=None, by_subject=False):
+        """
+        Count the user's tasks and completed tasks, including compacted ones.
+
+        Runs one aggregate query on the remaining tasks and one on the daily
+        rollups of compacted tasks (see app/utils/task_compaction.py).
+
+        Args:
+            start_date (date): Only count tasks due on or after this date
+            end_date (date): Only count tasks due on or before this date
+            by_subject (bool): Group the counts by subject
+
+        Returns:
+            tuple or dict: (total, completed), or {subject_id: (total, completed)}
+                when grouped by subject
+        """
+        # (model, its day column, total, completed) for remaining and compacted tasks
+        sources = (
+            (Task, Task.due_date, func.count(Task.id), func.sum(case((Task.completed_at.isnot(None), 1), else_=0))),
+            (TaskDailyRollup, TaskDailyRollup.day, func.sum(TaskDailyRollup.tasks), func.sum(TaskDailyRollup.completed)),
+        )
+
+        counts = {}
+        for model, day_column, total_column, completed_column in sources:
+            subject_column = model.subject_id if by_subject else db.null()
+            query = db.session.query(subject_column, total_column, completed_column).filter(model.user_id == self.user_id)
+            if start_date is not None:
+                query = query.filter(day_column >= start_date)
+            if end_date is not None:
+                query = query.filter(day_column <= end_date)
+            if by_subject:
+                query = query.group_by(model.subject_id)
+
+            for subject_id, total, done in query.all():
+                subject_total, subject_done = counts.get(subject_id, (0, 0))
+                counts[subject_id] = (subject_total + (total or 0), subject_done + (done or 0))
+
+        if by_subject:
+            return counts
+        return counts.get(None, (0, 0))
+
+    def reload(self, tasks, profile='card'):
+        """
+        Reload freshly generated tasks with a profile's relationships.
+
+        Args:
+            tasks (list): Task objects, e.g. returned by the task generator
+
+        Returns:
+            list: The same tasks in the same order, eagerly loaded
+        """
+        task_ids = [task.id for task in tasks if task is not None]
+        if not task_ids:
+            return []
+
+        loaded = {
+            task.id: task
+            for task in self.query(profile).filter(Task.id.in_(task_ids)).populate_existing().all()
+        }
+        return [loaded[task_id] for task_id in task_ids if task_id in loaded]
@@ -5,8 +5,10 @@ Handles subtopic selection and task subtopic management.
 
 from app import db
 from app.models.task import TaskSubtopic
+from app.utils.tracing import span
+from app.utils.unit_of_work import commit as commit_changes
 
-def add_subtopics_to_task(task, parent_topic, user, max_duration=None):
+def add_subtopics_to_task(task, parent_topic, user, max_duration=None, commit=True):
     """
     Add subtopics to a task based on estimated duration and confidence levels.
     Prioritizes subtopics with lower confidence levels using the (7 - confidence_level)² formula.
@@ -18,6 +20,7 @@ def add_subtopics_to_task(task, parent_topic, user, max_duration=None):
         user: User object
         max_duration: Maximum duration (in minutes) for the combined subtopics.
                      If None, uses the user's study hours preference.
+        commit: Commit the changes; otherwise only flush them for the caller to commit
         
     Returns:
         The updated task object with subtopics added.
@@ -70,10 +73,12 @@ def add_subtopics_to_task(task, parent_topic, user, max_duration=None):
         subtopic_ids = [s.id for s in subtopics]
         
         # Query confidence data for all subtopics at once
-        confidence_data = SubtopicConfidence.query.filter(
-            SubtopicConfidence.user_id == user.id,
-            SubtopicConfidence.subtopic_id.in_(subtopic_ids)
-        ).all()
+        with span('task_generation.subtopic_confidence_load', subtopics=len(subtopic_ids)) as load_span:
+            confidence_data = SubtopicConfidence.query.filter(
+                SubtopicConfidence.user_id == user.id,
+                SubtopicConfidence.subtopic_id.in_(subtopic_ids)
+            ).all()
+            load_span.set(confidence_rows=len(confidence_data))
         
         # Create dictionary for quick lookup
         confidence_dict = {conf.subtopic_id: conf.confidence_level for conf in confidence_data}
@@ -125,14 +130,20 @@ def add_subtopics_to_task(task, parent_topic, user, max_duration=None):
                 break
     
     # Commit changes
-    db.session.commit()
+    if commit:
+        with span('task_generation.commit', subtopics_added=len(added_subtopics)):
+            commit_changes()
     
     # Update task description with subtopics
     update_task_description_with_subtopics(task, added_subtopics)
     
     # Force the total duration to match the target duration, even if subtopics don't add up exactly
     task.total_duration = max_duration
-    db.session.commit()
+    if commit:
+        with span('task_generation.commit'):
+            commit_changes()
+    else:
+        db.session.flush()
     
     return task
 
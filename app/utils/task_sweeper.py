@@ -0,0 +1,116 @@
+"""
+Stale task sweeper utilities.
+Provides a bulk sweep that retires overdue open tasks across all users and
+generates their replacements, one transaction per chunk of users, for the
+`flask sweep-stale-tasks` command or a scheduler running it.
+"""
+
+import time
+from datetime import datetime, timedelta
+from itertools import groupby
+from app import db
+from app.models.task import Task
+from app.utils.optimization_batch import db_batch_process
+from app.utils.task_card_utils import refresh_task_cards
+
+def stale_task_criteria(today, grace_days=0):
+    """Filters selecting open tasks due more than `grace_days` days before today."""
+    return (
+        Task.due_date < today - timedelta(days=grace_days),
+        Task.completed_at.is_(None),
+        Task.skipped_at.is_(None)
+    )
+
+def _sweep_chunk(rows, today, replace):
+    """
+    Retire one chunk of stale tasks and generate their replacements, without committing.
+
+    Every user gets one task due today per subject they had stale tasks in,
+    unless they already have an open task for that subject today.
+
+    Returns:
+        dict: Counts for the chunk
+    """
+    from app.models.user import User
+    from app.utils.task_generator import generate_task_for_subject
+
+    now = datetime.utcnow()
+    db.session.execute(
+        db.update(Task).where(Task.id.in_([row.id for row in rows]))
+        .values(skipped_at=now).execution_options(synchronize_session=False)
+    )
+
+    subjects_by_user = {
+        user_id: {row.subject_id for row in user_rows}
+        for user_id, user_rows in groupby(rows, key=lambda row: row.user_id)
+    }
+    new_task_ids = []
+    if replace:
+        users = User.query.filter(User.id.in_(subjects_by_user)).all()
+        planned = {
+            (row.user_id, row.subject_id) for row in db.session.execute(
+                db.select(Task.user_id, Task.subject_id).where(
+                    Task.user_id.in_(subjects_by_user), Task.due_date == today,
+                    Task.completed_at.is_(None), Task.skipped_at.is_(None)
+                )
+            )
+        }
+        for user in users:
+            for subject_id in sorted(subjects_by_user[user.id]):
+                if (user.id, subject_id) in planned:
+                    continue
+                task = generate_task_for_subject(user, subject_id, commit=False, due_date=today)
+                if task:
+                    new_task_ids.append(task.id)
+
+        # Writes the cards and commits the chunk as one transaction
+        refresh_task_cards(new_task_ids)
+
+    return {'users': len(subjects_by_user), 'tasks_retired': len(rows), 'tasks_generated': len(new_task_ids)}
+
+def sweep_stale_tasks(today=None, grace_days=0, user_ids=None, batch_size=500, limit=None,
+                      replace=True, max_retries=3):
+    """
+    Retire overdue open tasks and generate replacements.
+
+    Stale tasks are found with one query on the active-task (user, due date)
+    index and read in keyset batches ordered by user, so each batch is a
+    chunk of users. A chunk's tasks are marked skipped with one UPDATE, its
+    replacements are generated and the chunk is committed once; a chunk
+    that fails is rolled back and retried (see db_batch_process).
+
+    Args:
+        today (date): Day to sweep for, defaults to today (UTC)
+        grace_days (int): Only retire tasks overdue by more than this many days
+        user_ids (list): Only sweep these users
+        batch_size (int): Stale tasks per chunk
+        limit (int): Maximum number of tasks to retire
+        replace (bool): Generate replacement tasks
+        max_retries (int): Retries of a failed chunk
+
+    Returns:
+        dict: Throughput report with users, tasks retired and generated,
+            chunks, duration and tasks per second
+    """
+    today = today or datetime.utcnow().date()
+    query = db.session.query(Task.id, Task.user_id, Task.subject_id).filter(*stale_task_criteria(today, grace_days))
+    if user_ids is not None:
+        query = query.filter(Task.user_id.in_(user_ids))
+
+    started = time.perf_counter()
+    chunks = db_batch_process(
+        query, batch_size=batch_size, key=Task.user_id, limit=limit, max_retries=max_retries,
+        process_func=lambda rows: _sweep_chunk(rows, today, replace)
+    )
+    duration = time.perf_counter() - started
+
+    retired = sum(chunk['tasks_retired'] for chunk in chunks)
+    return {
+        'date': today.isoformat(),
+        'chunks': len(chunks),
+        'users': sum(chunk['users'] for chunk in chunks),
+        'tasks_retired': retired,
+        'tasks_generated': sum(chunk['tasks_generated'] for chunk in chunks),
+        'duration_s': round(duration, 3),
+        'tasks_per_second': round(retired / duration, 1) if duration else 0.0
+    }
@@ -0,0 +1,312 @@
+"""
+Tracing utilities for timing the stages of a request.
+Provides nested spans with attributes, tracked through contextvars, for the
+task generation, analytics and confidence paths. Sampled requests are
+exported as one JSON line per trace, and the traces can be summarised into
+per-endpoint critical-path breakdowns.
+"""
+
+import functools
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from flask import g, request
+
+_current_span = ContextVar('current_span', default=None)
+
+class Span:
+    """A timed operation with attributes and child spans."""
+
+    __slots__ = ('name', 'attributes', 'start', 'end', 'children')
+
+    def __init__(self, name, attributes=None, start=None, end=None):
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.start = time.perf_counter() if start is None else start
+        self.end = end
+        self.children = []
+
+    def set(self, **attributes):
+        """Add attributes, e.g. counts known only once the work is done."""
+        self.attributes.update(attributes)
+
+    @property
+    def duration(self):
+        return ((self.end or time.perf_counter()) - self.start)
+
+    def to_dict(self, origin):
+        """Serialize the span tree with times in milliseconds from `origin`."""
+        return {
+            'name': self.name,
+            'start_ms': round((self.start - origin) * 1000.0, 3),
+            'duration_ms': round(self.duration * 1000.0, 3),
+            'attributes': self.attributes,
+            'children': [child.to_dict(origin) for child in self.children]
+        }
+
+class _NoopSpan:
+    """Stands in for a span when the current request is not being traced."""
+
+    def set(self, **attributes):
+        pass
+
+NOOP_SPAN = _NoopSpan()
+
+def current_span():
+    """Get the innermost open span, or a no-op span outside a trace."""
+    return _current_span.get() or NOOP_SPAN
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Time a block as a child of the current span.
+
+    Outside a sampled trace this costs one context variable lookup.
+
+    Args:
+        name (str): Span name, dotted by area (e.g. 'confidence.load_rows')
+        **attributes: Span attributes
+
+    Yields:
+        Span: The new span, or a no-op span when not tracing
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield NOOP_SPAN
+        return
+
+    child = Span(name, attributes)
+    parent.children.append(child)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except Exception as e:
+        child.set(error=type(e).__name__)
+        raise
+    finally:
+        child.end = time.perf_counter()
+        _current_span.reset(token)
+
+def traced(name=None):
+    """Decorator running a function inside a span named after it."""
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def record_span(name, start, end, **attributes):
+    """
+    Add an already finished span to the current span.
+
+    Spans finished in the meantime under the same parent that started within
+    the interval become its children, so a stage recorded after the fact
+    still contains the spans it ran.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return
+
+    finished = Span(name, attributes, start=start, end=end)
+    finished.children = [child for child in parent.children if child.start >= start]
+    parent.children = [child for child in parent.children if child.start < start]
+    parent.children.append(finished)
+
+class Stopwatch:
+    """Records consecutive stages of a pipeline as spans, without nesting blocks."""
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self._last = time.perf_counter()
+
+    def lap(self, stage, **attributes):
+        """
+        Record the time since the previous lap (or creation) as a stage span.
+
+        Returns:
+            float: Stage duration in seconds
+        """
+        now = time.perf_counter()
+        record_span(f"{self.prefix}.{stage}", self._last, now, **attributes)
+        duration = now - self._last
+        self._last = now
+        return duration
+
+class TraceWriter:
+    """Appends finished traces to a JSON-lines file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    def write(self, root):
+        line = json.dumps({
+            'timestamp': datetime.utcnow().isoformat(),
+            **root.to_dict(root.start)
+        }, default=str)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as trace_file:
+                trace_file.write(line + '\n')
+
+def start_trace(name, **attributes):
+    """
+    Open a root span in the current context.
+
+    Returns:
+        tuple: (root Span, token for finish_trace)
+    """
+    root = Span(name, attributes)
+    return root, _current_span.set(root)
+
+def finish_trace(root, token, writer=None):
+    """Close a root span opened by start_trace and export it."""
+    root.end = time.perf_counter()
+    _current_span.reset(token)
+    if writer is not None:
+        writer.write(root)
+
+def trace_file_path(app):
+    """Get the configured trace file path."""
+    return app.config.get('TRACE_FILE') or os.path.join(app.instance_path, 'traces.jsonl')
+
+def init_tracing(app):
+    """
+    Trace a sample of requests when TRACE_SAMPLE_RATE is above zero.
+
+    Args:
+        app: Flask app instance
+
+    Returns:
+        TraceWriter: The trace exporter, or None when tracing is off
+    """
+    sample_rate = app.config.get('TRACE_SAMPLE_RATE', 0.0)
+    if sample_rate <= 0:
+        return None
+
+    writer = TraceWriter(trace_file_path(app))
+    app.extensions['trace_writer'] = writer
+
+    @app.before_request
+    def start_request_trace():
+        if random.random() < sample_rate:
+            g._trace = start_trace(request.endpoint or 'unmatched', method=request.method, path=request.path)
+
+    @app.after_request
+    def annotate_request_trace(response):
+        trace = g.get('_trace')
+        if trace is not None:
+            from flask_login import current_user
+            trace[0].set(status=response.status_code)
+            if current_user.is_authenticated:
+                trace[0].set(user_id=current_user.id)
+        return response
+
+    @app.teardown_request
+    def finish_request_trace(exception=None):
+        trace = g.pop('_trace', None)
+        if trace is None:
+            return
+        try:
+            finish_trace(*trace, writer=writer)
+        except (OSError, ValueError) as e:
+            app.logger.error(f"Error exporting trace: {str(e)}")
+
+    return writer
+
+def critical_path(trace):
+    """
+    Follow the longest child at each level of an exported trace.
+
+    Args:
+        trace (dict): One exported trace
+
+    Returns:
+        list: (span name, duration_ms, self_ms) from the root down
+    """
+    path = []
+    node = trace
+    while node is not None:
+        children = node.get('children', [])
+        self_ms = node['duration_ms'] - sum(child['duration_ms'] for child in children)
+        path.append((node['name'], node['duration_ms'], max(self_ms, 0.0)))
+        node = max(children, key=lambda child: child['duration_ms']) if children else None
+    return path
+
+def summarize_traces(path, endpoint=None):
+    """
+    Summarise exported traces per endpoint.
+
+    Args:
+        path (str): Trace file
+        endpoint (str): Only summarise traces of this endpoint
+
+    Returns:
+        dict: {endpoint: {'traces', 'mean_ms', 'spans', 'critical_path'}} where
+            'spans' maps each span name to its count and mean total and self
+            time per trace, and 'critical_path' is the most common critical
+            path with mean durations of its spans
+    """
+    summaries = {}
+    if not os.path.exists(path):
+        return summaries
+
+    with open(path, encoding='utf-8') as trace_file:
+        for line in trace_file:
+            try:
+                trace = json.loads(line)
+            except ValueError:
+                continue
+            if endpoint and trace['name'] != endpoint:
+                continue
+
+            summary = summaries.setdefault(trace['name'], {
+                'traces': 0, 'total_ms': 0.0, 'spans': {}, 'paths': Counter(), 'path_times': {}
+            })
+            summary['traces'] += 1
+            summary['total_ms'] += trace['duration_ms']
+
+            nodes = list(trace['children'])
+            while nodes:
+                node = nodes.pop()
+                nodes.extend(node['children'])
+                entry = summary['spans'].setdefault(node['name'], {'count': 0, 'total_ms': 0.0, 'self_ms': 0.0})
+                entry['count'] += 1
+                entry['total_ms'] += node['duration_ms']
+                entry['self_ms'] += max(node['duration_ms'] - sum(c['duration_ms'] for c in node['children']), 0.0)
+
+            steps = critical_path(trace)
+            names = tuple(name for name, _, _ in steps)
+            summary['paths'][names] += 1
+            times = summary['path_times'].setdefault(names, [0.0] * len(names))
+            for index, (_, duration_ms, _) in enumerate(steps):
+                times[index] += duration_ms
+
+    for summary in summaries.values():
+        traces = summary['traces']
+        names, count = summary['paths'].most_common(1)[0]
+        summary['critical_path'] = [
+            (name, total / count) for name, total in zip(names, summary['path_times'][names])
+        ]
+        summary['mean_ms'] = summary.pop('total_ms') / traces
+        summary['spans'] = {
+            name: {
+                'count': entry['count'],
+                'mean_ms': entry['total_ms'] / traces,
+                'mean_self_ms': entry['self_ms'] / traces
+            }
+            for name, entry in summary['spans'].items()
+        }
+        del summary['paths'], summary['path_times']
+
+    return summaries
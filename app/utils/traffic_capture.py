@@ -0,0 +1,139 @@
+"""
+Traffic capture utilities for recording production request patterns.
+Provides an opt-in recorder that appends the method, path, JSON body,
+anonymised user and timing of task, subtopic, confidence and page requests
+to a compact JSON-lines log that the replay tool can re-run locally.
+"""
+
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+from flask import g, request
+
+# Short keys keep the log compact:
+# t: start time (epoch seconds), m: method, p: path with query string,
+# b: JSON body, u: anonymised user, s: status, ms: duration
+DEFAULT_CAPTURE_PREFIXES = ('/api/tasks/', '/api/subtopics/', '/api/confidence/')
+
+def anonymise_user(user_id, secret):
+    """
+    Replace a user ID with a stable pseudonym.
+
+    The same user always gets the same pseudonym for a given secret, so a
+    session can be replayed, but the ID cannot be recovered from the log.
+
+    Returns:
+        str: 12 hex characters, or None for anonymous requests
+    """
+    if user_id is None:
+        return None
+    digest = hmac.new(secret.encode('utf-8'), str(user_id).encode('utf-8'), hashlib.sha256)
+    return digest.hexdigest()[:12]
+
+class TrafficRecorder:
+    """Appends captured requests to a JSON-lines file."""
+
+    def __init__(self, path, prefixes=DEFAULT_CAPTURE_PREFIXES, secret=''):
+        self.path = path
+        self.prefixes = tuple(prefixes)
+        self.secret = secret
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    def should_capture(self, method, path, endpoint):
+        """Capture the configured API prefixes and GET requests for pages."""
+        if path.startswith(self.prefixes):
+            return True
+        return method == 'GET' and endpoint is not None and endpoint.startswith('main.')
+
+    def record(self, started, method, path, body, user_id, status, duration):
+        entry = {
+            't': round(started, 3),
+            'm': method,
+            'p': path,
+            'u': anonymise_user(user_id, self.secret),
+            's': status,
+            'ms': round(duration * 1000.0, 2)
+        }
+        if body is not None:
+            entry['b'] = body
+
+        line = json.dumps(entry, separators=(',', ':'), default=str)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as capture_file:
+                capture_file.write(line + '\n')
+
+def traffic_capture_path(app):
+    """Get the configured capture file path."""
+    return app.config.get('TRAFFIC_CAPTURE_FILE') or os.path.join(app.instance_path, 'traffic.jsonl')
+
+def init_traffic_capture(app):
+    """
+    Record matching requests when TRAFFIC_CAPTURE is set.
+
+    Args:
+        app: Flask app instance
+
+    Returns:
+        TrafficRecorder: The recorder, or None when capture is off
+    """
+    if not app.config.get('TRAFFIC_CAPTURE'):
+        return None
+
+    recorder = TrafficRecorder(
+        traffic_capture_path(app),
+        prefixes=app.config.get('TRAFFIC_CAPTURE_PREFIXES', DEFAULT_CAPTURE_PREFIXES),
+        secret=app.config['SECRET_KEY']
+    )
+    app.extensions['traffic_recorder'] = recorder
+
+    @app.before_request
+    def start_traffic_capture():
+        g._capture_started = (time.time(), time.perf_counter())
+
+    @app.after_request
+    def capture_request(response):
+        started = g.get('_capture_started')
+        if started is None or not recorder.should_capture(request.method, request.path, request.endpoint):
+            return response
+
+        from flask_login import current_user
+        user_id = current_user.id if current_user.is_authenticated else None
+        path = request.full_path.rstrip('?')
+        body = request.get_json(silent=True) if request.is_json else None
+
+        try:
+            recorder.record(
+                started[0], request.method, path, body, user_id,
+                response.status_code, time.perf_counter() - started[1]
+            )
+        except OSError as e:
+            app.logger.error(f"Error capturing request: {str(e)}")
+
+        return response
+
+    return recorder
+
+def load_capture(path):
+    """
+    Read a capture file, grouping requests into per-user sessions.
+
+    Returns:
+        dict: {anonymised user: [entries in time order]}; anonymous requests
+            are grouped under None
+    """
+    sessions = {}
+    with open(path, encoding='utf-8') as capture_file:
+        for line in capture_file:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            sessions.setdefault(entry.get('u'), []).append(entry)
+
+    for entries in sessions.values():
+        entries.sort(key=lambda entry: entry['t'])
+    return sessions
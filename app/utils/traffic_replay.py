@@ -0,0 +1,197 @@
+"""
+Traffic replay utilities for performance regression testing.
+Provides a tool that re-runs captured sessions against the local app with
+concurrent virtual users at a chosen speed-up, reports latency percentiles
+and query counts per endpoint, and compares reports from two revisions.
+"""
+
+import math
+import subprocess
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from app import db
+from app.utils.query_instrumentation import track_queries
+from app.utils.unit_of_work import commit
+
+REPLAY_PASSWORD = 'replay-password'
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(fraction * len(ordered)) - 1, 0)
+    return ordered[rank]
+
+def endpoint_key(app, method, path):
+    """Group a concrete path under its route, e.g. 'POST /api/tasks/complete/<int:task_id>'."""
+    try:
+        rule, _ = app.url_map.bind('localhost').match(path.split('?', 1)[0], method=method, return_rule=True)
+        return f"{method} {rule.rule}"
+    except Exception:
+        return f"{method} {path.split('?', 1)[0]}"
+
+def git_revision():
+    """Get the short hash of the checked-out revision, or None outside a git checkout."""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def ensure_accounts(prefix, count, password):
+    """Create (or reuse) numbered local accounts for virtual users to log in as."""
+    from app.models.user import User
+
+    usernames = [f"{prefix}_{index}" for index in range(count)]
+    existing = {user.username for user in User.query.filter(User.username.in_(usernames)).all()}
+    for username in usernames:
+        if username not in existing:
+            db.session.add(User(username, password))
+    commit()
+    return usernames
+
+def replay(app, sessions, users=None, speedup=1.0):
+    """
+    Re-run captured sessions with one thread per virtual user.
+
+    Each virtual user logs in as its own local account and replays one
+    captured session, keeping the original spacing between requests divided
+    by `speedup` (0 replays as fast as possible). When there are more virtual
+    users than sessions, sessions are reused. IDs in the captured paths refer
+    to the recorded database, so replay against a copy of it or expect 4xx
+    answers for the affected endpoints.
+
+    Args:
+        app: Flask app instance to send the requests to
+        sessions (dict): Result of load_capture()
+        users (int): Number of virtual users, defaults to one per session
+        speedup (float): Time compression factor
+
+    Returns:
+        dict: Report with per-endpoint latency percentiles and query counts
+    """
+    session_list = [entries for entries in sessions.values() if entries]
+    if not session_list:
+        raise ValueError('The capture contains no requests')
+
+    users = users or len(session_list)
+    origin = min(entries[0]['t'] for entries in session_list)
+
+    with app.app_context():
+        usernames = ensure_accounts('replay_user', users, REPLAY_PASSWORD)
+
+    results = []
+    results_lock = threading.Lock()
+    barrier = threading.Barrier(users + 1)
+    start = {}
+
+    def virtual_user(index):
+        entries = session_list[index % len(session_list)]
+        client = app.test_client()
+        try:
+            if entries[0].get('u') is not None:
+                client.post('/login', data={'username': usernames[index], 'password': REPLAY_PASSWORD})
+        except Exception:
+            # Release the other virtual users instead of leaving them waiting
+            barrier.abort()
+            raise
+
+        barrier.wait()
+        for entry in entries:
+            if speedup > 0:
+                delay = start['at'] + (entry['t'] - origin) / speedup - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+            began = time.perf_counter()
+            with track_queries() as stats:
+                response = client.open(entry['p'], method=entry['m'], json=entry.get('b'))
+            latency = time.perf_counter() - began
+
+            with results_lock:
+                results.append((endpoint_key(app, entry['m'], entry['p']), latency, stats.count, response.status_code))
+
+    threads = [threading.Thread(target=virtual_user, args=(index,)) for index in range(users)]
+    for thread in threads:
+        thread.start()
+    start['at'] = time.perf_counter()
+    barrier.wait()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start['at']
+
+    with app.app_context():
+        database = db.engine.dialect.name
+
+    return build_report(results, {
+        'revision': git_revision(),
+        'created_at': datetime.utcnow().isoformat(),
+        'database': database,
+        'virtual_users': users,
+        'speedup': speedup,
+        'duration_s': round(elapsed, 3)
+    })
+
+def build_report(results, meta):
+    """
+    Aggregate replayed requests by endpoint.
+
+    Args:
+        results (list): (endpoint, latency seconds, query count, status) tuples
+        meta (dict): Run details copied into the report
+
+    Returns:
+        dict: meta plus 'requests' and 'endpoints'
+    """
+    grouped = {}
+    for endpoint, latency, queries, status in results:
+        group = grouped.setdefault(endpoint, {'latencies': [], 'queries': [], 'statuses': Counter()})
+        group['latencies'].append(latency * 1000.0)
+        group['queries'].append(queries)
+        group['statuses'][str(status)] += 1
+
+    endpoints = {}
+    for endpoint, group in sorted(grouped.items()):
+        latencies = group['latencies']
+        endpoints[endpoint] = {
+            'count': len(latencies),
+            'statuses': dict(group['statuses']),
+            'p50_ms': round(percentile(latencies, 0.50), 2),
+            'p90_ms': round(percentile(latencies, 0.90), 2),
+            'p95_ms': round(percentile(latencies, 0.95), 2),
+            'p99_ms': round(percentile(latencies, 0.99), 2),
+            'max_ms': round(max(latencies), 2),
+            'mean_queries': round(sum(group['queries']) / len(group['queries']), 2),
+            'max_queries': max(group['queries'])
+        }
+
+    return {**meta, 'requests': len(results), 'endpoints': endpoints}
+
+def diff_reports(base, head):
+    """
+    Compare two replay reports endpoint by endpoint.
+
+    Returns:
+        list: Dicts with the endpoint, the base and head p50/p95/mean queries
+            (None where an endpoint is missing) and the relative p95 change
+    """
+    rows = []
+    for endpoint in sorted(set(base['endpoints']) | set(head['endpoints'])):
+        before = base['endpoints'].get(endpoint)
+        after = head['endpoints'].get(endpoint)
+        row = {'endpoint': endpoint}
+        for prefix, stats in (('base', before), ('head', after)):
+            row[f'{prefix}_p50_ms'] = stats['p50_ms'] if stats else None
+            row[f'{prefix}_p95_ms'] = stats['p95_ms'] if stats else None
+            row[f'{prefix}_queries'] = stats['mean_queries'] if stats else None
+
+        row['p95_change'] = (
+            (after['p95_ms'] - before['p95_ms']) / before['p95_ms']
+            if before and after and before['p95_ms'] else None
+        )
+        rows.append(row)
+    return rows
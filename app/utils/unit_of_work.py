@@ -0,0 +1,150 @@
+"""
+Unit of work utilities for request-scoped transactions.
+Provides one commit per request: code that commits through commit() only
+flushes while a request is running, and the request's changes are
+committed together when it succeeds or rolled back when it fails.
+Outside requests (CLI commands, scripts) commit() commits.
+"""
+
+from contextlib import contextmanager
+from flask import g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app import db
+
+_listeners_installed = False
+
+def in_unit_of_work():
+    """Whether the current application context belongs to a request running a unit of work."""
+    return has_app_context() and g.get('_unit_of_work') is not None
+
+def has_staged_writes():
+    """Whether the current request's unit of work has written anything yet."""
+    if not in_unit_of_work():
+        return False
+    session = db.session()
+    return bool(session.info.get('unit_of_work_written') or session.new or session.dirty or session.deleted)
+
+def commit():
+    """
+    Commit the session, or stage the changes for the request's commit.
+
+    Inside a request the changes are flushed, so they get IDs, constraint
+    errors surface at the call site and later queries see them.
+    """
+    if in_unit_of_work():
+        db.session.flush()
+    else:
+        db.session.commit()
+
+def rollback():
+    """Roll back the session, or leave it to the failing request to roll back everything."""
+    if not in_unit_of_work():
+        db.session.rollback()
+
+@contextmanager
+def savepoint():
+    """
+    Run a block in a SAVEPOINT inside a request, or as its own transaction outside one.
+
+    If the block raises, only its changes are rolled back and the rest of
+    the request's work stays staged. Before the request has staged anything
+    there is nothing to keep, so the block runs in the request's transaction
+    and a failure rolls that back; on SQLite this also keeps the transaction
+    from starting, and taking its read snapshot, before the first write.
+    """
+    if not in_unit_of_work():
+        yield
+    elif has_staged_writes():
+        with db.session.begin_nested():
+            yield
+    else:
+        try:
+            yield
+        except Exception:
+            db.session.rollback()
+            raise
+
+def on_rollback(callback):
+    """Call `callback()` if the current request's unit of work is rolled back."""
+    if in_unit_of_work():
+        g._unit_of_work.append(callback)
+
+def _roll_back(app, callbacks):
+    db.session.rollback()
+    for callback in callbacks:
+        try:
+            callback()
+        except Exception as e:
+            app.logger.error(f"Error in unit of work rollback callback: {str(e)}")
+
+def _mark_written(session, *args):
+    session.info['unit_of_work_written'] = True
+
+def _mark_bulk_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _mark_written(orm_execute_state.session)
+
+def _install_listeners():
+    """Track which sessions wrote anything, once per process."""
+    global _listeners_installed
+    if _listeners_installed:
+        return
+    event.listen(Session, 'after_flush', _mark_written)
+    event.listen(Session, 'do_orm_execute', _mark_bulk_write)
+    _listeners_installed = True
+
+def _finish(app, succeeded):
+    """Commit or roll back the current request's unit of work, once."""
+    callbacks = g.get('_unit_of_work')
+    if callbacks is None:
+        return
+    written = has_staged_writes()
+    del g._unit_of_work
+    db.session().info.pop('unit_of_work_written', None)
+    if not succeeded:
+        _roll_back(app, callbacks)
+        return
+    if not written:
+        # Read-only requests are ended by the session teardown, without a commit
+        return
+    try:
+        db.session.commit()
+    except Exception:
+        _roll_back(app, callbacks)
+        raise
+
+def init_unit_of_work(app):
+    """
+    Commit each request's changes once, when it finishes.
+
+    Responses below 400 commit, if the request wrote anything; error
+    responses and unhandled exceptions roll back. The commit happens before
+    the response is sent, so a client that reads its own write in the next
+    request sees it.
+
+    Args:
+        app: Flask app instance
+    """
+    if not app.config.get('UNIT_OF_WORK', True):
+        return app
+
+    _install_listeners()
+
+    @app.before_request
+    def begin_unit_of_work():
+        g._unit_of_work = []
+        db.session().info.pop('unit_of_work_written', None)
+
+    @app.after_request
+    def commit_unit_of_work(response):
+        # A failed commit is rolled back and raised, failing the request
+        _finish(app, response.status_code < 400)
+        return response
+
+    @app.teardown_request
+    def rollback_unit_of_work(exception=None):
+        # Only still pending when the request raised before after_request
+        _finish(app, False)
+
+    return app
@@ -0,0 +1,139 @@
+import os
+from datetime import datetime
+import pytest
+from app import create_app, db
+from app.utils.synthetic_data import SCALES, generate_synthetic_data
+from app.utils.traffic_replay import git_revision
+from benchmarks.harness import BenchmarkRun, load_history, measure, save_history
+from config.config import TestingConfig
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEED = 42
+RUNS = pytest.StashKey()
+
+def pytest_addoption(parser):
+    group = parser.getgroup('benchmarks')
+    group.addoption('--bench-scale', default='small',
+                    help='Comma-separated synthetic scales to run: small, medium, large.')
+    group.addoption('--bench-history', default=os.path.join(ROOT, 'instance', 'benchmark_history.json'),
+                    help='JSON file results are appended to and compared against.')
+    group.addoption('--bench-threshold', type=float, default=0.25,
+                    help='Fail when a median and the fastest round are this fraction slower than the baseline.')
+    group.addoption('--bench-rounds', type=int, default=10, help='Timed calls per benchmark.')
+    group.addoption('--bench-rebuild', action='store_true', help='Regenerate the synthetic datasets.')
+    group.addoption('--bench-no-save', action='store_true', help='Compare without appending to the history.')
+
+def pytest_configure(config):
+    config.stash[RUNS] = []
+
+def pytest_generate_tests(metafunc):
+    """Run every benchmark on SQLite, plus PostgreSQL when BENCH_POSTGRES_URI is set."""
+    if 'bench_target' not in metafunc.fixturenames:
+        return
+    databases = ['sqlite'] + (['postgresql'] if os.environ.get('BENCH_POSTGRES_URI') else [])
+    scales = [scale.strip() for scale in metafunc.config.getoption('bench_scale').split(',')]
+    targets = [f"{database}/{scale}" for database in databases for scale in scales]
+    metafunc.parametrize('bench_target', targets, indirect=True, scope='session')
+
+def load_dataset(scale, rebuild):
+    """Reuse the synthetic dataset already in the database, or regenerate it."""
+    db.create_all()
+    loaded = db.session.execute(
+        db.text("SELECT COUNT(*) FROM users WHERE username LIKE 'synth_user_%'")
+    ).scalar()
+    # A dataset built before a model gained a column is rebuilt
+    inspector = db.inspect(db.engine)
+    outdated = any(
+        {column.name for column in table.columns} - {column['name'] for column in inspector.get_columns(table.name)}
+        for table in db.metadata.sorted_tables
+    )
+    if rebuild or outdated or loaded != SCALES[scale]['users']:
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+        generate_synthetic_data(seed=SEED, scale=scale)
+
+@pytest.fixture(scope='session')
+def bench_target(request):
+    """An app on a loaded synthetic dataset, with the most active user to benchmark as."""
+    database, scale = request.param.split('/')
+    if database == 'sqlite':
+        uri = f"sqlite:///{os.path.join(ROOT, 'instance', 'benchmarks', f'{scale}.db')}"
+        os.makedirs(os.path.join(ROOT, 'instance', 'benchmarks'), exist_ok=True)
+    else:
+        uri = os.environ['BENCH_POSTGRES_URI']
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI', uri)
+        app = create_app('testing')
+    app.config['WTF_CSRF_ENABLED'] = False
+
+    config = request.config
+    history_path = config.getoption('bench_history')
+    run = BenchmarkRun(request.param, load_history(history_path), config.getoption('bench_threshold'), {
+        'revision': git_revision(),
+        'created_at': datetime.utcnow().isoformat()
+    })
+
+    with app.app_context():
+        load_dataset(scale, config.getoption('bench_rebuild'))
+        user_id = db.session.execute(db.text(
+            "SELECT user_id FROM tasks GROUP BY user_id ORDER BY COUNT(*) DESC, user_id LIMIT 1"
+        )).scalar()
+        last_task_id = db.session.execute(db.text("SELECT MAX(id) FROM tasks")).scalar()
+        db.session.remove()
+
+    yield {'app': app, 'user_id': user_id, 'run': run, 'rounds': config.getoption('bench_rounds')}
+
+    with app.app_context():
+        # Drop the tasks the benchmarks generated so the dataset stays the same size
+        db.session.execute(db.text("DELETE FROM task_subtopics WHERE task_id > :id"), {'id': last_task_id})
+        db.session.execute(db.text("DELETE FROM tasks WHERE id > :id"), {'id': last_task_id})
+        db.session.commit()
+        db.session.remove()
+        db.engine.dispose()
+
+    config.stash[RUNS].append(run)
+    if run.results and not config.getoption('bench_no_save'):
+        history = load_history(history_path)
+        history.append(run.to_dict())
+        save_history(history_path, history)
+
+@pytest.fixture
+def bench_app(bench_target):
+    """The benchmark app with an application context pushed."""
+    with bench_target['app'].app_context():
+        yield bench_target['app']
+
+@pytest.fixture
+def bench_user(bench_app, bench_target):
+    from app.models.user import User
+    return db.session.get(User, bench_target['user_id'])
+
+@pytest.fixture
+def bench(bench_app, bench_target):
+    """Time a callable, record it in the run and fail on a regression against the history.
+
+    Usage:
+        result = bench('select_weighted_topic', lambda: select_weighted_topic(topics, user, title))
+    """
+    def _bench(name, func, rounds=None):
+        run = bench_target['run']
+        result = measure(func, rounds=rounds or bench_target['rounds'])
+        reasons = run.record(name, result)
+        if reasons:
+            pytest.fail(f"{name} on {run.target} regressed: {'; '.join(reasons)}")
+        return result
+
+    return _bench
+
+def pytest_terminal_summary(terminalreporter, config):
+    for run in config.stash.get(RUNS, []):
+        terminalreporter.section(f"benchmarks {run.target}")
+        terminalreporter.write_line(f"{'benchmark':<40} {'rounds':>6} {'median':>9} {'p95':>9} {'queries':>8} {'peak KB':>9}")
+        for name, result in run.results.items():
+            terminalreporter.write_line(
+                f"{name:<40} {result['rounds']:>6} {result['median_ms']:>9.2f} {result['p95_ms']:>9.2f} "
+                f"{result['queries']:>8} {result['peak_kb']:>9.1f}"
+                + ('  REGRESSED' if name in run.regressions else '')
+            )
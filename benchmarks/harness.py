@@ -0,0 +1,158 @@
+"""
+Benchmark harness for the performance suite.
+Provides timing of a callable with its query count and peak Python memory,
+and a JSON history of runs that new results are compared against.
+"""
+
+import json
+import os
+import random
+import statistics
+import time
+import tracemalloc
+from app.utils.query_instrumentation import track_queries
+from app.utils.traffic_replay import percentile
+
+# Runs compared against, and the smallest slowdown worth failing over
+BASELINE_RUNS = 5
+NOISE_FLOOR_MS = 1.0
+
+# Fewest timed rounds a result needs before its timings can fail a run
+MIN_GATED_ROUNDS = 3
+
+def measure(func, rounds=10, warmup=1):
+    """
+    Time a callable and record what it costs.
+
+    The global random generator is reseeded first, so code that picks
+    topics or task types at random does the same work on every run. Memory
+    is measured in a separate round so tracemalloc does not slow down the
+    timed ones.
+
+    Returns:
+        dict: median_ms, p95_ms, min_ms, queries (most in any round),
+            peak_kb and rounds
+    """
+    random.seed(0)
+    for _ in range(warmup):
+        func()
+
+    timings = []
+    queries = []
+    for _ in range(rounds):
+        with track_queries() as stats:
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000.0)
+        queries.append(stats.count)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'median_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'min_ms': round(min(timings), 3),
+        'queries': max(queries),
+        'peak_kb': round(peak / 1024.0, 1),
+        'rounds': rounds
+    }
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as history_file:
+        return json.load(history_file)
+
+def save_history(path, history):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as history_file:
+        json.dump(history, history_file, indent=2)
+
+def baseline(history, target, name):
+    """
+    Reference result for a benchmark from earlier passing runs on the same target.
+
+    Args:
+        history (list): Earlier runs, oldest first
+        target (str): Database and scale, e.g. 'sqlite/small'
+        name (str): Benchmark name
+
+    Returns:
+        dict: Medians of the recent medians and minimums, and the most
+            queries seen, or None without history
+    """
+    results = [
+        run['results'][name] for run in history
+        if run['target'] == target and name in run['results'] and not run.get('regressions')
+    ][-BASELINE_RUNS:]
+    if not results:
+        return None
+    return {
+        'median_ms': statistics.median(result['median_ms'] for result in results),
+        # Runs recorded before minimums were kept stand in with their median
+        'min_ms': statistics.median(result.get('min_ms', result['median_ms']) for result in results),
+        'queries': max(result['queries'] for result in results)
+    }
+
+def find_regressions(result, reference, threshold):
+    """
+    Compare a result with its baseline.
+
+    A benchmark regresses when it runs more queries than before, or when
+    both its median and its fastest round are more than `threshold` slower
+    than the baseline's (and at least NOISE_FLOOR_MS). A busy host slows
+    some rounds but rarely the fastest one, so noise alone does not fail a
+    run. Timings of results with fewer than MIN_GATED_ROUNDS rounds are
+    only reported: one slow sample is its own median and minimum.
+
+    Returns:
+        list: Human-readable reasons, empty when there is no regression
+    """
+    if not reference:
+        return []
+
+    reasons = []
+    slowdown = result['median_ms'] - reference['median_ms']
+    fastest_slowdown = result.get('min_ms', result['median_ms']) - reference.get('min_ms', reference['median_ms'])
+    if (result.get('rounds', MIN_GATED_ROUNDS) >= MIN_GATED_ROUNDS
+            and slowdown > NOISE_FLOOR_MS and slowdown > reference['median_ms'] * threshold
+            and fastest_slowdown > reference.get('min_ms', reference['median_ms']) * threshold):
+        reasons.append(
+            f"median {result['median_ms']:.2f}ms vs baseline {reference['median_ms']:.2f}ms "
+            f"(+{slowdown / reference['median_ms']:.0%}), fastest round slower too"
+        )
+    if result['queries'] > reference['queries']:
+        reasons.append(f"{result['queries']} queries vs baseline {reference['queries']}")
+    return reasons
+
+class BenchmarkRun:
+    """Results of one suite run on one database and scale."""
+
+    def __init__(self, target, history, threshold, meta=None):
+        self.target = target
+        self.history = history
+        self.threshold = threshold
+        self.meta = meta or {}
+        self.results = {}
+        self.regressions = {}
+
+    def record(self, name, result):
+        """Store a result and return the reasons it regressed, if any."""
+        self.results[name] = result
+        reasons = find_regressions(result, baseline(self.history, self.target, name), self.threshold)
+        if reasons:
+            self.regressions[name] = reasons
+        return reasons
+
+    def to_dict(self):
+        return {
+            **self.meta,
+            'target': self.target,
+            'results': self.results,
+            'regressions': self.regressions
+        }
@@ -0,0 +1,78 @@
+import os
+import time
+import tracemalloc
+import pytest
+from app import create_app, db
+from app.models.task import Task
+from app.models.user import User
+from app.utils.account_deletion import delete_user
+from app.utils.query_instrumentation import track_queries
+from app.utils.synthetic_data import generate_synthetic_data
+from config.config import TestingConfig
+
+# Tasks of the one user deleted; set BENCH_DELETE_TASKS for a quicker run
+TASKS = int(os.environ.get('BENCH_DELETE_TASKS', 100_000))
+
+def delete_loaded(user_id):
+    """Deletion before the cascades: the ORM loads every child row and deletes it one by one."""
+    user = db.session.execute(db.select(User).where(User.id == user_id).options(
+        db.selectinload(User.tasks).selectinload(Task.subtopics),
+        db.selectinload(User.subtopic_confidences),
+        db.selectinload(User.topic_confidences),
+        db.selectinload(User.task_type_preferences),
+    )).scalar_one()
+    db.session.delete(user)
+    db.session.commit()
+
+def delete_cascade(user_id):
+    """One DELETE of the user, the database removes the rest in the same transaction."""
+    db.session.delete(db.session.get(User, user_id))
+    db.session.commit()
+
+# name: deletion of one user
+STRATEGIES = {
+    'orm_loaded': delete_loaded,
+    'database_cascade': delete_cascade,
+    'batched': delete_user,
+}
+
+DATABASES = ['sqlite'] + (['postgresql'] if os.environ.get('BENCH_POSTGRES_URI') else [])
+
+class TestAccountDeletion:
+    """Deleting a user with TASKS tasks, their subtopics and confidences, one strategy per fresh dataset.
+
+    On PostgreSQL the database's tables are dropped and rebuilt, so point
+    BENCH_POSTGRES_URI at a scratch database.
+    """
+
+    @pytest.mark.parametrize('database', DATABASES)
+    @pytest.mark.parametrize('strategy', list(STRATEGIES))
+    def test_delete_user(self, strategy, database, tmp_path, monkeypatch):
+        uri = f"sqlite:///{tmp_path / 'deletion.db'}" if database == 'sqlite' else os.environ['BENCH_POSTGRES_URI']
+        monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI', uri)
+        app = create_app('testing')
+
+        with app.app_context():
+            try:
+                db.drop_all()
+                db.create_all()
+                rows = generate_synthetic_data(seed=42, users=1, tasks=TASKS)
+                user_id = db.session.execute(db.select(User.id)).scalar_one()
+                db.session.remove()
+
+                tracemalloc.start()
+                started = time.perf_counter()
+                with track_queries() as stats:
+                    STRATEGIES[strategy](user_id)
+                duration_s = time.perf_counter() - started
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+                assert db.session.execute(db.select(db.func.count(Task.id))).scalar() == 0
+            finally:
+                db.session.remove()
+                db.drop_all()
+                db.engine.dispose()
+
+        print(f"\n{database} {strategy:<17} {rows['tasks']:,} tasks, {rows['task_subtopics']:,} subtopics: "
+              f"{duration_s:.2f}s, {stats.count:,} statements, {stats.commits} commits, peak {peak / 1024:,.0f} KB")
@@ -0,0 +1,49 @@
+from datetime import datetime
+from itertools import count
+import pytest
+from app import db
+from app.models.task import Task
+from app.utils.optimization_batch import db_batch_process, db_batch_update
+from app.utils.optimization_tasks import update_task_priorities
+from app.utils.task_priority import task_priority
+
+BATCH_SIZE = 1000
+
+def offset_scan(query, batch_size):
+    """The LIMIT/OFFSET loop db_batch_process used before keyset paging, as a reference."""
+    for offset in count(0, batch_size):
+        batch = query.order_by(Task.id).limit(batch_size).offset(offset).all()
+        if not batch:
+            return
+
+class TestBatchProcessingBenchmarks:
+    """Full scans of the tasks table, one round each as they grow with the dataset."""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, bench_app):
+        db.session.expunge_all()
+
+    def test_keyset_scan(self, bench):
+        bench('db_batch_process.keyset', lambda: db_batch_process(Task.query, batch_size=BATCH_SIZE), rounds=1)
+
+    def test_keyset_stream(self, bench):
+        bench('db_batch_process.stream',
+              lambda: db_batch_process(Task.query, batch_size=BATCH_SIZE, commit_per_batch=False), rounds=1)
+
+    def test_offset_scan(self, bench):
+        bench('offset_scan', lambda: offset_scan(Task.query, BATCH_SIZE), rounds=1)
+
+class TestBulkUpdateBenchmarks:
+    """Re-prioritising the benchmark user's tasks, set-based and through a callback."""
+
+    def test_update_task_priorities(self, bench, bench_user):
+        bench('update_task_priorities', lambda: update_task_priorities(bench_user.id))
+
+    def test_db_batch_update(self, bench, bench_user):
+        ids = db.session.execute(db.select(Task.id).where(Task.user_id == bench_user.id)).scalars().all()
+        today = datetime.utcnow().date()
+
+        def bump(task):
+            task.priority = task_priority(task.priority, task.due_date, today)
+
+        bench('db_batch_update', lambda: db_batch_update(Task, ids, bump, batch_size=BATCH_SIZE))
@@ -0,0 +1,117 @@
+import threading
+from datetime import datetime
+import pytest
+from sqlalchemy import text
+from app import db
+from app.models.confidence import SubtopicConfidence, TopicConfidence
+import app.utils.confidence_utils as confidence_utils
+
+THREADS = 8
+WRITES_PER_THREAD = 15
+ROUNDS = 3
+
+def apply_with_row_locks(user_id, entries):
+    """Pessimistic baseline: lock the rows with SELECT ... FOR UPDATE, then write.
+
+    SQLite ignores FOR UPDATE, so there the whole database is locked up front
+    with BEGIN IMMEDIATE, which is the closest equivalent.
+    """
+    from app.models.curriculum import Subtopic
+
+    try:
+        if db.engine.dialect.name == 'sqlite':
+            db.session.execute(text('BEGIN IMMEDIATE'))
+
+        topic_by_subtopic = dict(
+            db.session.query(Subtopic.id, Subtopic.topic_id)
+            .filter(Subtopic.id.in_(list(entries.keys())))
+            .all()
+        )
+        topic_ids = set(topic_by_subtopic.values())
+
+        # Lock topics before subtopics so writers always queue in the same order
+        TopicConfidence.query.filter(
+            TopicConfidence.user_id == user_id,
+            TopicConfidence.topic_id.in_(topic_ids)
+        ).with_for_update().all()
+
+        rows = SubtopicConfidence.query.filter(
+            SubtopicConfidence.user_id == user_id,
+            SubtopicConfidence.subtopic_id.in_(list(topic_by_subtopic.keys()))
+        ).with_for_update().all()
+
+        for row in rows:
+            entry = entries[row.subtopic_id]
+            if entry.get('confidence_level') is not None:
+                row.confidence_level = entry['confidence_level']
+            if entry.get('priority') is not None:
+                row.priority = entry['priority']
+            row.last_updated = datetime.utcnow()
+
+        db.session.flush()
+        TopicConfidence.update_for_topics(topic_ids, user_id)
+        db.session.commit()
+        return len(rows)
+    except Exception:
+        db.session.rollback()
+        raise
+
+class TestConfidenceWriteConcurrency:
+    """Pairs of tabs of the most active user updating the same subtopics, optimistic versus row locks.
+
+    Each round is THREADS * WRITES_PER_THREAD writes; compare the medians of
+    confidence_writes.optimistic and confidence_writes.row_locks.
+    """
+
+    @pytest.fixture(autouse=True)
+    def setup(self, bench_app, bench_user):
+        self.subtopic_ids = db.session.execute(
+            db.select(SubtopicConfidence.subtopic_id)
+            .where(SubtopicConfidence.user_id == bench_user.id)
+            .order_by(SubtopicConfidence.subtopic_id)
+            .limit(THREADS // 2)
+        ).scalars().all()
+
+        self.clients = []
+        for _ in range(THREADS):
+            client = bench_app.test_client()
+            with bench_app.app_context():
+                client.post('/login', data={'username': bench_user.username, 'password': 'password'})
+            self.clients.append(client)
+
+    def hammer(self):
+        """Have pairs of threads update the same subtopic through both confidence endpoints."""
+        barrier = threading.Barrier(THREADS)
+        failures = []
+
+        def worker(index):
+            client = self.clients[index]
+            subtopic_id = self.subtopic_ids[index % len(self.subtopic_ids)]
+            barrier.wait()
+
+            for write in range(WRITES_PER_THREAD):
+                level = (index + write) % 5 + 1
+                if write % 2:
+                    response = client.put(f'/api/confidence/user/subtopic/{subtopic_id}',
+                                          json={'confidence_level': level})
+                else:
+                    response = client.post('/api/subtopics/update_confidence',
+                                           json={'subtopics': {str(subtopic_id): {'confidence': level}}})
+                if response.status_code != 200:
+                    failures.append((subtopic_id, response.status_code))
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert failures == []
+
+    def test_optimistic(self, bench):
+        result = bench('confidence_writes.optimistic', self.hammer, rounds=ROUNDS)
+        print(f"\noptimistic: {THREADS * WRITES_PER_THREAD / result['median_ms'] * 1000:.1f} writes/s")
+
+    def test_row_locks(self, bench, monkeypatch):
+        monkeypatch.setattr(confidence_utils, 'apply_confidence_updates', apply_with_row_locks)
+        result = bench('confidence_writes.row_locks', self.hammer, rounds=ROUNDS)
+        print(f"\nrow locks: {THREADS * WRITES_PER_THREAD / result['median_ms'] * 1000:.1f} writes/s")
@@ -0,0 +1,98 @@
+from itertools import count, cycle
+import pytest
+from app import db
+from app.models.curriculum import Subject, Subtopic, Topic
+from app.models.task import Task, TaskType
+from app.utils.analytics_utils import get_chart_data_for_dashboard, prepare_analytics_data
+from app.utils.confidence_utils import update_subtopics_confidence_from_dict
+from app.utils.optimization_tasks import generate_balanced_task_batch
+from app.utils.task_generator_main import generate_task_for_subject
+from app.utils.task_subtopic_utils import add_subtopics_to_task
+from app.utils.task_topic_utils import get_topics_for_subject, select_weighted_topic
+
+class TestGenerationBenchmarks:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, bench_user):
+        """Benchmark as the most active user, on the subject they study most."""
+        self.user = bench_user
+        subject_id = db.session.execute(
+            db.select(Task.subject_id).where(Task.user_id == bench_user.id)
+            .group_by(Task.subject_id).order_by(db.func.count().desc(), Task.subject_id).limit(1)
+        ).scalar()
+        self.subject = db.session.get(Subject, subject_id)
+
+    def test_generate_task_for_subject(self, bench):
+        bench('generate_task_for_subject', lambda: generate_task_for_subject(self.user, self.subject.id))
+
+    def test_generate_balanced_task_batch(self, bench):
+        bench('generate_balanced_task_batch', lambda: generate_balanced_task_batch(self.user.id, count=3, max_per_subject=1),
+              rounds=3)
+
+    def test_select_weighted_topic(self, bench):
+        topics = get_topics_for_subject(self.subject.id)
+        bench('select_weighted_topic', lambda: select_weighted_topic(topics, self.user, self.subject.title))
+
+    def test_add_subtopics_to_task(self, bench):
+        topic = Topic.query.filter_by(subject_id=self.subject.id).order_by(Topic.id).first()
+        task_type = TaskType.query.order_by(TaskType.id).first()
+        numbers = count()
+
+        def add_subtopics():
+            # A fresh task each call, so every call packs from scratch
+            task = Task(user_id=self.user.id, subject_id=self.subject.id, topic_id=topic.id,
+                        task_type_id=task_type.id, title=f"Benchmark {next(numbers)}")
+            db.session.add(task)
+            db.session.flush()
+            add_subtopics_to_task(task, topic, self.user)
+
+        bench('add_subtopics_to_task', add_subtopics)
+
+class TestConfidenceBenchmarks:
+
+    def test_update_subtopics_confidence_from_dict(self, bench, bench_user):
+        # A post-completion prompt's worth of ratings, spread over a few topics
+        subtopic_ids = db.session.execute(db.select(Subtopic.id).order_by(Subtopic.id).limit(20)).scalars().all()
+        levels = cycle([2, 4])
+
+        def update():
+            level = next(levels)
+            update_subtopics_confidence_from_dict(
+                bench_user.id, {subtopic_id: (level, False) for subtopic_id in subtopic_ids}
+            )
+
+        bench('update_subtopics_confidence_from_dict', update)
+
+class TestAnalyticsBenchmarks:
+
+    def test_prepare_analytics_data(self, bench, bench_user):
+        bench('prepare_analytics_data', lambda: prepare_analytics_data(bench_user.id))
+
+    def test_get_chart_data_for_dashboard(self, bench, bench_user):
+        bench('get_chart_data_for_dashboard', lambda: get_chart_data_for_dashboard(bench_user.id))
+
+class TestCurriculumEndpointBenchmarks:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, bench_app, bench_user):
+        """Log in as the benchmark user."""
+        self.client = bench_app.test_client()
+        with bench_app.app_context():
+            self.client.post('/login', data={'username': bench_user.username, 'password': 'password'})
+        topic = Topic.query.order_by(Topic.id).first()
+        self.subject_id = topic.subject_id
+        self.topic_id = topic.id
+
+    def get(self, path):
+        response = self.client.get(path)
+        assert response.status_code == 200
+
+    @pytest.mark.parametrize('name, path', [
+        ('curriculum.subjects', '/api/curriculum/subjects'),
+        ('curriculum.topics', '/api/curriculum/subject/{subject_id}/topics'),
+        ('curriculum.subtopics', '/api/curriculum/topic/{topic_id}/subtopics'),
+        ('curriculum.search', '/api/curriculum/search?q=topic 1.1'),
+    ])
+    def test_curriculum_endpoint(self, bench, name, path):
+        path = path.format(subject_id=self.subject_id, topic_id=self.topic_id)
+        bench(name, lambda: self.get(path))
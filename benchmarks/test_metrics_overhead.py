@@ -0,0 +1,34 @@
+import pytest
+from app import create_app
+from config.config import TestingConfig
+
+# name: metrics config the app is created with
+PROFILES = {
+    'metrics_off': {'METRICS_ENABLED': False},
+    'metrics_on': {'METRICS_ENABLED': True, 'METRICS_SNAPSHOT_INTERVAL': 5.0},
+    # A snapshot written on every request, the worst case of the shared directory
+    'metrics_snapshot_every_request': {'METRICS_ENABLED': True, 'METRICS_SNAPSHOT_INTERVAL': 0},
+}
+
+class TestMetricsOverhead:
+    """One cheap authenticated request of the most active user, with metrics off and on.
+
+    The difference between the medians is what the metrics hooks, counters
+    and snapshot writes add to a request.
+    """
+
+    @pytest.mark.parametrize('profile', list(PROFILES))
+    def test_request(self, profile, bench, bench_app, bench_user, tmp_path, monkeypatch):
+        monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI', bench_app.config['SQLALCHEMY_DATABASE_URI'])
+        monkeypatch.setattr(TestingConfig, 'METRICS_DIR', str(tmp_path / 'metrics'))
+        for name, value in PROFILES[profile].items():
+            monkeypatch.setattr(TestingConfig, name, value)
+        app = create_app('testing')
+        app.config['WTF_CSRF_ENABLED'] = False
+
+        client = app.test_client()
+        with app.app_context():
+            client.post('/login', data={'username': bench_user.username, 'password': 'password'})
+            cursor = client.get('/api/confidence/user/data').get_json()['cursor']
+
+        bench(f'request.{profile}', lambda: client.get(f'/api/confidence/user/data?since={cursor}'))
@@ -0,0 +1,42 @@
+import os
+import statistics
+import time
+import pytest
+from sqlalchemy import create_engine, text
+from app.utils.postgres_engine import database_uri, engine_options, installed_drivers
+
+QUERIES = 1000
+ROUNDS = 5
+
+# name: (statement, parameters)
+WORKLOADS = {
+    'select_1': ('SELECT 1', {}),
+    'point_lookup': ('SELECT oid, relname, relkind FROM pg_class WHERE oid = :oid', {'oid': 1259}),
+    'rows_100': ('SELECT n, md5(n::text) FROM generate_series(1, :rows) AS n', {'rows': 100}),
+}
+
+@pytest.mark.skipif(not os.environ.get('BENCH_POSTGRES_URI'), reason='set BENCH_POSTGRES_URI to a local PostgreSQL database')
+class TestPostgresDriverOverhead:
+    """Per-query round trip of each installed driver through a pooled engine, over a local connection."""
+
+    @pytest.mark.parametrize('driver', installed_drivers())
+    @pytest.mark.parametrize('workload', list(WORKLOADS))
+    def test_per_query_overhead(self, driver, workload):
+        statement, parameters = WORKLOADS[workload]
+        engine = create_engine(database_uri(os.environ['BENCH_POSTGRES_URI'], driver),
+                               **engine_options({}, driver))
+        try:
+            timings = []
+            with engine.connect() as conn:
+                query = text(statement)
+                conn.execute(query, parameters).all()
+                for _ in range(ROUNDS):
+                    start = time.perf_counter()
+                    for _ in range(QUERIES):
+                        conn.execute(query, parameters).all()
+                    timings.append((time.perf_counter() - start) / QUERIES * 1e6)
+        finally:
+            engine.dispose()
+
+        print(f"\n{driver:<9} {workload:<13} median {statistics.median(timings):8.1f}us/query, "
+              f"best {min(timings):8.1f}us/query")
@@ -0,0 +1,64 @@
+import pytest
+from app import create_app, db
+from app.utils.load_test import run_load_test
+from config.config import TestingConfig
+
+USERS = 32
+DAYS = 2
+
+# name: config overrides
+PROFILES = {
+    'default': {'SQLITE_PROFILE': False, 'SQLITE_FOREIGN_KEYS': False},
+    'tuned': {'SQLITE_PROFILE': True},
+    'tuned+serialized_writes': {'SQLITE_PROFILE': True, 'SQLITE_SERIALIZE_WRITES': True},
+}
+
+def seed_curriculum():
+    from app.models.curriculum import Subject, Topic, Subtopic
+    from app.models.task import TaskType
+
+    TaskType.create_default_types()
+    for title in ('Biology', 'Chemistry', 'Psychology'):
+        subject = Subject(title=title)
+        topics = [Topic(subject=subject, name=f'{title} {i}', title=f'{title} {i}') for i in range(5)]
+        db.session.add_all([subject, *topics])
+        db.session.add_all([Subtopic(topic=topic, title=f'{topic.title}.{i}') for topic in topics for i in range(6)])
+    db.session.commit()
+
+class TestSQLiteConcurrency:
+    """Concurrent students on a fresh SQLite file with SQLite's defaults and with the tuned profile.
+
+    The students share one process, like the threads of one gunicorn worker;
+    every request is a separate connection and transaction, so the lock
+    contention is the same as between workers.
+    """
+
+    @pytest.mark.parametrize('profile', list(PROFILES))
+    def test_study_day_under_contention(self, profile, tmp_path, monkeypatch):
+        monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'concurrency.db'}")
+        # Cheap password hashes, so the run is bound by the database rather than by logins
+        monkeypatch.setattr(TestingConfig, 'BCRYPT_LOG_ROUNDS', 4, raising=False)
+        for name, value in PROFILES[profile].items():
+            monkeypatch.setattr(TestingConfig, name, value)
+        app = create_app('testing')
+        app.config['WTF_CSRF_ENABLED'] = False
+
+        with app.app_context():
+            db.create_all()
+            seed_curriculum()
+            journal_mode = db.session.execute(db.text('PRAGMA journal_mode')).scalar()
+
+        try:
+            report = run_load_test(app, users=USERS, days=DAYS, think_time=0)
+        finally:
+            with app.app_context():
+                db.session.remove()
+                db.engine.dispose()
+
+        slowest = max(report['steps'].items(), key=lambda item: item[1]['p95_ms'])
+        print(f"\n{profile} ({journal_mode}): {report['throughput_rps']:.1f} req/s, "
+              f"{report['error_rate']:.2%} errors, slowest p95 {slowest[0]} {slowest[1]['p95_ms']:.0f}ms")
+        # Without the lock a WAL writer whose read snapshot went stale fails at once with
+        # "database is locked", which no busy timeout waits out
+        if PROFILES[profile].get('SQLITE_SERIALIZE_WRITES'):
+            assert report['error_rate'] == 0.0, report['steps']
@@ -0,0 +1,88 @@
+import os
+import time
+from datetime import datetime, timedelta
+import pytest
+from app import create_app, db
+from app.models.task import Task
+from app.utils.analytics_utils import due_since
+from app.utils.synthetic_data import SCALES, generate_synthetic_data
+from app.utils.task_partitions import partition_task_tables
+from app.utils.task_repository import TaskRepository
+from benchmarks.harness import measure
+from config.config import TestingConfig
+
+# 50M tasks by default; set BENCH_PARTITION_TASKS for a quicker run
+TASKS = int(os.environ.get('BENCH_PARTITION_TASKS', SCALES['large']['tasks']))
+ROUNDS = 20
+
+# name: query run as the most active user
+HOT_QUERIES = {
+    'today': lambda tasks, today: tasks.active_for_day(today),
+    'last_7_days': lambda tasks, today: tasks.completion_counts(start_date=today - timedelta(days=7), end_date=today),
+    'month_view': lambda tasks, today: tasks.due_between(today.replace(day=1), today),
+    'stats_30_days': lambda tasks, today: Task.query.filter(
+        Task.user_id == tasks.user_id,
+        Task.created_at >= datetime.combine(today - timedelta(days=30), datetime.min.time()),
+        due_since(today - timedelta(days=30))
+    ).count(),
+    'due_today_all_users': lambda tasks, today: Task.query.filter(Task.due_date == today).count(),
+}
+
+def analyze():
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        conn.execute(db.text('ANALYZE tasks'))
+        conn.execute(db.text('ANALYZE task_subtopics'))
+
+def measure_hot_queries(user_id, today):
+    tasks = TaskRepository(user_id)
+    results = {}
+    for name, query in HOT_QUERIES.items():
+        results[name] = measure(lambda: query(tasks, today), rounds=ROUNDS)
+        db.session.remove()
+    return results
+
+@pytest.mark.skipif(not os.environ.get('BENCH_POSTGRES_URI'), reason='set BENCH_POSTGRES_URI to a scratch PostgreSQL database')
+class TestTaskPartitioning:
+    """Hot task queries on one synthetic dataset, before and after partitioning tasks by month.
+
+    The database's tables are dropped and rebuilt, so point BENCH_POSTGRES_URI
+    at a scratch database.
+    """
+
+    def test_hot_query_latency(self, monkeypatch):
+        monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI', os.environ['BENCH_POSTGRES_URI'])
+        app = create_app('testing')
+        today = datetime.utcnow().date()
+
+        with app.app_context():
+            try:
+                db.drop_all()
+                db.create_all()
+                generate_synthetic_data(seed=42, scale='large', tasks=TASKS, anchor_date=today)
+                analyze()
+                user_id = db.session.execute(db.text(
+                    "SELECT user_id FROM tasks GROUP BY user_id ORDER BY COUNT(*) DESC, user_id LIMIT 1"
+                )).scalar()
+                db.session.remove()
+
+                unpartitioned = measure_hot_queries(user_id, today)
+
+                started = time.perf_counter()
+                with db.engine.begin() as conn:
+                    result = partition_task_tables(conn)
+                migration_s = time.perf_counter() - started
+                analyze()
+
+                partitioned = measure_hot_queries(user_id, today)
+            finally:
+                db.session.remove()
+                db.drop_all()
+                db.engine.dispose()
+
+        print(f"\nmigrated {result['rows']['tasks']:,} tasks into {result['partitions_created']} partitions "
+              f"in {migration_s:.1f}s")
+        print(f"{'query':<22} {'unpartitioned':>14} {'partitioned':>12}   median ms (p95)")
+        for name in HOT_QUERIES:
+            before, after = unpartitioned[name], partitioned[name]
+            print(f"{name:<22} {before['median_ms']:>7.2f} ({before['p95_ms']:>5.1f}) "
+                  f"{after['median_ms']:>6.2f} ({after['p95_ms']:>5.1f})")
@@ -13,10 +13,84 @@ class Config:
     # Default to SQLite database for development simplicity
     SQLALCHEMY_DATABASE_URI = os.environ.get('LOCAL_DATABASE_URI', 'sqlite:///app.db')
     
+    # PostgreSQL driver and connection pool (see app/utils/postgres_engine.py)
+    POSTGRES_DRIVER = os.environ.get('POSTGRES_DRIVER', 'auto')  # auto, psycopg, psycopg2 or pg8000
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))  # Connections kept open per worker
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))  # Extra connections opened under load
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))  # Seconds before a connection is replaced
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 30000))
+    DB_IDLE_IN_TRANSACTION_TIMEOUT_MS = int(os.environ.get('DB_IDLE_IN_TRANSACTION_TIMEOUT_MS', 60000))
+    DB_QUERY_CACHE_SIZE = 500  # Compiled statements cached by SQLAlchemy per engine
+    DB_PREPARE_THRESHOLD = int(os.environ.get('DB_PREPARE_THRESHOLD', 5))  # psycopg 3: runs before a statement is prepared server-side
+    
+    # Optional read replica for views marked @read_only (see app/utils/read_replica.py)
+    REPLICA_DATABASE_URI = os.environ.get('REPLICA_DATABASE_URI')
+    REPLICA_READ_YOUR_WRITES_SECONDS = float(os.environ.get('REPLICA_READ_YOUR_WRITES_SECONDS', 5))  # Replica lag allowed for
+    REPLICA_RETRY_INTERVAL = float(os.environ.get('REPLICA_RETRY_INTERVAL', 30))  # Seconds on the primary after a replica failure
+    # Monthly partitions created ahead on a partitioned PostgreSQL tasks table (see app/utils/task_partitions.py)
+    TASK_PARTITIONS_MONTHS_AHEAD = int(os.environ.get('TASK_PARTITIONS_MONTHS_AHEAD', 3))
+    
     # Caching configuration
     CACHE_TYPE = 'SimpleCache'  # Simple memory cache
     CACHE_DEFAULT_TIMEOUT = 300  # Default timeout in seconds
     STATIC_CACHE_TIMEOUT = 86400  # 1 day cache for static files
+    
+    # Delta sync cursors trail the newest row returned, so rows committed late are re-sent (see get_confidence_changes)
+    CONFIDENCE_SYNC_LAG_SECONDS = float(os.environ.get('CONFIDENCE_SYNC_LAG_SECONDS', 60))
+    # Versioned confidence writes
+    OPTIMISTIC_LOCK_MAX_ATTEMPTS = 8  # Attempts before a conflicting versioned write gives up
+    
+    # One commit per request: commits during a request only flush (see app/utils/unit_of_work.py)
+    UNIT_OF_WORK = os.environ.get('UNIT_OF_WORK', 'true').lower() == 'true'
+    
+    # Opt-in SQLite profile: WAL and tuned pragmas on every connection (see app/utils/sqlite_profile.py).
+    # WAL mode is stored in the database file, so it stays on after the profile is turned off
+    SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE', 'false').lower() == 'true'
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))  # Wait for the write lock before "database is locked"
+    SQLITE_CACHE_SIZE_KB = 65536  # Page cache per connection
+    SQLITE_MMAP_SIZE = 268435456  # Bytes of the database file read through memory mapping
+    SQLITE_MAINTENANCE_INTERVAL = int(os.environ.get('SQLITE_MAINTENANCE_INTERVAL', 300))  # Seconds between checkpoints; 0 turns them off
+    # Opt-in foreign key enforcement, which also makes the ON DELETE CASCADE keys delete; check for orphans first
+    SQLITE_FOREIGN_KEYS = os.environ.get('SQLITE_FOREIGN_KEYS', 'false').lower() == 'true'
+    # Opt-in per-worker lock letting one write transaction at a time reach SQLite
+    SQLITE_SERIALIZE_WRITES = os.environ.get('SQLITE_SERIALIZE_WRITES', 'false').lower() == 'true'
+    
+    # Per-request SQL profiling (request metrics, N+1 warnings)
+    QUERY_INSTRUMENTATION = os.environ.get('QUERY_INSTRUMENTATION', 'true').lower() == 'true'
+    # Report each request's profile in a Server-Timing header and an INFO log line
+    QUERY_PROFILE_REPORT = os.environ.get('QUERY_PROFILE_REPORT', 'true').lower() == 'true'
+    N_PLUS_ONE_THRESHOLD = 5  # Repeats of one statement fingerprint flagged as a likely N+1
+    
+    # Opt-in slow query log (rotating JSON-lines file, summarised by `flask slow-queries`)
+    SLOW_QUERY_LOG = os.environ.get('SLOW_QUERY_LOG', 'false').lower() == 'true'
+    SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 200))
+    SLOW_QUERY_EXPLAIN = os.environ.get('SLOW_QUERY_EXPLAIN', 'false').lower() == 'true'  # Capture one plan per fingerprint
+    SLOW_QUERY_LOG_FILE = os.environ.get('SLOW_QUERY_LOG_FILE')  # Defaults to instance/slow_queries.log
+    SLOW_QUERY_LOG_MAX_BYTES = 5 * 1024 * 1024
+    SLOW_QUERY_LOG_BACKUPS = 3
+    
+    # Opt-in sampling profiler (collapsed-stack files per endpoint, controlled by `flask profiler`)
+    PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED', 'false').lower() == 'true'
+    PROFILER_SAMPLE_RATE = float(os.environ.get('PROFILER_SAMPLE_RATE', 0.0))  # Until set at runtime
+    PROFILER_TOKEN = os.environ.get('PROFILER_TOKEN')  # X-Profile-Request value that forces profiling
+    PROFILER_DIR = os.environ.get('PROFILER_DIR')  # Defaults to instance/profiles
+    PROFILER_INTERVAL_MS = 5  # Stack sampling interval
+    
+    # Prometheus-format metrics at /metrics
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'false').lower() == 'true'
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # Bearer token required to scrape, when set
+    METRICS_DIR = os.environ.get('METRICS_DIR')  # Shared by gunicorn workers; empty it before starting them
+    METRICS_SNAPSHOT_INTERVAL = 5.0  # Seconds between a worker's snapshot writes
+    
+    # Span tracing of sampled requests (JSON lines, summarised by `flask traces`)
+    TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', 0.0))  # 0 turns tracing off
+    TRACE_FILE = os.environ.get('TRACE_FILE')  # Defaults to instance/traces.jsonl
+    
+    # Opt-in request capture for `flask replay-traffic`
+    TRAFFIC_CAPTURE = os.environ.get('TRAFFIC_CAPTURE', 'false').lower() == 'true'
+    TRAFFIC_CAPTURE_FILE = os.environ.get('TRAFFIC_CAPTURE_FILE')  # Defaults to instance/traffic.jsonl
 
 
 class DevelopmentConfig(Config):
@@ -32,11 +106,14 @@ class TestingConfig(Config):
     """Testing configuration."""
     DEBUG = True
     TESTING = True
-    # Use in-memory SQLite for testing
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    # Use in-memory SQLite for testing unless a test database is provided
+    SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URI', 'sqlite:///:memory:')
     # Disable caching for testing
     CACHE_TYPE = 'NullCache'
     STATIC_CACHE_TIMEOUT = 0  # No caching for testing
+    # Test databases are created fresh from the models, so run them tuned and with foreign keys enforced
+    SQLITE_PROFILE = True
+    SQLITE_FOREIGN_KEYS = True
 
 
 class ProductionConfig(Config):
@@ -49,6 +126,8 @@ class ProductionConfig(Config):
     CACHE_TYPE = 'SimpleCache'  # You can use 'RedisCache' if Redis is available
     CACHE_DEFAULT_TIMEOUT = 600  # 10 minutes
     STATIC_CACHE_TIMEOUT = 604800  # 7 days for production
+    # Keep query counts and database time out of client responses and the logs
+    QUERY_PROFILE_REPORT = os.environ.get('QUERY_PROFILE_REPORT', 'false').lower() == 'true'
 
 
 # Configuration dictionary to easily access different configs
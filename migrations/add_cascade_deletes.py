@@ -0,0 +1,54 @@
+"""
+Add cascade deletes migration script.
+This recreates the foreign keys that the models declare with ondelete
+(ON DELETE CASCADE for the rows a user or task owns, SET NULL for the
+curriculum a user added) on a PostgreSQL database. SQLite keeps the
+foreign keys a table was created with; `flask delete-user` deletes the
+owned rows itself, so it works there either way.
+"""
+import re
+from app import db, create_app
+from app import models  # noqa: F401 - registers every table
+from sqlalchemy import text
+
+# pg_constraint.confdeltype for each ON DELETE action
+DELETE_ACTIONS = {'CASCADE': 'c', 'SET NULL': 'n'}
+
+def run_migration():
+    """Run the migration to add ON DELETE actions to the foreign keys."""
+    app = create_app()
+    with app.app_context():
+        if db.engine.dialect.name != 'postgresql':
+            print("The database is not PostgreSQL; new SQLite databases get the ON DELETE actions from the models.")
+            return
+
+        with db.engine.begin() as connection:
+            for table in db.metadata.sorted_tables:
+                for foreign_key in table.foreign_keys:
+                    action = foreign_key.ondelete
+                    if action is None:
+                        continue
+                    constraint = connection.execute(text(
+                        "SELECT conname, pg_get_constraintdef(oid), confdeltype FROM pg_constraint "
+                        "WHERE conrelid = to_regclass(:table) AND contype = 'f' AND conkey[1] = "
+                        "(SELECT attnum FROM pg_attribute WHERE attrelid = to_regclass(:table) AND attname = :column)"
+                    ), {'table': table.name, 'column': foreign_key.parent.name}).first()
+                    if constraint is None:
+                        print(f"Foreign key {table.name}.{foreign_key.parent.name} not found, skipping.")
+                        continue
+
+                    name, definition, current = constraint
+                    if current == DELETE_ACTIONS[action]:
+                        print(f"Foreign key {name} already has ON DELETE {action}.")
+                        continue
+                    definition = re.sub(r"\s+ON DELETE (CASCADE|SET NULL|SET DEFAULT|RESTRICT|NO ACTION)", '', definition)
+                    connection.execute(text(
+                        f'ALTER TABLE {table.name} DROP CONSTRAINT "{name}", '
+                        f'ADD CONSTRAINT "{name}" {definition} ON DELETE {action}'
+                    ))
+                    print(f"Foreign key {name} now has ON DELETE {action}.")
+
+        print("Migration completed successfully!")
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,35 @@
+"""
+Add confidence sync indexes migration script.
+This adds the (user_id, last_updated) indexes used by the confidence delta-sync API.
+"""
+from app import db, create_app
+from app.models.confidence import SubtopicConfidence, TopicConfidence
+from sqlalchemy import inspect
+
+def run_migration():
+    """Run the migration to add the confidence sync indexes."""
+    app = create_app()
+    with app.app_context():
+        inspector = inspect(db.engine)
+
+        for model in (SubtopicConfidence, TopicConfidence):
+            table_name = model.__tablename__
+
+            if table_name not in inspector.get_table_names():
+                print(f"Table {table_name} does not exist yet, skipping.")
+                continue
+
+            existing = {index['name'] for index in inspector.get_indexes(table_name)}
+
+            for index in model.__table__.indexes:
+                if index.name in existing:
+                    print(f"Index {index.name} already exists.")
+                    continue
+
+                index.create(db.engine)
+                print(f"Index {index.name} created.")
+
+        print("Migration completed successfully!")
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,36 @@
+"""
+Add confidence version columns migration script.
+This adds the version counters used for optimistic concurrency on confidence rows.
+"""
+from app import db, create_app
+from app.models.confidence import SubtopicConfidence, TopicConfidence
+from sqlalchemy import inspect, text
+
+def run_migration():
+    """Run the migration to add version columns to the confidence tables."""
+    app = create_app()
+    with app.app_context():
+        inspector = inspect(db.engine)
+
+        for model in (SubtopicConfidence, TopicConfidence):
+            table_name = model.__tablename__
+
+            if table_name not in inspector.get_table_names():
+                print(f"Table {table_name} does not exist yet, skipping.")
+                continue
+
+            columns = {column['name'] for column in inspector.get_columns(table_name)}
+            if 'version' in columns:
+                print(f"Column {table_name}.version already exists.")
+                continue
+
+            with db.engine.begin() as connection:
+                connection.execute(text(
+                    f"ALTER TABLE {table_name} ADD COLUMN version INTEGER NOT NULL DEFAULT 1"
+                ))
+            print(f"Column {table_name}.version added.")
+
+        print("Migration completed successfully!")
+
+if __name__ == "__main__":
+    run_migration()
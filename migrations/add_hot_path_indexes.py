@@ -0,0 +1,44 @@
+"""
+Add hot path indexes migration script.
+This adds the indexes proposed by `flask index-advisor` for task generation,
+the dashboard and analytics: composite and active-task partial indexes on
+tasks, and foreign key indexes on task_subtopics, topics, subtopics and
+task_type_preferences. Statistics are refreshed afterwards so the planner
+uses them straight away.
+"""
+from app import db, create_app
+from app.models.curriculum import Topic, Subtopic
+from app.models.task import Task, TaskSubtopic, TaskTypePreference
+from sqlalchemy import inspect, text
+
+def run_migration():
+    """Run the migration to add the hot path indexes."""
+    app = create_app()
+    with app.app_context():
+        inspector = inspect(db.engine)
+
+        for model in (Task, TaskSubtopic, Topic, Subtopic, TaskTypePreference):
+            table_name = model.__tablename__
+
+            if table_name not in inspector.get_table_names():
+                print(f"Table {table_name} does not exist yet, skipping.")
+                continue
+
+            existing = {index['name'] for index in inspector.get_indexes(table_name)}
+
+            for index in model.__table__.indexes:
+                if index.name in existing:
+                    print(f"Index {index.name} already exists.")
+                    continue
+
+                index.create(db.engine)
+                print(f"Index {index.name} created.")
+
+        with db.engine.begin() as connection:
+            connection.execute(text("ANALYZE"))
+        print("Table statistics refreshed.")
+
+        print("Migration completed successfully!")
+
+if __name__ == "__main__":
+    run_migration()
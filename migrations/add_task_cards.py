@@ -0,0 +1,49 @@
+"""
+Add task cards migration script.
+This adds the tasks.card_data read model and the (user_id, due_date) index,
+then fills in the cards for tasks due today or later.
+"""
+from app import db, create_app
+from app.models.task import Task
+from app.utils.task_card_utils import refresh_task_cards
+from datetime import datetime
+from sqlalchemy import inspect, text
+
+def run_migration():
+    """Run the migration to add and backfill task cards."""
+    app = create_app()
+    with app.app_context():
+        inspector = inspect(db.engine)
+
+        columns = {column['name'] for column in inspector.get_columns('tasks')}
+        if 'card_data' in columns:
+            print("Column tasks.card_data already exists.")
+        else:
+            with db.engine.begin() as connection:
+                connection.execute(text("ALTER TABLE tasks ADD COLUMN card_data JSON"))
+            print("Column tasks.card_data added.")
+
+        existing = {index['name'] for index in inspector.get_indexes('tasks')}
+        for index in Task.__table__.indexes:
+            if index.name in existing:
+                print(f"Index {index.name} already exists.")
+                continue
+            index.create(db.engine)
+            print(f"Index {index.name} created.")
+
+        # Older tasks are backfilled lazily when they are first displayed
+        task_ids = [
+            row.id for row in db.session.query(Task.id).filter(
+                Task.due_date >= datetime.utcnow().date(),
+                Task.card_data.is_(None)
+            ).all()
+        ]
+        batch_size = 200
+        for start in range(0, len(task_ids), batch_size):
+            refresh_task_cards(task_ids[start:start + batch_size])
+        print(f"Backfilled {len(task_ids)} task cards.")
+
+        print("Migration completed successfully!")
+
+if __name__ == "__main__":
+    run_migration()
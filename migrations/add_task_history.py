@@ -0,0 +1,26 @@
+"""
+Add task history migration script.
+This adds the task_daily_rollups and archived_tasks tables that
+`flask compact-tasks` folds old tasks into.
+"""
+from app import db, create_app
+from app.models.task_history import ArchivedTask, TaskDailyRollup
+from sqlalchemy import inspect
+
+def run_migration():
+    """Run the migration to add the task history tables."""
+    app = create_app()
+    with app.app_context():
+        existing = set(inspect(db.engine).get_table_names())
+
+        for model in (TaskDailyRollup, ArchivedTask):
+            if model.__tablename__ in existing:
+                print(f"Table {model.__tablename__} already exists.")
+                continue
+            model.__table__.create(db.engine)
+            print(f"Table {model.__tablename__} created.")
+
+        print("Migration completed successfully!")
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,25 @@
+"""
+Add task priority migration script.
+This adds the tasks.priority column that update_task_priorities maintains.
+"""
+from app import db, create_app
+from sqlalchemy import inspect, text
+
+def run_migration():
+    """Run the migration to add the priority column to tasks."""
+    app = create_app()
+    with app.app_context():
+        inspector = inspect(db.engine)
+
+        columns = {column['name'] for column in inspector.get_columns('tasks')}
+        if 'priority' in columns:
+            print("Column tasks.priority already exists.")
+        else:
+            with db.engine.begin() as connection:
+                connection.execute(text("ALTER TABLE tasks ADD COLUMN priority INTEGER NOT NULL DEFAULT 50"))
+            print("Column tasks.priority added.")
+
+        print("Migration completed successfully!")
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,32 @@
+"""
+Add task subtopic due dates migration script.
+This adds task_subtopics.task_due_date, a copy of the task's due date that
+partitioned PostgreSQL uses as the partition key, and fills it in.
+"""
+from app import db, create_app
+from sqlalchemy import inspect, text
+
+def run_migration():
+    """Run the migration to add and backfill task_subtopics.task_due_date."""
+    app = create_app()
+    with app.app_context():
+        columns = {column['name'] for column in inspect(db.engine).get_columns('task_subtopics')}
+        if 'task_due_date' in columns:
+            print("Column task_subtopics.task_due_date already exists.")
+        else:
+            with db.engine.begin() as connection:
+                connection.execute(text("ALTER TABLE task_subtopics ADD COLUMN task_due_date DATE"))
+            print("Column task_subtopics.task_due_date added.")
+
+        with db.engine.begin() as connection:
+            updated = connection.execute(text(
+                "UPDATE task_subtopics SET task_due_date = "
+                "(SELECT tasks.due_date FROM tasks WHERE tasks.id = task_subtopics.task_id) "
+                "WHERE task_due_date IS NULL"
+            )).rowcount
+        print(f"Backfilled {updated} task subtopics.")
+
+        print("Migration completed successfully!")
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,42 @@
+"""
+Partition tasks migration script.
+This converts the tasks and task_subtopics tables of a PostgreSQL database
+into tables partitioned by month of the task's due date and copies the
+existing rows into them, in one transaction. Both tables are locked until
+it commits, so run it in a maintenance window.
+"""
+import time
+from app import db, create_app
+from app.utils.task_partitions import is_partitioned, partition_task_tables
+from sqlalchemy import text
+
+def run_migration():
+    """Run the migration to partition the tasks tables."""
+    app = create_app()
+    with app.app_context():
+        if db.engine.dialect.name != 'postgresql':
+            print("Partitioning needs PostgreSQL; nothing to do.")
+            return
+
+        try:
+            with db.engine.begin() as connection:
+                if is_partitioned(connection):
+                    print("Table tasks is already partitioned.")
+                    return
+                started = time.perf_counter()
+                result = partition_task_tables(connection, months_ahead=app.config['TASK_PARTITIONS_MONTHS_AHEAD'])
+        except ValueError as e:
+            print(f"Nothing was changed: {e}")
+            return
+        print(f"Copied {result['rows']['tasks']} tasks and {result['rows']['task_subtopics']} task subtopics "
+              f"into {result['partitions_created']} partitions in {time.perf_counter() - started:.1f}s.")
+
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+            connection.execute(text("ANALYZE tasks"))
+            connection.execute(text("ANALYZE task_subtopics"))
+        print("Table statistics refreshed.")
+
+        print("Migration completed successfully!")
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,31 @@
+"""
+Require task due dates migration script.
+This gives tasks without a due date the day they were created, which the
+app now does for new tasks, and makes tasks.due_date NOT NULL, which
+partitioning needs for its partition key.
+"""
+from app import db, create_app
+from sqlalchemy import text
+
+def run_migration():
+    """Run the migration to backfill and require tasks.due_date."""
+    app = create_app()
+    with app.app_context():
+        with db.engine.begin() as connection:
+            updated = connection.execute(text(
+                "UPDATE tasks SET due_date = COALESCE(DATE(created_at), CURRENT_DATE) WHERE due_date IS NULL"
+            )).rowcount
+        print(f"Backfilled {updated} tasks without a due date.")
+
+        if db.engine.dialect.name == 'postgresql':
+            with db.engine.begin() as connection:
+                connection.execute(text("ALTER TABLE tasks ALTER COLUMN due_date SET NOT NULL"))
+            print("Column tasks.due_date is now NOT NULL.")
+        else:
+            # SQLite cannot alter a column; the model keeps new rows from leaving it empty
+            print("Column tasks.due_date left nullable; SQLite cannot alter columns.")
+
+        print("Migration completed successfully!")
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,112 @@
+import os
+from contextlib import contextmanager
+import pytest
+from app import create_app, db
+from app.utils.query_instrumentation import track_queries
+from config.config import TestingConfig
+
+@pytest.fixture
+def app_config(request, tmp_path, monkeypatch):
+    """Settings overridden on TestingConfig before `app` creates the app.
+    
+    Parametrize it indirectly with a dict of settings; '{tmp_path}' in a
+    string value is replaced with the test's temporary directory. Returns
+    the settings as applied.
+    
+    Usage:
+        @pytest.mark.parametrize('app_config', [{'TRACE_FILE': '{tmp_path}/traces.jsonl'}], indirect=True)
+    """
+    settings = {
+        name: value.format(tmp_path=tmp_path) if isinstance(value, str) else value
+        for name, value in getattr(request, 'param', {}).items()
+    }
+    for name, value in settings.items():
+        monkeypatch.setattr(TestingConfig, name, value)
+    return settings
+
+@pytest.fixture
+def app(tmp_path, monkeypatch, app_config):
+    """Application backed by a fresh database.
+    
+    Uses TEST_DATABASE_URI when set (e.g. a PostgreSQL test database),
+    otherwise a SQLite file so that several threads can share it. Settings
+    from `app_config` are applied first.
+    """
+    database_uri = os.environ.get('TEST_DATABASE_URI', f"sqlite:///{tmp_path / 'test.db'}")
+    monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI', database_uri)
+    
+    flask_app = create_app('testing')
+    flask_app.config['WTF_CSRF_ENABLED'] = False
+    
+    with flask_app.app_context():
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+
+@pytest.fixture
+def make_user(app):
+    """Factory creating users that can log in with password 'password'."""
+    from app.models.user import User
+    
+    def _make_user(username='student'):
+        user = User(username, 'password')
+        db.session.add(user)
+        db.session.commit()
+        return user
+    
+    return _make_user
+
+@pytest.fixture
+def login(app):
+    """Factory returning a test client logged in as the given user."""
+    def _login(user):
+        client = app.test_client()
+        # A fresh app context so a previous login cached on g is not reused
+        with app.app_context():
+            client.post('/login', data={'username': user.username, 'password': 'password'})
+        return client
+    
+    return _login
+
+@pytest.fixture
+def curriculum(app):
+    """A small curriculum: one subject with one topic of eight subtopics."""
+    from app.models.curriculum import Subject, Topic, Subtopic
+    
+    subject = Subject(title='Biology')
+    topic = Topic(subject=subject, name='Cells', title='Cells')
+    subtopics = [Subtopic(topic=topic, title=f'Subtopic {i}') for i in range(8)]
+    db.session.add_all([subject, topic, *subtopics])
+    db.session.commit()
+    
+    return {'subject': subject, 'topic': topic, 'subtopics': subtopics}
+
+@pytest.fixture
+def count_queries(app):
+    """Context manager collecting the SQL statements executed inside it."""
+    @contextmanager
+    def _count_queries():
+        with track_queries() as stats:
+            yield stats.statements
+    
+    return _count_queries
+
+@pytest.fixture
+def query_budget(app):
+    """Context manager failing the test if more than `limit` queries run inside it.
+    
+    Usage:
+        with query_budget(6):
+            client.get('/progress')
+    """
+    @contextmanager
+    def _query_budget(limit):
+        with track_queries() as stats:
+            yield stats
+        assert stats.count <= limit, (
+            f"{stats.count} queries exceeded the budget of {limit}:\n{stats.summary()}"
+        )
+    
+    return _query_budget
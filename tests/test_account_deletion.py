@@ -0,0 +1,95 @@
+from datetime import datetime
+import pytest
+from app import db
+from app.models.confidence import SubtopicConfidence, TopicConfidence
+from app.models.curriculum import Subject
+from app.models.task import Task, TaskSubtopic, TaskType, TaskTypePreference
+from app.models.task_history import TaskDailyRollup
+from app.models.user import User
+from app.utils.account_deletion import delete_user
+
+class TestAccountDeletion:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, app, curriculum, make_user):
+        """Create two users with tasks, subtopics, confidences, preferences and history, one with a subject."""
+        TaskType.create_default_types()
+        self.app = app
+        task_type_id = TaskType.query.filter_by(name='notes').first().id
+        subject_id = curriculum['subject'].id
+        subtopic_ids = [subtopic.id for subtopic in curriculum['subtopics']]
+        self.users = [make_user('leaving'), make_user('staying')]
+
+        for user in self.users:
+            for index in range(7):
+                task = Task(user_id=user.id, subject_id=subject_id, task_type_id=task_type_id,
+                            title=f'Task {index}', due_date=datetime.utcnow().date())
+                db.session.add(task)
+                db.session.flush()
+                db.session.add_all([TaskSubtopic(task_id=task.id, subtopic_id=subtopic_id) for subtopic_id in subtopic_ids[:2]])
+            db.session.add_all([SubtopicConfidence(user_id=user.id, subtopic_id=subtopic_id, confidence_level=4)
+                                for subtopic_id in subtopic_ids])
+            db.session.add(TopicConfidence(user_id=user.id, topic_id=curriculum['topic'].id, confidence_percent=50.0))
+            db.session.add(TaskTypePreference(user_id=user.id, task_type_id=task_type_id))
+            db.session.add(TaskDailyRollup(user_id=user.id, subject_id=subject_id, day=datetime(2025, 1, 1).date(),
+                                           tasks=3, completed=2, skipped=1, completed_minutes=60))
+        self.authored = Subject(title='Own subject', created_by_user_id=self.users[0].id, is_user_created=True)
+        db.session.add(self.authored)
+        db.session.commit()
+        self.user_ids = [user.id for user in self.users]
+
+    def owned_rows(self, user_id):
+        return {
+            'tasks': Task.query.filter_by(user_id=user_id).count(),
+            'task_subtopics': TaskSubtopic.query.join(Task).filter(Task.user_id == user_id).count(),
+            'subtopic_confidences': SubtopicConfidence.query.filter_by(user_id=user_id).count(),
+            'topic_confidences': TopicConfidence.query.filter_by(user_id=user_id).count(),
+            'task_type_preferences': TaskTypePreference.query.filter_by(user_id=user_id).count(),
+            'task_daily_rollups': TaskDailyRollup.query.filter_by(user_id=user_id).count(),
+        }
+
+    def test_delete_user_in_batches(self):
+        """Every row the user owns is deleted in batches; other users and authored curriculum stay."""
+        leaving, staying = self.user_ids
+        expected = self.owned_rows(leaving)
+
+        report = delete_user(leaving, batch_size=3)
+
+        assert report['deleted'] == {**expected, 'users': 1}
+        # 3 batches of tasks, 3 of subtopic confidences, one per other non-empty table and the user
+        assert report['batches'] == 3 + 3 + 3 + 1
+        assert db.session.get(User, leaving) is None
+        assert not any(self.owned_rows(leaving).values())
+        assert self.owned_rows(staying) == expected
+        assert db.session.get(Subject, self.authored.id).created_by_user_id is None
+
+    def test_session_delete_leaves_children_to_the_database(self, count_queries):
+        """Deleting a user through the session no longer loads their rows; ON DELETE CASCADE removes them."""
+        if db.engine.dialect.name == 'sqlite' and not db.session.execute(db.text('PRAGMA foreign_keys')).scalar():
+            pytest.skip('SQLite foreign keys are off')
+        leaving, staying = self.user_ids
+
+        with count_queries() as statements:
+            db.session.delete(db.session.get(User, leaving))
+            db.session.commit()
+
+        assert not any('FROM tasks' in statement for statement in statements)
+        assert len(statements) <= 4
+        assert not any(self.owned_rows(leaving).values())
+        assert self.owned_rows(staying)['tasks'] == 7
+        assert db.session.get(Subject, self.authored.id).created_by_user_id is None
+
+    def test_cli_deletes_named_users(self):
+        """The command refuses unknown users and reports what it deleted."""
+        runner = self.app.test_cli_runner()
+
+        result = runner.invoke(args=['delete-user', 'leaving', 'nobody', '--yes'])
+        assert result.exit_code != 0
+        assert 'nobody' in result.output
+        assert db.session.get(User, self.user_ids[0]) is not None
+
+        result = runner.invoke(args=['delete-user', 'leaving', '--yes', '--batch-size', '5'])
+        assert result.exit_code == 0, result.output
+        assert 'Deleted leaving: ' in result.output
+        assert '7 tasks' in result.output and '14 task_subtopics' in result.output
+        assert User.query.filter_by(username='leaving').count() == 0
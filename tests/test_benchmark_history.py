@@ -0,0 +1,64 @@
+import pytest
+from benchmarks.harness import BenchmarkRun, baseline, find_regressions, measure
+
+def run(target, median_ms, queries, regressed=False):
+    """A history entry with one benchmark result."""
+    return {
+        'target': target,
+        'results': {'generate': {'median_ms': median_ms, 'min_ms': median_ms, 'queries': queries}},
+        'regressions': {'generate': ['slower']} if regressed else {}
+    }
+
+class TestBenchmarkHistory:
+
+    def test_measure_reports_latency_queries_and_memory(self, app):
+        """A measured callable reports its timings, the queries it ran and its peak memory."""
+        from app import db
+
+        result = measure(lambda: [db.session.execute(db.text('SELECT 1')), bytearray(200_000)], rounds=3)
+        assert result['min_ms'] <= result['median_ms'] <= result['p95_ms']
+        assert result['queries'] == 1
+        assert result['rounds'] == 3
+        assert result['peak_kb'] >= 195
+
+    def test_baseline_uses_recent_passing_runs_on_the_same_target(self):
+        """Regressed runs and other databases or scales are ignored."""
+        history = [
+            run('sqlite/small', 10.0, 5),
+            run('sqlite/small', 12.0, 6),
+            run('sqlite/small', 50.0, 9, regressed=True),
+            run('postgresql/small', 3.0, 5),
+            run('sqlite/small', 14.0, 5),
+        ]
+        assert baseline(history, 'sqlite/small', 'generate') == {'median_ms': 12.0, 'min_ms': 12.0, 'queries': 6}
+        assert baseline(history, 'sqlite/large', 'generate') is None
+
+    @pytest.mark.parametrize('median_ms, queries, regressed', [
+        (11.0, 6, False),   # within the threshold
+        (13.0, 6, True),    # 30% slower
+        (10.5, 7, True),    # an extra query
+    ])
+    def test_regressions_are_flagged(self, median_ms, queries, regressed):
+        """Slowdowns beyond the threshold and extra queries fail the run."""
+        benchmark = BenchmarkRun('sqlite/small', [run('sqlite/small', 10.0, 6)], threshold=0.25)
+        reasons = benchmark.record('generate', {'median_ms': median_ms, 'queries': queries})
+
+        assert bool(reasons) == regressed
+        assert bool(benchmark.to_dict()['regressions']) == regressed
+
+    def test_small_absolute_changes_are_noise(self):
+        """Sub-millisecond slowdowns are not regressions however large in relative terms."""
+        assert find_regressions({'median_ms': 0.9, 'queries': 1}, {'median_ms': 0.3, 'queries': 1}, 0.25) == []
+
+    @pytest.mark.parametrize('result', [
+        {'median_ms': 20.0, 'min_ms': 20.0, 'queries': 6, 'rounds': 1},   # one slow sample
+        {'median_ms': 20.0, 'min_ms': 9.5, 'queries': 6, 'rounds': 10},   # slow rounds, but not the fastest
+    ])
+    def test_host_noise_is_not_a_regression(self, result):
+        """A slowdown only fails the run when there are enough rounds and even the fastest one is slower."""
+        assert find_regressions(result, {'median_ms': 10.0, 'min_ms': 9.0, 'queries': 6}, 0.25) == []
+
+    def test_extra_queries_fail_even_a_single_round(self):
+        """Query counts do not vary with the host, so one round is enough to judge them."""
+        result = {'median_ms': 10.0, 'min_ms': 10.0, 'queries': 7, 'rounds': 1}
+        assert find_regressions(result, {'median_ms': 10.0, 'min_ms': 9.0, 'queries': 6}, 0.25) == ['7 queries vs baseline 6']
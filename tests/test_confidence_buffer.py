@@ -0,0 +1,74 @@
+import pytest
+from flask import abort, jsonify
+from app import db
+from app.models.confidence import SubtopicConfidence, TopicConfidence
+from app.utils.confidence_buffer import confidence_buffer
+from app.utils.confidence_utils import get_subtopic_confidence_state
+
+class TestConfidenceBuffer:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, app, curriculum, make_user, login):
+        """Routes that record changes and then succeed or fail."""
+        self.app = app
+        self.user = make_user()
+        self.subtopic_ids = [subtopic.id for subtopic in curriculum['subtopics']]
+        self.topic_id = curriculum['topic'].id
+
+        def record_burst():
+            for level in (1, 2, 5):
+                confidence_buffer.record(self.user.id, self.subtopic_ids[0], confidence_level=level)
+            confidence_buffer.record(self.user.id, self.subtopic_ids[0], priority=True)
+            confidence_buffer.record(self.user.id, self.subtopic_ids[1], confidence_level=4)
+            state = get_subtopic_confidence_state(self.user.id, self.subtopic_ids[:2])
+            return jsonify({str(subtopic_id): entry['confidence_level'] for subtopic_id, entry in state.items()})
+
+        def record_then_fail():
+            confidence_buffer.record(self.user.id, self.subtopic_ids[0], confidence_level=1)
+            abort(409)
+
+        app.add_url_rule('/test/confidence-burst', view_func=record_burst, methods=['POST'])
+        app.add_url_rule('/test/confidence-fail', view_func=record_then_fail, methods=['POST'])
+        self.client = login(self.user)
+
+    def stored(self):
+        """Stored levels as another worker would read them, from a fresh session."""
+        with self.app.app_context():
+            return {
+                row.subtopic_id: (row.confidence_level, row.priority, row.version)
+                for row in SubtopicConfidence.query.filter_by(user_id=self.user.id)
+            }
+
+    def test_request_changes_are_coalesced_and_written_before_responding(self):
+        """A burst within a request is read back through the buffer and written once when the request commits."""
+        response = self.client.post('/test/confidence-burst')
+
+        assert response.get_json() == {str(self.subtopic_ids[0]): 5, str(self.subtopic_ids[1]): 4}
+        # One insert per subtopic and one topic recompute, not one per change
+        assert self.stored() == {self.subtopic_ids[0]: (5, True, 1), self.subtopic_ids[1]: (4, False, 1)}
+        with self.app.app_context():
+            assert TopicConfidence.query.filter_by(user_id=self.user.id).one().version == 1
+        assert confidence_buffer.pending_for_user(self.user.id) == {}
+
+    def test_failed_request_discards_its_changes(self):
+        """Changes recorded by a request that fails are rolled back with it."""
+        assert self.client.post('/test/confidence-fail').status_code == 409
+        assert self.stored() == {}
+        assert confidence_buffer.pending_for_user(self.user.id) == {}
+
+    def test_separate_requests_are_written_separately(self):
+        """Nothing is held across requests: each request's changes are stored when it responds."""
+        assert self.client.put(f'/api/confidence/user/subtopic/{self.subtopic_ids[0]}',
+                               json={'confidence_level': 2}).status_code == 200
+        assert self.stored() == {self.subtopic_ids[0]: (2, False, 1)}
+
+        assert self.client.put(f'/api/confidence/user/subtopic/{self.subtopic_ids[0]}',
+                               json={'confidence_level': 4}).status_code == 200
+        assert self.stored() == {self.subtopic_ids[0]: (4, False, 2)}
+
+    def test_changes_outside_requests_are_written_immediately(self):
+        """A CLI command or script gets every change stored as it records it."""
+        confidence_buffer.record(self.user.id, self.subtopic_ids[0], confidence_level=2)
+        assert self.stored() == {self.subtopic_ids[0]: (2, False, 1)}
+        assert confidence_buffer.pending_for_user(self.user.id) == {}
+        assert confidence_buffer.flush_user(self.user.id) == 0
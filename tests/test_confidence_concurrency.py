@@ -0,0 +1,132 @@
+import threading
+import pytest
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+from app import db
+from app.models.confidence import SubtopicConfidence, TopicConfidence
+from app.utils.retry_utils import retry_on_conflict
+
+THREADS = 8
+WRITERS_PER_SUBTOPIC = 2
+WRITES_PER_THREAD = 15
+
+class TestConfidenceConcurrency:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, app, curriculum, make_user, login):
+        """Create a user whose confidence rows already exist, plus one client per thread."""
+        self.app = app
+        self.user = make_user()
+        self.topic_id = curriculum['topic'].id
+        self.subtopic_ids = [subtopic.id for subtopic in curriculum['subtopics']]
+
+        # Pre-created rows, so every write is a versioned UPDATE
+        for subtopic_id in self.subtopic_ids:
+            db.session.add(SubtopicConfidence(user_id=self.user.id, subtopic_id=subtopic_id))
+        db.session.add(TopicConfidence(user_id=self.user.id, topic_id=self.topic_id))
+        db.session.commit()
+
+        self.clients = [login(self.user) for _ in range(THREADS)]
+
+    def hammer(self):
+        """Have pairs of threads repeatedly update the same subtopic through both endpoints.
+
+        Both threads of a pair write the same sequence of levels, so the final
+        level is known whichever of them commits last.
+
+        Returns:
+            tuple: (failed responses, last level written per subtopic)
+        """
+        barrier = threading.Barrier(THREADS)
+        failures = []
+        last_levels = {}
+
+        def worker(index):
+            client = self.clients[index]
+            slot = index % (THREADS // WRITERS_PER_SUBTOPIC)
+            subtopic_id = self.subtopic_ids[slot]
+            barrier.wait()
+
+            for write in range(WRITES_PER_THREAD):
+                level = (slot + write) % 5 + 1
+                if write % 2:
+                    response = client.put(
+                        f'/api/confidence/user/subtopic/{subtopic_id}',
+                        json={'confidence_level': level}
+                    )
+                else:
+                    response = client.post(
+                        '/api/subtopics/update_confidence',
+                        json={'subtopics': {str(subtopic_id): {'confidence': level}}}
+                    )
+                if response.status_code != 200:
+                    failures.append((subtopic_id, response.status_code))
+                last_levels[subtopic_id] = level
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return failures, last_levels
+
+    def assert_no_lost_updates(self, failures, last_levels):
+        """Every accepted write must be applied exactly once and the aggregate must be fresh."""
+        assert failures == []
+        db.session.expire_all()
+
+        rows = {
+            row.subtopic_id: row
+            for row in SubtopicConfidence.query.filter_by(user_id=self.user.id).all()
+        }
+        for subtopic_id, level in last_levels.items():
+            assert rows[subtopic_id].confidence_level == level
+            # Version 1 is the pre-created row, then one bump per accepted write
+            assert rows[subtopic_id].version == WRITERS_PER_SUBTOPIC * WRITES_PER_THREAD + 1
+
+        topic_confidence = TopicConfidence.query.filter_by(
+            user_id=self.user.id, topic_id=self.topic_id
+        ).one()
+        expected_average = sum(row.confidence_level for row in rows.values()) / len(rows)
+        assert topic_confidence.confidence_percent == pytest.approx((expected_average - 1) / 4.0 * 100.0)
+        # Every write recalculated the topic, and no recalculation overwrote another
+        assert topic_confidence.version == THREADS * WRITES_PER_THREAD + 1
+
+    def test_optimistic_writes_lose_no_updates(self):
+        """Concurrent endpoint writes retry on version conflicts instead of clobbering each other."""
+        failures, last_levels = self.hammer()
+        self.assert_no_lost_updates(failures, last_levels)
+
+    def test_only_unique_violations_are_retried(self):
+        """A duplicate insert may succeed once re-read, a NOT NULL violation never will."""
+        attempts = []
+
+        def insert(subtopic_id):
+            def operation():
+                attempts.append(subtopic_id)
+                db.session.add(SubtopicConfidence(user_id=self.user.id, subtopic_id=subtopic_id))
+                db.session.commit()
+            return operation
+
+        with pytest.raises(IntegrityError):
+            retry_on_conflict(insert(self.subtopic_ids[0]), max_attempts=3)
+        with pytest.raises(IntegrityError):
+            retry_on_conflict(insert(None), max_attempts=3)
+        assert attempts == [self.subtopic_ids[0]] * 3 + [None]
+
+    def test_stale_version_is_rejected(self):
+        """An UPDATE based on an old version matches no rows rather than overwriting."""
+        stale = TopicConfidence.query.filter_by(user_id=self.user.id, topic_id=self.topic_id).one()
+
+        with self.app.app_context():
+            fresh = TopicConfidence.query.filter_by(user_id=self.user.id, topic_id=self.topic_id).one()
+            fresh.confidence_percent = 80.0
+            db.session.commit()
+
+        stale.confidence_percent = 20.0
+        with pytest.raises(StaleDataError):
+            db.session.commit()
+        db.session.rollback()
+
+        assert TopicConfidence.query.filter_by(user_id=self.user.id, topic_id=self.topic_id).one().confidence_percent == 80.0
@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+import pytest
+from app import db
+from app.models.confidence import SubtopicConfidence, TopicConfidence
+from app.utils.confidence_utils import (decode_sync_cursor, encode_sync_cursor, format_confidence_changes,
+                                        get_confidence_changes)
+
+class TestConfidenceSync:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, app, curriculum, make_user, login):
+        """Create a user with two subtopic confidences and a topic confidence stamped an hour ago."""
+        self.user = make_user()
+        self.client = login(self.user)
+        self.subtopic_ids = [subtopic.id for subtopic in curriculum['subtopics']]
+        self.topic_id = curriculum['topic'].id
+        self.hour_ago = datetime.utcnow().replace(microsecond=0) - timedelta(hours=1)
+
+        self.add_subtopic(0, 2, self.hour_ago)
+        self.add_subtopic(1, 4, self.hour_ago + timedelta(seconds=1))
+        db.session.add(TopicConfidence(user_id=self.user.id, topic_id=self.topic_id, confidence_percent=50.0,
+                                       last_updated=self.hour_ago))
+        db.session.commit()
+
+    def add_subtopic(self, index, level, stamp):
+        db.session.add(SubtopicConfidence(user_id=self.user.id, subtopic_id=self.subtopic_ids[index],
+                                          confidence_level=level, last_updated=stamp))
+        db.session.commit()
+
+    def test_cursor_round_trip(self):
+        """Cursors are microseconds since the epoch; malformed ones are rejected."""
+        stamp = datetime(2026, 10, 19, 12, 30, 15, 123456)
+        assert decode_sync_cursor(encode_sync_cursor(stamp)) == stamp
+        assert encode_sync_cursor(None) == '0'
+        for cursor in ('-1', 'abc', ''):
+            with pytest.raises(ValueError):
+                decode_sync_cursor(cursor)
+
+    def test_cursor_trails_the_newest_row(self, app):
+        """A row stamped before one already synced, but committed after it, is sent within the lag."""
+        lag = timedelta(seconds=app.config['CONFIDENCE_SYNC_LAG_SECONDS'])
+        full = get_confidence_changes(self.user.id)
+        assert len(full['subtopics']) == 2 and len(full['topics']) == 1
+        assert decode_sync_cursor(full['cursor']) == self.hour_ago + timedelta(seconds=1) - lag
+
+        # Nothing changed: the cursor stays put and the rows within the lag are sent again
+        idle = get_confidence_changes(self.user.id, decode_sync_cursor(full['cursor']))
+        assert idle['cursor'] == full['cursor']
+        assert len(idle['subtopics']) == 2 and len(idle['topics']) == 1
+
+        # Request B's row is stamped t2 and commits first, and a poll syncs it
+        t2 = self.hour_ago + timedelta(seconds=20)
+        self.add_subtopic(3, 1, t2)
+        after_b = get_confidence_changes(self.user.id, decode_sync_cursor(idle['cursor']))
+        assert decode_sync_cursor(after_b['cursor']) == t2 - lag
+
+        # Request A's row was stamped t1 < t2 but only commits now; the next poll still sends it
+        self.add_subtopic(2, 5, self.hour_ago + timedelta(seconds=10))
+        after_a = get_confidence_changes(self.user.id, decode_sync_cursor(after_b['cursor']))
+        assert self.subtopic_ids[2] in [row.subtopic_id for row in after_a['subtopics']]
+        assert after_a['cursor'] == after_b['cursor']
+
+        # Only a row committed more than the lag after its stamp is missed
+        self.add_subtopic(4, 5, t2 - 2 * lag)
+        late = get_confidence_changes(self.user.id, decode_sync_cursor(after_a['cursor']))
+        assert self.subtopic_ids[4] not in [row.subtopic_id for row in late['subtopics']]
+
+    def test_formats(self):
+        """The columnar layout sends parallel arrays, the legacy one a list of objects."""
+        changes = get_confidence_changes(self.user.id)
+
+        columnar = format_confidence_changes(changes)
+        assert columnar['subtopic_confidences']['confidence_level'] == [2, 4]
+        assert columnar['subtopic_confidences']['last_updated'][1] - columnar['subtopic_confidences']['last_updated'][0] == 1000
+        assert columnar['topic_confidences']['topic_id'] == [self.topic_id]
+
+        legacy = format_confidence_changes(changes, columnar=False)
+        assert legacy['subtopic_confidences'][0] == {
+            'subtopic_id': self.subtopic_ids[0], 'confidence_level': 2, 'last_updated': self.hour_ago.isoformat()
+        }
+        assert legacy['topic_confidences'][0]['confidence_percent'] == 50.0
+
+    def test_sync_api(self):
+        """A full sync is legacy by default, a delta sync columnar, and bad requests are rejected."""
+        full = self.client.get('/api/confidence/user/data').get_json()
+        assert full['full'] is True and full['format'] == 'legacy'
+        assert len(full['subtopic_confidences']) == 2
+
+        response = self.client.put(f'/api/confidence/user/subtopic/{self.subtopic_ids[3]}', json={'confidence_level': 3})
+        assert response.status_code == 200
+
+        delta = self.client.get(f"/api/confidence/user/data?since={full['cursor']}").get_json()
+        assert delta['full'] is False and delta['format'] == 'columnar'
+        assert self.subtopic_ids[3] in delta['subtopic_confidences']['subtopic_id']
+        assert decode_sync_cursor(delta['cursor']) > decode_sync_cursor(full['cursor'])
+
+        assert self.client.get('/api/confidence/user/data?since=nope').status_code == 400
+        assert self.client.get('/api/confidence/user/data?format=xml').status_code == 400
@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+import pytest
+from app import db
+from app.models.task import Task, TaskType
+from app.utils.index_advisor import QueryRecorder, advise, existing_indexes, predicates
+
+class TestIndexAdvisor:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, app, curriculum, make_user):
+        """A user with a long history of finished tasks and one active task today."""
+        TaskType.create_default_types()
+        self.app = app
+        self.user = make_user()
+        self.today = datetime.utcnow().date()
+        task_type = TaskType.query.first()
+
+        for day in range(40):
+            task = Task(self.user.id, curriculum['subject'].id, task_type.id, f'Task {day}',
+                        topic_id=curriculum['topic'].id, due_date=self.today - timedelta(days=day))
+            if day:
+                task.completed_at = datetime.utcnow()
+            db.session.add(task)
+        db.session.commit()
+
+    def record(self, query):
+        recorder = QueryRecorder()
+        recorder.attach(db.engine)
+        try:
+            query()
+        finally:
+            recorder.detach(db.engine)
+        return recorder.queries
+
+    def drop_index(self, name):
+        db.session.execute(db.text(f"DROP INDEX {name}"))
+        db.session.commit()
+
+    def test_predicates_are_read_per_table(self):
+        """Equality, range, IS NULL and joined-table lookups are attributed to their tables."""
+        found = predicates(
+            "SELECT tasks.id, count(CASE WHEN (tasks.skipped_at IS NULL) THEN ? END) FROM tasks "
+            "JOIN task_subtopics AS task_subtopics_1 ON tasks.id = task_subtopics_1.task_id "
+            "WHERE tasks.user_id = ? AND tasks.topic_id IN (?...) AND tasks.created_at >= ? "
+            "AND tasks.completed_at IS NULL ORDER BY tasks.id"
+        )
+        assert found['tasks'] == {'equality': ['user_id', 'topic_id'], 'range': ['created_at'], 'null': ['completed_at']}
+        assert found['task_subtopics'] == {'equality': ['task_id'], 'range': [], 'null': []}
+
+    def test_model_indexes_serve_the_hot_shapes(self):
+        """With the shipped indexes, the task queries get no proposals."""
+        queries = self.record(lambda: [
+            Task.query.filter(Task.user_id == self.user.id, Task.created_at >= datetime.utcnow() - timedelta(days=7)).all(),
+            Task.query.filter(Task.user_id == self.user.id, Task.subject_id == 1, Task.completed_at.isnot(None)).count(),
+            Task.query.filter(Task.user_id == self.user.id, Task.due_date == self.today,
+                              Task.completed_at.is_(None), Task.skipped_at.is_(None)).all(),
+        ])
+        assert [proposal for proposal in advise(db.engine, queries) if proposal['table'] == 'tasks'] == []
+
+    def test_missing_foreign_key_index_is_proposed(self):
+        """A lookup that scans a table gets a proposal with the plan line that shows it."""
+        self.drop_index('ix_task_subtopics_task_id')
+        task_id = Task.query.first().id
+        queries = self.record(lambda: db.session.execute(
+            db.text("SELECT task_subtopics.id FROM task_subtopics WHERE task_subtopics.task_id = :id"), {'id': task_id}
+        ).all())
+
+        proposals = advise(db.engine, queries)
+        assert [proposal['ddl'] for proposal in proposals] == [
+            'CREATE INDEX ix_task_subtopics_task_id ON task_subtopics (task_id)'
+        ]
+        assert proposals[0]['calls'] == 1
+        assert any('SCAN task_subtopics' in line for line in proposals[0]['scans'])
+
+    def test_partial_index_is_proposed_for_a_small_active_set(self):
+        """Active tasks are few, so a partial index is proposed beside the full one."""
+        self.drop_index('ix_tasks_user_due_date_active')
+        queries = self.record(lambda: Task.query.filter(
+            Task.user_id == self.user.id, Task.due_date == self.today,
+            Task.completed_at.is_(None), Task.skipped_at.is_(None)
+        ).all())
+
+        proposal = advise(db.engine, queries)[0]
+        assert proposal['ddl'] == (
+            'CREATE INDEX ix_tasks_user_id_due_date_active ON tasks (user_id, due_date) '
+            'WHERE completed_at IS NULL AND skipped_at IS NULL'
+        )
+        assert proposal['matching_share'] == pytest.approx(1 / 40)
+
+    def test_partial_indexes_are_reflected(self):
+        """The shipped active-task index is recognised as partial."""
+        assert (('user_id', 'due_date'), frozenset({'completed_at', 'skipped_at'})) in existing_indexes(db.engine)['tasks']
+
+    def test_cli_runs_a_workload(self):
+        """The index-advisor command records a load test and reports on it."""
+        result = self.app.test_cli_runner().invoke(args=['index-advisor', '--users', '1'])
+        assert result.exit_code == 0, result.output
+        assert 'query shapes recorded' in result.output
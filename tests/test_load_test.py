@@ -0,0 +1,51 @@
+import pytest
+from app.utils.load_test import STUDENT_DAY, build_load_report, run_load_test
+
+class TestLoadTest:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, app):
+        """Seed a curriculum with several subjects so the dashboard can generate tasks."""
+        from app import db
+        from app.models.curriculum import Subject, Topic, Subtopic
+        from app.models.task import TaskType
+
+        TaskType.create_default_types()
+        for title in ('Biology', 'Chemistry', 'Physics'):
+            subject = Subject(title=title)
+            topic = Topic(subject=subject, name=f'{title} basics', title=f'{title} basics')
+            db.session.add_all([subject, topic, *[Subtopic(topic=topic, title=f'{title} {i}') for i in range(4)]])
+        db.session.commit()
+        self.app = app
+
+    def test_students_work_through_the_day(self):
+        """Every step of the day runs for every student without errors."""
+        report = run_load_test(self.app, users=3, think_time=0)
+
+        assert list(report['steps']) == list(STUDENT_DAY)
+        assert report['error_rate'] == 0.0, report['steps']
+        assert report['steps']['login']['count'] == 3
+        assert report['steps']['pomodoro']['count'] == 6
+        assert report['steps']['complete']['statuses'] == {'200': 3}
+        assert report['throughput_rps'] > 0
+
+        stats = report['steps']['index']
+        assert stats['p50_ms'] <= stats['p95_ms'] <= stats['p99_ms'] <= stats['max_ms']
+
+    def test_errors_are_counted_per_step(self):
+        """Error statuses and exceptions count towards the step's error rate."""
+        results = [('index', 0.01, 200), ('index', 0.02, 500), ('skip', 0.01, 'exception'), ('login', 0.01, 302)]
+        report = build_load_report(results, 2.0, {})
+
+        assert list(report['steps']) == ['login', 'index', 'skip']
+        assert report['steps']['index']['error_rate'] == 0.5
+        assert report['steps']['skip']['errors'] == 1
+        assert report['error_rate'] == 0.5
+        assert report['throughput_rps'] == 2.0
+
+    def test_cli_reports_steps(self):
+        """The load-test command prints a line per step."""
+        result = self.app.test_cli_runner().invoke(args=['load-test', '--users', '2', '--think-time', '0'])
+        assert result.exit_code == 0, result.output
+        assert 'curriculum_search' in result.output
+        assert '0.0% errors' in result.output
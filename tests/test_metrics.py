@@ -0,0 +1,90 @@
+import json
+import threading
+from pathlib import Path
+import pytest
+from app.models.task import TaskType
+from app.utils import metrics
+from app.utils.task_generator_main import generate_task_for_subject
+
+TOKEN = 'scrape-token'
+
+def value(values, name, **labels):
+    """Get one series from collected metrics, 0 when absent."""
+    return values.get(metrics._key(name, labels), 0)
+
+@pytest.mark.parametrize('app_config', [{
+    'METRICS_ENABLED': True,
+    'METRICS_TOKEN': TOKEN,
+    'METRICS_DIR': '{tmp_path}/metrics'
+}], indirect=True, ids=['metrics'])
+class TestMetrics:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, app_config, app, curriculum, make_user, login):
+        """Create a logged-in user in an app exposing metrics."""
+        TaskType.create_default_types()
+        self.directory = Path(app_config['METRICS_DIR'])
+        self.curriculum = curriculum
+        self.user = make_user()
+        self.client = login(self.user)
+
+    def scrape(self):
+        response = self.client.get('/metrics', headers={'Authorization': f'Bearer {TOKEN}'})
+        assert response.status_code == 200
+        return response.get_data(as_text=True)
+
+    def test_scrape_requires_token(self):
+        """Without the bearer token the endpoint refuses to answer."""
+        assert self.client.get('/metrics').status_code == 401
+
+    def test_request_and_database_metrics(self):
+        """Requests are counted per endpoint and status along with their SQL statements."""
+        self.client.get('/calendar')
+        text = self.scrape()
+
+        assert 'http_requests_total{endpoint="main.calendar",method="GET",status="200"}' in text
+        assert 'http_request_duration_seconds_bucket{endpoint="main.calendar",le="+Inf"}' in text
+        assert 'db_queries_total{endpoint="main.calendar"}' in text
+        assert '# TYPE http_request_duration_seconds histogram' in text
+
+    def test_workers_are_aggregated(self):
+        """Snapshots written by other worker processes are added to this worker's values."""
+        series = 'http_requests_total{endpoint="main.index",method="GET",status="200"}'
+
+        def scraped_value():
+            lines = [line for line in self.scrape().splitlines() if line.startswith(series)]
+            return float(lines[0].split()[-1]) if lines else 0
+
+        before = scraped_value()
+        other_worker = [['http_requests_total', ['main.index', 'GET', '200'], 1000]]
+        (self.directory / 'metrics_999999.json').write_text(json.dumps(other_worker))
+
+        assert scraped_value() == before + 1000
+
+    def test_per_thread_counters_lose_no_increments(self):
+        """Threads increment their own stores; the merged total is exact."""
+        before = value(metrics.collect(), 'cache_requests_total', cache='test', result='hit')
+
+        def worker():
+            for _ in range(5000):
+                metrics.inc('cache_requests_total', cache='test', result='hit')
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert value(metrics.collect(), 'cache_requests_total', cache='test', result='hit') == before + 20000
+
+    def test_task_generation_stages(self):
+        """Each stage of task generation is timed."""
+        before = metrics.collect()
+        task = generate_task_for_subject(self.user, self.curriculum['subject'].id)
+        assert task is not None
+        after = metrics.collect()
+
+        for stage in ('subject_lookup', 'task_type_selection', 'topic_listing', 'weighted_topic_selection', 'task_insert', 'subtopic_packing', 'card_refresh'):
+            key = metrics._key('task_generation_stage_duration_seconds', {'stage': stage})
+            count_before = sum(before[key][:-1]) if key in before else 0
+            assert sum(after[key][:-1]) == count_before + 1
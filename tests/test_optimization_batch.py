@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy.exc import OperationalError
+from app import db
+from app.models.task import Task, TaskType
+from app.utils.optimization_batch import KeysetIterator, db_batch_process, key_ranges
+
+class TestKeysetBatchProcessing:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, app, curriculum, make_user):
+        """Create a user with 25 open tasks whose due dates repeat."""
+        TaskType.create_default_types()
+        self.user = make_user()
+        self.subject_id = curriculum['subject'].id
+        task_type_id = TaskType.query.filter_by(name='notes').first().id
+        today = datetime.utcnow().date()
+        db.session.add_all([
+            Task(user_id=self.user.id, subject_id=self.subject_id, task_type_id=task_type_id,
+                 title=f'Task {index}', due_date=today + timedelta(days=index % 4))
+            for index in range(25)
+        ])
+        db.session.commit()
+        self.task_ids = [task_id for (task_id,) in db.session.query(Task.id).order_by(Task.id)]
+
+    def test_batches_seek_past_the_last_key(self, count_queries):
+        """Every batch is a bounded seek past the previous one rather than a growing OFFSET."""
+        with count_queries() as statements:
+            batches = list(KeysetIterator(Task.query, batch_size=10))
+
+        assert [len(batch) for batch in batches] == [10, 10, 5]
+        assert [task.id for batch in batches for task in batch] == self.task_ids
+        # SQLite renders every LIMIT with OFFSET, so check the seek and its bound
+        assert all('WHERE tasks.id > ?' in statement for statement in statements[1:])
+        assert all(' LIMIT ' in statement for statement in statements)
+
+    def test_non_unique_key_is_tie_broken_by_primary_key(self):
+        """Paging by a repeated due date visits each row exactly once, in key order."""
+        batches = list(KeysetIterator(Task.query, batch_size=4, key=Task.due_date))
+        tasks = [task for batch in batches for task in batch]
+
+        assert sorted(task.id for task in tasks) == self.task_ids
+        assert [(task.due_date, task.id) for task in tasks] == sorted((task.due_date, task.id) for task in tasks)
+
+    def test_deleting_processed_rows_skips_nothing(self):
+        """Deleting each batch while scanning neither skips nor repeats rows, unlike OFFSET paging."""
+        seen = []
+
+        def delete_batch(batch):
+            seen.extend(task.id for task in batch)
+            Task.query.filter(Task.id.in_([task.id for task in batch])).delete(synchronize_session=False)
+
+        db_batch_process(Task.query, batch_size=7, process_func=delete_batch)
+
+        assert seen == self.task_ids
+        assert Task.query.count() == 0
+
+    def test_failed_batch_is_retried_from_its_first_key(self, monkeypatch):
+        """A batch that fails is rolled back and read again, and later batches still run."""
+        monkeypatch.setattr('app.utils.optimization_batch.time.sleep', lambda seconds: None)
+        attempts = []
+
+        def flaky(batch):
+            attempts.append([task.id for task in batch])
+            for task in batch:
+                task.title = 'Processed'
+            if len(attempts) == 2:
+                raise OperationalError('UPDATE tasks', {}, Exception('database is locked'))
+            return len(batch)
+
+        counts = db_batch_process(Task.query, batch_size=10, process_func=flaky, limit=20)
+
+        assert attempts[1] == attempts[2] == self.task_ids[10:20]
+        assert counts == [10, 10]
+        assert Task.query.filter_by(title='Processed').count() == 20
+
+    def test_streaming_without_commits_reads_every_row(self):
+        """Without per-batch commits the rows come from one streamed query."""
+        ids = db_batch_process(Task.query, batch_size=6, commit_per_batch=False,
+                               process_func=lambda batch: [task.id for task in batch])
+
+        assert ids == self.task_ids
+
+    def test_parallel_workers_cover_disjoint_ranges(self):
+        """Workers split the key range so each row is processed once, results in key order."""
+        ranges = key_ranges(Task.query, Task.id, 3)
+        assert ranges[0][0] == self.task_ids[0] - 1 and ranges[-1][1] == self.task_ids[-1]
+        assert all(upper == next_after for (_, upper), (next_after, _) in zip(ranges, ranges[1:]))
+
+        ids = db_batch_process(Task.query, batch_size=4, workers=3,
+                               process_func=lambda batch: [task.id for task in batch])
+        assert ids == self.task_ids
+
+    def test_parallel_workers_keep_the_bounds(self):
+        """after and upper bound the ranges split between workers; limit cannot be split."""
+        ids = db_batch_process(Task.query, batch_size=4, workers=3, after=self.task_ids[4], upper=self.task_ids[19],
+                               process_func=lambda batch: [task.id for task in batch])
+        assert ids == self.task_ids[5:20]
+
+        with pytest.raises(ValueError):
+            db_batch_process(Task.query, workers=3, limit=10)
+
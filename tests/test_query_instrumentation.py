@@ -0,0 +1,91 @@
+import json
+from datetime import datetime
+import pytest
+from app import db
+from app.models.task import Task, TaskType, TaskSubtopic
+from app.utils.query_instrumentation import fingerprint
+from app.utils.task_card_utils import refresh_task_cards
+
+class TestQueryInstrumentation:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, app, curriculum, make_user, login):
+        """Create a logged-in user with one task due today."""
+        TaskType.create_default_types()
+        self.app = app
+        self.user = make_user()
+        self.client = login(self.user)
+
+        task = Task(
+            user_id=self.user.id,
+            subject_id=curriculum['subject'].id,
+            task_type_id=TaskType.query.filter_by(name='quiz').first().id,
+            title='Quiz: Cells',
+            topic_id=curriculum['topic'].id,
+            due_date=datetime.utcnow().date()
+        )
+        db.session.add(task)
+        db.session.flush()
+        for subtopic in curriculum['subtopics'][:2]:
+            db.session.add(TaskSubtopic(task_id=task.id, subtopic_id=subtopic.id))
+        db.session.commit()
+        refresh_task_cards([task.id])
+        self.task_id = task.id
+
+    def test_fingerprint_ignores_values(self):
+        """Statements differing only in literals, placeholders or list lengths share a fingerprint."""
+        first = fingerprint("SELECT * FROM tasks WHERE user_id = 1 AND title = 'a' AND id IN (?, ?)")
+        second = fingerprint("SELECT *  FROM tasks\n WHERE user_id = 42 AND title = 'b''c' AND id IN (?, ?, ?)")
+        assert first == second == "SELECT * FROM tasks WHERE user_id = ? AND title = ? AND id IN (?...)"
+        assert fingerprint("SELECT a FROM t WHERE b = %(b_1)s") == fingerprint("SELECT a FROM t WHERE b = :b")
+
+    def test_server_timing_header(self):
+        """Every response reports its database time, query and commit counts."""
+        response = self.client.get('/api/confidence/user/data')
+        assert response.status_code == 200
+        server_timing = response.headers['Server-Timing']
+        assert 'db;dur=' in server_timing
+        assert ' queries, ' in server_timing
+        assert ' commits"' in server_timing
+        assert 'app;dur=' in server_timing
+
+    def test_report_can_be_turned_off(self, caplog):
+        """Without the report, as in production, responses carry no timings and nothing is logged per request."""
+        self.app.config['QUERY_PROFILE_REPORT'] = False
+        caplog.set_level('INFO', logger=self.app.logger.name)
+
+        response = self.client.get('/api/confidence/user/data')
+        assert response.status_code == 200
+        assert 'Server-Timing' not in response.headers
+        assert not any(record.getMessage().startswith('sql_profile ') for record in caplog.records)
+
+    def test_n_plus_one_is_logged_with_origin(self, caplog):
+        """A per-row query loop is reported as a warning pointing at the looping code."""
+        caplog.set_level('INFO', logger=self.app.logger.name)
+        response = self.client.post('/api/confidence/user/initialize')
+        assert response.status_code == 200
+
+        lines = [
+            record.getMessage() for record in caplog.records
+            if record.getMessage().startswith('sql_profile ') and record.levelname == 'WARNING'
+        ]
+        assert lines
+        payload = json.loads(lines[-1][len('sql_profile '):])
+        assert payload['endpoint'].endswith('initialize_confidence')
+        assert payload['n_plus_one']
+        origins = [suspect['origin'] for suspect in payload['n_plus_one']]
+        assert 'app/models/confidence.py' in ' '.join(filter(None, origins))
+
+    @pytest.mark.parametrize('method, url, budget', [
+        ('get', '/', 4),
+        ('get', '/calendar', 4),
+        ('get', '/pomodoro', 4),
+        ('get', '/api/confidence/user/data', 4),
+        ('get', '/api/pomodoro/stats', 3),
+        ('post', '/api/tasks/complete/{task_id}', 6),
+    ])
+    def test_endpoint_query_budget(self, query_budget, method, url, budget):
+        """Hot endpoints stay within a fixed number of queries."""
+        with query_budget(budget):
+            response = getattr(self.client, method)(url.format(task_id=self.task_id))
+        assert response.status_code == 200
@@ -0,0 +1,109 @@
+import pytest
+from flask import g
+from app import db
+from app.models.curriculum import Subject
+from app.utils.read_replica import PRIMARY_UNTIL_KEY, _replica_state, replica_engine
+
+@pytest.fixture
+def app(app):
+    """The test app, forgetting afterwards that its replica was down."""
+    yield app
+    _replica_state['down_until'] = 0.0
+
+# A second SQLite file acting as the read replica
+@pytest.mark.parametrize('app_config', [{
+    'REPLICA_DATABASE_URI': 'sqlite:///{tmp_path}/replica.db'
+}], indirect=True, ids=['replica'])
+class TestReadReplica:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, app, curriculum, make_user, login):
+        """Copy the primary to the replica, then add a subject the replica has not seen."""
+        if db.engine.dialect.name != 'sqlite':
+            pytest.skip('Uses a SQLite file as the replica')
+        self.app = app
+
+        def add_subject_unflushed():
+            # Written only by the unit of work's commit at the end of the request
+            db.session.add(Subject(title='Physics'))
+            return {'success': True}
+
+        app.add_url_rule('/test/add-subject', view_func=add_subject_unflushed, methods=['POST'])
+        self.curriculum = curriculum
+        self.user = make_user()
+        self.client = login(self.user)
+        self.forget_own_writes()
+
+        result = app.test_cli_runner().invoke(args=['sync-replica'])
+        assert 'Copied' in result.output
+
+        db.session.add(Subject(title='Chemistry'))
+        db.session.commit()
+
+    def forget_own_writes(self):
+        with self.client.session_transaction() as session:
+            session.pop(PRIMARY_UNTIL_KEY, None)
+
+    def subject_titles(self):
+        response = self.client.get('/curriculum/api/subjects')
+        assert response.status_code == 200
+        return {subject['title'] for subject in response.get_json()['subjects']}
+
+    def test_read_only_views_read_from_the_replica(self):
+        """A @read_only view sees the replica's copy, which lags behind the primary."""
+        assert self.subject_titles() == {'Biology'}
+
+    def test_writes_go_to_the_primary(self):
+        """Inside a @read_only view, flushes and DML are still bound to the primary."""
+        with self.app.test_request_context():
+            g._read_replica = True
+            replica = replica_engine()
+
+            assert db.session.get_bind(mapper=Subject) is replica
+            assert db.session.get_bind(mapper=Subject, clause=db.update(Subject)) is db.engine
+
+    def test_user_reads_own_writes(self):
+        """After the user writes, their @read_only views read from the primary for a while."""
+        response = self.client.post('/api/update-dark-mode', json={'dark_mode': True})
+        assert response.status_code == 200
+
+        assert self.subject_titles() == {'Biology', 'Chemistry'}
+
+        self.forget_own_writes()
+        assert self.subject_titles() == {'Biology'}
+
+    def test_writes_flushed_by_the_request_commit_count(self):
+        """A write left for the request's final commit also keeps the user on the primary."""
+        assert self.client.post('/test/add-subject').status_code == 200
+        # Requests share the test's app context; in a worker the next request starts with a fresh g
+        g.pop('_wrote_primary', None)
+
+        with self.client.session_transaction() as session:
+            assert PRIMARY_UNTIL_KEY in session
+        assert self.subject_titles() == {'Biology', 'Chemistry', 'Physics'}
+
+    def test_calendar_reads_from_the_primary(self):
+        """The calendar may backfill task cards, so it is not @read_only and sees tasks the replica lacks."""
+        from datetime import datetime
+        from app.models.task import Task, TaskType
+
+        TaskType.create_default_types()
+        db.session.add(Task(user_id=self.user.id, subject_id=self.curriculum['subject'].id,
+                            task_type_id=TaskType.query.first().id, title='Osmosis practical',
+                            due_date=datetime.utcnow().date()))
+        db.session.commit()
+        self.forget_own_writes()
+
+        response = self.client.get('/calendar')
+        assert response.status_code == 200
+        assert b'<div class="calendar-event-title">Biology</div>' in response.data
+
+    def test_failed_replica_falls_back_to_the_primary(self, tmp_path):
+        """A broken replica is skipped and the view re-runs on the primary."""
+        replica_engine().dispose()
+        (tmp_path / 'replica.db').unlink()
+
+        assert self.subject_titles() == {'Biology', 'Chemistry'}
+        assert _replica_state['down_until'] > 0
+        # Skipped without trying it again until the retry interval passes
+        assert self.subject_titles() == {'Biology', 'Chemistry'}
@@ -0,0 +1,70 @@
+import os
+import pytest
+from app.utils.request_profiler import PROFILE_SUFFIX, load_profiles, summarize_profile
+
+TOKEN = 'profile-me'
+
+@pytest.mark.parametrize('app_config', [{
+    'PROFILER_ENABLED': True,
+    'PROFILER_TOKEN': TOKEN,
+    'PROFILER_DIR': '{tmp_path}/profiles',
+    'PROFILER_INTERVAL_MS': 1
+}], indirect=True, ids=['profiler'])
+class TestRequestProfiler:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, app_config, app, make_user):
+        """Create a user whose login (a bcrypt check) gives the sampler time to run."""
+        self.app = app
+        self.directory = app_config['PROFILER_DIR']
+        self.user = make_user()
+        self.client = app.test_client()
+        self.cli = app.test_cli_runner()
+
+    def log_in(self, headers=None):
+        response = self.client.post(
+            '/login', data={'username': self.user.username, 'password': 'password'}, headers=headers
+        )
+        assert response.status_code == 302
+
+    def profile_files(self):
+        return [name for name in os.listdir(self.directory) if name.endswith(PROFILE_SUFFIX)]
+
+    def test_unsampled_requests_are_not_profiled(self):
+        """With a zero sample rate and no header, nothing is recorded."""
+        self.log_in()
+        assert self.profile_files() == []
+
+    def test_admin_header_profiles_request(self):
+        """A request carrying the profiling token is written as collapsed stacks for its endpoint."""
+        self.log_in(headers={'X-Profile-Request': TOKEN})
+
+        profiles = load_profiles(self.directory)
+        assert list(profiles) == ['auth.login']
+        assert all(count > 0 for count in profiles['auth.login'].values())
+
+        summary = summarize_profile(profiles['auth.login'], top=100)
+        assert summary['samples'] == sum(profiles['auth.login'].values())
+        assert any(label == 'login (routes/auth.py)' for label, _ in summary['inclusive'])
+
+    def test_sample_rate_changes_at_runtime(self):
+        """The CLI changes the sample rate of running apps through the control file."""
+        result = self.cli.invoke(args=['profiler', 'rate', '1'])
+        assert result.exit_code == 0
+        self.app.extensions['request_profiler']._next_control_check = 0.0
+
+        self.log_in()
+        assert self.profile_files()
+
+        result = self.cli.invoke(args=['profiler', 'report', '--top', '5'])
+        assert result.exit_code == 0
+        assert 'auth.login' in result.output
+
+        result = self.cli.invoke(args=['profiler', 'clear'])
+        assert result.exit_code == 0
+        assert self.profile_files() == []
+
+        self.cli.invoke(args=['profiler', 'rate', '0'])
+        self.app.extensions['request_profiler']._next_control_check = 0.0
+        self.log_in()
+        assert self.profile_files() == []
@@ -0,0 +1,83 @@
+import json
+import pytest
+from app import db
+from app.models.user import User
+from app.utils.slow_query_log import explain_statement, parameter_shape, summarize_slow_queries
+from app.utils.task_repository import TaskRepository
+
+@pytest.mark.parametrize('app_config', [{
+    'SLOW_QUERY_LOG': True,
+    'SLOW_QUERY_THRESHOLD_MS': 0,
+    'SLOW_QUERY_EXPLAIN': True,
+    'SLOW_QUERY_LOG_FILE': '{tmp_path}/slow_queries.log'
+}], indirect=True, ids=['slow_query_log'])
+class TestSlowQueryLog:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, app_config, app, make_user):
+        """Create a user in an app whose slow query log records everything."""
+        self.app = app
+        self.path = app_config['SLOW_QUERY_LOG_FILE']
+        self.user = make_user()
+        yield
+        app.extensions['slow_query_log'].close()
+
+    def entries(self):
+        """Read the log entries written so far."""
+        self.app.extensions['slow_query_log'].logger.handlers[0].flush()
+        with open(self.path, encoding='utf-8') as log_file:
+            return [json.loads(line) for line in log_file]
+
+    def test_statement_is_attributed_to_caller(self):
+        """Entries name the app function that issued the statement and only the parameter types."""
+        TaskRepository(self.user.id).completion_counts()
+
+        entry = [e for e in self.entries() if 'count(tasks.id)' in e['statement']][-1]
+        assert 'app/utils/task_repository.py' in entry['caller']
+        assert entry['caller'].endswith('in completion_counts')
+        assert entry['parameters'] == ['int', 'int', 'int']
+        assert entry['duration_ms'] >= 0
+
+    def test_plan_is_captured_once_per_fingerprint(self):
+        """EXPLAIN runs for the first occurrence of a fingerprint only."""
+        repository = TaskRepository(self.user.id)
+        repository.completion_counts()
+        repository.completion_counts()
+
+        entries = [e for e in self.entries() if 'count(tasks.id)' in e['statement']]
+        assert len(entries) == 2
+        assert entries[0]['plan']
+        assert 'plan' not in entries[1]
+
+    def test_failed_explain_leaves_the_transaction_usable(self):
+        """A plan that cannot be captured is reported, and the caller's transaction carries on."""
+        db.session.add(User('pending', 'password'))
+        db.session.flush()
+        conn = db.session.connection()
+
+        plan = explain_statement(conn, 'SELECT * FROM no_such_table', {})
+        assert plan[0].startswith('EXPLAIN failed: ')
+        assert db.session.execute(db.select(db.func.count(User.id))).scalar() == 2
+        db.session.commit()
+
+    def test_summary_groups_by_fingerprint(self):
+        """The summary merges repeated statements and keeps their callers."""
+        for _ in range(3):
+            TaskRepository(self.user.id).completion_counts()
+        self.entries()
+
+        summary = summarize_slow_queries(str(self.path))
+        group = [g for g in summary if 'count(tasks.id)' in g['fingerprint']][0]
+        assert group['count'] == 3
+        assert group['max_ms'] >= group['mean_ms']
+        assert any(caller.endswith('in completion_counts') for caller in group['callers'])
+
+        result = self.app.test_cli_runner().invoke(args=['slow-queries', '--file', str(self.path), '--plans', '--limit', '100'])
+        assert result.exit_code == 0
+        assert 'count(tasks.id)' in result.output
+        assert 'in completion_counts' in result.output
+
+    def test_parameter_shape_hides_values(self):
+        """Parameter values are replaced by their types, including executemany batches."""
+        assert parameter_shape({'user_id': 7, 'title': 'x'}) == {'user_id': 'int', 'title': 'str'}
+        assert parameter_shape([(1, 'a'), (2, 'b')]) == {'rows': 2, 'shape': ['int', 'str']}
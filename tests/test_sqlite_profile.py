@@ -0,0 +1,99 @@
+import threading
+import pytest
+from sqlalchemy import create_engine
+from app import create_app, db
+from app.models.curriculum import Subject
+from app.utils.sqlite_profile import _serialized_engines, run_maintenance, serialize_writes
+from config.config import Config, TestingConfig
+
+class TestSQLiteProfile:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, app):
+        """Skip unless the tests run on SQLite."""
+        if db.engine.dialect.name != 'sqlite':
+            pytest.skip('SQLite only')
+        self.app = app
+
+    def pragma(self, name):
+        return db.session.execute(db.text(f"PRAGMA {name}")).scalar()
+
+    def test_connections_get_the_profile(self):
+        """Every connection runs in WAL mode with the tuned pragmas."""
+        assert self.pragma('journal_mode') == 'wal'
+        assert self.pragma('synchronous') == 1  # NORMAL
+        assert self.pragma('foreign_keys') == 1
+        assert self.pragma('busy_timeout') == self.app.config['SQLITE_BUSY_TIMEOUT_MS']
+        assert self.pragma('cache_size') == -self.app.config['SQLITE_CACHE_SIZE_KB']
+
+    def create_app_with(self, tmp_path, monkeypatch, **settings):
+        monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'other.db'}")
+        for name, value in settings.items():
+            monkeypatch.setattr(TestingConfig, name, value)
+        return create_app('testing')
+
+    def test_profile_and_foreign_keys_are_opt_in(self, tmp_path, monkeypatch):
+        """By default, existing databases keep SQLite's journal mode and foreign key behaviour."""
+        assert not Config.SQLITE_PROFILE and not Config.SQLITE_FOREIGN_KEYS and not Config.SQLITE_SERIALIZE_WRITES
+        default_app = self.create_app_with(tmp_path, monkeypatch, SQLITE_PROFILE=False, SQLITE_FOREIGN_KEYS=False)
+
+        with default_app.app_context():
+            assert self.pragma('journal_mode') == 'delete'
+            assert self.pragma('foreign_keys') == 0
+            db.session.remove()
+            db.engine.dispose()
+
+    def test_foreign_keys_without_the_profile(self, tmp_path, monkeypatch):
+        """Foreign keys can be enforced without switching the file to WAL."""
+        keys_app = self.create_app_with(tmp_path, monkeypatch, SQLITE_PROFILE=False, SQLITE_FOREIGN_KEYS=True)
+
+        with keys_app.app_context():
+            assert self.pragma('journal_mode') == 'delete'
+            assert self.pragma('foreign_keys') == 1
+            db.session.remove()
+            db.engine.dispose()
+
+    def test_maintenance_checkpoints_the_wal(self):
+        """A TRUNCATE checkpoint writes every WAL page back, and the command reports it."""
+        db.session.add(Subject(title='Physics'))
+        db.session.commit()
+
+        result = run_maintenance(db.engine, checkpoint='TRUNCATE')
+        assert result['busy'] == 0
+        assert result['checkpointed_pages'] == result['wal_pages']
+
+        output = self.app.test_cli_runner().invoke(args=['sqlite-maintenance']).output
+        assert 'Checkpoint TRUNCATE complete' in output
+
+    def test_serialized_writers_wait_for_each_other(self, tmp_path, monkeypatch):
+        """With SQLITE_SERIALIZE_WRITES, a second writer waits for the first transaction instead of failing."""
+        serialized_app = self.create_app_with(tmp_path, monkeypatch, SQLITE_SERIALIZE_WRITES=True)
+        with serialized_app.app_context():
+            assert db.engine in _serialized_engines
+            db.session.remove()
+            db.engine.dispose()
+
+        # SQLite itself gives up at once here, so only the lock can make the writer wait
+        engine = create_engine(f"sqlite:///{tmp_path / 'serialized.db'}", connect_args={'timeout': 0})
+        serialize_writes(engine, timeout=5)
+        Subject.__table__.create(engine)
+        insert = db.insert(Subject.__table__)
+        written = []
+
+        def second_writer():
+            with engine.begin() as conn:
+                conn.execute(insert.values(title='History'))
+            written.append('History')
+
+        first = engine.connect()
+        first.execute(insert.values(title='Physics'))
+        thread = threading.Thread(target=second_writer)
+        thread.start()
+        thread.join(0.2)
+        assert thread.is_alive()
+
+        first.commit()
+        first.close()
+        thread.join(5)
+        assert written == ['History']
+        engine.dispose()
@@ -0,0 +1,82 @@
+from datetime import datetime
+import pytest
+from app import db
+from app.models.task import Task, TaskType, TaskSubtopic
+from app.utils.task_card_utils import refresh_task_cards
+
+class TestTaskCards:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, app, curriculum, make_user, login):
+        """Create a logged-in user with one task due today."""
+        TaskType.create_default_types()
+        self.user = make_user()
+        self.client = login(self.user)
+        self.subtopic_ids = [subtopic.id for subtopic in curriculum['subtopics']]
+
+        task = Task(
+            user_id=self.user.id,
+            subject_id=curriculum['subject'].id,
+            task_type_id=TaskType.query.filter_by(name='quiz').first().id,
+            title='Quiz: Cells',
+            topic_id=curriculum['topic'].id,
+            due_date=datetime.utcnow().date()
+        )
+        db.session.add(task)
+        db.session.flush()
+        for subtopic_id in self.subtopic_ids[:2]:
+            db.session.add(TaskSubtopic(task_id=task.id, subtopic_id=subtopic_id))
+        db.session.commit()
+        self.task_id = task.id
+
+    def card(self):
+        """Get the stored card for the test task."""
+        db.session.expire_all()
+        return db.session.get(Task, self.task_id).card_data
+
+    def test_refresh_builds_card(self):
+        """A refreshed card holds everything the dashboard displays."""
+        refresh_task_cards([self.task_id])
+        card = self.card()
+
+        assert card['subject']['title'] == 'Biology'
+        assert card['task_type']['name'] == 'quiz'
+        assert card['topic']['title'] == 'Cells'
+        assert [item['subtopic']['title'] for item in card['subtopics']] == ['Subtopic 0', 'Subtopic 1']
+        assert all(item['confidence'] == 3 for item in card['subtopics'])
+
+    def test_adding_subtopics_builds_card_once(self, count_queries):
+        """Adding several subtopics reads the confidences for the card once, not once per subtopic."""
+        task = db.session.get(Task, self.task_id)
+        with count_queries() as statements:
+            task.add_subtopics(self.subtopic_ids[2:5])
+
+        assert sum('FROM subtopic_confidences' in statement for statement in statements) == 1
+        assert len(self.card()['subtopics']) == 5
+        assert db.session.get(Task, self.task_id).total_duration == 5 * 15
+
+    def test_confidence_change_updates_card(self):
+        """Changing a subtopic's confidence patches the cards that show it."""
+        refresh_task_cards([self.task_id])
+
+        response = self.client.put(
+            f'/api/confidence/user/subtopic/{self.subtopic_ids[0]}',
+            json={'confidence_level': 5}
+        )
+        assert response.status_code == 200
+
+        confidences = [item['confidence'] for item in self.card()['subtopics']]
+        assert confidences == [5, 3]
+
+    def test_dashboard_reads_cards_in_one_query(self, count_queries):
+        """Once cards exist, the dashboard loads today's tasks with a single task query."""
+        refresh_task_cards([self.task_id])
+
+        with count_queries() as statements:
+            response = self.client.get('/')
+
+        assert response.status_code == 200
+        assert b'Subtopic 1' in response.data
+        task_queries = [statement for statement in statements if 'FROM tasks' in statement]
+        assert len(task_queries) == 1
+        assert not any('task_subtopics' in statement for statement in statements)
@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta
+import pytest
+from app import db
+from app.models.task import Task, TaskSubtopic, TaskType
+from app.models.task_history import ArchivedTask, TaskDailyRollup
+from app.utils.task_compaction import compact_tasks
+from app.utils.task_repository import TaskRepository
+
+class TestTaskCompaction:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, app, curriculum, make_user):
+        """Create a user with recent, old and very old tasks, some with subtopics."""
+        TaskType.create_default_types()
+        self.app = app
+        self.user = make_user()
+        self.subject_id = curriculum['subject'].id
+        self.subtopic_ids = [subtopic.id for subtopic in curriculum['subtopics']]
+        task_type_id = TaskType.query.filter_by(name='notes').first().id
+        now = datetime.utcnow()
+
+        def add(days_ago, finished=None, subtopics=0):
+            created = now - timedelta(days=days_ago)
+            task = Task(user_id=self.user.id, subject_id=self.subject_id, task_type_id=task_type_id,
+                        title='Task', due_date=created.date(), total_duration=20)
+            task.created_at = created
+            if finished:
+                setattr(task, finished, created)
+            db.session.add(task)
+            db.session.flush()
+            for subtopic_id in self.subtopic_ids[:subtopics]:
+                db.session.add(TaskSubtopic(task_id=task.id, subtopic_id=subtopic_id))
+            return task
+
+        # Recent: kept whatever their state
+        self.recent = [add(5), add(5, 'skipped_at', 2), add(5, 'completed_at', 2)]
+        # Past the retention window: skipped go, completed stay unless archived, open stay
+        self.old_skipped = [add(120, 'skipped_at', 2), add(120, 'skipped_at')]
+        self.old_completed = add(120, 'completed_at', 3)
+        self.old_open = add(120)
+        # Past the history window: every finished task goes
+        self.ancient = [add(400, 'completed_at', 1), add(400, 'skipped_at')]
+        db.session.commit()
+        self.old_completed_id, self.old_open_id = self.old_completed.id, self.old_open.id
+        self.counts_before = (TaskRepository(self.user.id).completion_counts(),
+                              TaskRepository(self.user.id).completion_counts(by_subject=True))
+
+    def test_compaction_keeps_counts_and_deletes_detail_rows(self):
+        """Skipped and very old tasks are rolled up per day and deleted in id ranges."""
+        report = compact_tasks(batch_size=2)
+
+        assert report['tasks_deleted'] == 4
+        assert report['task_subtopics_deleted'] == 3
+        assert report['rows_reclaimed'] == 7
+        assert report['chunks'] == 2
+        assert report['maintenance']['vacuumed']
+        assert Task.query.count() == 5
+        assert db.session.get(Task, self.old_completed_id) is not None
+        assert db.session.get(Task, self.old_open_id) is not None
+
+        repository = TaskRepository(self.user.id)
+        assert (repository.completion_counts(), repository.completion_counts(by_subject=True)) == self.counts_before
+
+        rollups = TaskDailyRollup.query.order_by(TaskDailyRollup.day).all()
+        assert [(r.tasks, r.completed, r.skipped, r.completed_minutes) for r in rollups] == [(2, 1, 1, 20), (2, 0, 2, 0)]
+
+    def test_rollups_are_counted_on_the_due_date(self):
+        """A task due after the day it was created is counted on its due date before and after compaction."""
+        for task in self.ancient:
+            task.due_date += timedelta(days=10)
+        db.session.commit()
+        due_date = self.ancient[0].due_date
+        repository = TaskRepository(self.user.id)
+        before = [repository.completion_counts(start_date=due_date, end_date=due_date),
+                  repository.completion_counts(end_date=due_date - timedelta(days=1))]
+
+        compact_tasks(vacuum=False)
+
+        assert TaskDailyRollup.query.filter_by(day=due_date).one().tasks == 2
+        assert [repository.completion_counts(start_date=due_date, end_date=due_date),
+                repository.completion_counts(end_date=due_date - timedelta(days=1))] == before
+
+    def test_repeated_runs_add_to_existing_rollups(self):
+        """A second run for the same days adds to their rollups instead of duplicating them."""
+        compact_tasks(limit=1, vacuum=False)
+        report = compact_tasks(vacuum=False)
+
+        assert report['tasks_deleted'] == 3
+        assert TaskDailyRollup.query.count() == 2
+        assert sum(rollup.tasks for rollup in TaskDailyRollup.query) == 4
+        assert TaskRepository(self.user.id).completion_counts() == self.counts_before[0]
+
+    def test_archive_completed(self):
+        """Archiving also moves completed tasks past the retention window, with their subtopic ids."""
+        report = compact_tasks(archive_completed=True)
+
+        assert report['tasks_deleted'] == 5
+        assert report['tasks_archived'] == 2
+        archived = db.session.get(ArchivedTask, self.old_completed_id)
+        assert archived.subtopic_ids == self.subtopic_ids[:3]
+        assert archived.total_duration == 20
+        assert TaskRepository(self.user.id).completion_counts() == self.counts_before[0]
+
+    def test_retention_below_analytics_window_is_rejected(self):
+        """Analytics reads the last 30 days of detail, so a shorter retention is refused."""
+        with pytest.raises(ValueError):
+            compact_tasks(retention_days=7)
+
+        result = self.app.test_cli_runner().invoke(args=['compact-tasks', '--retention-days', '7'])
+        assert result.exit_code != 0
+        assert Task.query.count() == 9
+
+    def test_cli_reports_reclaimed_rows(self):
+        """The command prints the report and the database size before and after the VACUUM."""
+        result = self.app.test_cli_runner().invoke(args=['compact-tasks', '--batch-size', '3'])
+
+        assert result.exit_code == 0, result.output
+        assert '4 tasks and 3 task subtopics deleted (7 rows reclaimed)' in result.output
+        assert 'Database size' in result.output
@@ -0,0 +1,108 @@
+from datetime import date, datetime, timedelta
+import pytest
+from app import db
+from app.models.task import Task, TaskSubtopic, TaskType
+from app.models.task_history import TaskDailyRollup
+from app.utils.task_partitions import (detach_partitions, ensure_partitions, is_partitioned, monthly_partitions,
+                                       months_after, partition_name, partition_task_tables)
+from app.utils.task_repository import TaskRepository
+
+class TestTaskPartitions:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, app, curriculum, make_user):
+        """Create a user with tasks due this month and four months ago."""
+        TaskType.create_default_types()
+        self.user = make_user()
+        self.today = datetime.utcnow().date()
+        self.subtopic_ids = [subtopic.id for subtopic in curriculum['subtopics']]
+        self.subject_id = curriculum['subject'].id
+        self.task_type_id = task_type_id = TaskType.query.filter_by(name='notes').first().id
+
+        for days_ago, finished in ((0, None), (0, 'completed_at'), (120, 'completed_at'), (120, 'skipped_at')):
+            task = Task(user_id=self.user.id, subject_id=curriculum['subject'].id, task_type_id=task_type_id,
+                        title='Task', due_date=self.today - timedelta(days=days_ago))
+            if finished:
+                setattr(task, finished, datetime.utcnow())
+            db.session.add(task)
+            db.session.flush()
+            task.add_subtopic(self.subtopic_ids[0])
+        db.session.commit()
+
+    def test_month_arithmetic(self):
+        """Months roll over years in both directions and name their partitions."""
+        assert months_after(date(2026, 11, 30), 2) == date(2027, 1, 1)
+        assert months_after(date(2026, 1, 15), -1) == date(2025, 12, 1)
+        assert months_after(date(2026, 10, 19), 0) == date(2026, 10, 1)
+        assert partition_name('task_subtopics', date(2026, 3, 1)) == 'task_subtopics_2026_03'
+
+    def test_task_subtopics_copy_their_task_due_date(self):
+        """New task subtopics get their task's due date, the partition key, on flush."""
+        assert {row.task_due_date for row in TaskSubtopic.query} == {self.today, self.today - timedelta(days=120)}
+
+        task_id = db.session.execute(db.select(Task.id).order_by(Task.id)).scalars().first()
+        db.session.expunge_all()
+        db.session.add(TaskSubtopic(task_id=task_id, subtopic_id=self.subtopic_ids[1]))
+        db.session.commit()
+        assert TaskSubtopic.query.order_by(TaskSubtopic.id.desc()).first().task_due_date == self.today
+
+    def test_tasks_are_due_the_day_they_are_created_by_default(self):
+        """The due date is the partition key, so a task never goes without one."""
+        assert not Task.__table__.c.due_date.nullable
+        task = Task(user_id=self.user.id, subject_id=self.subject_id, task_type_id=self.task_type_id, title='Task')
+        assert task.due_date == self.today
+
+    def test_orphaned_task_subtopics_stop_the_conversion(self):
+        """Task subtopics without a task have no partition key, so nothing is converted while any are left."""
+        if db.engine.dialect.name != 'postgresql':
+            pytest.skip('PostgreSQL only')
+
+        db.session.commit()
+        with pytest.raises(ValueError, match='belong to no task'):
+            with db.engine.begin() as conn:
+                # Only possible where the foreign key was never enforced; rolled back with the conversion
+                for name in conn.execute(db.text(
+                    "SELECT conname FROM pg_constraint WHERE conrelid = 'task_subtopics'::regclass "
+                    "AND contype = 'f' AND confrelid = 'tasks'::regclass"
+                )).scalars().all():
+                    conn.execute(db.text(f'ALTER TABLE task_subtopics DROP CONSTRAINT "{name}"'))
+                conn.execute(db.text("INSERT INTO task_subtopics (task_id, subtopic_id, duration) VALUES (0, :subtopic, 15)"),
+                             {'subtopic': self.subtopic_ids[0]})
+                partition_task_tables(conn)
+
+        with db.engine.connect() as conn:
+            assert not is_partitioned(conn)
+        assert TaskSubtopic.query.count() == 4
+
+    def test_partitioning_prunes_and_detaches_into_rollups(self):
+        """Converted tables keep their rows, queries by due date scan one month and old months are rolled up."""
+        if db.engine.dialect.name != 'postgresql':
+            pytest.skip('PostgreSQL only')
+
+        counts = TaskRepository(self.user.id).completion_counts()
+        db.session.commit()
+        with db.engine.begin() as conn:
+            result = partition_task_tables(conn, months_ahead=1)
+        assert result['rows'] == {'tasks': 4, 'task_subtopics': 4}
+
+        with db.engine.begin() as conn:
+            assert ensure_partitions(conn, months_ahead=1) == []
+            assert months_after(self.today, 1) in monthly_partitions(conn)
+            plan = '\n'.join(conn.execute(
+                db.text("EXPLAIN SELECT * FROM tasks WHERE user_id = :user AND due_date = :day"),
+                {'user': self.user.id, 'day': self.today}
+            ).scalars())
+        assert partition_name('tasks', self.today) in plan
+        assert partition_name('tasks', months_after(self.today, -4)) not in plan
+
+        with db.engine.begin() as conn:
+            months = detach_partitions(conn, months_after(self.today, -2), archive_schema=None)
+        assert months_after(self.today - timedelta(days=120), 0) in months
+        assert Task.query.count() == 2
+        assert TaskDailyRollup.query.count() == 1
+        assert TaskRepository(self.user.id).completion_counts() == counts
+
+    def test_recent_months_cannot_be_detached(self):
+        """Analytics reads the last 30 days of task detail, so those months stay attached."""
+        with pytest.raises(ValueError):
+            detach_partitions(None, self.today)
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+import pytest
+from app import db
+from app.models.task import Task, TaskType
+from app.utils.optimization_batch import db_batch_update
+from app.utils.optimization_tasks import update_task_priorities
+from app.utils.task_priority import task_priority
+
+class TestTaskPriorities:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, app, curriculum, make_user):
+        """Create open tasks due from yesterday to in two weeks at several priorities."""
+        TaskType.create_default_types()
+        self.user = make_user()
+        self.today = datetime.utcnow().date()
+        task_type_id = TaskType.query.filter_by(name='notes').first().id
+        due_dates = [self.today + timedelta(days=days) for days in (-1, 0, 1, 2, 7, 8, 14)]
+        for due_date in due_dates:
+            for priority in (10, 50, 75, 95):
+                task = Task(user_id=self.user.id, subject_id=curriculum['subject'].id,
+                            task_type_id=task_type_id, title='Task', due_date=due_date)
+                task.priority = priority
+                db.session.add(task)
+        db.session.commit()
+
+    def test_sql_update_matches_python_rules(self, count_queries):
+        """One UPDATE sets every open task to the priority task_priority computes."""
+        expected = {task.id: task_priority(task.priority, task.due_date, self.today) for task in Task.query}
+
+        with count_queries() as statements:
+            updated = update_task_priorities(self.user.id)
+
+        assert len([statement for statement in statements if statement.startswith('UPDATE')]) == 1
+        assert updated == 28
+        assert {task.id: task.priority for task in Task.query} == expected
+
+    def test_finished_tasks_are_left_alone(self):
+        """Completed and skipped tasks keep their priority."""
+        Task.query.update({Task.completed_at: datetime.utcnow()})
+        db.session.commit()
+
+        assert update_task_priorities(self.user.id) == 0
+        assert {task.priority for task in Task.query} == {10, 50, 75, 95}
+
+    def test_batch_update_writes_only_changed_rows(self, count_queries):
+        """Callbacks see column values and changed rows are written with one executemany per batch."""
+        ids = [task.id for task in Task.query.order_by(Task.id)]
+
+        def bump(task):
+            task.priority = task_priority(task.priority, task.due_date, self.today)
+
+        original = {task.id: task.priority for task in Task.query}
+        expected = {task.id: task_priority(task.priority, task.due_date, self.today) for task in Task.query}
+
+        with count_queries() as statements:
+            updated = db_batch_update(Task, ids, bump, batch_size=16)
+
+        assert updated == sum(1 for task_id in ids if expected[task_id] != original[task_id])
+        # Two batches of 16, each one SELECT and at most one executemany UPDATE
+        assert len([statement for statement in statements if statement.startswith('UPDATE')]) == 2
+        db.session.expire_all()
+        assert {task.id: task.priority for task in Task.query} == expected
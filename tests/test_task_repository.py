@@ -0,0 +1,98 @@
+from datetime import datetime
+import pytest
+from app import db
+from app.models.task import Task, TaskType, TaskSubtopic
+from app.utils.task_repository import TaskRepository
+
+class TestTaskRepository:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, app, curriculum, make_user, login):
+        """Create a logged-in user and the default task types."""
+        TaskType.create_default_types()
+        self.user = make_user()
+        self.client = login(self.user)
+        self.subject_id = curriculum['subject'].id
+        self.topic_id = curriculum['topic'].id
+        self.subtopic_ids = [subtopic.id for subtopic in curriculum['subtopics']]
+        self.task_type_id = TaskType.query.filter_by(name='notes').first().id
+
+    def add_tasks(self, count, subtopics_per_task=3):
+        """Create tasks due today, each linked to several subtopics."""
+        today = datetime.utcnow().date()
+        for index in range(count):
+            task = Task(
+                user_id=self.user.id,
+                subject_id=self.subject_id,
+                task_type_id=self.task_type_id,
+                title=f'Task {index}',
+                topic_id=self.topic_id,
+                due_date=today
+            )
+            db.session.add(task)
+            db.session.flush()
+            for offset in range(subtopics_per_task):
+                subtopic_id = self.subtopic_ids[(index + offset) % len(self.subtopic_ids)]
+                db.session.add(TaskSubtopic(task_id=task.id, subtopic_id=subtopic_id))
+        db.session.commit()
+        db.session.expire_all()
+
+    def queries_for(self, count_queries, method, url, **kwargs):
+        """Count the queries one request runs."""
+        with count_queries() as statements:
+            response = getattr(self.client, method)(url, **kwargs)
+        assert response.status_code == 200
+        return len(statements)
+
+    @pytest.mark.parametrize('url', ['/', '/calendar', '/pomodoro', '/progress'])
+    def test_page_queries_do_not_grow_with_tasks(self, count_queries, url):
+        """Rendering one task or many costs the same number of queries."""
+        self.add_tasks(1)
+        few = self.queries_for(count_queries, 'get', url)
+
+        self.add_tasks(6)
+        many = self.queries_for(count_queries, 'get', url)
+
+        assert many == few
+
+    @pytest.mark.parametrize('profile', ['summary', 'card', 'detail', 'calendar'])
+    def test_profiles_load_lists_in_constant_queries(self, count_queries, profile):
+        """A profile loads tasks and everything its views touch in a fixed number of queries."""
+        self.add_tasks(5)
+        repository = TaskRepository(self.user.id)
+
+        with count_queries() as statements:
+            tasks = repository.active_for_day(datetime.utcnow().date(), profile=profile)
+            for task in tasks:
+                if profile != 'summary':
+                    _ = task.subject.title
+                    for task_subtopic in task.subtopics:
+                        _ = task_subtopic.subtopic.title
+                if profile == 'calendar':
+                    _ = [task_subtopic.subtopic.topic.title for task_subtopic in task.subtopics]
+
+        assert len(tasks) == 5
+        # One query for the tasks, plus one select-in for their subtopics
+        assert len(statements) == (1 if profile == 'summary' else 2)
+
+    def test_complete_task_prompt_queries_are_bounded(self, count_queries):
+        """Completing a task loads its subtopics and their confidences without per-subtopic queries."""
+        self.add_tasks(1, subtopics_per_task=1)
+        self.add_tasks(1, subtopics_per_task=6)
+        small, large = Task.query.order_by(Task.id).all()
+
+        few = self.queries_for(count_queries, 'post', f'/api/tasks/complete/{small.id}')
+        many = self.queries_for(count_queries, 'post', f'/api/tasks/complete/{large.id}')
+
+        assert many == few
+
+    def test_completion_counts(self):
+        """Aggregate counts match the per-subject totals."""
+        self.add_tasks(4)
+        task = Task.query.first()
+        task.completed_at = datetime.utcnow()
+        db.session.commit()
+
+        repository = TaskRepository(self.user.id)
+        assert repository.completion_counts() == (4, 1)
+        assert repository.completion_counts(by_subject=True) == {self.subject_id: (4, 1)}
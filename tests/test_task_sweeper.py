@@ -0,0 +1,124 @@
+from datetime import datetime, timedelta
+import pytest
+from app import db
+from app.models.curriculum import Subject, Subtopic, Topic
+from app.models.task import Task, TaskSubtopic, TaskType
+from app.utils.task_sweeper import sweep_stale_tasks
+
+class TestStaleTaskSweeper:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, app, curriculum, make_user):
+        """Create three users with overdue, current and finished tasks in two subjects."""
+        TaskType.create_default_types()
+        chemistry = Subject(title='Chemistry')
+        bonding = Topic(subject=chemistry, name='Bonding', title='Bonding')
+        db.session.add_all([chemistry, bonding, *[Subtopic(topic=bonding, title=f'Bond {i}') for i in range(4)]])
+        db.session.commit()
+
+        self.app = app
+        self.today = datetime.utcnow().date()
+        self.users = [make_user(f'student{index}') for index in range(3)]
+        self.subject_ids = [curriculum['subject'].id, chemistry.id]
+        task_type_id = TaskType.query.filter_by(name='notes').first().id
+
+        def add(user, subject_id, days_ago, finished=None):
+            task = Task(user_id=user.id, subject_id=subject_id, task_type_id=task_type_id,
+                        title='Task', due_date=self.today - timedelta(days=days_ago))
+            if finished:
+                setattr(task, finished, datetime.utcnow())
+            db.session.add(task)
+            return task
+
+        first, second, third = self.users
+        # Overdue in both subjects, twice in Biology
+        self.stale = [add(first, self.subject_ids[0], 3), add(first, self.subject_ids[0], 1),
+                      add(first, self.subject_ids[1], 2), add(second, self.subject_ids[1], 10)]
+        # Finished or not yet due
+        self.kept = [add(first, self.subject_ids[0], 5, 'completed_at'), add(second, self.subject_ids[0], 5, 'skipped_at'),
+                     add(third, self.subject_ids[0], 0), add(third, self.subject_ids[1], -2)]
+        db.session.commit()
+        self.stale_ids = [task.id for task in self.stale]
+        self.kept_ids = [task.id for task in self.kept]
+
+    def open_today(self, user):
+        return sorted(task.subject_id for task in Task.query.filter(
+            Task.user_id == user.id, Task.due_date == self.today, Task.skipped_at.is_(None)
+        ))
+
+    def test_sweep_retires_stale_tasks_and_replaces_per_subject(self):
+        """Overdue open tasks are skipped in bulk and each user gets one new task per subject."""
+        report = sweep_stale_tasks(batch_size=2)
+
+        assert report['tasks_retired'] == 4
+        assert report['tasks_generated'] == 3
+        assert report['chunks'] == 2
+        assert Task.query.filter(Task.id.in_(self.stale_ids), Task.skipped_at.is_(None)).count() == 0
+        # The completed task and the tasks not yet overdue stay open
+        assert Task.query.filter(Task.id.in_(self.kept_ids), Task.skipped_at.is_(None)).count() == 3
+
+        first, second, third = self.users
+        assert self.open_today(first) == sorted(self.subject_ids)
+        assert self.open_today(second) == [self.subject_ids[1]]
+        assert self.open_today(third) == [self.subject_ids[0]]
+
+        new_tasks = Task.query.filter(Task.id > max(self.stale_ids + self.kept_ids)).all()
+        assert all(task.card_data for task in new_tasks)
+        assert TaskSubtopic.query.filter(TaskSubtopic.task_id.in_([task.id for task in new_tasks])).count()
+
+    def test_sweep_commits_once_per_chunk(self):
+        """A chunk of users is retired, replaced and committed in one transaction."""
+        commits = []
+
+        def record_commit(connection):
+            commits.append(connection)
+
+        db.event.listen(db.engine, 'commit', record_commit)
+        try:
+            report = sweep_stale_tasks(batch_size=10)
+        finally:
+            db.event.remove(db.engine, 'commit', record_commit)
+
+        assert report['chunks'] == 1
+        assert len(commits) == 1
+
+    def test_existing_task_for_today_is_not_duplicated(self):
+        """Users who already have an open task for the subject today get no replacement for it."""
+        third = self.users[2]
+        old = Task(user_id=third.id, subject_id=self.subject_ids[0], task_type_id=self.kept[0].task_type_id,
+                   title='Task', due_date=self.today - timedelta(days=1))
+        db.session.add(old)
+        db.session.commit()
+
+        report = sweep_stale_tasks(user_ids=[third.id])
+
+        assert report['tasks_retired'] == 1
+        assert report['tasks_generated'] == 0
+
+    def test_grace_days_limit_and_no_replace(self):
+        """Only tasks overdue beyond the grace period are retired, up to the limit, optionally without replacements."""
+        report = sweep_stale_tasks(grace_days=2, replace=False)
+        assert report['tasks_retired'] == 2
+        assert report['tasks_generated'] == 0
+
+        report = sweep_stale_tasks(limit=1, replace=False)
+        assert report['tasks_retired'] == 1
+
+    def test_replacements_are_due_on_the_swept_day(self):
+        """A sweep run for another day generates replacements due that day, not today."""
+        day = self.today - timedelta(days=2)
+        report = sweep_stale_tasks(today=day)
+
+        assert report['tasks_retired'] == 2
+        new_tasks = Task.query.filter(Task.skipped_at.is_(None), Task.id.notin_(self.stale_ids + self.kept_ids)).all()
+        assert len(new_tasks) == report['tasks_generated'] == 2
+        assert {task.due_date for task in new_tasks} == {day}
+
+    def test_cli_prints_throughput_report(self, tmp_path):
+        """The command prints the report and appends it as JSON."""
+        output = tmp_path / 'sweeps.jsonl'
+        result = self.app.test_cli_runner().invoke(args=['sweep-stale-tasks', '--no-replace', '--output', str(output)])
+
+        assert result.exit_code == 0, result.output
+        assert '4 tasks retired and 0 generated for 2 users in 1 chunks' in result.output
+        assert '"tasks_retired": 4' in output.read_text()
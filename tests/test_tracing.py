@@ -0,0 +1,108 @@
+import json
+import time
+from pathlib import Path
+import pytest
+from app.models.task import TaskType
+from app.utils.task_generator_main import generate_task_for_subject
+from app.utils.tracing import (
+    NOOP_SPAN, TraceWriter, critical_path, finish_trace, record_span, span, start_trace
+)
+
+def span_names(node):
+    """All span names in an exported trace, depth first."""
+    names = [node['name']]
+    for child in node['children']:
+        names.extend(span_names(child))
+    return names
+
+@pytest.mark.parametrize('app_config', [{
+    'TRACE_SAMPLE_RATE': 1.0,
+    'TRACE_FILE': '{tmp_path}/traces.jsonl'
+}], indirect=True, ids=['tracing'])
+class TestTracing:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, app_config, app, curriculum, make_user, login):
+        """Create a logged-in user in an app tracing every request."""
+        TaskType.create_default_types()
+        self.app = app
+        self.path = Path(app_config['TRACE_FILE'])
+        self.curriculum = curriculum
+        self.user = make_user()
+        self.client = login(self.user)
+        self.path.unlink(missing_ok=True)
+
+    def traces(self):
+        with open(self.path, encoding='utf-8') as trace_file:
+            return [json.loads(line) for line in trace_file]
+
+    def test_spans_outside_a_trace_are_noops(self):
+        """Without an open trace, spans record nothing."""
+        with span('anything', size=1) as current:
+            assert current is NOOP_SPAN
+            current.set(more=2)
+
+    def test_spans_nest_and_recorded_stages_adopt_children(self):
+        """Stages recorded after the fact contain the spans that ran during them."""
+        writer = TraceWriter(str(self.path))
+        root, token = start_trace('job', kind='test')
+        with span('outer', items=3) as outer:
+            stage_start = time.perf_counter()
+            with span('inner'):
+                pass
+            record_span('stage', stage_start, time.perf_counter(), step=1)
+            outer.set(done=True)
+        finish_trace(root, token, writer)
+
+        trace = self.traces()[-1]
+        assert trace['name'] == 'job'
+        outer = trace['children'][0]
+        assert outer['attributes'] == {'items': 3, 'done': True}
+        assert [child['name'] for child in outer['children']] == ['stage']
+        assert [child['name'] for child in outer['children'][0]['children']] == ['inner']
+        assert [name for name, _, _ in critical_path(trace)] == ['job', 'outer', 'stage', 'inner']
+
+    def test_task_generation_stages_are_traced(self):
+        """Every stage of the generation pipeline appears with its attributes."""
+        writer = TraceWriter(str(self.path))
+        root, token = start_trace('job')
+        task = generate_task_for_subject(self.user, self.curriculum['subject'].id)
+        finish_trace(root, token, writer)
+        assert task is not None
+
+        generation = self.traces()[-1]['children'][0]
+        assert generation['name'] == 'task_generation'
+        assert generation['attributes'] == {'user_id': self.user.id, 'subject_id': self.curriculum['subject'].id}
+
+        stages = [child['name'] for child in generation['children']]
+        assert stages == [
+            'task_generation.confidence_flush',
+            'task_generation.subject_lookup',
+            'task_generation.task_type_selection',
+            'task_generation.topic_listing',
+            'task_generation.weighted_topic_selection',
+            'task_generation.task_insert',
+            'task_generation.subtopic_packing',
+            'task_generation.card_refresh',
+        ]
+        packing = generation['children'][6]
+        assert 'task_generation.subtopic_confidence_load' in span_names(packing)
+        assert 'task_generation.commit' in span_names(packing)
+
+    def test_requests_are_exported_and_summarised(self):
+        """A sampled request is written with its confidence spans and shows up in the CLI."""
+        subtopic_id = self.curriculum['subtopics'][0].id
+        response = self.client.put(f'/api/confidence/user/subtopic/{subtopic_id}', json={'confidence_level': 5})
+        assert response.status_code == 200
+
+        trace = [t for t in self.traces() if t['attributes'].get('method') == 'PUT'][-1]
+        assert trace['attributes']['status'] == 200
+        assert trace['attributes']['user_id'] == self.user.id
+        names = span_names(trace)
+        for name in ('confidence.apply', 'confidence.load_rows', 'confidence.topic_recalculation', 'confidence.commit'):
+            assert name in names
+
+        result = self.app.test_cli_runner().invoke(args=['traces', '--endpoint', trace['name']])
+        assert result.exit_code == 0
+        assert 'critical path' in result.output
+        assert 'confidence.apply' in result.output
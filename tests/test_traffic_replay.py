@@ -0,0 +1,77 @@
+import json
+import pytest
+from app.utils.traffic_capture import anonymise_user, load_capture
+from app.utils.traffic_replay import diff_reports, percentile, replay
+
+CONFIDENCE_ROUTE = 'PUT /api/confidence/user/subtopic/<int:subtopic_id>'
+
+@pytest.mark.parametrize('app_config', [{
+    'TRAFFIC_CAPTURE': True,
+    'TRAFFIC_CAPTURE_FILE': '{tmp_path}/traffic.jsonl'
+}], indirect=True, ids=['traffic_capture'])
+class TestTrafficReplay:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, app_config, app, curriculum, make_user, login):
+        """Record a short session of a logged-in user."""
+        self.app = app
+        self.path = app_config['TRAFFIC_CAPTURE_FILE']
+        self.user = make_user()
+        self.subtopic_id = curriculum['subtopics'][0].id
+
+        client = login(self.user)
+        client.get('/calendar')
+        client.put(f'/api/confidence/user/subtopic/{self.subtopic_id}', json={'confidence_level': 4})
+        client.post('/api/subtopics/update_confidence', json={'subtopics': {str(self.subtopic_id): {'confidence': 2}}})
+        client.get('/api/pomodoro/stats')
+
+    def test_capture_is_anonymised_and_filtered(self):
+        """Matching requests are logged with their body and a pseudonymous user."""
+        sessions = load_capture(str(self.path))
+        pseudonym = anonymise_user(self.user.id, self.app.config['SECRET_KEY'])
+        assert list(sessions) == [pseudonym]
+        assert pseudonym != str(self.user.id)
+
+        entries = sessions[pseudonym]
+        assert [(entry['m'], entry['p']) for entry in entries] == [
+            ('GET', '/calendar'),
+            ('PUT', f'/api/confidence/user/subtopic/{self.subtopic_id}'),
+            ('POST', '/api/subtopics/update_confidence'),
+        ]
+        assert entries[1]['b'] == {'confidence_level': 4}
+        assert all(entry['s'] == 200 and entry['ms'] > 0 for entry in entries)
+
+    def test_replay_reports_latency_and_queries(self):
+        """Replaying with several virtual users reports every captured endpoint."""
+        report = replay(self.app, load_capture(str(self.path)), users=3, speedup=0)
+
+        assert report['virtual_users'] == 3
+        assert report['requests'] == 9
+        stats = report['endpoints'][CONFIDENCE_ROUTE]
+        assert stats['count'] == 3
+        assert stats['statuses'] == {'200': 3}
+        assert stats['p50_ms'] <= stats['p95_ms'] <= stats['max_ms']
+        assert stats['mean_queries'] > 0
+
+    def test_reports_are_compared(self, tmp_path):
+        """Two reports are diffed per endpoint and p95 regressions are flagged."""
+        base = {'revision': 'aaa', 'endpoints': {CONFIDENCE_ROUTE: {'p50_ms': 5.0, 'p95_ms': 10.0, 'mean_queries': 6}}}
+        head = {'revision': 'bbb', 'endpoints': {CONFIDENCE_ROUTE: {'p50_ms': 6.0, 'p95_ms': 15.0, 'mean_queries': 4}}}
+
+        rows = diff_reports(base, head)
+        assert rows[0]['p95_change'] == pytest.approx(0.5)
+        assert rows[0]['head_queries'] == 4
+
+        (tmp_path / 'base.json').write_text(json.dumps(base))
+        (tmp_path / 'head.json').write_text(json.dumps(head))
+        result = self.app.test_cli_runner().invoke(
+            args=['replay-diff', str(tmp_path / 'base.json'), str(tmp_path / 'head.json')]
+        )
+        assert result.exit_code == 0
+        assert '1 endpoints regressed' in result.output
+
+    def test_percentile_uses_nearest_rank(self):
+        """Percentiles are actual observed latencies."""
+        assert percentile([1, 2, 3, 4], 0.5) == 2
+        assert percentile([1, 2, 3, 4], 0.95) == 4
+        assert percentile([], 0.5) == 0.0
@@ -0,0 +1,120 @@
+from datetime import datetime
+import pytest
+from flask import abort, jsonify
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models.task import Task, TaskType
+from app.models.user import User
+from app.utils.optimization_batch import bulk_update, db_batch_process
+from app.utils.query_instrumentation import track_queries
+from app.utils.unit_of_work import commit, on_rollback, savepoint
+
+class TestUnitOfWork:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, app, curriculum, make_user, login):
+        """Create a logged-in user with three tasks due today, plus routes that write and then fail."""
+        TaskType.create_default_types()
+        self.app = app
+        self.user = make_user()
+        self.subject_id = curriculum['subject'].id
+        self.task_type_id = TaskType.query.first().id
+        self.rolled_back = []
+
+        def write_then_fail():
+            db.session.add(self.new_task('Discarded'))
+            commit()
+            on_rollback(lambda: self.rolled_back.append(True))
+            abort(409)
+
+        def write_around_savepoint():
+            db.session.add(self.new_task('Kept'))
+            commit()
+            try:
+                with savepoint():
+                    db.session.add(User('student', 'password'))
+                    commit()
+            except IntegrityError:
+                pass
+            db.session.add(self.new_task('Also kept'))
+            commit()
+            return jsonify({'success': True})
+
+        def batch_then_fail():
+            bulk_update(Task, {Task.title: 'Renamed'}, Task.user_id == self.user.id)
+            db_batch_process(Task.query.filter(Task.user_id == self.user.id), batch_size=1,
+                             process_func=lambda tasks: [setattr(task, 'priority', 9) for task in tasks])
+            abort(409)
+
+        # Routes must be added before the app handles its first request
+        app.add_url_rule('/test/write-then-fail', view_func=write_then_fail, methods=['POST'])
+        app.add_url_rule('/test/savepoint', view_func=write_around_savepoint, methods=['POST'])
+        app.add_url_rule('/test/batch-then-fail', view_func=batch_then_fail, methods=['POST'])
+
+        self.client = login(self.user)
+        for index in range(3):
+            db.session.add(self.new_task(f'Task {index}'))
+        db.session.commit()
+
+    def new_task(self, title):
+        return Task(user_id=self.user.id, subject_id=self.subject_id, task_type_id=self.task_type_id,
+                    title=title, due_date=datetime.utcnow().date())
+
+    def titles(self):
+        db.session.expire_all()
+        return {task.title for task in Task.query.filter_by(user_id=self.user.id)}
+
+    def test_refresh_commits_once(self):
+        """Skipping every task of the day and generating replacements is one transaction."""
+        with track_queries() as stats:
+            response = self.client.post('/api/tasks/refresh')
+
+        assert response.status_code == 200
+        assert stats.commits == 1
+        assert 'commits' in response.headers['Server-Timing']
+        assert Task.query.filter(Task.user_id == self.user.id, Task.skipped_at.isnot(None)).count() == 3
+
+    def test_read_only_request_does_not_commit(self):
+        """A request that writes nothing ends without a commit."""
+        with track_queries() as stats:
+            response = self.client.get('/api/pomodoro/stats')
+
+        assert response.status_code == 200
+        assert stats.commits == 0
+
+    def test_error_response_rolls_back(self):
+        """Changes staged before an error response are discarded and rollback callbacks run."""
+        with track_queries() as stats:
+            response = self.client.post('/test/write-then-fail')
+
+        assert response.status_code == 409
+        assert stats.commits == 0
+        assert self.rolled_back == [True]
+        assert 'Discarded' not in self.titles()
+
+    def test_batch_helpers_commit_with_the_request(self):
+        """Batch helpers called in a request only flush, so its error response discards their batches."""
+        with track_queries() as stats:
+            response = self.client.post('/test/batch-then-fail')
+
+        assert response.status_code == 409
+        assert stats.commits == 0
+        assert self.titles() == {'Task 0', 'Task 1', 'Task 2'}
+
+    def test_savepoint_failure_keeps_the_rest_of_the_request(self):
+        """A failed savepoint only discards its own changes."""
+        with track_queries() as stats:
+            response = self.client.post('/test/savepoint')
+
+        assert response.status_code == 200
+        assert stats.commits == 1
+        assert {'Kept', 'Also kept'} <= self.titles()
+        assert User.query.count() == 1
+
+    def test_commit_outside_request_commits(self):
+        """CLI commands and background jobs still commit when asked to."""
+        with track_queries() as stats:
+            db.session.add(self.new_task('Scripted'))
+            commit()
+
+        assert stats.commits == 1